@@ -0,0 +1,34 @@
+"""Opening and writing back a .docx: python-docx's Document()/save() against docx_package."""
+from io import BytesIO
+
+import pytest
+from docx import Document
+
+from core.docx_package import open_docx, write_docx
+
+
+@pytest.fixture
+def parsed(document):
+    return Document(BytesIO(document))
+
+
+def _save(doc) -> bytes:
+    output = BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+def test_docx_save(run_benchmark, parsed):
+    run_benchmark(_save, parsed)
+
+
+def test_write_docx(run_benchmark, parsed, document):
+    run_benchmark(write_docx, parsed, document)
+
+
+def test_docx_open(run_benchmark, document):
+    run_benchmark(lambda: Document(BytesIO(document)))
+
+
+def test_open_docx(run_benchmark, document):
+    run_benchmark(open_docx, document)
@@ -0,0 +1,46 @@
+"""
+Edit-and-recheck loop: a document is checked, one paragraph is edited, and it is checked
+again. Each round extracts both uploads; the cold variant forgets the memo in between.
+"""
+from io import BytesIO
+
+import pytest
+from docx import Document
+
+from core import extraction_cache
+from core.local_document import LocalDocumentService
+
+EXPECTED_FONT = "Times New Roman"
+
+
+@pytest.fixture(scope="module")
+def service() -> LocalDocumentService:
+    return LocalDocumentService()
+
+
+@pytest.fixture(params=[0.1, 0.5, 0.9], ids=["edit-start", "edit-middle", "edit-end"])
+def edited(request, document) -> bytes:
+    """The document with a sentence added to one paragraph at the given position"""
+    doc = Document(BytesIO(document))
+    paragraphs = [p for p in doc.paragraphs if p.text.strip()]
+    paragraphs[int(len(paragraphs) * request.param)].add_run(" And a sentence added after review." * 4)
+    output = BytesIO()
+    doc.save(output)
+    return output.getvalue()
+
+
+def _check_twice(service, original: bytes, edited: bytes, keep_memo: bool):
+    extraction_cache.clear()
+    service.extract_document_properties(original, EXPECTED_FONT)
+    if not keep_memo:
+        extraction_cache.clear()
+    return service.extract_document_properties(edited, EXPECTED_FONT)
+
+
+def test_recheck_cold(run_benchmark, service, document, edited):
+    run_benchmark(_check_twice, service, document, edited, False)
+
+
+def test_recheck_incremental(run_benchmark, service, document, edited):
+    result = run_benchmark(_check_twice, service, document, edited, True)
+    assert result == _check_twice(service, document, edited, False)
@@ -0,0 +1,15 @@
+"""Font-metric page layout estimate of an uploaded .docx (the LibreOffice twin replacement)."""
+from io import BytesIO
+
+from docx import Document
+
+from core.layout_estimator import estimate_docx_layout
+
+
+def _estimate(document: bytes):
+    # Parsing is included: it is part of what a render would cost
+    return estimate_docx_layout(Document(BytesIO(document)), lambda run, paragraph: None)
+
+
+def test_estimate_docx_layout(run_benchmark, document):
+    run_benchmark(_estimate, document)
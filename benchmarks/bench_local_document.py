@@ -0,0 +1,50 @@
+"""Uploaded .docx pipeline: property extraction, checking and formatting."""
+import pytest
+
+from core import extraction_cache
+from core.local_document import LocalDocumentService
+from schemas.template import PageMargins, TemplateParams
+
+EXPECTED_FONT = "Times New Roman"
+
+
+def cold(func):
+    """Every round starts without the re-upload memo (measured in bench_incremental_extraction.py)"""
+    def call(*args, **kwargs):
+        extraction_cache.clear()
+        return func(*args, **kwargs)
+    return call
+
+
+@pytest.fixture(scope="module")
+def service() -> LocalDocumentService:
+    return LocalDocumentService()
+
+
+@pytest.fixture(scope="module")
+def params() -> TemplateParams:
+    # The usual thesis template; the corpus deviates from it in places on purpose
+    return TemplateParams(
+        font_size=14,
+        line_spacing=1.5,
+        margins=PageMargins(top=20, bottom=20, left=30, right=10),
+        check_numbering=True,
+        skip_first_page=True,
+        numbering_start_page=2,
+    )
+
+
+def test_extract_document_properties(run_benchmark, service, document):
+    run_benchmark(cold(service.extract_document_properties), document, EXPECTED_FONT)
+
+
+def test_check_document(run_benchmark, service, document, params):
+    run_benchmark(cold(service.check_document), document, params, EXPECTED_FONT)
+
+
+def test_format_document(run_benchmark, service, document, params):
+    run_benchmark(cold(service.format_document), document, params, EXPECTED_FONT)
+
+
+def test_format_document_styles_mode(run_benchmark, service, document, params):
+    run_benchmark(cold(service.format_document), document, params, EXPECTED_FONT, "styles")
@@ -0,0 +1,25 @@
+"""LibreOffice/PyMuPDF "PDF twin" helpers (skipped where LibreOffice or PyMuPDF is missing)."""
+import shutil
+
+import pytest
+
+from core import pdf_utils
+
+pytestmark = pytest.mark.skipif(
+    pdf_utils.fitz is None or not (shutil.which("libreoffice") or shutil.which("soffice")),
+    reason="needs LibreOffice and PyMuPDF (run inside the Docker image)",
+)
+
+
+def test_get_page_start_text_via_pdf(run_benchmark, document):
+    run_benchmark(pdf_utils.get_page_start_text_via_pdf, document, 1)
+
+
+def test_find_text_in_pdf_pages(run_benchmark, document):
+    # Text that is not in the document: the worst case, every page is scanned
+    run_benchmark(pdf_utils.find_text_in_pdf_pages, document, "відсутній у документі фрагмент тексту")
+
+
+def test_find_text_in_pdf_page_range(run_benchmark, document):
+    # What numbering-start detection does: only a window of pages is rendered and searched
+    run_benchmark(pdf_utils.find_text_in_pdf_pages, document, "відсутній у документі фрагмент тексту", (1, 7))
@@ -0,0 +1,165 @@
+"""
+Benchmark suite for the document pipeline (pytest-benchmark), run from this directory:
+
+    cd benchmarks
+    pytest                                     # tiny/small/medium/large corpus presets
+    pytest --corpus max                        # the 500-page document
+    pytest --benchmark-save=baseline           # store a JSON baseline in baselines/<machine>/
+    pytest --benchmark-compare --benchmark-compare-fail=mean:15% \
+           --memory-baseline=baselines/<machine>/0001_baseline.json
+
+Each benchmark times the call and then runs it once more outside the timed rounds to record
+peak memory in `extra_info`, so both end up in the saved JSON. Baselines are only comparable
+on the same machine (the Docker image has the LibreOffice needed by bench_pdf_utils.py).
+"""
+import ctypes
+import ctypes.util
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# The services import the settings module, which requires a connection string; nothing connects
+os.environ.setdefault("DB_CONNECTION_STRING", "postgresql+asyncpg://benchmark@localhost/benchmark")
+
+from benchmarks.corpus import PRESETS, generate_docx  # noqa: E402
+
+DEFAULT_PRESETS = "tiny,small,medium,large"
+# Timed rounds per preset: enough for stable numbers on small inputs, bounded on big ones
+ROUNDS = {"tiny": 10, "small": 5, "medium": 3, "large": 1, "max": 1}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("corpus benchmarks")
+    group.addoption(
+        "--corpus", default=DEFAULT_PRESETS,
+        help=f"comma-separated corpus presets to run ({', '.join(PRESETS)}; default: {DEFAULT_PRESETS})",
+    )
+    group.addoption(
+        "--memory-baseline", default=None,
+        help="pytest-benchmark JSON file; fail if peak memory grew past --memory-tolerance",
+    )
+    group.addoption(
+        "--memory-tolerance", type=float, default=20.0,
+        help="allowed peak memory growth over --memory-baseline, percent (default: 20)",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "preset" in metafunc.fixturenames:
+        names = [name.strip() for name in metafunc.config.getoption("corpus").split(",") if name.strip()]
+        unknown = [name for name in names if name not in PRESETS]
+        if unknown:
+            raise pytest.UsageError(f"Unknown corpus preset(s): {', '.join(unknown)}")
+        metafunc.parametrize("preset", names)
+
+
+_documents: dict[str, bytes] = {}
+
+
+@pytest.fixture
+def document(preset) -> bytes:
+    """The preset's .docx bytes (generated once per session)"""
+    if preset not in _documents:
+        _documents[preset] = generate_docx(PRESETS[preset])
+    return _documents[preset]
+
+
+@pytest.fixture
+def rounds(preset) -> int:
+    return ROUNDS.get(preset, 1)
+
+
+def _rss_kib(field: str) -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise OSError(f"{field} not in /proc/self/status")
+
+
+def _release_free_heap() -> None:
+    """Hand memory freed by earlier rounds back to the OS (glibc), so it cannot hide new growth"""
+    libc_name = ctypes.util.find_library("c")
+    if libc_name:
+        malloc_trim = getattr(ctypes.CDLL(libc_name), "malloc_trim", None)
+        if malloc_trim is not None:
+            malloc_trim(0)
+
+
+def _reset_peak_rss() -> bool:
+    """Reset VmHWM to the current RSS (Linux >= 4.0); False where unsupported"""
+    _release_free_heap()
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure_memory(func, *args, **kwargs) -> dict[str, float]:
+    """
+    Peak memory of one call, in MiB:
+    - peak_python_mib: tracemalloc peak (Python objects only);
+    - peak_rss_growth_mib: growth of the process high-water mark, which also counts
+      C allocations such as lxml trees (Linux only).
+    """
+    result = {}
+    gc.collect()
+    if _reset_peak_rss():
+        before = _rss_kib("VmRSS")
+        func(*args, **kwargs)
+        result["peak_rss_growth_mib"] = round((_rss_kib("VmHWM") - before) / 1024, 2)
+        gc.collect()
+
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        result["peak_python_mib"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+@pytest.fixture(scope="session")
+def memory_baseline(pytestconfig) -> dict[str, dict]:
+    path = pytestconfig.getoption("memory_baseline")
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {bench["fullname"]: bench.get("extra_info", {}) for bench in data.get("benchmarks", [])}
+
+
+@pytest.fixture
+def run_benchmark(benchmark, request, rounds, memory_baseline):
+    """
+    run_benchmark(func, *args): time `func` for the preset's number of rounds, then record
+    its peak memory and compare it with --memory-baseline.
+    """
+    def run(func, *args, **kwargs):
+        result = benchmark.pedantic(func, args=args, kwargs=kwargs, rounds=rounds, iterations=1, warmup_rounds=0)
+        memory = measure_memory(func, *args, **kwargs)
+        benchmark.extra_info.update(memory)
+
+        baseline = memory_baseline.get(request.node.nodeid)
+        if baseline:
+            tolerance = request.config.getoption("memory_tolerance") / 100
+            regressions = [
+                f"{key}: {value} MiB (baseline {baseline[key]} MiB)"
+                for key, value in memory.items()
+                # Ignore sub-MiB noise on tiny documents
+                if baseline.get(key) is not None and value > max(baseline[key] * (1 + tolerance), baseline[key] + 1)
+            ]
+            if regressions:
+                pytest.fail("Peak memory regression: " + "; ".join(regressions))
+        return result
+
+    return run
@@ -0,0 +1,306 @@
+"""
+Synthetic .docx corpus for the benchmarks.
+
+Documents are generated from a `CorpusSpec` with a fixed seed, so the same spec always
+produces the same bytes and benchmark runs on different machines measure the same input.
+They exercise the paths real theses hit: fragmented runs with mixed direct formatting,
+named styles, theme fonts, headings, figures with "Рис. X.Y." captions, tables,
+several sections and headers/footers with PAGE fields (first page without a number).
+
+    python -m benchmarks.corpus --out benchmarks/corpus                  # every preset
+    python -m benchmarks.corpus --out /tmp/corpus --pages 300 --runs 8   # one custom document
+"""
+import argparse
+import random
+import struct
+import zipfile
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+from docx import Document
+from docx.enum.section import WD_SECTION
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_BREAK
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Cm, Mm, Pt
+
+# Body paragraphs of ~70 words at 14pt / 1.5 spacing on A4: about five per page
+PARAGRAPHS_PER_PAGE = 5
+WORDS_PER_PARAGRAPH = 70
+
+_WORDS = (
+    "аналіз", "система", "модель", "документ", "форматування", "дослідження", "результат",
+    "метод", "процес", "структура", "дані", "параметр", "оцінка", "розробка", "алгоритм",
+    "перевірка", "шрифт", "інтервал", "сторінка", "розділ", "таблиця", "рисунок", "значення",
+    "вимога", "стандарт", "кваліфікаційна", "робота", "проєкт", "сервіс", "застосунок",
+    "користувач", "інтерфейс", "база", "запит", "відповідь", "швидкодія", "пам'ять",
+    "та", "що", "для", "з", "у", "на", "який", "було", "є", "це", "також", "при",
+)
+
+# Explicit fonts appear next to the expected one so the checker has something to report
+_EXPLICIT_FONTS = ("Times New Roman", "Times New Roman", "Times New Roman", "Arial", "Calibri")
+_THEME_FONT_KEYS = ("minorHAnsi", "majorHAnsi")
+_FIXED_TIMESTAMP = datetime(2024, 1, 1)
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    name: str
+    pages: int = 10
+    runs_per_paragraph: int = 3  # run fragmentation; 1 = one run per paragraph
+    sections: int = 1
+    image_every_pages: int = 5  # 0 = no figures
+    table_every_pages: int = 8  # 0 = no tables
+    heading_every_pages: int = 2
+    theme_fonts: bool = True  # some runs use w:asciiTheme instead of an explicit font
+    page_numbers: bool = True  # PAGE field in every section footer
+    title_page: bool = True  # first page is a title page without a page number
+    seed: int = 0
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}.docx"
+
+
+PRESETS = {
+    spec.name: spec
+    for spec in (
+        CorpusSpec("tiny", pages=1, runs_per_paragraph=1, image_every_pages=0, table_every_pages=0, title_page=False),
+        CorpusSpec("small", pages=10, runs_per_paragraph=3),
+        CorpusSpec("medium", pages=50, runs_per_paragraph=4, sections=2),
+        CorpusSpec("large", pages=200, runs_per_paragraph=6, sections=3),
+        CorpusSpec("max", pages=500, runs_per_paragraph=8, sections=4),
+    )
+}
+
+
+def _png(width: int, height: int, rgb: tuple[int, int, int]) -> bytes:
+    """A solid-colour PNG (no imaging library needed)"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    row = b"\x00" + bytes(rgb) * width
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * height))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _add_page_field(paragraph) -> None:
+    """Append a complex PAGE field (begin / instrText / separate / result / end)"""
+    def field_char(kind: str):
+        run = paragraph.add_run()
+        element = OxmlElement("w:fldChar")
+        element.set(qn("w:fldCharType"), kind)
+        run._r.append(element)
+
+    field_char("begin")
+    instr = OxmlElement("w:instrText")
+    instr.set(qn("xml:space"), "preserve")
+    instr.text = " PAGE "
+    paragraph.add_run()._r.append(instr)
+    field_char("separate")
+    paragraph.add_run("1")
+    field_char("end")
+
+
+def _set_theme_font(run, theme_key: str) -> None:
+    rPr = run._r.get_or_add_rPr()
+    fonts = rPr.find(qn("w:rFonts"))
+    if fonts is None:
+        fonts = OxmlElement("w:rFonts")
+        rPr.insert(0, fonts)
+    fonts.set(qn("w:asciiTheme"), theme_key)
+    fonts.set(qn("w:hAnsiTheme"), theme_key)
+
+
+class _Writer:
+    def __init__(self, spec: CorpusSpec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.doc = Document()
+        self.section_number = 1
+        self.figure_number = 0
+        self.table_number = 0
+
+    def words(self, count: int) -> str:
+        return " ".join(self.rng.choice(_WORDS) for _ in range(count))
+
+    def setup(self) -> None:
+        normal = self.doc.styles["Normal"]
+        normal.font.name = "Times New Roman"
+        normal.font.size = Pt(14)
+        normal.paragraph_format.line_spacing = 1.5
+        section = self.doc.sections[0]
+        section.page_height, section.page_width = Mm(297), Mm(210)
+        section.top_margin, section.bottom_margin = Mm(20), Mm(20)
+        section.left_margin, section.right_margin = Mm(30), Mm(10)
+        section.different_first_page_header_footer = self.spec.title_page
+        if self.spec.page_numbers:
+            self.add_page_number(section)
+
+    def add_page_number(self, section) -> None:
+        footer = section.footer
+        footer.is_linked_to_previous = False
+        paragraph = footer.paragraphs[0]
+        paragraph.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+        _add_page_field(paragraph)
+
+    def title_page(self) -> None:
+        for text in ("Міністерство освіти і науки України", "КВАЛІФІКАЦІЙНА РОБОТА", self.words(8).capitalize()):
+            paragraph = self.doc.add_paragraph(text)
+            paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        self.doc.add_paragraph().add_run().add_break(WD_BREAK.PAGE)
+
+    def body_paragraph(self) -> None:
+        paragraph = self.doc.add_paragraph()
+        paragraph.paragraph_format.first_line_indent = Cm(1.25)
+        if self.rng.random() < 0.1:
+            # Direct paragraph formatting that disagrees with the style
+            paragraph.paragraph_format.line_spacing = 1.15
+
+        words = WORDS_PER_PARAGRAPH + self.rng.randint(-20, 20)
+        runs = max(1, self.spec.runs_per_paragraph + self.rng.randint(-1, 1))
+        per_run = max(1, words // runs)
+        for index in range(runs):
+            run = paragraph.add_run(self.words(per_run) + " ")
+            if runs == 1:
+                continue
+            roll = self.rng.random()
+            if roll < 0.25:
+                pass  # inherits the paragraph style
+            elif roll < 0.45 and self.spec.theme_fonts:
+                _set_theme_font(run, self.rng.choice(_THEME_FONT_KEYS))
+            else:
+                run.font.name = self.rng.choice(_EXPLICIT_FONTS)
+            if self.rng.random() < 0.3:
+                run.font.size = Pt(self.rng.choice((14, 14, 14, 12, 13.5)))
+            if index and self.rng.random() < 0.1:
+                run.bold = True
+            if index and self.rng.random() < 0.1:
+                run.italic = True
+
+    def heading(self, level: int) -> None:
+        self.doc.add_heading(self.words(self.rng.randint(3, 7)).capitalize(), level=level)
+
+    def figure(self) -> None:
+        self.figure_number += 1
+        color = tuple(self.rng.randrange(256) for _ in range(3))
+        picture = self.doc.add_paragraph()
+        picture.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        picture.add_run().add_picture(BytesIO(_png(64, 40, color)), width=Cm(10))
+        caption = self.doc.add_paragraph(
+            f"Рис. {self.section_number}.{self.figure_number}. {self.words(5).capitalize()}"
+        )
+        caption.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        self.doc.add_paragraph(f"Джерело: {self.words(4)}")
+
+    def table(self) -> None:
+        self.table_number += 1
+        self.doc.add_paragraph(f"Таблиця {self.section_number}.{self.table_number}. {self.words(4).capitalize()}")
+        rows, cols = self.rng.randint(3, 8), self.rng.randint(2, 5)
+        table = self.doc.add_table(rows=rows, cols=cols)
+        table.style = "Table Grid"
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = self.words(self.rng.randint(1, 4))
+
+    def new_section(self) -> None:
+        self.section_number += 1
+        self.figure_number = self.table_number = 0
+        section = self.doc.add_section(WD_SECTION.NEW_PAGE)
+        section.different_first_page_header_footer = False
+        if self.spec.page_numbers:
+            self.add_page_number(section)
+        self.heading(1)
+
+    def write(self) -> bytes:
+        spec = self.spec
+        self.setup()
+        if spec.title_page:
+            self.title_page()
+        self.heading(1)
+
+        body_pages = max(1, spec.pages - (1 if spec.title_page else 0))
+        section_breaks = {body_pages * i // spec.sections for i in range(1, spec.sections)}
+        for page in range(body_pages):
+            if page in section_breaks:
+                self.new_section()
+            elif page and spec.heading_every_pages and page % spec.heading_every_pages == 0:
+                self.heading(2)
+            for _ in range(PARAGRAPHS_PER_PAGE):
+                self.body_paragraph()
+            if spec.image_every_pages and page % spec.image_every_pages == spec.image_every_pages - 1:
+                self.figure()
+            if spec.table_every_pages and page % spec.table_every_pages == spec.table_every_pages - 1:
+                self.table()
+
+        properties = self.doc.core_properties
+        properties.created = properties.modified = properties.last_printed = _FIXED_TIMESTAMP
+        buffer = BytesIO()
+        self.doc.save(buffer)
+        return _normalize_zip(buffer.getvalue())
+
+
+def _normalize_zip(data: bytes) -> bytes:
+    """Rewrite the package with fixed entry timestamps so equal documents are equal bytes"""
+    output = BytesIO()
+    with zipfile.ZipFile(BytesIO(data)) as source, zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            entry = zipfile.ZipInfo(info.filename, date_time=_FIXED_TIMESTAMP.timetuple()[:6])
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            target.writestr(entry, source.read(info.filename))
+    return output.getvalue()
+
+
+def generate_docx(spec: CorpusSpec) -> bytes:
+    """Build the document described by `spec` (deterministic for a given spec)"""
+    return _Writer(spec).write()
+
+
+def write_corpus(directory: Path, specs) -> list[Path]:
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for spec in specs:
+        path = directory / spec.filename
+        path.write_bytes(generate_docx(spec))
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic .docx documents for benchmarking")
+    parser.add_argument("--out", type=Path, required=True, help="output directory")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS), help="preset(s) to write (default: all)")
+    parser.add_argument("--pages", type=int, help="write one custom document with this many pages (1-500)")
+    parser.add_argument("--runs", type=int, default=3, help="runs per paragraph for --pages")
+    parser.add_argument("--sections", type=int, default=1, help="sections for --pages")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.pages is not None:
+        if not 1 <= args.pages <= 500:
+            parser.error("--pages must be between 1 and 500")
+        specs = [
+            CorpusSpec(
+                f"custom-{args.pages}p",
+                pages=args.pages,
+                runs_per_paragraph=args.runs,
+                sections=args.sections,
+                seed=args.seed,
+            )
+        ]
+    else:
+        specs = [PRESETS[name] for name in (args.preset or PRESETS)]
+
+    for path in write_corpus(args.out, specs):
+        print(f"{path} ({path.stat().st_size // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
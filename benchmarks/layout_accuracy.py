@@ -0,0 +1,163 @@
+"""
+Accuracy of the font-metric layout estimator against a LibreOffice render.
+
+Every paragraph's estimated page is compared with the page its text lands on in the PDF.
+Needs LibreOffice, PyMuPDF and the fonts the documents use (run inside the Docker image):
+
+    python -m benchmarks.layout_accuracy                              # small, medium, large presets
+    python -m benchmarks.layout_accuracy --preset max thesis.docx     # presets and/or real files
+    python -m benchmarks.layout_accuracy --json layout.json
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from bisect import bisect_right
+from io import BytesIO
+from pathlib import Path
+from typing import Optional
+
+from docx import Document
+
+from benchmarks.corpus import PRESETS, generate_docx
+from core.layout_estimator import estimate_docx_layout
+from core.local_document import LocalDocumentService
+from core.pdf_utils import fitz
+
+DEFAULT_PRESETS = ("small", "medium", "large")
+# Alphanumeric characters of a paragraph searched for in the PDF text; short enough to
+# survive hyphenation at the end of the first line
+MATCH_PREFIX = 24
+
+_NON_WORD = re.compile(r"\W+")
+
+
+def _alnum(text: str) -> str:
+    return _NON_WORD.sub("", text).replace("_", "").lower()
+
+
+def render_pages(docx_bytes: bytes) -> tuple[list[str], float]:
+    """Text of every page of the LibreOffice render, and the render time in seconds"""
+    soffice = shutil.which("libreoffice") or shutil.which("soffice")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        docx_path = os.path.join(temp_dir, "document.docx")
+        with open(docx_path, "wb") as f:
+            f.write(docx_bytes)
+        started = time.perf_counter()
+        subprocess.run(
+            [soffice, "--headless", "--convert-to", "pdf", docx_path, "--outdir", temp_dir],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        elapsed = time.perf_counter() - started
+        with fitz.open(os.path.join(temp_dir, "document.pdf")) as pdf:
+            return [page.get_text("text") for page in pdf], elapsed
+
+
+def rendered_paragraph_pages(paragraph_texts: list[str], page_texts: list[str]) -> list[Optional[int]]:
+    """
+    Page of each paragraph in the render: the paragraph's text prefix is searched forward
+    from the previous match, so repeated phrases resolve in document order.
+    """
+    starts, chunks, offset = [], [], 0
+    for text in page_texts:
+        starts.append(offset)
+        chunk = _alnum(text)
+        chunks.append(chunk)
+        offset += len(chunk)
+    rendered = "".join(chunks)
+
+    pages: list[Optional[int]] = []
+    cursor = 0
+    for text in paragraph_texts:
+        prefix = _alnum(text)[:MATCH_PREFIX]
+        position = rendered.find(prefix, cursor) if prefix else -1
+        if position < 0:
+            pages.append(None)
+            continue
+        pages.append(bisect_right(starts, position))
+        cursor = position + len(prefix)
+    return pages
+
+
+def measure(name: str, docx_bytes: bytes) -> dict:
+    service = LocalDocumentService()
+    doc = Document(BytesIO(docx_bytes))
+    theme_map = service._get_document_theme_fonts(doc)
+    doc_defaults = service._get_doc_defaults(doc, theme_map)
+
+    started = time.perf_counter()
+    layout = estimate_docx_layout(
+        doc, lambda run, paragraph: service._resolve_font_family(run, paragraph, theme_map, doc_defaults)
+    )
+    estimate_seconds = time.perf_counter() - started
+
+    page_texts, render_seconds = render_pages(docx_bytes)
+    actual = rendered_paragraph_pages([p.text for p in doc.paragraphs], page_texts)
+
+    errors = [
+        abs(estimated - rendered)
+        for estimated, rendered in zip(layout.paragraph_pages, actual)
+        if rendered is not None
+    ]
+    rendered_first_page_end = next((index for index, page in enumerate(actual) if page and page > 1), None)
+    return {
+        "document": name,
+        "paragraphs": len(errors),
+        "unmatched": len(actual) - len(errors),
+        "exact_pct": round(100 * errors.count(0) / len(errors), 1) if errors else None,
+        "within_one_pct": round(100 * sum(error <= 1 for error in errors) / len(errors), 1) if errors else None,
+        "max_error": max(errors, default=None),
+        "pages_estimated": layout.page_count,
+        "pages_rendered": len(page_texts),
+        "first_page_end_estimated": layout.first_page_end,
+        "first_page_end_rendered": rendered_first_page_end,
+        "reliable": layout.reliable,
+        "unresolved_fonts": sorted(layout.unresolved_fonts),
+        "estimate_ms": round(estimate_seconds * 1000, 1),
+        "render_ms": round(render_seconds * 1000, 1),
+    }
+
+
+def print_table(rows: list[dict]) -> None:
+    columns = (
+        ("document", "document"), ("paragraphs", "paras"), ("exact_pct", "exact %"), ("within_one_pct", "±1 %"),
+        ("max_error", "max err"), ("pages_estimated", "pages est"), ("pages_rendered", "pages pdf"),
+        ("first_page_end_estimated", "p1 end est"), ("first_page_end_rendered", "p1 end pdf"),
+        ("estimate_ms", "estimate ms"), ("render_ms", "render ms"),
+    )
+    cells = [[header for _, header in columns]] + [[str(row[key]) for key, _ in columns] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    for line in cells:
+        print("  ".join(cell.rjust(width) if i else cell.ljust(width) for i, (cell, width) in enumerate(zip(line, widths))))
+    for row in rows:
+        if row["unresolved_fonts"]:
+            print(f"{row['document']}: no metrics for {', '.join(row['unresolved_fonts'])} (heuristic widths used)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the layout estimator with a LibreOffice render")
+    parser.add_argument("paths", nargs="*", type=Path, help=".docx files to measure")
+    parser.add_argument("--preset", action="append", choices=sorted(PRESETS), help="corpus preset(s) to measure")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if fitz is None or not (shutil.which("libreoffice") or shutil.which("soffice")):
+        parser.error("needs LibreOffice and PyMuPDF")
+
+    documents = [(path.name, path.read_bytes()) for path in args.paths]
+    presets = args.preset or ([] if args.paths else DEFAULT_PRESETS)
+    documents += [(name, generate_docx(PRESETS[name])) for name in presets]
+
+    rows = [measure(name, data) for name, data in documents]
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(json.dumps(rows, indent=2, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,51 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class AppSettings(BaseSettings):
     DB_CONNECTION_STRING: str = Field(alias="DB_CONNECTION_STRING", min_length=1)
+    # Connection pool (per worker process)
+    DB_POOL_SIZE: int = Field(default=10, ge=1)
+    DB_MAX_OVERFLOW: int = Field(default=20, ge=0)
+    DB_POOL_TIMEOUT: float = Field(default=30.0, gt=0)  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = Field(default=300)
+    DB_STATEMENT_CACHE_SIZE: int = Field(default=100, ge=0)  # set to 0 behind pgbouncer (transaction mode)
+    DB_COMMAND_TIMEOUT: float = Field(default=30.0, gt=0)  # per-statement timeout, seconds
+    DB_CONNECT_TIMEOUT: float = Field(default=10.0, gt=0)
     GOOGLE_CLIENT_ID: str = Field(default="")
     GOOGLE_CLIENT_SECRET: str = Field(default="")
     GOOGLE_FONTS_API_KEY: str = Field(default="")
     SECRET_KEY: str = Field(default="supersecretkeychangeme")
     FRONTEND_URL: str = Field(default="http://localhost:3000")
+    FONT_CATALOG_TTL_SECONDS: int = Field(default=600)
+    CACHE_VERSION_POLL_SECONDS: float = Field(default=5.0, ge=0)  # how often workers check cache_versions
+    PRINCIPAL_CACHE_TTL_SECONDS: float = Field(default=60.0, ge=0)
+    PRINCIPAL_CACHE_MAX_SIZE: int = Field(default=10_000, ge=1)
+    GOOGLE_DOCS_BATCH_MAX_REQUESTS: int = Field(default=500, ge=1)  # requests per documents.batchUpdate call
+    GOOGLE_DOCS_BATCH_MAX_BYTES: int = Field(default=1_000_000, ge=1024)  # approx. JSON payload per call
+    # Google API quota guard (per worker process)
+    GOOGLE_API_GLOBAL_RATE: float = Field(default=40.0, gt=0)  # requests per second
+    GOOGLE_API_GLOBAL_BURST: float = Field(default=80.0, ge=1)
+    GOOGLE_API_USER_RATE: float = Field(default=1.0, gt=0)  # requests per second per Google account
+    GOOGLE_API_USER_BURST: float = Field(default=10.0, ge=1)
+    GOOGLE_API_USER_MAX_CONCURRENCY: int = Field(default=4, ge=1)
+    GOOGLE_API_MAX_RETRIES: int = Field(default=5, ge=0)
+    GOOGLE_API_BACKOFF_BASE_SECONDS: float = Field(default=0.5, gt=0)
+    GOOGLE_API_BACKOFF_MAX_SECONDS: float = Field(default=32.0, gt=0)
+    GOOGLE_API_MAX_WAIT_SECONDS: float = Field(default=10.0, ge=0)  # longer local waits are answered with 429
+    # Serve Google OAuth/Docs/Drive from another host, e.g. http://localhost:8090 for loadtest/fake_google.py
+    GOOGLE_API_BASE_URL: str = Field(default="")
+    METRICS_TOKEN: str = Field(default="")  # bearer token required on /metrics (empty = open)
+    REQUEST_PROFILE_RETENTION_DAYS: int = Field(default=7, ge=1)
+    LAYOUT_FONT_DIRS: str = Field(default="")  # extra font directories for layout estimation (os.pathsep-separated)
+    # When to render a LibreOffice/Drive PDF twin for page mapping: auto = only when the
+    # font-metric estimate is unreliable; always = every time (previous behaviour); never
+    LAYOUT_PDF_FALLBACK: str = Field(default="auto", pattern="^(auto|always|never)$")
+    # Per-worker memo of extracted paragraphs and layout states, for re-uploads of an edited document (0 = off)
+    PARAGRAPH_CACHE_MAX_SIZE: int = Field(default=20_000, ge=0)
+    LAYOUT_CHECKPOINT_CACHE_MAX_SIZE: int = Field(default=2_000, ge=0)
+    # Check results are stored as deltas against the previous check, with a full issue list every N results
+    CHECK_RESULT_SNAPSHOT_EVERY: int = Field(default=10, ge=1)
+    LOG_LEVEL: str = Field(default="INFO")
+    LOG_FORMAT: str = Field(default="json", pattern="^(json|text)$")  # text: human-readable, for local runs
+    LOG_DEBUG_SAMPLE_RATE: float = Field(default=0.0, ge=0, le=1)  # share of requests that keep DEBUG logs
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,34 @@
+import uuid
+from typing import Iterable, Union
+
+Chunk = Union[bytes, memoryview]
+
+
+class MultipartBody:
+    """
+    A multipart/mixed response body built from parts that are already in memory.
+    Part bodies are kept as the chunks they came in (e.g. a DocxStream), so nothing is
+    copied into one buffer before streaming.
+    """
+
+    def __init__(self, parts: list[tuple[dict[str, str], Iterable[Chunk]]]):
+        self.boundary = uuid.uuid4().hex
+        self.chunks: list[Chunk] = []
+        for headers, body in parts:
+            head = f"--{self.boundary}\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+            self.chunks.append((head + "\r\n").encode("latin-1"))
+            self.chunks.extend(body)
+            self.chunks.append(b"\r\n")
+        self.chunks.append(f"--{self.boundary}--\r\n".encode("latin-1"))
+        self.size = sum(len(chunk) for chunk in self.chunks)
+
+    @property
+    def media_type(self) -> str:
+        return f"multipart/mixed; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self.size
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
@@ -0,0 +1,26 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Tuple
+
+
+def encode_cursor(created_at: datetime, item_id: Any) -> str:
+    """
+    Encode a keyset cursor for (created_at, id) ordered listings.
+    The cursor is an opaque URL-safe string pointing *after* the given row.
+    """
+    payload = json.dumps([created_at.isoformat(), str(item_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, id_type: Callable[[str], Any] = int) -> Tuple[datetime, Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), id_type(item_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
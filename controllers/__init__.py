@@ -6,6 +6,7 @@ from controllers.check_result import check_result_router
 from controllers.user_action_log import user_action_log_router
 from controllers.font import router as font_router
 from controllers.analytics import analytics_router
+from controllers.request_profile import request_profile_router
 
 __all__ = [
     "auth_router",
@@ -16,4 +17,5 @@ __all__ = [
     "user_action_log_router",
     "font_router",
     "analytics_router",
+    "request_profile_router",
 ]
@@ -1,13 +1,12 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
 
 from core.analytics import AnalyticsService
 from crud.analytics import AnalyticsRepositoryDependency
 from crud.user import UserRepositoryDependency
-from db import get_db
 from core import AdminUserDependency
-from schemas.analytics import AnalyticsDashboardResponse
+from core.google_api import google_api
+from schemas.analytics import AnalyticsDashboardResponse, GoogleApiUsageResponse
 
 analytics_router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
@@ -31,4 +30,15 @@ async def get_dashboard_analytics(
     Get analytics dashboard data.
     Requires admin privileges.
     """
-    return analytics_service.get_dashboard_data()
+    return await analytics_service.get_dashboard_data()
+
+
+@analytics_router.get("/google-api", response_model=GoogleApiUsageResponse)
+async def get_google_api_usage(
+    _: AdminUserDependency,
+):
+    """
+    Google API quota usage of this worker since start (calls, retries, throttling).
+    Requires admin privileges.
+    """
+    return google_api.metrics.snapshot()
@@ -1,14 +1,24 @@
+import logging
+
 from fastapi import APIRouter, Request, HTTPException, status, Response
 from fastapi.responses import RedirectResponse
 
 from common.app_settings import settings
-from core import AuthServiceDependency, CurrentUserDependency, UserActionLogServiceDependency, RateLimitServiceDependency
+from core import (
+    AuthServiceDependency,
+    CurrentUserDependency,
+    CurrentUserRecordDependency,
+    UserActionLogServiceDependency,
+    RateLimitServiceDependency,
+)
 
 
 
 from schemas.auth import TokenResponse, RefreshTokenRequest, GoogleAuthUrl
 from schemas.user import UserDto
 
+logger = logging.getLogger(__name__)
+
 auth_router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
@@ -20,7 +30,7 @@ async def get_remaining_checks(
     """
     Get the number of remaining free checks for an anonymous user today.
     """
-    remaining = rate_limit_service.get_remaining_checks(request)
+    remaining = await rate_limit_service.get_remaining_checks(request)
     return {"remaining_checks": remaining}
 
 
@@ -32,7 +42,7 @@ async def login(request: Request, auth_service: AuthServiceDependency):
     """
     # Build callback URL from request
     redirect_uri = str(request.url_for("auth_callback"))
-    print(f"DEBUG: Generated redirect_uri for Google: {redirect_uri}")
+    logger.debug("Generated redirect_uri for Google: %s", redirect_uri)
     authorization_url = auth_service.get_authorization_url(redirect_uri)
     return GoogleAuthUrl(authorization_url=authorization_url)
 
@@ -72,10 +82,10 @@ async def auth_callback(
     
     redirect_uri = str(request.url_for("auth_callback"))
     try:
-        user, access_token, refresh_token = auth_service.process_google_callback(code, redirect_uri)
+        user, access_token, refresh_token = await auth_service.process_google_callback(code, redirect_uri)
         
         # Log the login action
-        log_service.log_action(
+        await log_service.log_action(
             user_id=user.id,
             action_type="LOGIN",
             details={
@@ -129,7 +139,7 @@ async def refresh_token(
             detail="Refresh token not found",
         )
     
-    new_access_token, new_refresh_token = auth_service.refresh_access_token(refresh_token_value)
+    new_access_token, new_refresh_token = await auth_service.refresh_access_token(refresh_token_value)
     
     # Set new refresh token in HTTP-only cookie
     response.set_cookie(
@@ -151,7 +161,7 @@ async def refresh_token(
 
 
 @auth_router.get("/me", response_model=UserDto)
-async def get_current_user_info(current_user: CurrentUserDependency):
+async def get_current_user_info(current_user: CurrentUserRecordDependency):
     """
     Get current authenticated user information.
     Requires valid access token.
@@ -171,7 +181,7 @@ async def logout(
     Client should also discard the access token.
     """
     # Log the logout action
-    log_service.log_action(
+    await log_service.log_action(
         user_id=current_user.id,
         action_type="LOGOUT",
         details={
@@ -193,14 +203,14 @@ async def logout(
 
 @auth_router.post("/refresh-google-token", response_model=dict)
 async def refresh_google_token(
-    current_user: CurrentUserDependency,
+    current_user: CurrentUserRecordDependency,
     auth_service: AuthServiceDependency,
 ):
     """
     Refresh the user's Google access token using their stored Google refresh token.
     This is useful when the Google token expires but the app session is still valid.
     """
-    new_google_token = auth_service.refresh_google_token(current_user)
+    new_google_token = await auth_service.refresh_google_token(current_user)
     return {
         "google_access_token": new_google_token,
         "message": "Google token refreshed successfully"
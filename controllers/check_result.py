@@ -1,12 +1,26 @@
-from fastapi import APIRouter, HTTPException, status, Request
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Response, status, Request
 from uuid import UUID
 
 from core import CheckResultServiceDependency, CurrentUserDependency, UserActionLogServiceDependency
-from schemas.check_result import CheckResultDto
+from schemas.check_result import CheckResultDiffDto, CheckResultDto, CheckResultSummaryDto
+from common.pagination import encode_cursor, decode_cursor
 
 check_result_router = APIRouter(prefix="/check-results", tags=["Check Results"])
 
 
+def _parse_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, UUID)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
 @check_result_router.get("/{check_result_id}", response_model=CheckResultDto)
 async def get_check_result(
     check_result_id: UUID,
@@ -19,7 +33,7 @@ async def get_check_result(
     Get a specific check result by ID.
     Only the document owner can access it.
     """
-    check_result = check_result_service.get_check_result(check_result_id, current_user.id)
+    check_result = await check_result_service.get_check_result(check_result_id, current_user.id)
     if not check_result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -27,7 +41,7 @@ async def get_check_result(
         )
     
     # Log check result access
-    log_service.log_action(
+    await log_service.log_action(
         user_id=current_user.id,
         action_type="CHECK_RESULT_VIEW",
         details={
@@ -50,4 +64,41 @@ async def get_document_check_results(
     Get all check results for a specific document.
     Only the document owner can access them.
     """
-    return check_result_service.get_document_check_results(document_id, current_user.id)
+    return await check_result_service.get_document_check_results(document_id, current_user.id)
+
+
+@check_result_router.get("/document/{document_id}/summary", response_model=list[CheckResultSummaryDto])
+async def get_document_check_summaries(
+    document_id: UUID,
+    current_user: CurrentUserDependency,
+    check_result_service: CheckResultServiceDependency,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200, description="Number of check results to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+):
+    """
+    Check history of a document, newest first, without the issues
+    (load them per result from GET /check-results/{check_result_id}).
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    Only the document owner can access it.
+    """
+    summaries = await check_result_service.get_document_check_summaries(
+        document_id, current_user.id, limit=limit, cursor=_parse_cursor(cursor)
+    )
+    if len(summaries) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(summaries[-1].created_at, summaries[-1].id)
+    return summaries
+
+
+@check_result_router.get("/document/{document_id}/diff", response_model=CheckResultDiffDto)
+async def get_document_check_diff(
+    document_id: UUID,
+    current_user: CurrentUserDependency,
+    check_result_service: CheckResultServiceDependency,
+):
+    """
+    What changed since the last check: new and resolved issues of the document's
+    latest check compared with the check before it.
+    Only the document owner can access it.
+    """
+    return await check_result_service.get_document_check_diff(document_id, current_user.id)
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, HTTPException, status, Request, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Query, status, Request, Response, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from uuid import UUID
-from typing import Optional
-from io import BytesIO
+from typing import Literal, Optional
 
 from core import (
     DocumentServiceDependency,
     CurrentUserDependency,
+    CurrentUserRecordDependency,
     OptionalUserDependency,
     UserActionLogServiceDependency,
     CheckResultServiceDependency,
@@ -17,12 +18,29 @@ from core.format_checker import FormatCheckerServiceDependency
 from core.document_formatter import DocumentFormatterServiceDependency
 from core.local_document import LocalDocumentService
 from core.rate_limit import RateLimitServiceDependency
+from core.profiling import PROFILE_ID_HEADER, RequestProfiler, profile_requested
+from common.multipart import MultipartBody
+from common.pagination import encode_cursor, decode_cursor
+from core.request_profile import RequestProfileServiceDependency
 from schemas.document import DocumentCreate, DocumentDto, FormatDocumentRequest, FormatResultDto
 from schemas.check_result import CheckDocumentRequest, CheckResultDto, UploadCheckResultDto
 from schemas.template import TemplateParams
 
 document_router = APIRouter(prefix="/documents", tags=["Documents"])
 
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _upload_check_result(check_result, file_name: str) -> UploadCheckResultDto:
+    return UploadCheckResultDto(
+        passed=check_result.passed,
+        overall_score=check_result.overall_score,
+        issues_count=len(check_result.issues),
+        issues=[issue.to_dict() for issue in check_result.issues],
+        processing_time_ms=check_result.processing_time_ms,
+        document_title=check_result.document_title or file_name,
+    )
+
 
 # ====================
 # Upload Endpoints (must come before parameterized routes)
@@ -31,8 +49,10 @@ document_router = APIRouter(prefix="/documents", tags=["Documents"])
 @document_router.post("/upload/check", response_model=UploadCheckResultDto)
 async def check_uploaded_document(
     request: Request,
+    response: Response,
     template_service: TemplateServiceDependency,
     rate_limit_service: RateLimitServiceDependency,
+    profile_service: RequestProfileServiceDependency,
     current_user: OptionalUserDependency = None,
     log_service: UserActionLogServiceDependency = None,
     file: UploadFile = File(..., description="The .docx file to check"),
@@ -51,12 +71,13 @@ async def check_uploaded_document(
     
     Anonymous users: Limited to 10 checks per day.
     Authenticated users: Unlimited checks.
+    Admins can send `X-Profile: 1` to profile the check (see /admin/profiles).
     """
     # Handle rate limiting for anonymous users
     remaining_checks = None
     if not current_user:
         # Anonymous user - apply rate limiting
-        rate_info = rate_limit_service.check_and_increment_anonymous_limit(request)
+        rate_info = await rate_limit_service.check_and_increment_anonymous_limit(request)
         remaining_checks = rate_info["remaining_checks"]
     else:
         # Authenticated user - check for banned status
@@ -104,7 +125,7 @@ async def check_uploaded_document(
     
     if template_id:
         # Using template
-        template = template_service.get_template(template_id)
+        template = await template_service.get_template(template_id)
         if not template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -131,9 +152,12 @@ async def check_uploaded_document(
         )
     
     # Perform check
+    profiler = RequestProfiler() if profile_requested(request, current_user) else None
     try:
         local_doc_service = LocalDocumentService()
-        check_result = local_doc_service.check_document(
+        check_job = local_doc_service.check_document
+        check_result = await run_in_threadpool(
+            profiler.wrap(check_job) if profiler else check_job,
             file_content=file_content,
             params=params,
             expected_font_family=expected_font_family,
@@ -144,9 +168,17 @@ async def check_uploaded_document(
             detail=f"Failed to check document: {str(e)}",
         )
     
+    if profiler:
+        profile = await profile_service.save_profile(
+            profiler, current_user.id, "documents.upload.check",
+            details={"file_name": file.filename, "file_size": len(file_content), "template_id": template_id_value},
+        )
+        if profile:
+            response.headers[PROFILE_ID_HEADER] = str(profile.id)
+    
     # Log the check (only for authenticated users)
     if current_user and log_service:
-        log_service.log_action(
+        await log_service.log_action(
             user_id=current_user.id,
             action_type="DOCUMENT_CHECK",
             details={
@@ -160,14 +192,7 @@ async def check_uploaded_document(
             }
         )
     
-    result = UploadCheckResultDto(
-        passed=check_result.passed,
-        overall_score=check_result.overall_score,
-        issues_count=len(check_result.issues),
-        issues=[issue.to_dict() for issue in check_result.issues],
-        processing_time_ms=check_result.processing_time_ms,
-        document_title=check_result.document_title or file.filename,
-    )
+    result = _upload_check_result(check_result, file.filename)
     
     # Add remaining checks info for anonymous users
     if remaining_checks is not None:
@@ -181,11 +206,15 @@ async def format_uploaded_document(
     current_user: CurrentUserDependency,
     template_service: TemplateServiceDependency,
     log_service: UserActionLogServiceDependency,
+    profile_service: RequestProfileServiceDependency,
     request: Request,
     file: UploadFile = File(...),
     template_id: Optional[int] = Form(None),
     custom_params: Optional[str] = Form(None),
     font_family: Optional[str] = Form(None),
+    mode: Literal["runs", "styles"] = Form("runs"),
+    verify: bool = Form(False, description="Also check the formatted document and return the result with it"),
+    detailed_changes: bool = Form(False, description="List every change separately instead of aggregated counts"),
 ):
     """
     Format an uploaded .docx file according to a template or custom parameters.
@@ -194,7 +223,14 @@ async def format_uploaded_document(
     - template_id: Use an existing template's formatting rules
     - custom_params (JSON string) + optional font_family: Use custom formatting parameters
     
+    mode=styles normalizes font, size and spacing through the document's styles and removes
+    only conflicting direct formatting (fewer edits, smaller output); the default rewrites every run.
+    
     Returns the formatted document as a downloadable .docx file.
+    With verify=true the response is multipart/mixed: an application/json part with the
+    check result of the formatted document (same shape as /upload/check), then the .docx.
+    The check runs on the formatted document in memory, so there is no need to upload it again.
+    Admins can send `X-Profile: 1` to profile the run (see /admin/profiles).
     """
     # Check for banned users
     if current_user.is_banned:
@@ -227,7 +263,7 @@ async def format_uploaded_document(
     
     if template_id:
         # Using template
-        template = template_service.get_template(template_id)
+        template = await template_service.get_template(template_id)
         if not template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -254,13 +290,22 @@ async def format_uploaded_document(
         )
     
     # Perform formatting
+    profiler = RequestProfiler() if profile_requested(request, current_user) else None
     try:
         local_doc_service = LocalDocumentService()
-        formatted_content, format_result = local_doc_service.format_document(
+        format_job = local_doc_service.format_and_check_document if verify else local_doc_service.format_document
+        job_result = await run_in_threadpool(
+            profiler.wrap(format_job) if profiler else format_job,
             file_content=file_content,
             params=params,
             expected_font_family=expected_font_family,
+            mode=mode,
+            detailed_changes=detailed_changes,
         )
+        if verify:
+            formatted_content, format_result, check_result = job_result
+        else:
+            (formatted_content, format_result), check_result = job_result, None
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -268,14 +313,16 @@ async def format_uploaded_document(
         )
     
     # Log the format operation
-    log_service.log_action(
+    await log_service.log_action(
         user_id=current_user.id,
         action_type="DOCUMENT_FORMAT",
         details={
             "file_name": file.filename,
             "template_id": template_id_value,
             "custom_params": custom_params_dict,
+            "mode": mode,
             "changes_applied": format_result.changes_applied,
+            "check_passed": check_result.passed if check_result else None,
             "ip_address": request.client.host if request.client else None,
         }
     )
@@ -285,14 +332,37 @@ async def format_uploaded_document(
     from urllib.parse import quote
     output_filename = f"formatted_{file.filename}"
     encoded_filename = quote(output_filename)
+    headers = {}
     
-    return StreamingResponse(
-        BytesIO(formatted_content),
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={
-            "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
-        }
-    )
+    if profiler:
+        profile = await profile_service.save_profile(
+            profiler, current_user.id, "documents.upload.format",
+            details={"file_name": file.filename, "file_size": len(file_content), "template_id": template_id_value},
+        )
+        if profile:
+            headers[PROFILE_ID_HEADER] = str(profile.id)
+    
+    # Chunks straight from the docx writer (unmodified parts are views into the upload)
+    if check_result is None:
+        headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{encoded_filename}"
+        headers["Content-Length"] = str(len(formatted_content))
+        return StreamingResponse(formatted_content, media_type=DOCX_MEDIA_TYPE, headers=headers)
+
+    body = MultipartBody([
+        (
+            {"Content-Type": "application/json", "Content-Disposition": 'inline; name="check_result"'},
+            [_upload_check_result(check_result, file.filename).model_dump_json().encode("utf-8")],
+        ),
+        (
+            {
+                "Content-Type": DOCX_MEDIA_TYPE,
+                "Content-Disposition": f"attachment; name=\"document\"; filename*=UTF-8''{encoded_filename}",
+            },
+            formatted_content,
+        ),
+    ])
+    headers["Content-Length"] = str(len(body))
+    return StreamingResponse(body, media_type=body.media_type, headers=headers)
 
 
 # ====================
@@ -303,11 +373,25 @@ async def format_uploaded_document(
 async def get_user_documents(
     current_user: CurrentUserDependency,
     document_service: DocumentServiceDependency,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500, description="Number of documents to return"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
 ):
     """
-    Get all documents for the current user.
+    Get the current user's documents, newest first, each with a summary of its latest check.
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
-    return document_service.get_user_documents(current_user.id)
+    try:
+        parsed_cursor = decode_cursor(cursor, UUID) if cursor is not None else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    documents = await document_service.get_user_documents(current_user.id, limit=limit, cursor=parsed_cursor)
+    if len(documents) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(documents[-1].created_at, documents[-1].id)
+    return documents
 
 
 @document_router.get("/by-google-id/{google_doc_id}", response_model=DocumentDto)
@@ -320,7 +404,7 @@ async def get_document_by_google_id(
     Get a document by Google Doc ID.
     Only the document owner can access it.
     """
-    document = document_service.get_document_by_google_id(google_doc_id, current_user.id)
+    document = await document_service.get_document_by_google_id(google_doc_id, current_user.id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -339,7 +423,7 @@ async def get_document(
     Get a specific document by ID.
     Only the document owner can access it.
     """
-    document = document_service.get_document(document_id, current_user.id)
+    document = await document_service.get_document(document_id, current_user.id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -366,10 +450,10 @@ async def create_document(
             detail="Cannot create documents while your account is banned",
         )
     
-    document = document_service.create_document(data, current_user)
+    document = await document_service.create_document(data, current_user)
     
     # Log document creation
-    log_service.log_action(
+    await log_service.log_action(
         user_id=current_user.id,
         action_type="DOCUMENT_CREATE",
         details={
@@ -402,10 +486,10 @@ async def delete_document(
             detail="Cannot delete documents while your account is banned",
         )
     
-    document = document_service.delete_document(document_id, current_user.id)
+    document = await document_service.delete_document(document_id, current_user.id)
     
     # Log document deletion
-    log_service.log_action(
+    await log_service.log_action(
         user_id=current_user.id,
         action_type="DOCUMENT_DELETE",
         details={
@@ -421,14 +505,16 @@ async def delete_document(
 async def check_document(
     document_id: UUID,
     data: CheckDocumentRequest,
-    current_user: CurrentUserDependency,
+    current_user: CurrentUserRecordDependency,
     document_service: DocumentServiceDependency,
     template_service: TemplateServiceDependency,
     format_checker: FormatCheckerServiceDependency,
     check_result_service: CheckResultServiceDependency,
     user_service: UserServiceDependency,
     log_service: UserActionLogServiceDependency,
+    profile_service: RequestProfileServiceDependency,
     request: Request,
+    response: Response,
 ):
     """
     Check a document's formatting against a template or custom parameters.
@@ -438,6 +524,7 @@ async def check_document(
     - custom_params + optional font_family: Use custom formatting parameters
     
     Custom parameters avoid creating template entities in the database.
+    Admins can send `X-Profile: 1` to profile the check (see /admin/profiles).
     """
     # Check for banned users
     if current_user.is_banned:
@@ -449,7 +536,7 @@ async def check_document(
     # Verify document exists and belongs to user (admins can access any document)
     from models.user import UserRole
     is_admin = current_user.role == UserRole.ADMIN
-    document = document_service.get_document(document_id, current_user.id, is_admin=is_admin)
+    document = await document_service.get_document(document_id, current_user.id, is_admin=is_admin)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -471,7 +558,7 @@ async def check_document(
     
     if data.template_id:
         # Using template
-        template = template_service.get_template(data.template_id)
+        template = await template_service.get_template(data.template_id)
         if not template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -486,22 +573,39 @@ async def check_document(
         font_family = data.font_family
         custom_params_dict = params.model_dump()
     
-    # Callback to save refreshed Google token
+    # The Google calls run in a worker thread; remember a refreshed token and save it afterwards
+    refreshed_tokens: list[str] = []
+    
     def on_token_refresh(new_token: str):
-        user_service.update_google_token(current_user.id, new_token)
+        refreshed_tokens.append(new_token)
     
     # Perform the format check
-    check_result = format_checker.check_document(
-        google_token=current_user.google_token,
-        doc_id=document.google_doc_id,
-        params=params,
-        expected_font_family=font_family,
-        refresh_token=current_user.google_refresh_token,
-        on_token_refresh=on_token_refresh,
-    )
+    profiler = RequestProfiler() if profile_requested(request, current_user) else None
+    check_job = format_checker.check_document
+    try:
+        check_result = await run_in_threadpool(
+            profiler.wrap(check_job) if profiler else check_job,
+            google_token=current_user.google_token,
+            doc_id=document.google_doc_id,
+            params=params,
+            expected_font_family=font_family,
+            refresh_token=current_user.google_refresh_token,
+            on_token_refresh=on_token_refresh,
+        )
+    finally:
+        if refreshed_tokens:
+            await user_service.update_google_token(current_user.id, refreshed_tokens[-1])
+    
+    if profiler:
+        profile = await profile_service.save_profile(
+            profiler, current_user.id, "documents.check",
+            details={"document_id": str(document_id), "template_id": template_id},
+        )
+        if profile:
+            response.headers[PROFILE_ID_HEADER] = str(profile.id)
     
     # Save the check result
-    saved_result = check_result_service.create_check_result(
+    saved_result = await check_result_service.create_check_result(
         document_id=document_id,
         passed=check_result.passed,
         overall_score=check_result.overall_score,
@@ -514,7 +618,7 @@ async def check_document(
     )
     
     # Log the check action
-    log_service.log_action(
+    await log_service.log_action(
         user_id=current_user.id,
         action_type="DOCUMENT_CHECK",
         details={
@@ -536,13 +640,15 @@ async def check_document(
 async def format_document(
     document_id: UUID,
     data: FormatDocumentRequest,
-    current_user: CurrentUserDependency,
+    current_user: CurrentUserRecordDependency,
     document_service: DocumentServiceDependency,
     template_service: TemplateServiceDependency,
     document_formatter: DocumentFormatterServiceDependency,
     user_service: UserServiceDependency,
     log_service: UserActionLogServiceDependency,
+    profile_service: RequestProfileServiceDependency,
     request: Request,
+    response: Response,
 ):
     """
     Apply formatting to a document based on a template or custom parameters.
@@ -555,6 +661,15 @@ async def format_document(
     Provide either:
     - template_id: Use an existing template's formatting rules
     - custom_params + optional font_family: Use custom formatting parameters
+    
+    Large plans are sent as several Google Docs batchUpdate calls (one call when the plan
+    fits GOOGLE_DOCS_BATCH_MAX_REQUESTS / GOOGLE_DOCS_BATCH_MAX_BYTES). Each call is atomic
+    but the sequence is not: style updates are sent before text replacements, and if a later
+    call fails the document stays partly formatted. The error then says how many batches and
+    requests were applied; formatting again finishes the job, since only values that still
+    differ are requested.
+    
+    Admins can send `X-Profile: 1` to profile the run (see /admin/profiles).
     """
     # Check for banned users
     if current_user.is_banned:
@@ -566,7 +681,7 @@ async def format_document(
     # Verify document exists and belongs to user (admins can access any document)
     from models.user import UserRole
     is_admin = current_user.role == UserRole.ADMIN
-    document = document_service.get_document(document_id, current_user.id, is_admin=is_admin)
+    document = await document_service.get_document(document_id, current_user.id, is_admin=is_admin)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -587,7 +702,7 @@ async def format_document(
     
     if data.template_id:
         # Using template
-        template = template_service.get_template(data.template_id)
+        template = await template_service.get_template(data.template_id)
         if not template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -606,22 +721,40 @@ async def format_document(
             detail="Either template_id or custom_params must be provided",
         )
     
-    # Callback to save refreshed Google token
+    # The Google calls run in a worker thread; remember a refreshed token and save it afterwards
+    refreshed_tokens: list[str] = []
+    
     def on_token_refresh(new_token: str):
-        user_service.update_google_token(current_user.id, new_token)
+        refreshed_tokens.append(new_token)
     
     # Perform the format operation
-    format_result = document_formatter.format_document(
-        google_token=current_user.google_token,
-        doc_id=document.google_doc_id,
-        params=params,
-        expected_font_family=font_family,
-        refresh_token=current_user.google_refresh_token,
-        on_token_refresh=on_token_refresh,
-    )
+    profiler = RequestProfiler() if profile_requested(request, current_user) else None
+    format_job = document_formatter.format_document
+    try:
+        format_result = await run_in_threadpool(
+            profiler.wrap(format_job) if profiler else format_job,
+            google_token=current_user.google_token,
+            doc_id=document.google_doc_id,
+            params=params,
+            expected_font_family=font_family,
+            refresh_token=current_user.google_refresh_token,
+            on_token_refresh=on_token_refresh,
+            detailed_changes=data.detailed_changes,
+        )
+    finally:
+        if refreshed_tokens:
+            await user_service.update_google_token(current_user.id, refreshed_tokens[-1])
+    
+    if profiler:
+        profile = await profile_service.save_profile(
+            profiler, current_user.id, "documents.format",
+            details={"document_id": str(document_id), "template_id": template_id},
+        )
+        if profile:
+            response.headers[PROFILE_ID_HEADER] = str(profile.id)
     
     # Log the format action
-    log_service.log_action(
+    await log_service.log_action(
         user_id=current_user.id,
         action_type="DOCUMENT_FORMAT",
         details={
@@ -631,6 +764,8 @@ async def format_document(
             "custom_params": data.custom_params is not None,
             "success": format_result.success,
             "changes_applied": format_result.changes_applied,
+            "batches_applied": format_result.batches_applied,
+            "batches_total": format_result.batches_total,
             "ip_address": request.client.host if request.client else None,
         }
     )
@@ -644,15 +779,7 @@ async def format_document(
     return FormatResultDto(
         success=format_result.success,
         changes_applied=format_result.changes_applied,
-        changes=[
-            {
-                "type": c.type,
-                "description": c.description,
-                "before": c.before,
-                "after": c.after,
-            }
-            for c in format_result.changes
-        ],
+        changes=format_result.changes_as_dicts(),
         processing_time_ms=format_result.processing_time_ms,
         document_title=format_result.document_title,
     )
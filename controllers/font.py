@@ -1,29 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Literal, Optional
 
-from db import get_db
 from schemas.font import FontDto, FontListResponse, FontSeedResponse, FontCreate
 from crud.font import FontRepositoryDependency
 from core import AdminUserDependency
+from core.font_catalog import font_catalog
 
 
 router = APIRouter(prefix="/fonts", tags=["fonts"])
 
 
 @router.post("/", response_model=FontDto, summary="Create font manually")
-def create_font(
+async def create_font(
     font_data: FontCreate,
     admin_user: AdminUserDependency,
     font_repository: FontRepositoryDependency = None
 ):
     """Create a new font manually"""
     # Check if font already exists
-    existing_font = font_repository.get_font_by_family(font_data.family)
+    existing_font = await font_repository.get_font_by_family(font_data.family)
     if existing_font:
         raise HTTPException(status_code=400, detail="Font with this family name already exists")
     
-    return font_repository.create_font(
+    font = await font_repository.create_font(
         family=font_data.family,
         category=font_data.category,
         variants=font_data.variants,
@@ -31,21 +30,39 @@ def create_font(
         version=font_data.version,
         last_modified=font_data.last_modified
     )
+    font_catalog.invalidate()
+    return font
 
 
 @router.get("/", summary="Get all fonts")
-def list_fonts(
+async def list_fonts(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(10, ge=1, le=1000, description="Number of records to return"),
     search: Optional[str] = Query(None, description="Search by font family name"),
+    match: Literal["contains", "prefix", "fuzzy"] = Query(
+        "contains", description="How `search` is matched: substring, prefix or fuzzy (trigram)"
+    ),
     font_repository: FontRepositoryDependency = None
-) -> dict:
-    """Get paginated list of all fonts with optional search"""
-    fonts = font_repository.get_all_fonts(skip=skip, limit=limit, search=search)
-    total = font_repository.count_fonts(search=search)
-    
+):
+    """
+    Get paginated list of all fonts with optional search.
+    Served from the in-memory font catalog; supports conditional requests
+    (ETag / If-None-Match) so repeated picker queries can be answered with 304.
+    """
+    await font_catalog.ensure_loaded(font_repository)
+    etag = font_catalog.etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+
+    if etag and etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    fonts, total = font_catalog.search(search=search, match=match, skip=skip, limit=limit)
+    response.headers.update(headers)
+
     return {
-        "fonts": [FontDto.model_validate(font) for font in fonts],
+        "fonts": fonts,
         "total": total,
         "skip": skip,
         "limit": limit
@@ -53,31 +70,31 @@ def list_fonts(
 
 
 @router.get("/{font_id}", response_model=FontDto)
-def get_font(
+async def get_font(
     font_id: int,
     font_repository: FontRepositoryDependency = None
 ):
     """Get font by ID"""
-    font = font_repository.get_font_by_id(font_id)
+    font = await font_repository.get_font_by_id(font_id)
     if not font:
         raise HTTPException(status_code=404, detail="Font not found")
     return font
 
 
 @router.get("/by-family/{family}", response_model=FontDto)
-def get_font_by_family(
+async def get_font_by_family(
     family: str,
     font_repository: FontRepositoryDependency = None
 ):
     """Get font by family name"""
-    font = font_repository.get_font_by_family(family)
+    font = await font_repository.get_font_by_family(family)
     if not font:
         raise HTTPException(status_code=404, detail="Font not found")
     return font
 
 
 @router.post("/seed", response_model=FontSeedResponse)
-def seed_fonts(
+async def seed_fonts(
     admin_user: AdminUserDependency,
     font_repository: FontRepositoryDependency = None
 ):
@@ -87,7 +104,7 @@ def seed_fonts(
     """
     from core import font as font_core
     try:
-        count = font_core.seed_fonts_from_google_with_settings(font_repository)
+        count = await font_core.seed_fonts_from_google_with_settings(font_repository)
         return FontSeedResponse(
             success=True,
             message=f"Successfully seeded {count} fonts",
@@ -95,16 +112,20 @@ def seed_fonts(
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Seeding may have committed part of the fonts even when it fails
+        font_catalog.invalidate()
 
 
 @router.delete("/{font_id}", summary="Delete font")
-def delete_font(
+async def delete_font(
     font_id: int,
     admin_user: AdminUserDependency,
     font_repository: FontRepositoryDependency = None
 ):
     """Delete a font by ID (admin only)"""
-    success = font_repository.delete_font(font_id)
+    success = await font_repository.delete_font(font_id)
     if not success:
         raise HTTPException(status_code=404, detail="Font not found")
+    font_catalog.invalidate()
     return {"success": True, "message": "Font deleted successfully"}
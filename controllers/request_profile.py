@@ -0,0 +1,58 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Query
+from fastapi.responses import Response
+
+from core import AdminUserDependency
+from core.request_profile import RequestProfileServiceDependency
+from schemas.request_profile import RequestProfileDto, RequestProfileSummaryDto
+
+request_profile_router = APIRouter(prefix="/admin/profiles", tags=["Admin"])
+
+
+@request_profile_router.get("", response_model=list[RequestProfileSummaryDto])
+async def get_profiles(
+    _: AdminUserDependency,
+    profile_service: RequestProfileServiceDependency,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Recent request profiles, newest first.
+    Requires admin privileges.
+    """
+    return await profile_service.get_profiles(limit=limit, offset=offset)
+
+
+@request_profile_router.get("/{profile_id}", response_model=RequestProfileDto)
+async def get_profile(
+    profile_id: UUID,
+    _: AdminUserDependency,
+    profile_service: RequestProfileServiceDependency,
+):
+    """
+    A stored profile: per-stage time and tracemalloc peak, plus the profiler's text report.
+    Requires admin privileges.
+    """
+    return await profile_service.get_profile(profile_id)
+
+
+@request_profile_router.get("/{profile_id}/artifact")
+async def get_profile_artifact(
+    profile_id: UUID,
+    _: AdminUserDependency,
+    profile_service: RequestProfileServiceDependency,
+):
+    """
+    The full profiler output: pyinstrument's interactive HTML flame view, or a cProfile
+    pstats file (view with e.g. `snakeviz profile.prof`).
+    Requires admin privileges.
+    """
+    artifact, artifact_type = await profile_service.get_artifact(profile_id)
+    if artifact_type == "html":
+        return Response(content=artifact, media_type="text/html")
+    return Response(
+        content=artifact,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'},
+    )
@@ -25,7 +25,7 @@ async def get_all_templates(
     if include_inactive and (not current_user or current_user.role != UserRole.ADMIN):
         include_inactive = False
     
-    templates = template_service.get_all_templates(include_inactive=include_inactive)
+    templates = await template_service.get_all_templates(include_inactive=include_inactive)
     total = len(templates)
     paginated_templates = templates[skip:skip+limit]
     return {
@@ -45,7 +45,7 @@ async def get_template(
     """
     Get a specific template by ID.
     """
-    template = template_service.get_template(template_id)
+    template = await template_service.get_template(template_id)
     if not template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -63,7 +63,7 @@ async def create_template(
     """
     Create a new template (admin only).
     """
-    return template_service.create_template(data)
+    return await template_service.create_template(data)
 
 
 @template_router.put("/{template_id}", response_model=TemplateDto)
@@ -77,7 +77,7 @@ async def update_template(
     Update template (admin only).
     """
     params_dict = data.params.model_dump() if data.params else None
-    return template_service.update_template(
+    return await template_service.update_template(
         template_id,
         name=data.name,
         description=data.description,
@@ -96,4 +96,4 @@ async def delete_template(
     """
     Delete a template (admin only).
     """
-    return template_service.delete_template(template_id)
+    return await template_service.delete_template(template_id)
@@ -1,7 +1,13 @@
 from fastapi import APIRouter, HTTPException, status, Request
 from uuid import UUID
 
-from core import UserServiceDependency, CurrentUserDependency, AdminUserDependency, UserActionLogServiceDependency
+from core import (
+    UserServiceDependency,
+    CurrentUserDependency,
+    CurrentUserRecordDependency,
+    AdminUserDependency,
+    UserActionLogServiceDependency,
+)
 from schemas.user import BanUserRequest, UserDto
 
 user_router = APIRouter(prefix="/users", tags=["Users"])
@@ -17,7 +23,7 @@ async def get_all_users(
     """
     Get all users (admin only) with pagination.
     """
-    users = user_service.get_all_users()
+    users = await user_service.get_all_users()
     total = len(users)
     paginated_users = users[skip:skip+limit]
     return {
@@ -29,7 +35,7 @@ async def get_all_users(
 
 
 @user_router.get("/me", response_model=UserDto)
-async def get_current_user(current_user: CurrentUserDependency):
+async def get_current_user(current_user: CurrentUserRecordDependency):
     """
     Get current authenticated user.
     """
@@ -56,7 +62,7 @@ async def get_user(
             detail="Access denied",
         )
     
-    user = user_service.get_user(user_id)
+    user = await user_service.get_user(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -74,7 +80,7 @@ async def delete_user(
     """
     Delete a user (admin only).
     """
-    return user_service.delete_user(user_id, admin_user.id)
+    return await user_service.delete_user(user_id, admin_user.id)
 
 
 @user_router.post("/{user_id}/ban", response_model=UserDto)
@@ -91,9 +97,9 @@ async def ban_user(
     if body is None:
         body = BanUserRequest()
     
-    result = user_service.ban_user(user_id, admin_user.id)
+    result = await user_service.ban_user(user_id, admin_user.id)
     # Log action
-    log_service.log_action(
+    await log_service.log_action(
         user_id=admin_user.id,
         action_type="ADMIN_BAN_USER",
         details={
@@ -120,9 +126,9 @@ async def unban_user(
     if body is None:
         body = BanUserRequest()
     
-    result = user_service.unban_user(user_id)
+    result = await user_service.unban_user(user_id)
     # Log action
-    log_service.log_action(
+    await log_service.log_action(
         user_id=admin_user.id,
         action_type="ADMIN_UNBAN_USER",
         details={
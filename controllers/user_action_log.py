@@ -1,7 +1,7 @@
 from typing import Optional
 from datetime import datetime
 from uuid import UUID
-from fastapi import APIRouter, Query, HTTPException, status
+from fastapi import APIRouter, Query, HTTPException, Response, status
 
 from core import (
     UserActionLogServiceDependency,
@@ -9,16 +9,37 @@ from core import (
     CurrentUserDependency,
 )
 from schemas.user_action_log import UserActionLogDto, UserActionLogListResponse
+from common.pagination import encode_cursor, decode_cursor
 
 user_action_log_router = APIRouter(prefix="/logs", tags=["User Action Logs"])
 
 
+def _parse_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _next_cursor(logs, limit: int) -> Optional[str]:
+    """Cursor for the page after `logs`, or None when this was the last page."""
+    if len(logs) < limit:
+        return None
+    return encode_cursor(logs[-1].created_at, logs[-1].id)
+
+
 @user_action_log_router.get("")
-def get_all_logs(
+async def get_all_logs(
     admin_user: AdminUserDependency,
     log_service: UserActionLogServiceDependency,
     limit: int = Query(10, ge=1, le=1000, description="Number of logs to return"),
-    skip: int = Query(0, ge=0, description="Number of logs to skip"),
+    skip: int = Query(0, ge=0, description="Number of logs to skip (ignored when cursor is set)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
     action_type: Optional[str] = Query(None, description="Filter by action type"),
     user_id: Optional[UUID] = Query(None, description="Filter by user ID"),
     start_date: Optional[datetime] = Query(None, description="Filter by start date (ISO format)"),
@@ -32,21 +53,28 @@ def get_all_logs(
     - user_id: Specific user
     - start_date: Logs after this date
     - end_date: Logs before this date
+
+    Pages are ordered newest first. Follow `next_cursor` for constant-time
+    paging; `total` may be a cached value or a planner estimate
+    (`total_is_estimate`).
     """
-    logs, total = log_service.get_all_logs(
+    logs, total, total_is_estimate = await log_service.get_all_logs(
         limit=limit,
         offset=skip,
         action_type=action_type,
         user_id=user_id,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        cursor=_parse_cursor(cursor)
     )
     
     return {
         "logs": [UserActionLogDto.from_log(log) for log in logs],
         "total": total,
+        "total_is_estimate": total_is_estimate,
         "limit": limit,
-        "skip": skip
+        "skip": skip,
+        "next_cursor": _next_cursor(logs, limit)
     }
 
 
@@ -54,17 +82,24 @@ def get_all_logs(
 async def get_my_logs(
     current_user: CurrentUserDependency,
     log_service: UserActionLogServiceDependency,
+    response: Response,
     limit: int = Query(100, ge=1, le=1000, description="Number of logs to return"),
-    offset: int = Query(0, ge=0, description="Number of logs to skip"),
+    offset: int = Query(0, ge=0, description="Number of logs to skip (ignored when cursor is set)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
 ):
     """
     Get action logs for the current authenticated user.
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
-    logs = log_service.get_user_logs(
+    logs = await log_service.get_user_logs(
         user_id=current_user.id,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=_parse_cursor(cursor)
     )
+    next_cursor = _next_cursor(logs, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return [UserActionLogDto.from_log(log) for log in logs]
 
@@ -78,7 +113,7 @@ async def get_log(
     """
     Get a specific log entry by ID (admin only).
     """
-    log = log_service.get_log(log_id)
+    log = await log_service.get_log(log_id)
     if not log:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -2,9 +2,11 @@ from core.auth import (
     AuthService,
     AuthServiceDependency,
     CurrentUserDependency,
+    CurrentUserRecordDependency,
     OptionalUserDependency,
     AdminUserDependency,
     get_current_user,
+    get_current_user_record,
     get_optional_user,
     require_admin,
 )
@@ -22,9 +24,11 @@ __all__ = [
     "AuthService",
     "AuthServiceDependency",
     "CurrentUserDependency",
+    "CurrentUserRecordDependency",
     "OptionalUserDependency",
     "AdminUserDependency",
     "get_current_user",
+    "get_current_user_record",
     "get_optional_user",
     "require_admin",
     # Services
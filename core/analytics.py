@@ -17,11 +17,11 @@ class AnalyticsService:
         self.analytics_repo = analytics_repo
         self.user_repo = user_repo
 
-    def get_dashboard_data(self) -> AnalyticsDashboardResponse:
+    async def get_dashboard_data(self) -> AnalyticsDashboardResponse:
         """Get all analytics data for the dashboard"""
         
         # Get document processing stats
-        doc_stats = self.analytics_repo.get_document_processing_last_week()
+        doc_stats = await self.analytics_repo.get_document_processing_last_week()
         
         # Fill in missing dates with zeros
         seven_days_ago = datetime.utcnow().date() - timedelta(days=6)
@@ -45,7 +45,7 @@ class AnalyticsService:
             )
         
         # Get user registration stats
-        user_stats = self.analytics_repo.get_user_registrations_last_week()
+        user_stats = await self.analytics_repo.get_user_registrations_last_week()
         user_date_map = {row.date: row.count for row in user_stats}
         
         user_registrations = []
@@ -60,7 +60,7 @@ class AnalyticsService:
             )
         
         # Get recent users
-        recent_users_data = self.analytics_repo.get_recent_users(limit=10)
+        recent_users_data = await self.analytics_repo.get_recent_users(limit=10)
         recent_users = [
             RecentUserDto(
                 id=user.id,
@@ -72,7 +72,7 @@ class AnalyticsService:
         ]
         
         # Get recent bans/unbans
-        recent_actions_data = self.analytics_repo.get_recent_bans_unbans(limit=4)
+        recent_actions_data = await self.analytics_repo.get_recent_bans_unbans(limit=4)
         recent_bans_unbans = []
         
         for action in recent_actions_data:
@@ -83,7 +83,7 @@ class AnalyticsService:
             
             target_user_email = "Unknown"
             if target_user_id:
-                target_user = self.user_repo.get_user_by_id(target_user_id)
+                target_user = await self.user_repo.get_user_by_id(target_user_id)
                 if target_user:
                     target_user_email = target_user.email
             
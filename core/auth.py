@@ -3,14 +3,16 @@ from typing import Annotated, Optional
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 
 from common.app_settings import settings
-from crud import UserRepository, UserRepositoryDependency
+from crud import UserRepository, UserRepositoryDependency, CacheVersionRepositoryDependency
+from core.google_api import build_service, credentials_key, google_api, google_auth_uri, google_token_uri
+from core.principal_cache import Principal, principal_cache
 from models import User
 
 
@@ -35,8 +37,13 @@ security = HTTPBearer()
 
 
 class AuthService:
-    def __init__(self, user_repository: UserRepositoryDependency):
+    def __init__(
+        self,
+        user_repository: UserRepositoryDependency,
+        cache_version_repository: CacheVersionRepositoryDependency,
+    ):
         self.user_repository = user_repository
+        self.cache_version_repository = cache_version_repository
 
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create a JWT access token."""
@@ -75,8 +82,8 @@ class AuthService:
             "web": {
                 "client_id": settings.GOOGLE_CLIENT_ID,
                 "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
+                "auth_uri": google_auth_uri(),
+                "token_uri": google_token_uri(),
                 "redirect_uris": [redirect_uri],
             }
         }
@@ -94,19 +101,26 @@ class AuthService:
         )
         return authorization_url
 
-    def process_google_callback(self, code: str, redirect_uri: str) -> tuple[User, str, str]:
-        """
-        Process Google OAuth callback.
-        Returns: (user, access_token, refresh_token)
-        """
+    def _exchange_google_code(self, code: str, redirect_uri: str) -> tuple[Credentials, dict]:
+        """Exchange the OAuth code and fetch the user's profile (blocking Google calls)."""
         flow = self.get_google_auth_flow(redirect_uri)
         flow.fetch_token(code=code)
 
         credentials = flow.credentials
 
         # Get user info from Google
-        service = build("oauth2", "v2", credentials=credentials)
-        user_info = service.userinfo().get().execute()
+        service = build_service("oauth2", "v2", credentials)
+        user_info = google_api.execute(
+            service.userinfo().get(), "oauth2.userinfo.get", credentials_key(credentials)
+        )
+        return credentials, user_info
+
+    async def process_google_callback(self, code: str, redirect_uri: str) -> tuple[User, str, str]:
+        """
+        Process Google OAuth callback.
+        Returns: (user, access_token, refresh_token)
+        """
+        credentials, user_info = await run_in_threadpool(self._exchange_google_code, code, redirect_uri)
 
         email = user_info.get("email")
         if not email:
@@ -116,16 +130,16 @@ class AuthService:
             )
 
         # Find or create user
-        user = self.user_repository.get_user_by_email(email)
+        user = await self.user_repository.get_user_by_email(email)
         if not user:
             user = User(email=email)
-            user = self.user_repository.create_user(user)
+            user = await self.user_repository.create_user(user)
 
         # Store Google tokens
         user.google_token = credentials.token
         if credentials.refresh_token:
             user.google_refresh_token = credentials.refresh_token
-        self.user_repository.update_user(user)
+        await self.user_repository.update_user(user)
 
         # Generate JWT tokens
         token_data = {"sub": str(user.id), "email": user.email}
@@ -134,7 +148,7 @@ class AuthService:
 
         return user, access_token, refresh_token
 
-    def refresh_access_token(self, refresh_token: str) -> tuple[str, str]:
+    async def refresh_access_token(self, refresh_token: str) -> tuple[str, str]:
         """
         Refresh the access token using a refresh token.
         Returns: (new_access_token, new_refresh_token)
@@ -148,7 +162,7 @@ class AuthService:
                 detail="Invalid refresh token",
             )
 
-        user = self.user_repository.get_user_by_id(UUID(user_id))
+        user = await self.user_repository.get_user_by_id(UUID(user_id))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -162,7 +176,7 @@ class AuthService:
 
         return new_access_token, new_refresh_token
 
-    def refresh_google_token(self, user: User) -> str:
+    async def refresh_google_token(self, user: User) -> str:
         """
         Refresh the user's Google access token using their stored refresh token.
         Returns the new Google access token.
@@ -177,17 +191,17 @@ class AuthService:
             credentials = Credentials(
                 token=user.google_token,
                 refresh_token=user.google_refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
+                token_uri=google_token_uri(),
                 client_id=settings.GOOGLE_CLIENT_ID,
                 client_secret=settings.GOOGLE_CLIENT_SECRET,
             )
             
             from google.auth.transport.requests import Request
-            credentials.refresh(Request())
+            await run_in_threadpool(credentials.refresh, Request())
             
             # Update user's Google token in database
             user.google_token = credentials.token
-            self.user_repository.update_user(user)
+            await self.user_repository.update_user(user)
             
             return credentials.token
         except Exception as e:
@@ -196,8 +210,11 @@ class AuthService:
                 detail=f"Failed to refresh Google token: {str(e)}. Please log in again.",
             )
 
-    def get_current_user_from_token(self, token: str) -> User:
-        """Get the current user from a JWT token."""
+    async def get_principal_from_token(self, token: str) -> Principal:
+        """
+        Get the caller's principal (id, role, is_banned) from a JWT token.
+        The token is always verified; the user lookup is served from the principal cache.
+        """
         payload = self.verify_token(token, token_type="access")
 
         user_id = payload.get("sub")
@@ -207,14 +224,20 @@ class AuthService:
                 detail="Invalid token payload",
             )
 
-        user = self.user_repository.get_user_by_id(UUID(user_id))
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-            )
+        await principal_cache.sync(self.cache_version_repository)
+        principal = principal_cache.get(user_id)
+        if principal is None:
+            generation = principal_cache.generation
+            user = await self.user_repository.get_user_by_id(UUID(user_id))
+            if not user:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found",
+                )
+            principal = Principal.from_user(user)
+            principal_cache.put(user_id, principal, generation)
 
-        return user
+        return principal
 
 
 AuthServiceDependency = Annotated[AuthService, Depends(AuthService)]
@@ -224,11 +247,34 @@ AuthServiceDependency = Annotated[AuthService, Depends(AuthService)]
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     auth_service: AuthServiceDependency = None,
-) -> User:
-    """FastAPI dependency to get the current authenticated user."""
-    user = auth_service.get_current_user_from_token(credentials.credentials)
+) -> Principal:
+    """FastAPI dependency to get the current authenticated user (as a cached principal)."""
+    user = await auth_service.get_principal_from_token(credentials.credentials)
     # Restrict banned users from using the API
-    if getattr(user, "is_banned", False):
+    if user.is_banned:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is banned",
+        )
+    return user
+
+
+CurrentUserDependency = Annotated[Principal, Depends(get_current_user)]
+
+
+# Dependency for endpoints that need the full user row (Google tokens, profile data)
+async def get_current_user_record(
+    current_user: CurrentUserDependency,
+    user_repository: UserRepositoryDependency,
+) -> User:
+    """FastAPI dependency to load the current user's database record."""
+    user = await user_repository.get_user_by_id(current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    if user.is_banned:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is banned",
@@ -236,33 +282,33 @@ async def get_current_user(
     return user
 
 
-CurrentUserDependency = Annotated[User, Depends(get_current_user)]
+CurrentUserRecordDependency = Annotated[User, Depends(get_current_user_record)]
 
 
 # Dependency to get optional current user from request (returns None if not authenticated)
 async def get_optional_user(
     credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False)),
     auth_service: AuthServiceDependency = None,
-) -> User | None:
+) -> Principal | None:
     """FastAPI dependency to get the current user if authenticated, None otherwise."""
     if not credentials:
         return None
     
     try:
-        user = auth_service.get_current_user_from_token(credentials.credentials)
+        user = await auth_service.get_principal_from_token(credentials.credentials)
         # Don't allow banned users
-        if getattr(user, "is_banned", False):
+        if user.is_banned:
             return None
         return user
     except HTTPException:
         return None
 
 
-OptionalUserDependency = Annotated[User | None, Depends(get_optional_user)]
+OptionalUserDependency = Annotated[Principal | None, Depends(get_optional_user)]
 
 
 # Dependency to require admin role
-async def require_admin(current_user: CurrentUserDependency) -> User:
+async def require_admin(current_user: CurrentUserDependency) -> Principal:
     """FastAPI dependency that requires admin role."""
     from models.user import UserRole
     if current_user.role != UserRole.ADMIN:
@@ -273,4 +319,4 @@ async def require_admin(current_user: CurrentUserDependency) -> User:
     return current_user
 
 
-AdminUserDependency = Annotated[User, Depends(require_admin)]
+AdminUserDependency = Annotated[Principal, Depends(require_admin)]
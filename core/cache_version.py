@@ -0,0 +1,36 @@
+import time
+from typing import Optional
+
+from crud.cache_version import CacheVersionRepository
+
+
+class CacheVersionWatcher:
+    """
+    Tracks the last seen value of one `cache_versions` row.
+
+    In-process caches call `poll()` on every read; the row itself is queried at most
+    once per `poll_seconds`, so a write on any node invalidates every other node's copy
+    within that interval while the hot path stays free of DB round trips.
+    """
+
+    def __init__(self, name: str, poll_seconds: float):
+        self.name = name
+        self.poll_seconds = poll_seconds
+        self.seen_version: Optional[int] = None
+        self._polled_at: Optional[float] = None
+
+    async def poll(self, cache_version_repository: CacheVersionRepository) -> bool:
+        """Return True if the version changed since the last poll (always True on the first one)."""
+        now = time.monotonic()
+        if self._polled_at is not None and now - self._polled_at < self.poll_seconds:
+            return False
+        self._polled_at = now
+        version = await cache_version_repository.get_version(self.name)
+        changed = version != self.seen_version
+        self.seen_version = version
+        return changed
+
+    async def bump(self, cache_version_repository: CacheVersionRepository) -> None:
+        """Publish an invalidation to the other nodes (the caller drops its own copy)."""
+        self.seen_version = await cache_version_repository.bump_version(self.name)
+        self._polled_at = time.monotonic()
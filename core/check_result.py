@@ -1,11 +1,14 @@
-from typing import Annotated, Optional
+from datetime import datetime
+from typing import Annotated, Optional, Tuple
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 
+from common.app_settings import settings
+from core.issue_delta import diff_issues, net_changes, rebuild_issues
 from crud import CheckResultRepositoryDependency, DocumentRepositoryDependency
 from models import CheckResult
-from schemas.check_result import CheckResultDto
+from schemas.check_result import CheckResultDiffDto, CheckResultDto, CheckResultSummaryDto, Issue
 
 
 class CheckResultService:
@@ -17,26 +20,27 @@ class CheckResultService:
         self.check_result_repository = check_result_repository
         self.document_repository = document_repository
 
-    def get_check_result(self, check_result_id: UUID, user_id: UUID) -> Optional[CheckResultDto]:
+    async def get_check_result(self, check_result_id: UUID, user_id: UUID) -> Optional[CheckResultDto]:
         """Get check result by ID with ownership validation."""
-        check_result = self.check_result_repository.get_check_result_by_id(check_result_id)
+        check_result = await self.check_result_repository.get_check_result_by_id(check_result_id)
         if not check_result:
             return None
 
         # Verify user owns the document
-        document = self.document_repository.get_document_by_id(check_result.document_id)
+        document = await self.document_repository.get_document_by_id(check_result.document_id)
         if not document or document.user_id != user_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied to this check result",
             )
 
-        return CheckResultDto.from_check_result(check_result)
+        chain = await self.check_result_repository.get_delta_chain(check_result)
+        return CheckResultDto.from_check_result(check_result, rebuild_issues(chain).get(check_result.id))
 
-    def get_document_check_results(self, document_id: UUID, user_id: UUID) -> list[CheckResultDto]:
+    async def get_document_check_results(self, document_id: UUID, user_id: UUID) -> list[CheckResultDto]:
         """Get all check results for a document with ownership validation."""
         # Verify user owns the document
-        document = self.document_repository.get_document_by_id(document_id)
+        document = await self.document_repository.get_document_by_id(document_id)
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -48,10 +52,79 @@ class CheckResultService:
                 detail="Access denied to this document",
             )
 
-        check_results = self.check_result_repository.get_check_results_by_document_id(document_id)
-        return [CheckResultDto.from_check_result(cr) for cr in check_results]
+        check_results = await self.check_result_repository.get_check_results_by_document_id(document_id)
+        issues = rebuild_issues(reversed(check_results))
+        return [CheckResultDto.from_check_result(cr, issues.get(cr.id)) for cr in check_results]
 
-    def create_check_result(
+    async def get_document_check_summaries(
+        self,
+        document_id: UUID,
+        user_id: UUID,
+        limit: int = 50,
+        cursor: Optional[Tuple[datetime, UUID]] = None,
+    ) -> list[CheckResultSummaryDto]:
+        """Get a page of a document's check history (no issues) with ownership validation."""
+        document = await self.document_repository.get_document_by_id(document_id)
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found",
+            )
+        if document.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied to this document",
+            )
+
+        check_results = await self.check_result_repository.get_check_result_summaries(document_id, limit, cursor)
+        return [CheckResultSummaryDto.model_validate(cr) for cr in check_results]
+
+    async def get_document_check_diff(self, document_id: UUID, user_id: UUID) -> CheckResultDiffDto:
+        """Changes in the document's latest check against the one before it, with ownership validation."""
+        document = await self.document_repository.get_document_by_id(document_id)
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document not found",
+            )
+        if document.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied to this document",
+            )
+
+        # The latest delta is enough; the result before it is only needed for results stored before deltas
+        latest_results = await self.check_result_repository.get_latest_check_results(document_id, limit=2)
+        if not latest_results:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Document has no check results",
+            )
+        latest = latest_results[0]
+        delta = latest.issues_delta
+        previous = latest_results[1] if len(latest_results) > 1 else None
+        if delta is None and previous is not None and previous.issues is not None:
+            delta = _delta_against(previous, previous.issues, latest.issues or [])
+
+        new_issues: list[dict] = latest.issues or []
+        resolved_issues: list[dict] = []
+        if delta is not None:
+            new_issues, resolved_issues = net_changes(delta)
+        return CheckResultDiffDto(
+            check_result_id=latest.id,
+            previous_check_result_id=UUID(delta["previous_id"]) if delta else None,
+            created_at=latest.created_at,
+            passed=latest.passed,
+            previous_passed=delta["previous_passed"] if delta else None,
+            overall_score=latest.overall_score,
+            previous_overall_score=delta["previous_overall_score"] if delta else None,
+            issues_count=latest.issues_count,
+            new_issues=[Issue.model_validate(issue) for issue in new_issues],
+            resolved_issues=[Issue.model_validate(issue) for issue in resolved_issues],
+            unchanged_count=latest.issues_count - len(new_issues),
+        )
+
+    async def create_check_result(
         self,
         document_id: UUID,
         passed: bool,
@@ -77,7 +150,7 @@ class CheckResultService:
             custom_font_family: Font family for custom mode (optional)
         """
         # Verify user owns the document
-        document = self.document_repository.get_document_by_id(document_id)
+        document = await self.document_repository.get_document_by_id(document_id)
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -89,6 +162,20 @@ class CheckResultService:
                 detail="Access denied to this document",
             )
 
+        # Store the changes against the previous check; start a new snapshot every N results
+        snapshot_id: Optional[UUID] = None
+        issues_delta: Optional[dict] = None
+        stored_issues: Optional[list[dict]] = issues
+        latest_results = await self.check_result_repository.get_latest_check_results(document_id)
+        if latest_results:
+            previous = latest_results[0]
+            chain = await self.check_result_repository.get_delta_chain(previous)
+            previous_issues = rebuild_issues(chain).get(previous.id)
+            if previous_issues is not None:
+                issues_delta = _delta_against(previous, previous_issues, issues)
+                if len(chain) < settings.CHECK_RESULT_SNAPSHOT_EVERY:
+                    snapshot_id, stored_issues = previous.snapshot_id or previous.id, None
+
         check_result = CheckResult(
             document_id=document_id,
             template_id=template_id,
@@ -97,11 +184,24 @@ class CheckResultService:
             passed=passed,
             overall_score=overall_score,
             issues_count=len(issues),
-            issues=issues,
+            issues=stored_issues,
+            issues_delta=issues_delta,
+            snapshot_id=snapshot_id,
             processing_time_ms=processing_time_ms,
         )
-        created_result = self.check_result_repository.create_check_result(check_result)
-        return CheckResultDto.from_check_result(created_result)
+        created_result = await self.check_result_repository.create_check_result(check_result)
+        return CheckResultDto.from_check_result(created_result, issues)
+
+
+def _delta_against(previous: CheckResult, previous_issues: list[dict], issues: list[dict]) -> dict:
+    """Delta from `previous` (whose full issue list is `previous_issues`) to `issues`"""
+    delta = diff_issues(previous_issues, issues)
+    return {
+        "previous_id": str(previous.id),
+        "previous_passed": previous.passed,
+        "previous_overall_score": previous.overall_score,
+        **delta,
+    }
 
 
 CheckResultServiceDependency = Annotated[CheckResultService, Depends(CheckResultService)]
@@ -1,41 +1,61 @@
 from datetime import datetime, timedelta
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, select
 from models.user_action_log import UserActionLog
+from models.request_profile import RequestProfile
 from db import SessionLocal
 
 logger = logging.getLogger(__name__)
 
-def cleanup_old_logs(days: int = 14):
+async def cleanup_old_logs(days: int = 14):
     """
     Delete UserActionLog entries older than the specified number of days.
     """
     logger.info(f"Starting cleanup of logs older than {days} days...")
     
-    db: Session = SessionLocal()
-    try:
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Count logs before deletion
-        count_before = db.query(UserActionLog).count()
-        
-        # Perform deletion
-        deleted = db.query(UserActionLog).filter(
-            UserActionLog.created_at < cutoff_date
-        ).delete(synchronize_session=False)
-        
-        db.commit()
-        
-        count_after = db.query(UserActionLog).count()
-        
-        logger.info(
-            f"Cleanup complete. Deleted {deleted} log entries. "
-            f"Remaining: {count_after} (was {count_before})"
-        )
-        return deleted
-    except Exception as e:
-        db.rollback()
-        logger.error(f"Error during log cleanup: {e}")
-        return 0
-    finally:
-        db.close()
+    async with SessionLocal() as db:
+        try:
+            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            count_query = select(func.count()).select_from(UserActionLog)
+            
+            # Count logs before deletion
+            count_before = (await db.execute(count_query)).scalar_one()
+            
+            # Perform deletion
+            result = await db.execute(
+                delete(UserActionLog).where(UserActionLog.created_at < cutoff_date)
+            )
+            deleted = result.rowcount
+            
+            await db.commit()
+            
+            count_after = (await db.execute(count_query)).scalar_one()
+            
+            logger.info(
+                f"Cleanup complete. Deleted {deleted} log entries. "
+                f"Remaining: {count_after} (was {count_before})"
+            )
+            return deleted
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error during log cleanup: {e}")
+            return 0
+
+
+async def cleanup_old_profiles(days: int = 7):
+    """
+    Delete RequestProfile entries (and their artifacts) older than the specified number of days.
+    """
+    async with SessionLocal() as db:
+        try:
+            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            result = await db.execute(
+                delete(RequestProfile).where(RequestProfile.created_at < cutoff_date)
+            )
+            await db.commit()
+            logger.info(f"Profile cleanup complete. Deleted {result.rowcount} request profiles.")
+            return result.rowcount
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error during profile cleanup: {e}")
+            return 0
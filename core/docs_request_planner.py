@@ -0,0 +1,154 @@
+"""
+Google Docs batchUpdate planner.
+
+Collects the style updates the formatter wants, compares them with the style the
+document already has, drops the ones that would not change anything and merges
+adjacent ranges that receive the same update into a single request. The resulting
+plan is split into size-bounded batches for `documents().batchUpdate`.
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+# Style magnitudes come back from the API as floats (e.g. 12.000001 after unit conversion)
+_FLOAT_TOLERANCE = 0.01
+
+
+def _same_value(current: Any, target: Any) -> bool:
+    """True if `current` already satisfies `target` (nested dicts compared on target's keys only)."""
+    if isinstance(target, dict):
+        if not isinstance(current, dict):
+            return False
+        return all(_same_value(current.get(key), value) for key, value in target.items())
+    if isinstance(target, bool) or isinstance(current, bool):
+        return current is target
+    if isinstance(target, (int, float)) and isinstance(current, (int, float)):
+        return abs(current - target) <= _FLOAT_TOLERANCE
+    return current == target
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable, order-independent form of a style dict"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+@dataclass
+class _StyleUpdate:
+    kind: str  # "updateTextStyle" | "updateParagraphStyle"
+    start: int
+    end: int
+    style: dict
+    key: tuple  # canonical form of (kind, style) used for coalescing
+    differs: bool
+
+
+class DocsRequestPlanner:
+    """
+    Builds a minimal list of batchUpdate requests.
+
+    - `add()`: document-level requests (margins, header/footer settings...), emitted first, as given.
+    - `update_text_style()` / `update_paragraph_style()`: style targets for a range; kept only
+      if the current style differs, and coalesced with adjacent ranges that get the same target.
+    - `replace_text()`: index-shifting edits, emitted last from the end of the body backwards
+      so earlier indices stay valid.
+    """
+
+    _STYLE_FIELDS = {"updateTextStyle": "textStyle", "updateParagraphStyle": "paragraphStyle"}
+
+    def __init__(self):
+        self._document_requests: list[dict] = []
+        self._style_updates: list[_StyleUpdate] = []
+        self._replacements: list[tuple[int, int, str]] = []
+        self.changed_fields: set[str] = set()
+
+    def add(self, *requests: dict) -> None:
+        self._document_requests.extend(requests)
+
+    def update_text_style(self, start: int, end: int, current: dict, target: dict) -> bool:
+        """Plan `target` for [start, end). Returns True if the range actually changes."""
+        return self._plan("updateTextStyle", start, end, current, target)
+
+    def update_paragraph_style(self, start: int, end: int, current: dict, target: dict) -> bool:
+        """Plan `target` for the paragraph(s) in [start, end). Returns True if anything changes."""
+        return self._plan("updateParagraphStyle", start, end, current, target)
+
+    def replace_text(self, start: int, end: int, text: str) -> None:
+        self._replacements.append((start, end, text))
+
+    def _plan(self, kind: str, start: Optional[int], end: Optional[int], current: dict, target: dict) -> bool:
+        if start is None or end is None or end <= start or not target:
+            return False
+        differing = {name for name, value in target.items() if not _same_value(current.get(name), value)}
+        self.changed_fields.update(differing)
+        key = (kind, _freeze(target))
+        self._style_updates.append(_StyleUpdate(kind, start, end, target, key, bool(differing)))
+        return bool(differing)
+
+    def _coalesced_style_requests(self) -> list[dict]:
+        """
+        Merge runs of touching ranges with the same target, then keep runs where at least
+        one member differs. Members that already match are rewritten with their current
+        value, which is a no-op for the document but saves a request boundary.
+        """
+        by_key: dict[tuple, list[_StyleUpdate]] = {}
+        for update in self._style_updates:
+            by_key.setdefault(update.key, []).append(update)
+
+        merged: list[_StyleUpdate] = []
+        for updates in by_key.values():
+            updates.sort(key=lambda u: u.start)
+            run = None
+            for update in updates:
+                if run is not None and update.start <= run.end:
+                    run.end = max(run.end, update.end)
+                    run.differs = run.differs or update.differs
+                    continue
+                if run is not None and run.differs:
+                    merged.append(run)
+                run = _StyleUpdate(update.kind, update.start, update.end, update.style, update.key, update.differs)
+            if run is not None and run.differs:
+                merged.append(run)
+
+        merged.sort(key=lambda u: (u.start, u.kind))
+        return [
+            {
+                u.kind: {
+                    "range": {"startIndex": u.start, "endIndex": u.end},
+                    self._STYLE_FIELDS[u.kind]: u.style,
+                    "fields": ",".join(u.style.keys()),
+                }
+            }
+            for u in merged
+        ]
+
+    def _request_groups(self) -> list[list[dict]]:
+        """Requests in execution order; each group must go into the same batch."""
+        groups = [[request] for request in self._document_requests]
+        groups.extend([request] for request in self._coalesced_style_requests())
+        for start, end, text in sorted(self._replacements, key=lambda r: r[0], reverse=True):
+            groups.append([
+                {"deleteContentRange": {"range": {"startIndex": start, "endIndex": end}}},
+                {"insertText": {"location": {"index": start}, "text": text}},
+            ])
+        return groups
+
+    def build(self) -> list[dict]:
+        return [request for group in self._request_groups() for request in group]
+
+    def batches(self, max_requests: int, max_bytes: int) -> list[list[dict]]:
+        """Split the plan into consecutive batches of at most `max_requests` requests / ~`max_bytes` of JSON."""
+        batches: list[list[dict]] = []
+        current: list[dict] = []
+        current_bytes = 0
+        for group in self._request_groups():
+            group_bytes = sum(len(json.dumps(request, separators=(",", ":"))) for request in group)
+            if current and (len(current) + len(group) > max_requests or current_bytes + group_bytes > max_bytes):
+                batches.append(current)
+                current, current_bytes = [], 0
+            current.extend(group)
+            current_bytes += group_bytes
+        if current:
+            batches.append(current)
+        return batches
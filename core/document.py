@@ -1,10 +1,12 @@
-from typing import Annotated, Optional
+from datetime import datetime
+from typing import Annotated, Optional, Tuple
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 
 from crud import DocumentRepositoryDependency
-from models import Document, User
+from core.principal_cache import Principal
+from models import Document
 from models.document import DocumentStatus
 from models.user import UserRole
 from schemas.document import DocumentCreate, DocumentDto
@@ -14,9 +16,9 @@ class DocumentService:
     def __init__(self, document_repository: DocumentRepositoryDependency):
         self.document_repository = document_repository
 
-    def get_document(self, document_id: UUID, user_id: UUID, is_admin: bool = False) -> Optional[DocumentDto]:
+    async def get_document(self, document_id: UUID, user_id: UUID, is_admin: bool = False) -> Optional[DocumentDto]:
         """Get document by ID with ownership check. Admins can access any document."""
-        document = self.document_repository.get_document_by_id(document_id)
+        document = await self.document_repository.get_document_by_id(document_id)
         if not document:
             return None
         # Allow access if user owns the document OR is an admin
@@ -27,9 +29,9 @@ class DocumentService:
             )
         return DocumentDto.from_document(document)
 
-    def get_document_by_google_id(self, google_doc_id: str, user_id: UUID) -> Optional[DocumentDto]:
+    async def get_document_by_google_id(self, google_doc_id: str, user_id: UUID) -> Optional[DocumentDto]:
         """Get document by Google Doc ID with ownership check."""
-        document = self.document_repository.get_document_by_google_doc_id(google_doc_id)
+        document = await self.document_repository.get_document_by_google_doc_id(google_doc_id)
         if not document:
             return None
         # Check ownership
@@ -40,15 +42,20 @@ class DocumentService:
             )
         return DocumentDto.from_document(document)
 
-    def get_user_documents(self, user_id: UUID) -> list[DocumentDto]:
-        """Get all documents for a user."""
-        documents = self.document_repository.get_documents_by_user_id(user_id)
-        return [DocumentDto.from_document(doc) for doc in documents]
+    async def get_user_documents(
+        self,
+        user_id: UUID,
+        limit: int = 100,
+        cursor: Optional[Tuple[datetime, UUID]] = None,
+    ) -> list[DocumentDto]:
+        """Get a page of a user's documents, newest first, with their latest check summary."""
+        rows = await self.document_repository.get_documents_page_by_user_id(user_id, limit, cursor)
+        return [DocumentDto.from_document(doc, latest_check) for doc, latest_check in rows]
 
-    def create_document(self, data: DocumentCreate, user: User) -> DocumentDto:
+    async def create_document(self, data: DocumentCreate, user: Principal) -> DocumentDto:
         """Create a new document."""
         # Check if document already exists
-        existing = self.document_repository.get_document_by_google_doc_id(data.google_doc_id)
+        existing = await self.document_repository.get_document_by_google_doc_id(data.google_doc_id)
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -61,12 +68,12 @@ class DocumentService:
             title=data.title,
             status=DocumentStatus.PENDING,
         )
-        created_document = self.document_repository.create_document(document)
+        created_document = await self.document_repository.create_document(document)
         return DocumentDto.from_document(created_document)
 
-    def update_document_status(self, document_id: UUID, user_id: UUID, new_status: DocumentStatus) -> DocumentDto:
+    async def update_document_status(self, document_id: UUID, user_id: UUID, new_status: DocumentStatus) -> DocumentDto:
         """Update document status."""
-        document = self.document_repository.get_document_by_id(document_id)
+        document = await self.document_repository.get_document_by_id(document_id)
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -79,12 +86,12 @@ class DocumentService:
             )
 
         document.status = new_status
-        updated_document = self.document_repository.update_document(document)
+        updated_document = await self.document_repository.update_document(document)
         return DocumentDto.from_document(updated_document)
 
-    def delete_document(self, document_id: UUID, user_id: UUID) -> DocumentDto:
+    async def delete_document(self, document_id: UUID, user_id: UUID) -> DocumentDto:
         """Delete a document with ownership check."""
-        document = self.document_repository.get_document_by_id(document_id)
+        document = await self.document_repository.get_document_by_id(document_id)
         if not document:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -96,7 +103,7 @@ class DocumentService:
                 detail="Access denied to this document",
             )
 
-        deleted_document = self.document_repository.delete_document(document)
+        deleted_document = await self.document_repository.delete_document(document)
         return DocumentDto.from_document(deleted_document)
 
 
@@ -0,0 +1,143 @@
+"""
+Per-document analysis shared by the check, format and PDF-twin stages.
+
+Parsing a .docx and deriving its theme fonts, doc defaults, paragraph/section lists and
+page layout is done once per input and cached here. A stage that mutates the tree calls
+`invalidate()` with what it touched; the next reader recomputes only that. A check run
+right after a format reuses the formatted tree instead of parsing the written file again.
+"""
+from functools import cached_property
+from typing import TYPE_CHECKING, Optional, Union
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
+
+from core.docx_package import DocxStream, open_docx
+from core.extraction_cache import fingerprint, incremental_docx_layout
+from core.layout_estimator import PageLayout, has_rendered_page_breaks, rendered_docx_layout
+
+if TYPE_CHECKING:
+    from core.local_document import LocalDocumentService
+
+_STYLE_CACHES = ("theme_fonts", "doc_defaults", "style_table", "style_fingerprint")
+_TREE_CACHES = ("paragraphs", "sections", "paragraph_sections")
+# Any edit changes the XML the fingerprints are taken from
+_LAYOUT_CACHES = ("layout", "body_fingerprints", "paragraph_fingerprints")
+
+
+class DocumentAnalysis:
+    """A parsed .docx and everything derived from it, computed on first use"""
+
+    def __init__(self, service: "LocalDocumentService", content: Union[bytes, DocxStream]):
+        self.service = service
+        self._content = content
+        # Word's rendered page breaks describe the document as it was saved, not after our edits
+        self.modified = False
+        self.doc = open_docx(self.content)
+
+    @property
+    def content(self) -> bytes:
+        """The .docx bytes the tree corresponds to (the written output after a format)"""
+        if isinstance(self._content, DocxStream):
+            self._content = self._content.getvalue()
+        return self._content
+
+    @cached_property
+    def theme_fonts(self) -> dict[str, str]:
+        return self.service._get_document_theme_fonts(self.doc)
+
+    @cached_property
+    def doc_defaults(self) -> dict[str, str]:
+        return self.service._get_doc_defaults(self.doc, self.theme_fonts)
+
+    @cached_property
+    def style_table(self) -> dict:
+        """(style id, style type) -> style; filled as paragraphs and runs are looked up"""
+        return {}
+
+    def _style(self, part, style_id: Optional[str], style_type):
+        # python-docx scans every style in styles.xml on each `.style` access
+        key = (style_id, style_type)
+        style = self.style_table.get(key)
+        if style is None:
+            style = self.style_table[key] = part.get_style(style_id, style_type)
+        return style
+
+    def paragraph_style(self, paragraph):
+        """`paragraph.style`, from the style table"""
+        return self._style(paragraph.part, paragraph._p.style, WD_STYLE_TYPE.PARAGRAPH)
+
+    def run_style(self, run):
+        """`run.style`, from the style table"""
+        return self._style(run.part, run._r.style, WD_STYLE_TYPE.CHARACTER)
+
+    def font_of(self, run, paragraph) -> str:
+        return self.service._resolve_font_family(run, paragraph, self.theme_fonts, self.doc_defaults, styles=self)
+
+    @cached_property
+    def paragraphs(self) -> list:
+        return self.doc.paragraphs
+
+    @cached_property
+    def sections(self) -> list:
+        return list(self.doc.sections)
+
+    @cached_property
+    def paragraph_sections(self) -> list[int]:
+        """Index of the section every body paragraph belongs to"""
+        indices, section = [], 0
+        for paragraph in self.paragraphs:
+            indices.append(section)
+            pPr = paragraph._element.pPr
+            if pPr is not None and pPr.find(qn('w:sectPr')) is not None:
+                section += 1
+        return indices
+
+    @cached_property
+    def style_fingerprint(self) -> bytes:
+        """Identifies everything besides a paragraph's own XML that its extracted facts depend on"""
+        return fingerprint(self.doc.styles.element, repr(sorted(self.theme_fonts.items())).encode("utf-8"))
+
+    @cached_property
+    def body_fingerprints(self) -> list[bytes]:
+        return [fingerprint(child) for child in self.doc.element.body]
+
+    @cached_property
+    def paragraph_fingerprints(self) -> list[bytes]:
+        """Fingerprint of every paragraph in `paragraphs` (the body's w:p children)"""
+        return [
+            element_fingerprint
+            for child, element_fingerprint in zip(self.doc.element.body, self.body_fingerprints)
+            if child.tag == qn('w:p')
+        ]
+
+    @cached_property
+    def layout(self) -> PageLayout:
+        """Page of every paragraph and section start pages of the tree as it is now"""
+        if not self.modified and has_rendered_page_breaks(self.doc):
+            return rendered_docx_layout(self.doc)
+        # Section geometry lives in sectPr elements that may come after the paragraphs they govern
+        seed = fingerprint(self.style_fingerprint, *self.doc.element.body.iter(qn('w:sectPr')))
+        return incremental_docx_layout(self.doc, self.font_of, self.body_fingerprints, seed)
+
+    def invalidate(self, styles: bool = False, structure: bool = False) -> None:
+        """
+        Drop what an edit made stale. Any edit invalidates the layout; `styles` when
+        docDefaults, styles or the theme changed, `structure` when paragraphs or section
+        breaks were added or removed.
+        """
+        self.modified = True
+        names = _LAYOUT_CACHES + (_STYLE_CACHES if styles else ()) + (_TREE_CACHES if structure else ())
+        for name in names:
+            self.__dict__.pop(name, None)
+
+    def reload(self, content: Union[bytes, DocxStream]) -> None:
+        """Re-parse after an edit python-docx only picks up from a fresh tree (e.g. a new section)"""
+        self._content = content
+        self.doc = open_docx(self.content)
+        for name in _LAYOUT_CACHES + _STYLE_CACHES + _TREE_CACHES:
+            self.__dict__.pop(name, None)
+
+    def written(self, stream: DocxStream) -> None:
+        """Record that the (edited) tree was written as `stream`; `content` now refers to it"""
+        self._content = stream
@@ -3,19 +3,34 @@ Document Formatter Service - Applies formatting fixes to Google Docs.
 """
 from typing import Annotated, Optional, Callable
 from dataclasses import dataclass, field
+import re
 import time
 
 from fastapi import Depends, HTTPException, status
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from common.app_settings import settings
+from core.docs_request_planner import DocsRequestPlanner
+from core.google_api import build_service, credentials_key, google_api, google_token_uri
+from core.metrics import StageClock, tracked_job
 from core.google_docs import GoogleDocsService, GoogleDocsServiceDependency
 from schemas.template import TemplateParams
 
 
+_CAPTION_PREFIX = re.compile(r'^(Рис\.|Зоб\.|Рисунок|Фото)\s*')
+_CAPTION_NUMBER = re.compile(r'^(Рис|Зоб|Рисунок|Фото)\.?\s*(\d+)\s*[\.\,]\s*(\d+)(?:\.[\d\.]+)?\s*[\.\,]?\s*(.*)')
+
+# Margins closer than this (in points) to the target are left alone
+_MARGIN_TOLERANCE_PT = 0.05
+
+
+# Example excerpts kept per aggregated change, and their length
+CHANGE_EXAMPLE_LIMIT = 3
+CHANGE_EXAMPLE_CHARS = 40
+
+
 @dataclass
 class FormatChange:
     """A formatting change applied to the document."""
@@ -23,6 +38,72 @@ class FormatChange:
     description: str
     before: Optional[str] = None
     after: Optional[str] = None
+    count: int = 1  # identical changes folded into this entry
+    examples: list[str] = field(default_factory=list)  # excerpts of the text it was applied to
+
+
+class PartialBatchUpdateError(Exception):
+    """A batchUpdate failed after earlier batches of the same format run were applied"""
+
+    def __init__(self, batches_applied: int, batches_total: int, requests_applied: int, cause: Exception):
+        super().__init__(str(cause))
+        self.batches_applied = batches_applied
+        self.batches_total = batches_total
+        self.requests_applied = requests_applied
+        self.cause = cause
+
+
+class ChangeLedger:
+    """
+    Collects format changes, folding repeats of the same change (type, before -> after) into
+    one counted entry with a few example excerpts, so a large document yields a handful of
+    entries instead of one per run. With `detailed` every change is kept as its own entry.
+    """
+
+    def __init__(self, detailed: bool = False, example_limit: int = CHANGE_EXAMPLE_LIMIT):
+        self.detailed = detailed
+        self.example_limit = example_limit
+        self.total = 0
+        self._entries: dict[tuple, FormatChange] = {}  # in order of first occurrence
+        self._details: list[FormatChange] = []
+
+    def add(
+        self,
+        type: str,
+        description: str,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        example: Optional[str] = None,
+        count: int = 1,
+    ) -> None:
+        self.total += count
+        if self.detailed:
+            self._details.append(FormatChange(type, description, before, after, count, [example] if example else []))
+            return
+        key = (type, description, before, after)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = FormatChange(type, description, before, after, count, [example] if example else [])
+            return
+        entry.count += count
+        if example and len(entry.examples) < self.example_limit:
+            entry.examples.append(example)
+
+    def append(self, change: FormatChange) -> None:
+        self.add(
+            change.type, change.description, change.before, change.after,
+            change.examples[0] if change.examples else None, change.count,
+        )
+
+    def extend(self, changes) -> None:
+        for change in changes:
+            self.append(change)
+
+    def __len__(self) -> int:
+        return self.total
+
+    def entries(self) -> list[FormatChange]:
+        return self._details if self.detailed else list(self._entries.values())
 
 
 @dataclass
@@ -34,6 +115,10 @@ class FormatResult:
     processing_time_ms: int = 0
     document_title: Optional[str] = None
     error_message: Optional[str] = None
+    # batchUpdate calls sent; on failure, batches_applied < batches_total means the document is partly formatted
+    batches_applied: int = 0
+    batches_total: int = 0
+    requests_applied: int = 0
 
     def changes_as_dicts(self) -> list[dict]:
         return [
@@ -42,6 +127,8 @@ class FormatResult:
                 "description": change.description,
                 "before": change.before,
                 "after": change.after,
+                "count": change.count,
+                "examples": change.examples,
             }
             for change in self.changes
         ]
@@ -63,7 +150,7 @@ class DocumentFormatterService:
         credentials = Credentials(
             token=google_token,
             refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
+            token_uri=google_token_uri(),
             client_id=settings.GOOGLE_CLIENT_ID,
             client_secret=settings.GOOGLE_CLIENT_SECRET,
         )
@@ -81,6 +168,7 @@ class DocumentFormatterService:
         
         return credentials
 
+    @tracked_job("google.format")
     def format_document(
         self,
         google_token: str,
@@ -89,6 +177,7 @@ class DocumentFormatterService:
         expected_font_family: Optional[str] = None,
         refresh_token: Optional[str] = None,
         on_token_refresh: Optional[Callable[[str], None]] = None,
+        detailed_changes: bool = False,
     ) -> FormatResult:
         """
         Apply formatting to a Google Doc.
@@ -100,36 +189,38 @@ class DocumentFormatterService:
             expected_font_family: Font family to apply (optional)
             refresh_token: Google refresh token for auto-refresh (optional)
             on_token_refresh: Callback when token is refreshed (optional)
+            detailed_changes: Report every change separately instead of aggregated counts
             
         Returns:
             FormatResult with success status and applied changes
         """
         start_time = time.time()
-        changes: list[FormatChange] = []
+        changes = ChangeLedger(detailed_changes)
         
         try:
             credentials = self._get_credentials(google_token, refresh_token, on_token_refresh)
-            service = build("docs", "v1", credentials=credentials)
+            service = build_service("docs", "v1", credentials)
+            user_key = credentials_key(credentials)
             
-            # Get the document first to understand its structure
-            document = service.documents().get(documentId=doc_id).execute()
-            document_title = document.get("title", "Untitled")
-            
-            # Get document properties including first page information
-            doc_props = self.google_docs_service.get_document_properties(
-                google_token=google_token,
+            # Get the document structure and its properties (including first page information)
+            # in one fields-masked fetch; headers/footers only matter for page numbering
+            document, doc_props = self.google_docs_service.get_document_with_properties(
+                google_token=credentials.token or google_token,
                 doc_id=doc_id,
                 refresh_token=refresh_token,
-                on_token_refresh=on_token_refresh
+                on_token_refresh=on_token_refresh,
+                include_headers_footers=params.check_numbering or params.skip_first_page,
             )
+            document_title = document.get("title", "Untitled")
+            clock = StageClock("google.format")  # fetch/export/extract are recorded as google.* stages
             
-            # Build batch update requests
-            requests = []
+            # Build batch update requests (only what actually differs from the document)
+            planner = DocsRequestPlanner()
             
             # 1. Update page margins
-            margin_request = self._build_margin_request(params)
+            margin_request = self._build_margin_request(params, doc_props)
             if margin_request:
-                requests.append(margin_request)
+                planner.add(margin_request)
                 changes.append(FormatChange(
                     type="margin",
                     description=f"Set margins: top={params.margins.top}mm, bottom={params.margins.bottom}mm, left={params.margins.left}mm, right={params.margins.right}mm",
@@ -140,15 +231,15 @@ class DocumentFormatterService:
             
             if params.skip_first_page:
                 # User WANTS to skip first page (hide number/header)
-                requests.append({
-                    "updateDocumentStyle": {
-                        "documentStyle": {
-                            "useFirstPageHeaderFooter": True,
-                        },
-                        "fields": "useFirstPageHeaderFooter",
-                    }
-                })
                 if not doc_props.first_page_different:
+                    planner.add({
+                        "updateDocumentStyle": {
+                            "documentStyle": {
+                                "useFirstPageHeaderFooter": True,
+                            },
+                            "fields": "useFirstPageHeaderFooter",
+                        }
+                    })
                     changes.append(FormatChange(
                         type="first_page_different",
                         description="Enabled 'Different first page' for headers and footers",
@@ -163,7 +254,7 @@ class DocumentFormatterService:
                 # Logic Fix: If 'Different first page' is ON, Page 1 has a separate footer (usually empty).
                 # We must DISABLE it so Page 1 uses the default footer (which has the number).
                 if doc_props.first_page_different:
-                    requests.append({
+                    planner.add({
                         "updateDocumentStyle": {
                             "documentStyle": {
                                 "useFirstPageHeaderFooter": False,
@@ -182,12 +273,12 @@ class DocumentFormatterService:
                     document, params, doc_props
                 )
                 if page_numbering_requests:
-                    requests.extend(page_numbering_requests)
+                    planner.add(*page_numbering_requests)
                 changes.extend(page_numbering_changes)
             else:
                 # Still set page number start value
                 if params.check_numbering:
-                    requests.append({
+                    planner.add({
                         "updateDocumentStyle": {
                             "documentStyle": {
                                 "pageNumberStart": params.start_from_number,
@@ -203,62 +294,87 @@ class DocumentFormatterService:
                     ))
             
             # 4. Update body text formatting (font size, font family, line spacing)
-            body_content = document.get("body", {}).get("content", [])
-            text_requests = self._build_text_formatting_requests(
-                body_content, 
+            self._build_text_formatting_requests(
+                planner,
+                document,
                 params,
                 doc_props,
+                changes,
                 expected_font_family,
-                changes
             )
-            if text_requests:
-                requests.extend(text_requests)
-                if expected_font_family:
-                    changes.append(FormatChange(
-                        type="font_family",
-                        description=f"Set font family to: {expected_font_family}",
-                    ))
+            if expected_font_family and "weightedFontFamily" in planner.changed_fields:
+                changes.append(FormatChange(
+                    type="font_family",
+                    description=f"Set font family to: {expected_font_family}",
+                ))
+            if "fontSize" in planner.changed_fields:
                 changes.append(FormatChange(
                     type="font_size",
                     description=f"Set font size to: {params.font_size}pt",
                 ))
+            if "lineSpacing" in planner.changed_fields:
                 changes.append(FormatChange(
                     type="line_spacing",
                     description=f"Set line spacing to: {params.line_spacing}",
                 ))
             
-            # Execute batch update if we have requests
-            if requests:
-                service.documents().batchUpdate(
-                    documentId=doc_id,
-                    body={"requests": requests}
-                ).execute()
+            clock.lap("plan")
+            
+            # Execute the plan in size-bounded batches (a single call when it fits the limits)
+            sent = self._execute_batches(service, doc_id, planner, user_key)
+            clock.lap("batch_update")
             
             # Second pass: Clear first page footer if needed
             if needs_second_pass_for_first_page:
                 # Re-fetch the document to get the new first page footer ID
-                document = service.documents().get(documentId=doc_id).execute()
+                document = google_api.execute(
+                    service.documents().get(documentId=doc_id, fields="documentStyle(firstPageFooterId),footers"),
+                    "docs.documents.get",
+                    user_key,
+                )
                 second_pass_requests = self._build_clear_first_page_footer_requests(document)
                 if second_pass_requests:
-                    service.documents().batchUpdate(
-                        documentId=doc_id,
-                        body={"requests": second_pass_requests}
-                    ).execute()
+                    second_pass = DocsRequestPlanner()
+                    second_pass.add(*second_pass_requests)
+                    sent = self._execute_batches(service, doc_id, second_pass, user_key, applied=sent)
                     changes.append(FormatChange(
                         type="remove_first_page_number",
                         description="Removed page number from first page (skip first page is enabled)",
                     ))
+                clock.lap("second_pass")
             
             processing_time = int((time.time() - start_time) * 1000)
             
             return FormatResult(
                 success=True,
                 changes_applied=len(changes),
-                changes=changes,
+                changes=changes.entries(),
                 processing_time_ms=processing_time,
                 document_title=document_title,
+                batches_applied=sent[0],
+                batches_total=sent[0],
+                requests_applied=sent[1],
             )
             
+        except PartialBatchUpdateError as e:
+            processing_time = int((time.time() - start_time) * 1000)
+            return FormatResult(
+                success=False,
+                changes_applied=0,
+                changes=[],
+                processing_time_ms=processing_time,
+                error_message=(
+                    f"Formatting stopped after {e.batches_applied} of {e.batches_total} update batches "
+                    f"({e.requests_applied} requests applied); the document is partly formatted. "
+                    f"Run the format again to finish it. Cause: {e.cause}"
+                ),
+                batches_applied=e.batches_applied,
+                batches_total=e.batches_total,
+                requests_applied=e.requests_applied,
+            )
+        except HTTPException:
+            # Local quota guard (429) or token refresh failure (401): let the caller report it as is
+            raise
         except HttpError as e:
             processing_time = int((time.time() - start_time) * 1000)
             error_msg = str(e)
@@ -287,12 +403,50 @@ class DocumentFormatterService:
                 error_message=str(e),
             )
 
-    def _build_margin_request(self, params: TemplateParams) -> Optional[dict]:
-        """Build request to update document margins."""
+    def _execute_batches(
+        self, service, doc_id: str, planner: DocsRequestPlanner, user_key: str, applied: tuple[int, int] = (0, 0),
+    ) -> tuple[int, int]:
+        """
+        Send the plan as consecutive batchUpdate calls bounded by the configured size.
+        Each call is atomic, the sequence is not: style updates go first and text replacements
+        last, and a failure once something was applied raises PartialBatchUpdateError.
+        `applied` and the return value are the (batches, requests) sent so far in this run.
+        """
+        applied_batches, applied_requests = applied
+        batches = planner.batches(
+            max_requests=settings.GOOGLE_DOCS_BATCH_MAX_REQUESTS,
+            max_bytes=settings.GOOGLE_DOCS_BATCH_MAX_BYTES,
+        )
+        for batch in batches:
+            try:
+                # Text replacements are not idempotent, so a 5xx is not blindly retried
+                google_api.execute(
+                    service.documents().batchUpdate(documentId=doc_id, body={"requests": batch}),
+                    "docs.documents.batchUpdate",
+                    user_key,
+                    idempotent=False,
+                )
+            except Exception as e:
+                if applied_batches == 0:
+                    raise
+                raise PartialBatchUpdateError(
+                    applied_batches, applied[0] + len(batches), applied_requests, e,
+                ) from e
+            applied_batches += 1
+            applied_requests += len(batch)
+        return applied_batches, applied_requests
+
+    def _build_margin_request(self, params: TemplateParams, doc_props) -> Optional[dict]:
+        """Build request to update document margins (None if they already match)."""
         # Convert mm to points (1 inch = 72 points, 1 inch = 25.4 mm)
         def mm_to_pt(mm: float) -> float:
             return mm * 72 / 25.4
         
+        current = (doc_props.margin_top_pt, doc_props.margin_bottom_pt, doc_props.margin_left_pt, doc_props.margin_right_pt)
+        target = (params.margins.top, params.margins.bottom, params.margins.left, params.margins.right)
+        if all(abs(c - mm_to_pt(t)) <= _MARGIN_TOLERANCE_PT for c, t in zip(current, target)):
+            return None
+        
         return {
             "updateDocumentStyle": {
                 "documentStyle": {
@@ -488,176 +642,143 @@ class DocumentFormatterService:
 
     def _build_text_formatting_requests(
         self,
-        body_content: list,
+        planner: DocsRequestPlanner,
+        document: dict,
         params: TemplateParams,
         doc_props,  # DocumentProperties from GoogleDocsService
+        changes: ChangeLedger,
         font_family: Optional[str] = None,
-        changes: list[FormatChange] = None,
-    ) -> list[dict]:
-        """Build requests to update text formatting, respecting skip_first_page."""
-        requests = []
-        
-        # Build a map of paragraph indices to their positions
-        paragraph_index_map = {}
-        for idx, element in enumerate(body_content):
-            if "paragraph" in element:
-                paragraph_index_map[idx] = element["paragraph"]
-        
-        structural_requests = []
-        
-        # Find all text ranges in the document
-        actual_para_idx = 0
+    ) -> None:
+        """
+        Plan body text formatting, respecting skip_first_page.
+        Every target is compared with the paragraph's effective style (inline style over its
+        named style over NORMAL_TEXT), so text that is already correct produces no request.
+        """
+        body_content = document.get("body", {}).get("content", [])
+        named_text_styles, named_paragraph_styles = self._named_styles(document)
+
+        # paragraph index -> "is on the first page", built once instead of scanned per paragraph
+        first_page_paragraphs = {
+            pls.paragraph_index: pls.is_on_first_page
+            for pls in doc_props.paragraph_line_spacings
+        }
+        target_line_spacing = params.line_spacing * 100
+
+        actual_para_idx = -1
         for element in body_content:
-            if "paragraph" in element:
-                paragraph = element["paragraph"]
-                para_style = paragraph.get("paragraphStyle", {})
-                named_style = para_style.get("namedStyleType", "NORMAL_TEXT")
-                
-                # Check if this is a heading
-                is_heading = named_style.startswith("HEADING_")
-                
-                # Check if this paragraph is on the first page
-                is_on_first_page = False
-                if params.skip_first_page:
-                    for pls in doc_props.paragraph_line_spacings:
-                        if pls.paragraph_index == actual_para_idx:
-                            is_on_first_page = pls.is_on_first_page
-                            break
-                    if is_on_first_page:
-                        actual_para_idx += 1
-                        continue
-                
-                # --- NEW: Image, Caption and Source Formatting ---
-                import re
-                has_image = any("inlineObjectElement" in e for e in paragraph.get("elements", []))
-                full_para_text = "".join(e.get("textRun", {}).get("content", "") for e in paragraph.get("elements", []) if "textRun" in e).strip()
-                caption_match = re.match(r'^(Рис\.|Зоб\.|Рисунок|Фото)\s*', full_para_text)
-                is_source = full_para_text.lower().startswith("джерело:")
-
-                elements = paragraph.get("elements", [])
-                if elements:
-                    para_start_index = elements[0].get("startIndex")
-                    para_end_index = elements[-1].get("endIndex")
-                    
-                    if para_start_index is not None and para_end_index is not None and para_end_index > para_start_index:
-                        # 1. Align Center
-                        if has_image or caption_match or is_source:
-                            if para_style.get("alignment") != "CENTER":
-                                requests.append({
-                                    "updateParagraphStyle": {
-                                        "range": {"startIndex": para_start_index, "endIndex": para_end_index},
-                                        "paragraphStyle": {"alignment": "CENTER"},
-                                        "fields": "alignment",
-                                    }
-                                })
-                                if has_image: changes.append(FormatChange(type="image_alignment", description="Відцентровано зображення"))
-                                elif caption_match: changes.append(FormatChange(type="caption_alignment", description="Відцентровано підпис"))
-                                elif is_source: changes.append(FormatChange(type="source_alignment", description="Відцентровано джерело"))
-
-                        # 2. Fix Caption Format (STORE FOR LATER REVERSE PROCESSING)
-                        if caption_match:
-                            fixed_text = re.sub(
-                                r'^(Рис|Зоб|Рисунок|Фото)\.?\s*(\d+)\s*[\.\,]\s*(\d+)(?:\.[\d\.]+)?\s*[\.\,]?\s*(.*)',
-                                r'\1. \2.\3. \4',
-                                full_para_text
-                            )
-                            if fixed_text != full_para_text:
-                                structural_requests.append({
-                                    "start": para_start_index,
-                                    "end": para_end_index - 1, # Don't delete the trailing \n
-                                    "text": fixed_text
-                                })
-                                changes.append(FormatChange(type="caption_format_fix", description="Виправлено формат номера підпису"))
-
-                        # 3. Format Source Style (Italic)
-                        if is_source:
-                            requests.append({
-                                "updateTextStyle": {
-                                    "range": {"startIndex": para_start_index, "endIndex": para_end_index},
-                                    "textStyle": {"italic": True},
-                                    "fields": "italic",
-                                }
-                            })
-                            changes.append(FormatChange(type="source_style", description="Додано курсив до джерела"))
-
-                # Standard Text Formatting (Font, Size, Spacing)
-                for elem in paragraph.get("elements", []):
-                    if "textRun" in elem:
-                        start_index = elem.get("startIndex", 0)
-                        end_index = elem.get("endIndex", 0)
-                        if end_index > start_index:
-                            existing_style = elem.get("textRun", {}).get("textStyle", {})
-                            text_style = {"fontSize": {"magnitude": params.font_size, "unit": "PT"}}
-                            fields = "fontSize"
-                            
-                            # We only want to set explicit bold if we really need to.
-                            # Google Docs inherits bolding from paragraph styles (headings).
-                            # The bug happens because updating weightedFontFamily requires a 'weight'.
-                            # If we set weight to 400 on a heading, it unbolds it.
-                            
-                            # FORCE BOLD ON ALL HEADINGS
-                            if is_heading:
-                                text_style["bold"] = True
-                                fields += ",bold"
-                            
-                            if font_family:
-                                # Try to get explicit weight first
-                                existing_weight = existing_style.get("weightedFontFamily", {}).get("weight")
-                                
-                                # If no explicit weight in font family, infer it
-                                if existing_weight is None:
-                                    if existing_style.get("bold") is True:
-                                        existing_weight = 700
-                                    elif is_heading and existing_style.get("bold") is not False:
-                                        # Headings are bold by default, unless explicitly unbolded
-                                        existing_weight = 700
-                                    else:
-                                        existing_weight = 400
-                                        
-                                text_style["weightedFontFamily"] = {
-                                    "fontFamily": font_family, 
-                                    "weight": existing_weight
-                                }
-                                fields += ",weightedFontFamily"
-                            
-                            requests.append({
-                                "updateTextStyle": {
-                                    "range": {"startIndex": start_index, "endIndex": end_index},
-                                    "textStyle": text_style, "fields": fields,
-                                }
-                            })
-                
-                # Line Spacing
-                if elements:
-                    para_start_index = elements[0].get("startIndex")
-                    para_end_index = elements[-1].get("endIndex")
-                    if para_start_index is not None and para_end_index is not None and para_end_index > para_start_index:
-                        requests.append({
-                            "updateParagraphStyle": {
-                                "range": {"startIndex": para_start_index, "endIndex": para_end_index},
-                                "paragraphStyle": {"lineSpacing": params.line_spacing * 100},
-                                "fields": "lineSpacing",
-                            }
-                        })
-                
-                actual_para_idx += 1
-        
-        # ADD STRUCTURAL CHANGES IN REVERSE ORDER TO PREVENT INDEX SHIFTING
-        structural_requests.sort(key=lambda x: x["start"], reverse=True)
-        for req in structural_requests:
-            requests.append({
-                "deleteContentRange": {
-                    "range": {"startIndex": req["start"], "endIndex": req["end"]}
-                }
-            })
-            requests.append({
-                "insertText": {
-                    "location": {"index": req["start"]},
-                    "text": req["text"]
-                }
-            })
-        
-        return requests
+            if "paragraph" not in element:
+                continue
+            actual_para_idx += 1
+            paragraph = element["paragraph"]
+            para_style = paragraph.get("paragraphStyle", {})
+            named_style = para_style.get("namedStyleType", "NORMAL_TEXT")
+
+            # Check if this is a heading
+            is_heading = named_style.startswith("HEADING_")
+
+            # Check if this paragraph is on the first page
+            if params.skip_first_page and first_page_paragraphs.get(actual_para_idx, False):
+                continue
+
+            elements = paragraph.get("elements", [])
+            if not elements:
+                continue
+            para_start_index = elements[0].get("startIndex")
+            para_end_index = elements[-1].get("endIndex")
+            effective_para_style = {**named_paragraph_styles.get(named_style, {}), **para_style}
+            paragraph_target = {"lineSpacing": target_line_spacing}
+
+            # --- Image, Caption and Source Formatting ---
+            has_image = any("inlineObjectElement" in e for e in elements)
+            full_para_text = "".join(e["textRun"].get("content", "") for e in elements if "textRun" in e).strip()
+            caption_match = _CAPTION_PREFIX.match(full_para_text)
+            is_source = full_para_text.lower().startswith("джерело:")
+
+            if para_start_index is not None and para_end_index is not None and para_end_index > para_start_index:
+                # 1. Align Center
+                if (has_image or caption_match or is_source) and para_style.get("alignment") != "CENTER":
+                    paragraph_target["alignment"] = "CENTER"
+                    example = full_para_text[:CHANGE_EXAMPLE_CHARS] or None
+                    if has_image: changes.add("image_alignment", "Відцентровано зображення", example=example)
+                    elif caption_match: changes.add("caption_alignment", "Відцентровано підпис", example=example)
+                    elif is_source: changes.add("source_alignment", "Відцентровано джерело", example=example)
+
+                # 2. Fix Caption Format (applied last, from the end of the body backwards)
+                if caption_match:
+                    fixed_text = _CAPTION_NUMBER.sub(r'\1. \2.\3. \4', full_para_text)
+                    if fixed_text != full_para_text:
+                        planner.replace_text(para_start_index, para_end_index - 1, fixed_text)  # Keep the trailing \n
+                        changes.add("caption_format_fix", "Виправлено формат номера підпису", example=full_para_text[:CHANGE_EXAMPLE_CHARS])
+
+            # Standard Text Formatting (Font, Size, Spacing)
+            source_needs_italic = False
+            paragraph_text_style = {
+                **named_text_styles.get("NORMAL_TEXT", {}),
+                **named_text_styles.get(named_style, {}),
+            }
+            for elem in elements:
+                if "textRun" not in elem:
+                    continue
+                start_index = elem.get("startIndex", 0)
+                end_index = elem.get("endIndex", 0)
+                if end_index <= start_index:
+                    continue
+                existing_style = elem["textRun"].get("textStyle", {})
+                effective_style = {**paragraph_text_style, **existing_style}
+                text_style = {"fontSize": {"magnitude": params.font_size, "unit": "PT"}}
+
+                # We only want to set explicit bold if we really need to.
+                # Google Docs inherits bolding from paragraph styles (headings).
+                # The bug happens because updating weightedFontFamily requires a 'weight'.
+                # If we set weight to 400 on a heading, it unbolds it.
+
+                # FORCE BOLD ON ALL HEADINGS
+                if is_heading:
+                    text_style["bold"] = True
+
+                if font_family:
+                    # Try to get explicit weight first
+                    existing_weight = existing_style.get("weightedFontFamily", {}).get("weight")
+
+                    # If no explicit weight in font family, infer it
+                    if existing_weight is None:
+                        if existing_style.get("bold") is True:
+                            existing_weight = 700
+                        elif is_heading and existing_style.get("bold") is not False:
+                            # Headings are bold by default, unless explicitly unbolded
+                            existing_weight = 700
+                        else:
+                            existing_weight = 400
+
+                    text_style["weightedFontFamily"] = {
+                        "fontFamily": font_family,
+                        "weight": existing_weight
+                    }
+
+                # 3. Format Source Style (Italic)
+                if is_source:
+                    text_style["italic"] = True
+                    source_needs_italic = source_needs_italic or effective_style.get("italic") is not True
+
+                planner.update_text_style(start_index, end_index, effective_style, text_style)
+
+            if source_needs_italic:
+                changes.add("source_style", "Додано курсив до джерела", example=full_para_text[:CHANGE_EXAMPLE_CHARS])
+
+            # Line Spacing (+ centering)
+            planner.update_paragraph_style(para_start_index, para_end_index, effective_para_style, paragraph_target)
+
+    @staticmethod
+    def _named_styles(document: dict) -> tuple[dict[str, dict], dict[str, dict]]:
+        """namedStyleType -> textStyle / paragraphStyle as defined by the document's named styles."""
+        text_styles: dict[str, dict] = {}
+        paragraph_styles: dict[str, dict] = {}
+        for style in document.get("namedStyles", {}).get("styles", []):
+            style_type = style.get("namedStyleType")
+            if style_type:
+                text_styles[style_type] = style.get("textStyle", {})
+                paragraph_styles[style_type] = style.get("paragraphStyle", {})
+        return text_styles, paragraph_styles
 
 
 def get_document_formatter_service(
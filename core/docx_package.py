@@ -0,0 +1,248 @@
+"""
+Reads and writes .docx packages for python-docx without touching the parts nobody looks at.
+
+`open_docx()` loads only the XML parts eagerly; images, embedded OLE objects, fonts and
+other binary parts are read from the archive on first access, so analysing a photo-heavy
+document never decompresses its media. Their size is known from the zip central directory.
+
+`write_docx()` writes a Document back without `doc.save()`.
+
+`doc.save()` re-serializes and recompresses every part, images included. Here only the XML
+parts python-docx keeps parsed (document, styles, settings, numbering, headers/footers...)
+plus the relationship and content-type items are serialized; every other part that is
+unchanged since it was read (media, fonts, theme, customXml) is copied from the source
+archive as its raw deflate stream, without decompressing it. The result is a list of
+chunks - memoryviews into the source for the copied entries - that a StreamingResponse can
+send as is; nothing is concatenated unless `getvalue()` is called.
+"""
+import struct
+import time
+import zipfile
+import zlib
+from io import BytesIO
+from typing import Iterator, Optional, Union
+
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.package import Unmarshaller
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.part import Part, PartFactory, XmlPart
+from docx.opc.phys_pkg import _ZipPkgReader
+from docx.opc.pkgreader import PackageReader, _ContentTypeMap
+from docx.opc.pkgwriter import _ContentTypesItem
+from docx.package import Package
+
+from core.metrics import StageClock
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<IHHHHIIH")
+_LOCAL_HEADER_SIGNATURE = 0x04034B50
+_CENTRAL_HEADER_SIGNATURE = 0x02014B50
+_END_SIGNATURE = 0x06054B50
+_VERSION = 20  # 2.0: deflate
+_UTF8_FLAG = 0x800
+_ZIP32_LIMIT = 0xFFFFFFFF
+# Same trade-off as zipfile's default: output size close to Word's, a fraction of level 9's time
+COMPRESS_LEVEL = 6
+
+Chunk = Union[bytes, memoryview]
+
+
+class DocxStream:
+    """The chunks of a written .docx; iterate it for streaming, `getvalue()` for bytes"""
+
+    def __init__(self, chunks: list[Chunk]):
+        self.chunks = chunks
+        self.size = sum(len(chunk) for chunk in chunks)
+
+    def __iter__(self) -> Iterator[Chunk]:
+        return iter(self.chunks)
+
+    async def __aiter__(self):
+        # Already in memory: lets StreamingResponse send it without a threadpool hop per chunk
+        for chunk in self.chunks:
+            yield chunk
+
+    def __len__(self) -> int:
+        return self.size
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.chunks)
+
+
+class DeferredPart(Part):
+    """A binary part (image, font, OLE object...) whose bytes are read from the archive on first access"""
+
+    def __init__(self, partname, content_type: str, package, archive: bytes, info: zipfile.ZipInfo):
+        super().__init__(partname, content_type, None, package)
+        self._archive = archive
+        self._info = info
+
+    @property
+    def blob(self) -> bytes:
+        if self._blob is None:
+            with zipfile.ZipFile(BytesIO(self._archive)) as archive:
+                self._blob = archive.read(self._info)
+        return self._blob
+
+    def unread_from(self, archive: bytes) -> bool:
+        """True while the part is still exactly the entry it would be read from in `archive`"""
+        return self._blob is None and self._archive is archive
+
+    @property
+    def size(self) -> int:
+        """Uncompressed size, from the central directory"""
+        return self._info.file_size
+
+
+def _is_xml(content_type: str) -> bool:
+    return content_type.endswith(("+xml", "/xml"))
+
+
+class _LazyZipReader(_ZipPkgReader):
+    """Reads XML entries as python-docx does; returns the ZipInfo of any other entry instead of its bytes"""
+
+    def __new__(cls, pkg_file):
+        # PhysPkgReader.__new__ is a factory that would hand back a plain _ZipPkgReader
+        return object.__new__(cls)
+
+    def __init__(self, pkg_file):
+        super().__init__(pkg_file)
+        self.content_types = _ContentTypeMap.from_xml(self.content_types_xml)
+
+    def blob_for(self, pack_uri):
+        if pack_uri.membername.endswith(".rels") or pack_uri == CONTENT_TYPES_URI \
+                or _is_xml(self.content_types[pack_uri]):
+            return super().blob_for(pack_uri)
+        return self._zipf.getinfo(pack_uri.membername)
+
+
+def open_docx(file_content: bytes):
+    """
+    `Document(BytesIO(file_content))` with binary parts loaded on demand (see `DeferredPart`).
+    The document can still be edited and saved; `package.image_parts` only lists images added
+    after opening, so `add_picture()` may store a duplicate of an existing image.
+    """
+    reader = _LazyZipReader(BytesIO(file_content))
+    try:
+        pkg_srels = PackageReader._srels_for(reader, PACKAGE_URI)
+        sparts = PackageReader._load_serialized_parts(reader, pkg_srels, reader.content_types)
+    finally:
+        reader.close()
+
+    def part_factory(partname, content_type, reltype, blob, package):
+        if isinstance(blob, zipfile.ZipInfo):
+            return DeferredPart(partname, content_type, package, file_content, blob)
+        return PartFactory(partname, content_type, reltype, blob, package)
+
+    package = Package()
+    Unmarshaller.unmarshal(PackageReader(reader.content_types, pkg_srels, sparts), package, part_factory)
+    document_part = package.main_document_part
+    if document_part.content_type != CT.WML_DOCUMENT_MAIN:
+        raise ValueError(f"file is not a Word file, content type is '{document_part.content_type}'")
+    return document_part.document
+
+
+class _ZipWriter:
+    def __init__(self):
+        self.chunks: list[Chunk] = []
+        self.central: list[bytes] = []
+        self.offset = 0
+        self.count = 0
+        now = time.localtime()
+        self.dos_time = (now.tm_hour << 11) | (now.tm_min << 5) | (now.tm_sec // 2)
+        self.dos_date = ((now.tm_year - 1980) << 9) | (now.tm_mon << 5) | now.tm_mday
+
+    def _entry(self, name: str, method: int, dos_time: int, dos_date: int, crc: int,
+               compressed: Chunk, size: int) -> None:
+        encoded = name.encode("utf-8")
+        flags = 0 if encoded.isascii() else _UTF8_FLAG
+        header = _LOCAL_HEADER.pack(
+            _LOCAL_HEADER_SIGNATURE, _VERSION, flags, method, dos_time, dos_date,
+            crc, len(compressed), size, len(encoded), 0,
+        )
+        self.central.append(_CENTRAL_HEADER.pack(
+            _CENTRAL_HEADER_SIGNATURE, _VERSION, _VERSION, flags, method, dos_time, dos_date,
+            crc, len(compressed), size, len(encoded), 0, 0, 0, 0, 0, self.offset,
+        ) + encoded)
+        self.chunks += (header + encoded, compressed)
+        self.offset += len(header) + len(encoded) + len(compressed)
+        self.count += 1
+
+    def write(self, name: str, data: bytes) -> None:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        self._entry(name, zipfile.ZIP_DEFLATED, self.dos_time, self.dos_date, zlib.crc32(data), compressed, len(data))
+
+    def copy(self, info: zipfile.ZipInfo, source: memoryview) -> None:
+        """Copy an entry's compressed bytes as they are in the source archive"""
+        header = _LOCAL_HEADER.unpack_from(source, info.header_offset)
+        start = info.header_offset + _LOCAL_HEADER.size + header[9] + header[10]
+        year, month, day, hour, minute, second = info.date_time
+        self._entry(
+            info.filename, info.compress_type,
+            (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day,
+            info.CRC, source[start:start + info.compress_size], info.file_size,
+        )
+
+    def close(self) -> list[Chunk]:
+        directory = b"".join(self.central)
+        self.chunks.append(directory + _END_OF_CENTRAL_DIRECTORY.pack(
+            _END_SIGNATURE, 0, 0, self.count, self.count, len(directory), self.offset, 0,
+        ))
+        return self.chunks
+
+
+def _source_entries(source: bytes) -> Optional[dict[str, zipfile.ZipInfo]]:
+    """Entries that can be copied raw (plain stored/deflated, no zip64); None if the archive is unusable"""
+    try:
+        with zipfile.ZipFile(BytesIO(source)) as archive:
+            infos = archive.infolist()
+    except zipfile.BadZipFile:
+        return None
+    return {
+        info.filename: info
+        for info in infos
+        if info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+        and not info.flag_bits & 0x1  # encrypted
+        and max(info.header_offset, info.compress_size, info.file_size) < _ZIP32_LIMIT
+    }
+
+
+def write_docx(doc, source: bytes) -> DocxStream:
+    """
+    Serialize `doc` (opened from `source`) as a .docx, copying unmodified parts from `source`.
+    Falls back to `doc.save()` when `source` cannot be read as a zip archive.
+    """
+    clock = StageClock("docx")
+    entries = _source_entries(source)
+    package = doc.part.package
+    if entries is None:
+        output = BytesIO()
+        doc.save(output)
+        return DocxStream([output.getvalue()])
+
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+
+    source_view = memoryview(source)
+    writer = _ZipWriter()
+    writer.write(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+    writer.write(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+    for part in parts:
+        name = part.partname.membername
+        info = entries.get(name)
+        if isinstance(part, XmlPart):
+            writer.write(name, part.blob)
+        elif isinstance(part, DeferredPart) and part.unread_from(source) and info is not None:
+            writer.copy(info, source_view)
+        elif info is not None and info.file_size == len(part.blob) and info.CRC == zlib.crc32(part.blob):
+            writer.copy(info, source_view)
+        else:
+            writer.write(name, part.blob)
+        if len(part.rels):
+            writer.write(part.partname.rels_uri.membername, part.rels.xml)
+    stream = DocxStream(writer.close())
+    clock.lap("write")
+    return stream
@@ -0,0 +1,104 @@
+"""
+Per-worker memo for re-checking an edited document.
+
+Students re-upload a thesis after fixing one chapter. Every body element of the upload is
+fingerprinted by its XML, so:
+
+- a paragraph's extracted facts (segments, spacing, alignment, image) are reused when the
+  same `w:p` is seen again with the same style table (see LocalDocumentService);
+- the layout estimate resumes from the last checkpoint whose whole prefix of body
+  elements is unchanged, instead of starting from page 1.
+
+Fingerprints are content hashes, so nothing needs invalidating: an edited paragraph simply
+has a new key, and old entries age out of the LRU.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+from lxml import etree
+
+from core.layout_estimator import PageLayout, estimate_docx_layout
+from core.metrics import cache_hit, cache_miss
+from common.app_settings import settings
+
+# Body elements between layout checkpoints: a resumed estimate redoes at most this many
+LAYOUT_CHECKPOINT_EVERY = 32
+
+V = TypeVar("V")
+
+
+def fingerprint(*parts) -> bytes:
+    """128-bit digest of XML elements and/or bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else etree.tostring(part))
+    return digest.digest()
+
+
+class LruCache(Generic[V]):
+    """Bounded, thread-safe LRU map (extraction runs in the threadpool)"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, V]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+paragraph_cache: LruCache = LruCache(settings.PARAGRAPH_CACHE_MAX_SIZE)
+layout_checkpoint_cache: LruCache = LruCache(settings.LAYOUT_CHECKPOINT_CACHE_MAX_SIZE)
+
+
+def clear() -> None:
+    paragraph_cache.clear()
+    layout_checkpoint_cache.clear()
+
+
+def incremental_docx_layout(doc, font_of: Callable, body_fingerprints: list[bytes], seed: bytes) -> PageLayout:
+    """
+    `estimate_docx_layout()` resumed from the latest cached checkpoint whose body prefix
+    matches. `seed` must cover everything outside the body elements that the layout depends
+    on (styles, theme, every section's sectPr).
+    """
+    # prefix_keys[k] identifies `seed` plus body elements 0..k
+    prefix_keys, key = [], seed
+    for element_fingerprint in body_fingerprints:
+        key = hashlib.blake2b(key + element_fingerprint, digest_size=16).digest()
+        prefix_keys.append(key)
+
+    resume = None
+    last = (len(prefix_keys) - 1) // LAYOUT_CHECKPOINT_EVERY * LAYOUT_CHECKPOINT_EVERY
+    for child in range(last, 0, -LAYOUT_CHECKPOINT_EVERY):
+        resume = layout_checkpoint_cache.get(prefix_keys[child])
+        if resume is not None:
+            break
+    if resume is not None:
+        cache_hit("layout_checkpoints")
+    else:
+        cache_miss("layout_checkpoints")
+
+    layout = estimate_docx_layout(doc, font_of, resume=resume, checkpoint_every=LAYOUT_CHECKPOINT_EVERY)
+    for checkpoint in layout.checkpoints:
+        layout_checkpoint_cache.put(prefix_keys[checkpoint.child], checkpoint)
+    return layout
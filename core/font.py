@@ -1,5 +1,4 @@
 import httpx
-from sqlalchemy.orm import Session
 from typing import List, Annotated
 import logging
 
@@ -23,25 +22,25 @@ STANDARD_FONTS = [
 ]
 
 
-def get_all_fonts(font_repository: FontRepositoryDependency) -> List[FontDto]:
+async def get_all_fonts(font_repository: FontRepositoryDependency) -> List[FontDto]:
     """Get all available fonts"""
-    fonts = font_repository.get_all_fonts()
+    fonts = await font_repository.get_all_fonts()
     return [FontDto.from_font(font) for font in fonts]
 
 
-def get_font_by_id(font_repository: FontRepositoryDependency, font_id: int) -> FontDto | None:
+async def get_font_by_id(font_repository: FontRepositoryDependency, font_id: int) -> FontDto | None:
     """Get font by ID"""
-    font = font_repository.get_font_by_id(font_id)
+    font = await font_repository.get_font_by_id(font_id)
     return FontDto.from_font(font) if font else None
 
 
-def get_font_by_family(font_repository: FontRepositoryDependency, family: str) -> FontDto | None:
+async def get_font_by_family(font_repository: FontRepositoryDependency, family: str) -> FontDto | None:
     """Get font by family name"""
-    font = font_repository.get_font_by_family(family)
+    font = await font_repository.get_font_by_family(family)
     return FontDto.from_font(font) if font else None
 
 
-def seed_standard_fonts(font_repository: FontRepositoryDependency) -> int:
+async def seed_standard_fonts(font_repository: FontRepositoryDependency) -> int:
     """
     Seed standard fonts that are not available in Google Fonts API
     Returns the number of fonts added
@@ -50,7 +49,7 @@ def seed_standard_fonts(font_repository: FontRepositoryDependency) -> int:
         fonts_data = []
         for font in STANDARD_FONTS:
             # Check if font already exists
-            existing = font_repository.get_font_by_family(font["name"])
+            existing = await font_repository.get_font_by_family(font["name"])
             if not existing:
                 font_data = {
                     "family": font["name"],
@@ -63,7 +62,7 @@ def seed_standard_fonts(font_repository: FontRepositoryDependency) -> int:
                 fonts_data.append(font_data)
         
         if fonts_data:
-            count = font_repository.bulk_create_fonts(fonts_data)
+            count = await font_repository.bulk_create_fonts(fonts_data)
             logger.info(f"Successfully seeded {count} standard fonts")
             return count
         else:
@@ -75,7 +74,7 @@ def seed_standard_fonts(font_repository: FontRepositoryDependency) -> int:
         raise Exception(f"Failed to seed standard fonts: {str(e)}")
 
 
-def seed_fonts_from_google(font_repository: FontRepositoryDependency, api_key: str) -> int:
+async def seed_fonts_from_google(font_repository: FontRepositoryDependency, api_key: str) -> int:
     """
     Seed fonts from Google Web Fonts API
     Returns the number of fonts added
@@ -84,8 +83,8 @@ def seed_fonts_from_google(font_repository: FontRepositoryDependency, api_key: s
         # Make request to Google Fonts API
         url = f"https://www.googleapis.com/webfonts/v1/webfonts?key={api_key}"
         
-        with httpx.Client(timeout=30.0) as client:
-            response = client.get(url)
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.get(url)
             response.raise_for_status()
             data = response.json()
         
@@ -103,7 +102,7 @@ def seed_fonts_from_google(font_repository: FontRepositoryDependency, api_key: s
             fonts_data.append(font_data)
         
         # Bulk insert fonts
-        count = font_repository.bulk_create_fonts(fonts_data)
+        count = await font_repository.bulk_create_fonts(fonts_data)
         logger.info(f"Successfully seeded {count} fonts from Google Web Fonts API")
         return count
         
@@ -115,7 +114,7 @@ def seed_fonts_from_google(font_repository: FontRepositoryDependency, api_key: s
         raise Exception(f"Failed to seed fonts: {str(e)}")
 
 
-def seed_fonts_from_google_with_settings(font_repository: FontRepositoryDependency) -> int:
+async def seed_fonts_from_google_with_settings(font_repository: FontRepositoryDependency) -> int:
     """
     Seed fonts from Google Web Fonts API using API key from settings
     Also seeds standard fonts first
@@ -127,20 +126,20 @@ def seed_fonts_from_google_with_settings(font_repository: FontRepositoryDependen
         raise Exception("GOOGLE_FONTS_API_KEY not found in environment variables")
     
     # First seed standard fonts
-    standard_count = seed_standard_fonts(font_repository)
+    standard_count = await seed_standard_fonts(font_repository)
     
     # Then seed Google fonts
-    google_count = seed_fonts_from_google(font_repository, google_api_key)
+    google_count = await seed_fonts_from_google(font_repository, google_api_key)
     
     return standard_count + google_count
 
 
-def ensure_fonts_seeded(font_repository: FontRepositoryDependency) -> bool:
+async def ensure_fonts_seeded(font_repository: FontRepositoryDependency) -> bool:
     """
     Check if fonts are seeded, if not - seed them from Google Fonts API and standard fonts
     Returns True if fonts were seeded, False if they already existed
     """
-    count = font_repository.count_fonts()
+    count = await font_repository.count_fonts()
     
     if count > 0:
         logger.info(f"Fonts already seeded ({count} fonts found)")
@@ -150,7 +149,7 @@ def ensure_fonts_seeded(font_repository: FontRepositoryDependency) -> bool:
     
     # First seed standard fonts (always works, no API key needed)
     try:
-        seed_standard_fonts(font_repository)
+        await seed_standard_fonts(font_repository)
     except Exception as e:
         logger.error(f"Failed to seed standard fonts: {e}")
     
@@ -163,7 +162,7 @@ def ensure_fonts_seeded(font_repository: FontRepositoryDependency) -> bool:
     
     logger.info("Seeding fonts from Google Web Fonts API...")
     try:
-        seed_fonts_from_google(font_repository, google_api_key)
+        await seed_fonts_from_google(font_repository, google_api_key)
     except Exception as e:
         logger.error(f"Failed to seed Google fonts: {e}")
         logger.info("Standard fonts are available for use.")
@@ -0,0 +1,147 @@
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from crud.font import FontRepository
+from schemas.font import FontDto
+from common.app_settings import settings
+from core.metrics import cache_hit, cache_miss
+
+logger = logging.getLogger(__name__)
+
+# Same default cut-off as pg_trgm's `similarity_threshold`
+FUZZY_SIMILARITY_THRESHOLD = 0.3
+
+
+def _trigrams(value: str) -> frozenset:
+    """Trigrams the way pg_trgm builds them: per word, padded with two leading and one trailing space"""
+    grams = set()
+    for word in value.lower().split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return frozenset(grams)
+
+
+class FontCatalog:
+    """
+    In-process, read-mostly copy of the fonts table.
+
+    The font picker hits `/fonts` on every keystroke, so the list is kept in memory
+    sorted by lower-cased family name: prefix lookups are a bisect, substring lookups
+    a scan over ~1,700 short strings and fuzzy lookups a trigram comparison.
+    The catalog is loaded at startup, dropped on create/delete/seed and lazily
+    reloaded from the repository on the next read (or after FONT_CATALOG_TTL_SECONDS,
+    so other workers pick up admin changes too).
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._fonts: List[FontDto] = []
+        self._keys: List[str] = []
+        self._trigrams: List[frozenset] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._etag: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        # Bumped by invalidate(), so a load that raced it is not stored
+        self._generation = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        return time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self._etag
+
+    async def load(self, font_repository: FontRepository) -> None:
+        """(Re)load the whole catalog from the database"""
+        generation = self._generation
+        fonts = [FontDto.from_font(font) for font in await font_repository.get_all_fonts(limit=None)]
+        fonts.sort(key=lambda font: font.family.lower())
+
+        digest = hashlib.sha1()
+        for font in fonts:
+            digest.update(f"{font.id}|{font.family}|{font.category}|{font.version}\n".encode("utf-8"))
+
+        trigrams = [_trigrams(font.family) for font in fonts]
+        postings: Dict[str, List[int]] = {}
+        for index, grams in enumerate(trigrams):
+            for gram in grams:
+                postings.setdefault(gram, []).append(index)
+
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated while reading: this list may predate the change, leave it to the next read
+                return
+            self._fonts = fonts
+            self._keys = [font.family.lower() for font in fonts]
+            self._trigrams = trigrams
+            self._postings = postings
+            self._etag = f'W/"fonts-{digest.hexdigest()[:16]}"'
+            self._loaded_at = time.monotonic()
+        logger.info(f"Font catalog loaded ({len(fonts)} fonts)")
+
+    async def ensure_loaded(self, font_repository: FontRepository) -> None:
+        if self.is_loaded:
+            cache_hit("fonts")
+        else:
+            cache_miss("fonts")
+            await self.load(font_repository)
+
+    def invalidate(self) -> None:
+        """Drop the catalog; the next read reloads it"""
+        with self._lock:
+            self._loaded_at = None
+            self._etag = None
+            self._generation += 1
+
+    def search(
+        self,
+        search: Optional[str] = None,
+        match: str = "contains",
+        skip: int = 0,
+        limit: int = 10,
+    ) -> Tuple[List[FontDto], int]:
+        """
+        Look fonts up in memory.
+        match: "contains" (case-insensitive substring, same as the SQL ILIKE),
+               "prefix" (family starts with the term) or
+               "fuzzy" (trigram similarity, best matches first)
+        Returns (page of fonts, total number of matches)
+        """
+        with self._lock:
+            fonts, keys, trigrams, postings = self._fonts, self._keys, self._trigrams, self._postings
+
+        term = (search or "").strip().lower()
+        if not term:
+            matches = fonts
+        elif match == "prefix":
+            start = bisect.bisect_left(keys, term)
+            end = bisect.bisect_left(keys, term + "\uffff", lo=start)
+            matches = fonts[start:end]
+        elif match == "fuzzy":
+            query_grams = _trigrams(term)
+            # Only fonts sharing at least one trigram with the term can score above zero
+            candidates = {index for gram in query_grams for index in postings.get(gram, ())}
+            scored = []
+            for index in candidates:
+                grams = trigrams[index]
+                similarity = len(query_grams & grams) / len(query_grams | grams)
+                if similarity >= FUZZY_SIMILARITY_THRESHOLD or term in keys[index]:
+                    scored.append((-similarity, index))
+            scored.sort()
+            matches = [fonts[index] for _, index in scored]
+        else:
+            matches = [font for font, key in zip(fonts, keys) if term in key]
+
+        return matches[skip:skip + limit], len(matches)
+
+
+font_catalog = FontCatalog(ttl_seconds=settings.FONT_CATALOG_TTL_SECONDS)
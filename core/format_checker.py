@@ -8,6 +8,7 @@ import time
 from fastapi import Depends
 
 from core.google_docs import GoogleDocsService, GoogleDocsServiceDependency, DocumentProperties, TextSegment
+from core.metrics import StageClock, tracked_job
 from schemas.template import TemplateParams
 
 
@@ -53,6 +54,7 @@ class FormatCheckerService:
     def __init__(self, google_docs_service: GoogleDocsServiceDependency):
         self.google_docs_service = google_docs_service
 
+    @tracked_job("google.check")
     def check_document(
         self,
         google_token: str,
@@ -69,8 +71,10 @@ class FormatCheckerService:
             google_token, 
             doc_id,
             refresh_token=refresh_token,
-            on_token_refresh=on_token_refresh
+            on_token_refresh=on_token_refresh,
+            include_headers_footers=params.check_numbering,
         )
+        clock = StageClock("google.check")
         
         # --- Font Size & Family Checks (Unchanged) ---
         font_size_issues: list[TextSegment] = []
@@ -405,6 +409,7 @@ class FormatCheckerService:
         score = max(0.0, min(1.0, score))
         passed = score >= 0.98 and not any(i.severity == "high" for i in issues)
         
+        clock.lap("rules")
         return CheckResult(
             passed=passed,
             overall_score=round(score, 2),
@@ -0,0 +1,332 @@
+"""
+Google API executor - every call to Google (Docs, Drive, userinfo) goes through here.
+
+- Local rate limiting: a global token bucket (per worker process) plus one bucket and a
+  concurrency cap per Google account, so one user's burst cannot eat the project quota.
+- Retries with full-jitter exponential backoff on 429 / rate-limit 403 / 5xx, honouring Retry-After.
+- Counters for quota use, exposed to admins via /analytics/google-api and on /metrics.
+- `build_service` / `google_token_uri` honour GOOGLE_API_BASE_URL, so the whole Google side
+  can be swapped for a local stand-in (loadtest/fake_google.py).
+"""
+import hashlib
+import logging
+import random
+import socket
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import HTTPException, status
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from common.app_settings import settings
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded", "RESOURCE_EXHAUSTED", "quotaExceeded")
+
+GOOGLE_AUTH_URI = "https://accounts.google.com/o/oauth2/auth"
+GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+# Path of each API under GOOGLE_API_BASE_URL, same layout as Google's own hosts
+_SERVICE_PATHS = {"docs": "", "drive": "drive/v3/", "oauth2": ""}
+
+
+def _base_url() -> str:
+    return settings.GOOGLE_API_BASE_URL.rstrip("/")
+
+
+def google_auth_uri() -> str:
+    return f"{_base_url()}/o/oauth2/auth" if settings.GOOGLE_API_BASE_URL else GOOGLE_AUTH_URI
+
+
+def google_token_uri() -> str:
+    return f"{_base_url()}/token" if settings.GOOGLE_API_BASE_URL else GOOGLE_TOKEN_URI
+
+
+def build_service(api: str, version: str, credentials: Credentials) -> Any:
+    """googleapiclient `build`, pointed at GOOGLE_API_BASE_URL when it is set"""
+    if not settings.GOOGLE_API_BASE_URL:
+        return build(api, version, credentials=credentials)
+    endpoint = f"{_base_url()}/{_SERVICE_PATHS.get(api, '')}"
+    return build(api, version, credentials=credentials, client_options={"api_endpoint": endpoint})
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` stored."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token if one is available, otherwise return how long until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float) -> float:
+        """
+        Block until a token is available.
+        Returns the time spent waiting; raises TimeoutError if it would exceed `timeout`.
+        """
+        waited = 0.0
+        while True:
+            delay = self._reserve()
+            if delay == 0:
+                return waited
+            if waited + delay > timeout:
+                raise TimeoutError(delay)
+            time.sleep(delay)
+            waited += delay
+
+
+@dataclass
+class GoogleApiMetrics:
+    """Counters since process start (per worker)."""
+    calls: dict[str, int] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+    retries: int = 0
+    google_throttled: int = 0  # 429 / rate-limit 403 responses from Google
+    local_waits: int = 0  # calls delayed by our own token buckets
+    local_wait_seconds: float = 0.0
+    rejected: int = 0  # calls refused because the local wait would be too long
+    in_flight: int = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "errors": dict(self.errors),
+            "retries": self.retries,
+            "google_throttled": self.google_throttled,
+            "local_waits": self.local_waits,
+            "local_wait_seconds": round(self.local_wait_seconds, 3),
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+        }
+
+
+def credentials_key(credentials: Credentials) -> str:
+    """Stable per-account key (the refresh token survives access-token refreshes)"""
+    secret = credentials.refresh_token or credentials.token or ""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+def _retry_after_seconds(error: HttpError) -> Optional[float]:
+    value = error.resp.get("retry-after") if error.resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_rate_limited(error: HttpError) -> bool:
+    if error.resp.status == 429:
+        return True
+    if error.resp.status != 403:
+        return False
+    content = error.content.decode("utf-8", "ignore") if isinstance(error.content, bytes) else str(error.content)
+    return any(reason in content for reason in RATE_LIMIT_REASONS)
+
+
+class GoogleApiExecutor:
+    """Runs googleapiclient requests under the quota rules above (blocking; call from a worker thread)."""
+
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: float,
+        user_rate: float,
+        user_burst: float,
+        user_max_concurrency: int,
+        max_retries: int,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+        max_wait_seconds: float,
+        max_tracked_users: int = 10_000,
+    ):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.user_max_concurrency = user_max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.max_tracked_users = max_tracked_users
+        self.metrics = GoogleApiMetrics()
+        self._global_bucket = TokenBucket(global_rate, global_burst)
+        self._users: "OrderedDict[str, tuple[TokenBucket, threading.BoundedSemaphore]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _user_limits(self, user_key: str) -> tuple[TokenBucket, threading.BoundedSemaphore]:
+        with self._lock:
+            limits = self._users.get(user_key)
+            if limits is None:
+                limits = (
+                    TokenBucket(self.user_rate, self.user_burst),
+                    threading.BoundedSemaphore(self.user_max_concurrency),
+                )
+                self._users[user_key] = limits
+                if len(self._users) > self.max_tracked_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_key)
+            return limits
+
+    def _count(self, counter: dict[str, int], key: str) -> None:
+        with self._lock:
+            counter[key] = counter.get(key, 0) + 1
+
+    def _reject(self, retry_after: float) -> HTTPException:
+        with self._lock:
+            self.metrics.rejected += 1
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many Google API requests. Please try again in a moment.",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+    def _throttle(self, user_key: Optional[str]) -> None:
+        waited = 0.0
+        try:
+            if user_key is not None:
+                waited += self._user_limits(user_key)[0].acquire(self.max_wait_seconds)
+            waited += self._global_bucket.acquire(self.max_wait_seconds - waited)
+        except TimeoutError as e:
+            raise self._reject(e.args[0])
+        if waited:
+            with self._lock:
+                self.metrics.local_waits += 1
+                self.metrics.local_wait_seconds += waited
+
+    def _backoff(self, attempt: int, error: Optional[HttpError]) -> float:
+        retry_after = _retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max_seconds)
+        # "Full jitter": spreads retries of many clients hit by the same outage
+        return random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt))
+
+    def execute(
+        self,
+        request: Any,
+        operation: str,
+        user_key: Optional[str] = None,
+        idempotent: bool = True,
+    ) -> Any:
+        """
+        Execute a googleapiclient HttpRequest.
+
+        Args:
+            request: e.g. `service.documents().get(documentId=...)` (not yet executed)
+            operation: metric label, e.g. "docs.get"
+            user_key: per-account limiter key (see credentials_key); None = global limit only
+            idempotent: False for writes that may have been applied when a 5xx comes back
+                        (those are only retried on rate limiting, which guarantees nothing ran)
+        """
+        self._count(self.metrics.calls, operation)
+        semaphore = self._user_limits(user_key)[1] if user_key is not None else None
+        if semaphore is not None and not semaphore.acquire(timeout=self.max_wait_seconds):
+            raise self._reject(self.max_wait_seconds)
+        with self._lock:
+            self.metrics.in_flight += 1
+        try:
+            attempt = 0
+            while True:
+                self._throttle(user_key)
+                try:
+                    return request.execute()
+                except HttpError as e:
+                    rate_limited = _is_rate_limited(e)
+                    if rate_limited:
+                        with self._lock:
+                            self.metrics.google_throttled += 1
+                    retryable = rate_limited or (idempotent and e.resp.status in RETRYABLE_STATUSES)
+                    if not retryable or attempt >= self.max_retries:
+                        self._count(self.metrics.errors, f"{operation}:{e.resp.status}")
+                        raise
+                    delay = self._backoff(attempt, e)
+                    logger.warning(f"Google API {operation} returned {e.resp.status}, retrying in {delay:.2f}s")
+                except (ConnectionError, socket.timeout, TimeoutError) as e:
+                    if not idempotent or attempt >= self.max_retries:
+                        self._count(self.metrics.errors, f"{operation}:network")
+                        raise
+                    delay = self._backoff(attempt, None)
+                    logger.warning(f"Google API {operation} network error ({e}), retrying in {delay:.2f}s")
+                with self._lock:
+                    self.metrics.retries += 1
+                attempt += 1
+                time.sleep(delay)
+        finally:
+            with self._lock:
+                self.metrics.in_flight -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+
+google_api = GoogleApiExecutor(
+    global_rate=settings.GOOGLE_API_GLOBAL_RATE,
+    global_burst=settings.GOOGLE_API_GLOBAL_BURST,
+    user_rate=settings.GOOGLE_API_USER_RATE,
+    user_burst=settings.GOOGLE_API_USER_BURST,
+    user_max_concurrency=settings.GOOGLE_API_USER_MAX_CONCURRENCY,
+    max_retries=settings.GOOGLE_API_MAX_RETRIES,
+    backoff_base_seconds=settings.GOOGLE_API_BACKOFF_BASE_SECONDS,
+    backoff_max_seconds=settings.GOOGLE_API_BACKOFF_MAX_SECONDS,
+    max_wait_seconds=settings.GOOGLE_API_MAX_WAIT_SECONDS,
+)
+
+
+def _error_counts() -> dict[tuple[str, ...], float]:
+    return {tuple(key.rsplit(":", 1)): value for key, value in dict(google_api.metrics.errors).items()}
+
+
+def _event_counts() -> dict[tuple[str, ...], float]:
+    metrics = google_api.metrics
+    return {
+        ("retry",): metrics.retries,
+        ("google_throttled",): metrics.google_throttled,
+        ("local_wait",): metrics.local_waits,
+        ("rejected",): metrics.rejected,
+    }
+
+
+registry.counter(
+    "diploma_google_api_calls_total", "Google API calls", ("operation",),
+    callback=lambda: {(operation,): value for operation, value in dict(google_api.metrics.calls).items()},
+)
+registry.counter(
+    "diploma_google_api_errors_total", "Google API calls that failed after retries", ("operation", "status"),
+    callback=_error_counts,
+)
+registry.counter(
+    "diploma_google_api_events_total", "Retries and throttling around Google API calls", ("event",),
+    callback=_event_counts,
+)
+registry.counter(
+    "diploma_google_api_local_wait_seconds_total", "Time calls spent waiting for local quota tokens",
+    callback=lambda: {(): google_api.metrics.local_wait_seconds},
+)
+registry.gauge(
+    "diploma_google_api_in_flight", "Google API calls in progress",
+    callback=lambda: {(): google_api.metrics.in_flight},
+)
@@ -1,7 +1,6 @@
 """
 Google Docs Service - Fetches document properties from Google Docs API.
 """
-import math
 import logging
 from typing import Annotated, Optional, Callable
 from dataclasses import dataclass, field
@@ -9,13 +8,51 @@ from dataclasses import dataclass, field
 from fastapi import Depends, HTTPException, status
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from common.app_settings import settings
+from core.google_api import build_service, credentials_key, google_api, google_token_uri
+from core.layout_estimator import PageLayout, estimate_google_layout, use_pdf_twin
+from core.metrics import StageClock
 
 logger = logging.getLogger(__name__)
 
+# `documents.get` fields mask: only what _extract_properties, the formatter and the layout estimate read.
+# Of inline objects only the embedded size and margins are downloaded (not imageProperties: contentUri,
+# crop, brightness...); lists, suggestions and unused style attributes are never downloaded.
+_TEXT_STYLE_FIELDS = "bold,italic,fontSize,weightedFontFamily"
+_PARAGRAPH_STYLE_FIELDS = "namedStyleType,alignment,lineSpacing,spaceAbove,spaceBelow"
+_PARAGRAPH_FIELDS = (
+    f"paragraph(paragraphStyle({_PARAGRAPH_STYLE_FIELDS}),"
+    "elements(startIndex,endIndex,pageBreak,autoText(type),inlineObjectElement(inlineObjectId),"
+    f"textRun(content,textStyle({_TEXT_STYLE_FIELDS}))))"
+)
+# Table structure and image sizes let the layout estimate measure them instead of guessing
+_TABLE_FIELDS = (
+    "table(columns,tableStyle(tableColumnProperties(width,widthType)),"
+    f"tableRows(tableRowStyle(minRowHeight),tableCells(content({_PARAGRAPH_FIELDS},table(columns)))))"
+)
+# inlineObjects is a map keyed by object id; `*` selects the fields of every value
+_INLINE_OBJECT_FIELDS = "inlineObjects(*(inlineObjectProperties(embeddedObject(size,marginTop,marginBottom))))"
+DOCS_BODY_FIELDS = (
+    "title,documentStyle,"
+    f"namedStyles(styles(namedStyleType,textStyle({_TEXT_STYLE_FIELDS}),paragraphStyle({_PARAGRAPH_STYLE_FIELDS}))),"
+    f"body(content(endIndex,sectionBreak(sectionStyle),{_PARAGRAPH_FIELDS},{_TABLE_FIELDS}))"
+)
+# Header/footer content is only needed for page-numbering rules
+DOCS_HEADER_FOOTER_FIELDS = "headers,footers"
+
+# Cleared if the API rejects the sub-selection on the map; whole inline objects are fetched from then on
+_inline_object_subfields = True
+
+
+def docs_fields_mask(include_headers_footers: bool, inline_object_subfields: bool = True) -> str:
+    inline_objects = _INLINE_OBJECT_FIELDS if inline_object_subfields else "inlineObjects"
+    mask = f"{DOCS_BODY_FIELDS},{inline_objects}"
+    if include_headers_footers:
+        return f"{mask},{DOCS_HEADER_FOOTER_FIELDS}"
+    return mask
+
 
 @dataclass
 class TextSegment:
@@ -127,7 +164,7 @@ class GoogleDocsService:
         credentials = Credentials(
             token=google_token,
             refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
+            token_uri=google_token_uri(),
             client_id=settings.GOOGLE_CLIENT_ID,
             client_secret=settings.GOOGLE_CLIENT_SECRET,
         )
@@ -146,12 +183,35 @@ class GoogleDocsService:
         
         return credentials
 
+    def _get_document(self, service, doc_id: str, include_headers_footers: bool, user_key: str) -> dict:
+        """`documents.get` with the fields mask (see DOCS_BODY_FIELDS)"""
+        global _inline_object_subfields
+        subfields = _inline_object_subfields
+        try:
+            return google_api.execute(
+                service.documents().get(documentId=doc_id, fields=docs_fields_mask(include_headers_footers, subfields)),
+                "docs.documents.get",
+                user_key,
+            )
+        except HttpError as e:
+            if e.resp.status != 400 or not subfields:
+                raise
+            # An invalid mask is a 400 for every document: fall back to whole inline objects for good
+            logger.warning(f"documents.get rejected the inlineObjects sub-selection, fetching whole inline objects: {e}")
+            _inline_object_subfields = False
+            return google_api.execute(
+                service.documents().get(documentId=doc_id, fields=docs_fields_mask(include_headers_footers, False)),
+                "docs.documents.get",
+                user_key,
+            )
+
     def get_document_properties(
         self, 
         google_token: str, 
         doc_id: str,
         refresh_token: Optional[str] = None,
-        on_token_refresh: Optional[Callable[[str], None]] = None
+        on_token_refresh: Optional[Callable[[str], None]] = None,
+        include_headers_footers: bool = True,
     ) -> DocumentProperties:
         """
         Fetch document properties from Google Docs.
@@ -161,26 +221,57 @@ class GoogleDocsService:
             doc_id: Google Document ID
             refresh_token: User's Google refresh token (optional, for auto-refresh)
             on_token_refresh: Callback when token is refreshed (to save new token)
+            include_headers_footers: Fetch header/footer content (needed for page numbering only)
             
         Returns:
             DocumentProperties with extracted formatting info
         """
+        _, doc_props = self.get_document_with_properties(
+            google_token, doc_id, refresh_token, on_token_refresh, include_headers_footers
+        )
+        return doc_props
+
+    def get_document_with_properties(
+        self,
+        google_token: str,
+        doc_id: str,
+        refresh_token: Optional[str] = None,
+        on_token_refresh: Optional[Callable[[str], None]] = None,
+        include_headers_footers: bool = True,
+    ) -> tuple[dict, DocumentProperties]:
+        """
+        Same as get_document_properties, but also returns the (fields-masked) document JSON
+        so callers that need the raw structure do not fetch it a second time.
+        Without headers/footers, page numbering properties are left at their defaults.
+        """
         try:
+            clock = StageClock("google")
             credentials = self._get_credentials(google_token, refresh_token, on_token_refresh)
-            service = build("docs", "v1", credentials=credentials)
+            service = build_service("docs", "v1", credentials)
+            clock.lap("credentials")
             
-            # Get the full document
-            document = service.documents().get(documentId=doc_id).execute()
+            # Get the parts of the document the rules actually read
+            user_key = credentials_key(credentials)
+            document = self._get_document(service, doc_id, include_headers_footers, user_key)
+            clock.lap("fetch")
             
-            # Try to get PDF twin bytes for perfect page estimation
+            # Page layout from font metrics; the Drive PDF export is only needed when it is unreliable
+            layout = estimate_google_layout(document)
+            clock.lap("layout")
             pdf_bytes = None
-            try:
-                drive_service = build("drive", "v3", credentials=credentials)
-                pdf_bytes = drive_service.files().export(fileId=doc_id, mimeType="application/pdf").execute()
-            except Exception as e:
-                logger.warning(f"Failed to export Google Doc to PDF twin: {e}")
-                
-            return self._extract_properties(document, pdf_bytes)
+            if use_pdf_twin(layout):
+                try:
+                    drive_service = build_service("drive", "v3", credentials)
+                    pdf_bytes = google_api.execute(
+                        drive_service.files().export(fileId=doc_id, mimeType="application/pdf"),
+                        "drive.files.export",
+                        user_key,
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to export Google Doc to PDF twin: {e}")
+                clock.lap("export")
+
+            return document, self._extract_properties(document, pdf_bytes, layout)
             
         except HttpError as e:
             if e.resp.status == 404:
@@ -204,8 +295,11 @@ class GoogleDocsService:
                     detail=f"Error communicating with Google Docs API: {str(e)}"
                 )
 
-    def _extract_properties(self, document: dict, pdf_bytes: Optional[bytes] = None) -> DocumentProperties:
+    def _extract_properties(
+        self, document: dict, pdf_bytes: Optional[bytes] = None, layout: Optional[PageLayout] = None
+    ) -> DocumentProperties:
         """Extract formatting properties from a Google Docs document using optional PDF twin mapping."""
+        clock = StageClock("google")
         title = document.get("title", "Untitled")
         
         # Get document style (page setup)
@@ -222,9 +316,6 @@ class GoogleDocsService:
         margin_left = doc_style.get("marginLeft", {}).get("magnitude", 72)
         margin_right = doc_style.get("marginRight", {}).get("magnitude", 72)
         
-        # Calculate usable content width for line-wrap estimation
-        content_width_pt = page_width_pt - margin_left - margin_right
-        
         # First page header/footer different
         first_page_different = doc_style.get("useFirstPageHeaderFooter", False)
         
@@ -281,6 +372,8 @@ class GoogleDocsService:
                 para_named_style_type = para_style.get("namedStyleType", "NORMAL_TEXT")
                 styles_list.append(para_named_style_type)
         
+        clock.lap("scan")
+
         # Run PDF twin page mapping if pdf_bytes is available
         pdf_para_pages = {}
         pdf_first_page_end = None
@@ -352,80 +445,15 @@ class GoogleDocsService:
             except Exception as e:
                 logger.error(f"Failed to perform PDF twin page mapping for Google Docs: {e}")
                 
-        # Always estimate first page end based on content height to serve as a sanity check
-        estimated_first_page_end: Optional[int] = None
-        # Calculate available height on first page (page height minus margins)
-        # Use 100% of printable area for maximum accuracy instead of reducing it
-        available_height_pt = (page_height_pt - margin_top - margin_bottom)
-        
-        # Estimate paragraph heights and accumulate until we exceed first page
-        cumulative_height_pt = 0.0
-        temp_para_index = 0
-        
-        for element in content:
-            if "paragraph" in element:
-                paragraph = element["paragraph"]
-                para_style = paragraph.get("paragraphStyle", {})
-                
-                # Get the paragraph's named style type (e.g., HEADING_1, NORMAL_TEXT)
-                para_named_style_type = para_style.get("namedStyleType", "NORMAL_TEXT")
-                is_heading = para_named_style_type.startswith("HEADING_")
-                
-                # Get the paragraph's named style defaults
-                para_style_defaults = named_styles_map.get(para_named_style_type, {})
-                
-                estimated_font_size = para_style_defaults.get("font_size") or fallback_size or 11
-                font_vertical_metrics = 1.2 # roughly 1.2x font size
-                line_spacing = para_style.get("lineSpacing", 115) / 100
-                
-                spacing_before = para_style.get("spaceAbove", {}).get("magnitude", 0)
-                spacing_after = para_style.get("spaceBelow", {}).get("magnitude", 0)
-                
-                # Estimate content width based on page size and margins
-                content_width_pt = page_width_pt - margin_left - margin_right
-                
-                # Count lines in paragraph (rough estimate based on content)
-                para_text_length = 0
-                for elem in paragraph.get("elements", []):
-                    if "textRun" in elem:
-                        content_text = elem["textRun"].get("content", "")
-                        para_text_length += len(content_text)
-                
-                # --- IMPROVED ESTIMATION LOGIC ---
-                
-                # Calculate avg char width (0.6 is a standard ratio for variable width fonts)
-                avg_char_width_pt = estimated_font_size * 0.62
-                
-                # Calculate how many chars fit on one line dynamically
-                chars_per_line = max(1, content_width_pt / avg_char_width_pt)
-                
-                # Use ceil to account for wrapping (e.g. 61 chars in 60 limit = 2 lines)
-                if para_text_length > 0:
-                    estimated_lines = math.ceil(para_text_length / chars_per_line)
-                else:
-                    estimated_lines = 1  # Empty line still has height
-                
-                # ---------------------------------
-                
-                # Calculate paragraph height: 
-                # - Base line height = font_size * line_spacing * number_of_lines
-                # - Add spacing before and after from paragraph style
-                # - Add extra spacing for headings (they typically have more space)
-                # - Add a buffer per paragraph (3pt) to account for rendering variations
-                base_line_height = (estimated_font_size * font_vertical_metrics) * line_spacing * estimated_lines
-                heading_extra_space = estimated_font_size if is_heading else 0
-                
-                para_height = base_line_height + spacing_before + spacing_after + heading_extra_space
-                
-                cumulative_height_pt += para_height
-                
-                # If we've exceeded the first page height, mark this as the boundary
-                if cumulative_height_pt > available_height_pt:
-                    estimated_first_page_end = temp_para_index
-                    break
-                
-                temp_para_index += 1
-        
+        clock.lap("pdf_mapping")
+
+        # Font-metric estimate of the first page end, the sanity check for the PDF twin (or its replacement)
+        if layout is None:
+            layout = estimate_google_layout(document)
+        estimated_first_page_end = layout.first_page_end
+
+        clock.lap("page_estimation")
+
         # Determine which method to use for first page detection
         if first_page_break_index is not None and (estimated_first_page_end is None or first_page_break_index <= estimated_first_page_end + 12):
             first_page_end_index = first_page_break_index
@@ -537,57 +565,12 @@ class GoogleDocsService:
                 paragraph_index += 1
         
         # Track physical page numbers for elements
-        # Track physical page numbers for elements
-        para_pages = {}
         if pdf_para_pages:
             para_pages = pdf_para_pages
-            current_page = len(pdf_doc)
         else:
-            cumulative_height_pt = 0.0
-            current_page = 1
-            available_height_pt = (page_height_pt - margin_top - margin_bottom) * 0.87
-            
-            temp_para_index = 0
-            for element in content:
-                if "sectionBreak" in element:
-                    # section breaks (if Next Page) often act as page breaks, but we will rely on paragraph pageBreak
-                    pass
-                    
-                if "paragraph" in element:
-                    paragraph = element["paragraph"]
-                    
-                    # Check for explicit page break in paragraph elements
-                    has_page_break = any("pageBreak" in elem for elem in paragraph.get("elements", []))
-                    if has_page_break:
-                        current_page += 1
-                        cumulative_height_pt = 0.0
-                        
-                    para_style = paragraph.get("paragraphStyle", {})
-                    line_spacing = para_style.get("lineSpacing", 115) / 100
-                    spacing_before = para_style.get("spacingBefore", {}).get("magnitude", 0)
-                    spacing_after = para_style.get("spacingAfter", {}).get("magnitude", 0)
-                    para_named_style_type = para_style.get("namedStyleType", "NORMAL_TEXT")
-                    para_style_defaults = named_styles_map.get(para_named_style_type, {})
-                    is_heading = para_named_style_type.startswith("HEADING_")
-                    estimated_font_size = para_style_defaults.get("font_size") or fallback_size or 11
-                    
-                    para_text_length = sum(len(elem.get("textRun", {}).get("content", "")) for elem in paragraph.get("elements", []) if "textRun" in elem)
-                    avg_char_width_pt = estimated_font_size * 0.52
-                    chars_per_line = max(1, content_width_pt / avg_char_width_pt)
-                    estimated_lines = math.ceil(para_text_length / chars_per_line) if para_text_length > 0 else 1
-                    
-                    font_vertical_metrics = 1.15
-                    base_line_height = (estimated_font_size * font_vertical_metrics) * line_spacing * estimated_lines
-                    heading_extra_space = (estimated_font_size * 0.5) if is_heading else 0
-                    para_height = base_line_height + spacing_before + spacing_after + heading_extra_space
-                    
-                    cumulative_height_pt += para_height
-                    if cumulative_height_pt > available_height_pt:
-                        current_page += 1
-                        cumulative_height_pt = para_height
-                        
-                    para_pages[temp_para_index] = current_page
-                    temp_para_index += 1
+            para_pages = dict(enumerate(layout.paragraph_pages))
+
+        clock.lap("extract")
 
         # Track sections and their start pages
         section_styles = [doc_style]
@@ -675,6 +658,8 @@ class GoogleDocsService:
                     # Continues from previous section, calculate the actual displayed number
                     page_number_start = doc_style_start + numbering_start_page - 1
 
+        clock.lap("page_numbering")
+
         return DocumentProperties(
             title=title,
             page_width_pt=page_width_pt,
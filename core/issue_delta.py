@@ -0,0 +1,73 @@
+"""
+Check results of a document stored as deltas against the previous check.
+
+A delta lists the issues that are new (with their position in the new list) and the issues
+that were resolved (with their position in the previous list). Resolved issues are kept in
+full, so a single delta answers "what changed since the last check" on its own; replaying
+the deltas after a snapshot rebuilds the exact issue list of any result.
+"""
+import json
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Iterable, Optional
+from uuid import UUID
+
+
+def issue_key(issue: dict) -> str:
+    return json.dumps(issue, sort_keys=True, ensure_ascii=False)
+
+
+def diff_issues(previous: list[dict], current: list[dict]) -> dict:
+    """Delta turning `previous` into `current`; unchanged issues keep their relative order"""
+    matcher = SequenceMatcher(None, [issue_key(i) for i in previous], [issue_key(i) for i in current], autojunk=False)
+    added, resolved = [], []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        resolved += [[i, previous[i]] for i in range(i1, i2)]
+        added += [[j, current[j]] for j in range(j1, j2)]
+    return {"added": added, "resolved": resolved}
+
+
+def apply_delta(previous: list[dict], delta: dict) -> list[dict]:
+    resolved = {i for i, _ in delta["resolved"]}
+    issues = [issue for i, issue in enumerate(previous) if i not in resolved]
+    for j, issue in delta["added"]:
+        issues.insert(j, issue)
+    return issues
+
+
+def net_changes(delta: dict) -> tuple[list[dict], list[dict]]:
+    """(new, resolved) issues of a delta, without issues that only moved within the list"""
+    added = [issue for _, issue in delta["added"]]
+    resolved = [issue for _, issue in delta["resolved"]]
+    moved = Counter(map(issue_key, added)) & Counter(map(issue_key, resolved))
+    return _without(added, moved.copy()), _without(resolved, moved)
+
+
+def _without(issues: Iterable[dict], keys: Counter) -> list[dict]:
+    kept = []
+    for issue in issues:
+        key = issue_key(issue)
+        if keys[key]:
+            keys[key] -= 1
+        else:
+            kept.append(issue)
+    return kept
+
+
+def rebuild_issues(results: Iterable) -> dict:
+    """
+    Full issue list of every result in `results` (CheckResult rows of one document, oldest
+    first, each delta preceded by the result it was taken against), keyed by id.
+    A result whose chain is incomplete maps to None.
+    """
+    issues: dict = {}
+    for result in results:
+        if result.issues is not None:
+            issues[result.id] = result.issues
+            continue
+        previous: Optional[list[dict]] = issues.get(UUID(result.issues_delta["previous_id"]))
+        issues[result.id] = apply_delta(previous, result.issues_delta) if previous is not None else None
+    return issues
+
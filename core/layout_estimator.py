@@ -0,0 +1,989 @@
+"""
+Page layout estimation from real font metrics.
+
+Replaces the "characters per line" guesses: lines are wrapped greedily with the advance
+widths of the installed TrueType fonts (read with fontTools, one width table per font file,
+cached for the life of the process), then stacked onto pages honouring line spacing,
+paragraph spacing, indents, inline images, tables, page/section breaks, widow control and
+keep-with-next. The result maps every body paragraph to the page its first line lands on.
+
+It is still an estimate - no kerning, hyphenation, justification stretch or text flowing
+around floating objects. `PageLayout.reliable` says whether every font had real (or
+metric-compatible) metrics and every object a known size; callers only render a LibreOffice
+twin when it is False (LAYOUT_PDF_FALLBACK=auto).
+"""
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+
+from common.app_settings import settings
+
+try:
+    from fontTools.ttLib import TTCollection, TTFont
+except ImportError:
+    TTCollection = TTFont = None
+
+logger = logging.getLogger(__name__)
+
+EMU_PER_PT = 12700
+TWIPS_PER_PT = 20
+
+FONT_DIRS = (
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    "~/.fonts",
+    "~/.local/share/fonts",
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    "C:/Windows/Fonts",
+)
+# Same advance widths as the requested family (the Docker image ships Liberation, and the MS core fonts)
+METRIC_COMPATIBLE = {
+    "times new roman": ("liberation serif", "tinos"),
+    "arial": ("liberation sans", "arimo"),
+    "helvetica": ("liberation sans", "arimo"),
+    "courier new": ("liberation mono", "cousine"),
+    "calibri": ("carlito",),
+    "cambria": ("caladea",),
+}
+# Last resort when neither the family nor a clone is installed; widths will be off
+GENERIC_FALLBACK = ("liberation serif", "times new roman", "dejavu serif", "liberation sans", "arial", "dejavu sans")
+# Used without any font files (or without fontTools): a typical serif at 12pt
+HEURISTIC_CHAR_WIDTH_EM = 0.5
+HEURISTIC_LINE_HEIGHT_EM = 1.15
+# Inline objects whose size the source does not tell us
+DEFAULT_OBJECT_HEIGHT_PT = 200.0
+# Word's default table cell margins (0.08")
+CELL_PADDING_PT = 5.4
+
+WORD_WIDTH_CACHE_SIZE = 50_000
+
+_WORD_RE = re.compile(r"\S+\s*|\s+")
+
+
+# --- Font metrics ---
+
+@dataclass
+class FontMetrics:
+    family: str
+    exact: bool  # metrics of the requested family or a metric-compatible clone
+    widths: dict[str, float]  # advance width per character, in em
+    default_width: float  # em, for characters the font has no glyph for
+    line_height: float  # single-spaced line height, in em
+    # Words repeat a lot in running text; their width (in em) is kept until the cap is hit
+    _word_widths: dict[str, float] = field(default_factory=dict, repr=False)
+
+    def text_width(self, text: str, size_pt: float) -> float:
+        width = self._word_widths.get(text)
+        if width is None:
+            widths, default = self.widths, self.default_width
+            width = sum(widths.get(char, default) for char in text)
+            if len(self._word_widths) < WORD_WIDTH_CACHE_SIZE:
+                self._word_widths[text] = width
+        return size_pt * width
+
+
+def _load_metrics(path: str, font_number: int, family: str, exact: bool) -> FontMetrics:
+    font = TTFont(path, fontNumber=font_number, lazy=True)
+    try:
+        units = font["head"].unitsPerEm
+        advances = font["hmtx"].metrics
+        widths = {
+            chr(code): advances[glyph][0] / units
+            for code, glyph in font.getBestCmap().items()
+            if glyph in advances
+        }
+        os2 = font["OS/2"] if "OS/2" in font else None
+        if os2 is not None and os2.usWinAscent:
+            # Word and LibreOffice size single spacing from the Windows metrics
+            line_height = (os2.usWinAscent + os2.usWinDescent) / units
+        else:
+            hhea = font["hhea"]
+            line_height = (hhea.ascent - hhea.descent + hhea.lineGap) / units
+    finally:
+        font.close()
+    default_width = widths.get("n") or (sum(widths.values()) / len(widths) if widths else HEURISTIC_CHAR_WIDTH_EM)
+    return FontMetrics(family, exact, widths, default_width, line_height)
+
+
+class FontRegistry:
+    """Indexes the installed fonts by family on first use and caches one width table per face."""
+
+    def __init__(self, font_dirs: Iterable[str]):
+        self.font_dirs = [os.path.expanduser(path) for path in font_dirs]
+        self._lock = threading.Lock()
+        self._faces: Optional[dict[tuple[str, bool], tuple[str, int]]] = None
+        self._metrics: dict[tuple[str, bool], FontMetrics] = {}
+
+    def _index(self) -> dict[tuple[str, bool], tuple[str, int]]:
+        faces: dict[tuple[str, bool], tuple[str, int]] = {}
+        if TTFont is None:
+            logger.warning("fontTools is not installed; page layout falls back to average character widths")
+            return faces
+        for directory in self.font_dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.lower().endswith((".ttf", ".otf", ".ttc")):
+                        self._index_file(os.path.join(root, name), faces)
+        logger.info("Indexed %s font faces for layout estimation", len(faces))
+        return faces
+
+    @staticmethod
+    def _index_file(path: str, faces: dict) -> None:
+        try:
+            if path.lower().endswith(".ttc"):
+                collection = TTCollection(path, lazy=True)
+                fonts = list(collection.fonts)
+            else:
+                fonts = [TTFont(path, lazy=True)]
+        except Exception as e:
+            logger.debug("Skipping unreadable font %s: %s", path, e)
+            return
+        for number, font in enumerate(fonts):
+            try:
+                names = font["name"]
+                family = names.getDebugName(16) or names.getDebugName(1)
+                selection = font["OS/2"].fsSelection if "OS/2" in font else 0
+                bold, italic = bool(selection & 0x20), bool(selection & 0x01)
+            except Exception:
+                continue
+            finally:
+                font.close()
+            if not family or italic:
+                continue
+            # First file wins, so a face listed twice keeps a stable choice
+            faces.setdefault((family.lower(), bold), (path, number))
+
+    def metrics(self, family: Optional[str], bold: bool = False) -> FontMetrics:
+        key = ((family or "").lower(), bold)
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            with self._lock:
+                if self._faces is None:
+                    self._faces = self._index()
+                metrics = self._metrics.get(key) or self._resolve(family or "", bold)
+                self._metrics[key] = metrics
+        return metrics
+
+    def _resolve(self, family: str, bold: bool) -> FontMetrics:
+        requested = family.lower()
+        candidates = [(requested, True), *((alias, True) for alias in METRIC_COMPATIBLE.get(requested, ()))]
+        candidates += [(name, False) for name in GENERIC_FALLBACK]
+        for name, exact in candidates:
+            for weight in ((bold, False) if bold else (False,)):
+                face = self._faces.get((name, weight))
+                if face is None:
+                    continue
+                try:
+                    # A bold request measured with the regular face is only approximate
+                    return _load_metrics(*face, family, exact and weight == bold)
+                except Exception as e:
+                    logger.warning("Failed to read font metrics from %s: %s", face[0], e)
+        return FontMetrics(family, False, {}, HEURISTIC_CHAR_WIDTH_EM, HEURISTIC_LINE_HEIGHT_EM)
+
+
+def _configured_font_dirs() -> list[str]:
+    extra = [path for path in settings.LAYOUT_FONT_DIRS.split(os.pathsep) if path]
+    return [*extra, *FONT_DIRS]
+
+
+font_registry = FontRegistry(_configured_font_dirs())
+
+
+# --- Layout model ---
+
+@dataclass
+class PageGeometry:
+    content_width_pt: float
+    content_height_pt: float
+
+
+@dataclass
+class LayoutRun:
+    text: str = ""  # "\f" is a page break, "\n" a line break
+    font_family: Optional[str] = None
+    size_pt: float = 12.0
+    bold: bool = False
+    object_size: Optional[tuple[float, float]] = None  # (width, height) pt of an inline object
+
+
+@dataclass
+class LayoutParagraph:
+    runs: list[LayoutRun]
+    geometry: PageGeometry
+    paragraph_index: Optional[int] = None  # index in the caller's paragraph list (None inside tables, TOCs)
+    line_spacing: float = 1.0  # multiple when line_rule is "auto", otherwise points
+    line_rule: str = "auto"  # "auto" | "exact" | "atLeast"
+    space_before_pt: float = 0.0
+    space_after_pt: float = 0.0
+    indent_left_pt: float = 0.0
+    indent_right_pt: float = 0.0
+    first_line_indent_pt: float = 0.0
+    page_break_before: bool = False
+    keep_with_next: bool = False
+    widow_control: bool = False
+    mark: Optional[LayoutRun] = None  # paragraph mark font: the height of an empty paragraph
+    # Start of the section that begins after this paragraph: "nextPage", "continuous", "oddPage", "evenPage"
+    section_break: Optional[str] = None
+
+
+@dataclass
+class LayoutTable:
+    rows: list[list[list["LayoutParagraph | LayoutTable"]]]  # row -> cell -> blocks
+    column_widths_pt: list[float]
+    geometry: PageGeometry
+    row_heights: list[tuple[float, str]] = field(default_factory=list)  # (height, "atLeast" | "exact")
+
+
+@dataclass
+class PageLayout:
+    paragraph_pages: list[int]  # 1-based page of each paragraph's first line
+    page_first_paragraph: dict[int, int]  # page -> paragraph whose line opens it (body paragraphs only)
+    section_start_pages: dict[int, int]
+    page_count: int
+    unresolved_fonts: set[str] = field(default_factory=set)
+    estimated_objects: int = 0  # objects laid out with a guessed size (floating, sizeless, unfetched)
+    # States an estimate of an edited copy can resume from (see LayoutCheckpoint)
+    checkpoints: list["LayoutCheckpoint"] = field(default_factory=list, repr=False)
+
+    @property
+    def reliable(self) -> bool:
+        return not self.unresolved_fonts and self.estimated_objects == 0
+
+    @property
+    def first_page_end(self) -> Optional[int]:
+        """Index of the first paragraph past page 1 (None if everything fits on it)"""
+        for index, page in enumerate(self.paragraph_pages):
+            if page > 1:
+                return index
+        return None
+
+    def paragraph_at_page_start(self, page: int) -> Optional[int]:
+        """The paragraph whose text opens `page` (or the first one after it, when a table does)"""
+        if page in self.page_first_paragraph:
+            return self.page_first_paragraph[page]
+        for index, paragraph_page in enumerate(self.paragraph_pages):
+            if paragraph_page >= page:
+                return index
+        return None
+
+
+@dataclass(frozen=True)
+class LayoutCheckpoint:
+    """
+    Builder and engine state just before body element `child` is laid out. It depends only
+    on the elements up to and including `child` (keep-with-next looks one block ahead), so
+    a document sharing that prefix can resume the estimate here.
+    """
+    child: int
+    paragraph_index: int
+    section: int
+    page: int
+    y: float
+    paragraph_pages: tuple[int, ...]  # pages of the paragraphs before `paragraph_index`
+    page_first_paragraph: dict[int, int]
+    section_start_pages: dict[int, int]
+    unresolved_fonts: frozenset[str]
+    estimated_objects: int
+
+
+def use_pdf_twin(layout: Optional[PageLayout]) -> bool:
+    """Whether a LibreOffice/Drive PDF render should back up (or replace) this estimate"""
+    mode = settings.LAYOUT_PDF_FALLBACK
+    if mode == "always":
+        return True
+    if mode == "never":
+        return False
+    return layout is None or not layout.reliable
+
+
+# --- Line breaking ---
+
+@dataclass
+class _Line:
+    height: float
+    page_break_after: bool = False
+
+
+class _Wrapper:
+    def __init__(self, registry: FontRegistry, layout: PageLayout):
+        self.registry = registry
+        self.layout = layout
+
+    def _font(self, run: LayoutRun) -> FontMetrics:
+        metrics = self.registry.metrics(run.font_family, run.bold)
+        if not metrics.exact:
+            self.layout.unresolved_fonts.add(run.font_family or "(unset)")
+        return metrics
+
+    def _line_height(self, natural_pt: float, paragraph: LayoutParagraph) -> float:
+        if paragraph.line_rule == "exact":
+            return paragraph.line_spacing
+        if paragraph.line_rule == "atLeast":
+            return max(natural_pt, paragraph.line_spacing)
+        return natural_pt * paragraph.line_spacing
+
+    def lines(self, paragraph: LayoutParagraph, width_pt: float) -> list[_Line]:
+        """Greedy line breaking: each word goes on the current line if it fits, else opens a new one"""
+        available = max(1.0, width_pt - paragraph.indent_left_pt - paragraph.indent_right_pt)
+        mark = paragraph.mark or LayoutRun()
+        lines: list[_Line] = []
+        x = paragraph.first_line_indent_pt
+        natural = 0.0  # tallest content on the current line
+        empty_height = self._font(mark).line_height * mark.size_pt
+
+        def close(page_break: bool = False) -> None:
+            nonlocal x, natural
+            lines.append(_Line(self._line_height(natural or empty_height, paragraph), page_break))
+            x, natural = 0.0, 0.0
+
+        for run in paragraph.runs:
+            if run.object_size is not None:
+                width, height = run.object_size
+                if x > 0 and x + width > available:
+                    close()
+                x += width
+                natural = max(natural, height)
+                continue
+            metrics = self._font(run)
+            run_natural = metrics.line_height * run.size_pt
+            for chunk in re.split(r"([\f\n])", run.text):
+                if chunk == "\f":
+                    close(page_break=True)
+                elif chunk == "\n":
+                    natural = max(natural, run_natural)
+                    close()
+                for word in _WORD_RE.findall(chunk) if chunk not in ("\f", "\n") else ():
+                    natural = max(natural, run_natural)
+                    # Trailing spaces may hang past the margin, as in Word
+                    stripped = word.rstrip()
+                    width = metrics.text_width(stripped, run.size_pt)
+                    if stripped and x > 0 and x + width > available:
+                        close()
+                        natural = run_natural
+                    while width > available:
+                        # Longer than a whole line: break it by characters
+                        cut = max(1, int(len(stripped) * available / width))
+                        close()
+                        natural = run_natural
+                        stripped = stripped[cut:]
+                        width = metrics.text_width(stripped, run.size_pt)
+                    x += width + metrics.text_width(word[len(word.rstrip()):], run.size_pt)
+        if x > 0 or natural > 0 or not lines:
+            close()
+        return lines
+
+
+# --- Pagination ---
+
+class _Flow:
+    def __init__(self, layout: PageLayout):
+        self.layout = layout
+        self.page = 1
+        self.y = 0.0
+
+    def new_page(self) -> None:
+        self.page += 1
+        self.y = 0.0
+
+    def fits(self, height: float, geometry: PageGeometry) -> bool:
+        return self.y == 0.0 or self.y + height <= geometry.content_height_pt + 0.01
+
+
+class LayoutEngine:
+    def __init__(self, registry: Optional[FontRegistry] = None):
+        self.registry = registry or font_registry
+
+    def run(self, blocks: list, paragraph_count: int, resume: Optional[LayoutCheckpoint] = None,
+            boundaries: Optional[dict[int, tuple[int, int, int]]] = None) -> PageLayout:
+        """
+        Place `blocks` on pages. With `resume`, the blocks start at its body element and the
+        state before it is taken from the checkpoint. A checkpoint is recorded before every
+        block position in `boundaries` ({position: (child, paragraph_index, estimated_objects)}).
+        """
+        layout = PageLayout([1] * paragraph_count, {}, {0: 1}, 1)
+        flow = _Flow(layout)
+        section = 0
+        if resume is not None:
+            layout.paragraph_pages[:resume.paragraph_index] = resume.paragraph_pages
+            layout.page_first_paragraph.update(resume.page_first_paragraph)
+            layout.section_start_pages.update(resume.section_start_pages)
+            layout.unresolved_fonts.update(resume.unresolved_fonts)
+            flow.page, flow.y, section = resume.page, resume.y, resume.section
+        wrapper = _Wrapper(self.registry, layout)
+        wrapped: dict[int, Optional[list[_Line]]] = {}
+
+        def lines_at(position: int) -> Optional[list[_Line]]:
+            # Wrapped one block ahead so keep-with-next can look at the next paragraph's first line
+            if position not in wrapped:
+                block = blocks[position]
+                wrapped[position] = (
+                    wrapper.lines(block, block.geometry.content_width_pt) if isinstance(block, LayoutParagraph) else None
+                )
+            return wrapped[position]
+
+        for position, block in enumerate(blocks):
+            if boundaries and position in boundaries:
+                child, paragraph_index, estimated_objects = boundaries[position]
+                layout.checkpoints.append(LayoutCheckpoint(
+                    child, paragraph_index, section, flow.page, flow.y,
+                    tuple(layout.paragraph_pages[:paragraph_index]), dict(layout.page_first_paragraph),
+                    dict(layout.section_start_pages), frozenset(layout.unresolved_fonts), estimated_objects,
+                ))
+            if isinstance(block, LayoutTable):
+                self._place_table(block, wrapper, flow)
+            else:
+                following = (blocks[position + 1], lines_at(position + 1)) if position + 1 < len(blocks) else None
+                self._place_paragraph(block, lines_at(position), following, flow)
+                del wrapped[position]
+                if block.section_break is not None:
+                    section += 1
+                    if block.section_break != "continuous":
+                        flow.new_page()
+                        if block.section_break == "oddPage" and flow.page % 2 == 0 or \
+                           block.section_break == "evenPage" and flow.page % 2 == 1:
+                            flow.new_page()
+                    layout.section_start_pages[section] = flow.page
+        layout.page_count = flow.page if flow.y > 0 or flow.page == 1 else flow.page - 1
+        return layout
+
+    def _place_paragraph(self, paragraph: LayoutParagraph, lines: list[_Line], following, flow: _Flow) -> None:
+        geometry, layout = paragraph.geometry, flow.layout
+        if paragraph.page_break_before and flow.y > 0:
+            flow.new_page()
+        space_before = paragraph.space_before_pt if flow.y > 0 else 0.0
+
+        # Lines that have to start together: widow/orphan control keeps two, keep-with-next
+        # also wants the next paragraph's first line on the same page
+        lead = lines[0].height
+        if paragraph.widow_control and len(lines) > 1:
+            lead += lines[1].height
+        if paragraph.keep_with_next and following is not None and following[1]:
+            lead = sum(line.height for line in lines) + paragraph.space_after_pt + following[1][0].height
+        if not flow.fits(space_before + lead, geometry) and lead <= geometry.content_height_pt:
+            flow.new_page()
+            space_before = 0.0
+        flow.y += space_before
+
+        for number, line in enumerate(lines):
+            if not flow.fits(line.height, geometry):
+                flow.new_page()
+                # Widow control: the last line never goes alone, it takes the one before along
+                if paragraph.widow_control and number == len(lines) - 1 and number >= 3:
+                    flow.y += lines[number - 1].height
+            if paragraph.paragraph_index is not None:
+                if number == 0:
+                    layout.paragraph_pages[paragraph.paragraph_index] = flow.page
+                layout.page_first_paragraph.setdefault(flow.page, paragraph.paragraph_index)
+            flow.y += line.height
+            if line.page_break_after:
+                flow.new_page()
+        flow.y = min(flow.y + paragraph.space_after_pt, geometry.content_height_pt)
+
+    def _cell_height(self, blocks: list, width_pt: float, wrapper: _Wrapper) -> float:
+        height = 0.0
+        for block in blocks:
+            if isinstance(block, LayoutTable):
+                height += sum(self._row_heights(block, wrapper))
+                continue
+            lines = wrapper.lines(block, width_pt)
+            height += block.space_before_pt + sum(line.height for line in lines) + block.space_after_pt
+        return height
+
+    def _row_heights(self, table: LayoutTable, wrapper: _Wrapper) -> list[float]:
+        heights = []
+        for row_index, row in enumerate(table.rows):
+            height = 0.0
+            for column, cell in enumerate(row):
+                width = table.column_widths_pt[column] if column < len(table.column_widths_pt) else table.column_widths_pt[-1]
+                height = max(height, self._cell_height(cell, max(1.0, width - 2 * CELL_PADDING_PT), wrapper))
+            if row_index < len(table.row_heights):
+                rule_height, rule = table.row_heights[row_index]
+                height = rule_height if rule == "exact" else max(height, rule_height)
+            heights.append(height)
+        return heights
+
+    def _place_table(self, table: LayoutTable, wrapper: _Wrapper, flow: _Flow) -> None:
+        # Rows do not split across pages; a row taller than a page gets a page of its own
+        for height in self._row_heights(table, wrapper):
+            if not flow.fits(height, table.geometry):
+                flow.new_page()
+            flow.y += height
+            while flow.y > table.geometry.content_height_pt:
+                flow.y -= table.geometry.content_height_pt
+                flow.new_page()
+
+
+# --- .docx adapter ---
+
+_RUN_PATHS = (
+    "./w:r | ./w:hyperlink/w:r | ./w:ins/w:r | ./w:smartTag/w:r | ./w:fldSimple/w:r"
+    " | ./w:sdt/w:sdtContent/w:r | ./w:hyperlink/w:ins/w:r"
+)
+
+
+def _child_val(parent, tag: str) -> Optional[str]:
+    child = parent.find(qn(tag)) if parent is not None else None
+    return child.get(qn("w:val")) if child is not None else None
+
+
+def _attributes(element) -> Optional[tuple]:
+    return tuple(sorted(element.attrib.items())) if element is not None else None
+
+
+def _twips(value: Optional[str]) -> Optional[float]:
+    try:
+        return int(value) / TWIPS_PER_PT if value is not None else None
+    except ValueError:
+        return None
+
+
+def _section_geometry(section) -> PageGeometry:
+    width = section.page_width.pt if section.page_width else 612.0
+    height = section.page_height.pt if section.page_height else 792.0
+    left = section.left_margin.pt if section.left_margin is not None else 72.0
+    right = section.right_margin.pt if section.right_margin is not None else 72.0
+    top = section.top_margin.pt if section.top_margin is not None else 72.0
+    bottom = section.bottom_margin.pt if section.bottom_margin is not None else 72.0
+    return PageGeometry(max(36.0, width - left - right), max(36.0, height - abs(top) - abs(bottom)))
+
+
+def _section_start(section) -> str:
+    start = section._sectPr.find(qn("w:type"))
+    return start.get(qn("w:val")) if start is not None and start.get(qn("w:val")) else "nextPage"
+
+
+class DocxLayoutBuilder:
+    """Turns a python-docx Document into layout blocks, resolving the style chain on the way."""
+
+    def __init__(self, doc, font_of: Callable[[Run, Paragraph], Optional[str]]):
+        self.doc = doc
+        self.font_of = font_of
+        self.defaults = self._doc_defaults()
+        self.estimated_objects = 0
+        # python-docx style lookups dominate the cost, so both caches key on the raw XML
+        self._paragraph_cache: dict = {}
+        self._font_cache: dict = {}
+
+    def _doc_defaults(self) -> dict:
+        defaults = {"size": 10.0, "line": 1.0, "line_rule": "auto", "before": 0.0, "after": 0.0}
+        doc_defaults = self.doc.styles.element.find(qn("w:docDefaults"))
+        if doc_defaults is None:
+            return defaults
+        size = doc_defaults.find(f"{qn('w:rPrDefault')}/{qn('w:rPr')}/{qn('w:sz')}")
+        if size is not None and size.get(qn("w:val")):
+            defaults["size"] = int(size.get(qn("w:val"))) / 2
+        spacing = doc_defaults.find(f"{qn('w:pPrDefault')}/{qn('w:pPr')}/{qn('w:spacing')}")
+        if spacing is not None:
+            self._apply_spacing(spacing, defaults)
+        return defaults
+
+    @staticmethod
+    def _apply_spacing(spacing, target: dict) -> None:
+        line, rule = spacing.get(qn("w:line")), spacing.get(qn("w:lineRule")) or "auto"
+        if line is not None:
+            target["line_rule"] = rule
+            target["line"] = int(line) / 240 if rule == "auto" else int(line) / TWIPS_PER_PT
+        if _twips(spacing.get(qn("w:before"))) is not None:
+            target["before"] = _twips(spacing.get(qn("w:before")))
+        if _twips(spacing.get(qn("w:after"))) is not None:
+            target["after"] = _twips(spacing.get(qn("w:after")))
+
+    def _style_chain(self, style) -> list:
+        chain = []
+        while style is not None and len(chain) < 20:
+            chain.append(style)
+            style = style.base_style
+        return chain
+
+    def _paragraph_format(self, paragraph: Paragraph) -> dict:
+        """Effective spacing/indent/pagination properties: docDefaults < style chain < direct"""
+        key = _child_val(paragraph._p.pPr, "w:pStyle")
+        inherited = self._paragraph_cache.get(key)
+        if inherited is None:
+            style = paragraph.style
+            inherited = dict(self.defaults, left=0.0, right=0.0, first_line=0.0,
+                             page_break_before=False, keep_with_next=False, widow_control=False)
+            for ancestor in reversed(self._style_chain(style)):
+                self._apply_pPr(ancestor.element.find(qn("w:pPr")), inherited)
+                size = ancestor.element.find(f"{qn('w:rPr')}/{qn('w:sz')}")
+                if size is not None and size.get(qn("w:val")):
+                    inherited["size"] = int(size.get(qn("w:val"))) / 2
+                inherited["bold"] = inherited.get("bold") or ancestor.element.find(f"{qn('w:rPr')}/{qn('w:b')}") is not None
+            self._paragraph_cache[key] = inherited
+        effective = dict(inherited)
+        self._apply_pPr(paragraph._p.pPr, effective)
+        return effective
+
+    def _apply_pPr(self, pPr, target: dict) -> None:
+        if pPr is None:
+            return
+        spacing = pPr.find(qn("w:spacing"))
+        if spacing is not None:
+            self._apply_spacing(spacing, target)
+        indent = pPr.find(qn("w:ind"))
+        if indent is not None:
+            left = _twips(indent.get(qn("w:left")) or indent.get(qn("w:start")))
+            right = _twips(indent.get(qn("w:right")) or indent.get(qn("w:end")))
+            if left is not None:
+                target["left"] = left
+            if right is not None:
+                target["right"] = right
+            if _twips(indent.get(qn("w:firstLine"))) is not None:
+                target["first_line"] = _twips(indent.get(qn("w:firstLine")))
+            if _twips(indent.get(qn("w:hanging"))) is not None:
+                target["first_line"] = -_twips(indent.get(qn("w:hanging")))
+        for tag, name in (("w:pageBreakBefore", "page_break_before"), ("w:keepNext", "keep_with_next"),
+                          ("w:widowControl", "widow_control")):
+            element = pPr.find(qn(tag))
+            if element is not None:
+                target[name] = element.get(qn("w:val")) not in ("0", "false", "off")
+
+    def _font_family(self, r, paragraph: Paragraph) -> Optional[str]:
+        pPr, rPr = paragraph._p.pPr, r.rPr
+        key = (
+            _child_val(pPr, "w:pStyle"),
+            _attributes(pPr.find(f"{qn('w:rPr')}/{qn('w:rFonts')}") if pPr is not None else None),
+            _child_val(rPr, "w:rStyle"),
+            _attributes(rPr.find(qn("w:rFonts")) if rPr is not None else None),
+        )
+        if key not in self._font_cache:
+            self._font_cache[key] = self.font_of(Run(r, paragraph), paragraph)
+        return self._font_cache[key]
+
+    def _runs(self, paragraph: Paragraph, style_format: dict) -> list[LayoutRun]:
+        runs = []
+        for r in paragraph._p.xpath(_RUN_PATHS):
+            rPr = r.rPr
+            size = _child_val(rPr, "w:sz")
+            size = int(size) / 2 if size and size.isdigit() else style_format["size"]
+            bold_element = rPr.find(qn("w:b")) if rPr is not None else None
+            if bold_element is not None:
+                bold = bold_element.get(qn("w:val")) not in ("0", "false", "off")
+            else:
+                bold = bool(style_format.get("bold"))
+            family = self._font_family(r, paragraph)
+            text = []
+            for child in r:
+                tag = child.tag
+                if tag == qn("w:t"):
+                    text.append(child.text or "")
+                elif tag == qn("w:tab"):
+                    text.append("    ")
+                elif tag in (qn("w:br"), qn("w:cr")):
+                    text.append("\f" if child.get(qn("w:type")) == "page" else "\n")
+                elif tag in (qn("w:drawing"), qn("w:pict"), qn("w:object")):
+                    if text:
+                        runs.append(LayoutRun("".join(text), family, size, bold))
+                        text = []
+                    runs.append(LayoutRun(object_size=self._object_size(child)))
+            if text:
+                runs.append(LayoutRun("".join(text), family, size, bold))
+        return runs
+
+    def _object_size(self, element) -> tuple[float, float]:
+        inline = element.find(f"{qn('wp:inline')}/{qn('wp:extent')}")
+        if inline is not None:
+            return int(inline.get("cx", 0)) / EMU_PER_PT, int(inline.get("cy", 0)) / EMU_PER_PT
+        # Floating (wp:anchor) or VML: the text does not simply flow below it
+        self.estimated_objects += 1
+        anchor = element.find(f"{qn('wp:anchor')}/{qn('wp:extent')}")
+        if anchor is not None:
+            return 0.0, int(anchor.get("cy", 0)) / EMU_PER_PT
+        return 0.0, DEFAULT_OBJECT_HEIGHT_PT
+
+    def paragraph(self, p, geometry: PageGeometry, index: Optional[int]) -> LayoutParagraph:
+        paragraph = Paragraph(p, self.doc._body)
+        effective = self._paragraph_format(paragraph)
+        # An empty run measures the paragraph mark: it resolves through the paragraph's styles only
+        mark = LayoutRun("", self._font_family(OxmlElement("w:r"), paragraph),
+                         effective["size"], bool(effective.get("bold")))
+        return LayoutParagraph(
+            runs=self._runs(paragraph, effective),
+            geometry=geometry,
+            paragraph_index=index,
+            line_spacing=effective["line"],
+            line_rule=effective["line_rule"],
+            space_before_pt=effective["before"],
+            space_after_pt=effective["after"],
+            indent_left_pt=effective["left"],
+            indent_right_pt=effective["right"],
+            first_line_indent_pt=effective["first_line"],
+            page_break_before=effective["page_break_before"],
+            keep_with_next=effective["keep_with_next"],
+            widow_control=effective["widow_control"],
+            mark=mark,
+        )
+
+    def table(self, tbl, geometry: PageGeometry) -> LayoutTable:
+        grid = [_twips(col.get(qn("w:w"))) or 0.0 for col in tbl.iter(qn("w:gridCol"))]
+        rows, row_heights = [], []
+        for tr in tbl.findall(qn("w:tr")):
+            cells, widths = [], []
+            for tc in tr.findall(qn("w:tc")):
+                cells.append(self.cell_blocks(tc, geometry))
+                width = tc.find(f"{qn('w:tcPr')}/{qn('w:tcW')}")
+                widths.append(_twips(width.get(qn("w:w"))) if width is not None and width.get(qn("w:type")) == "dxa" else None)
+            rows.append(cells)
+            height = tr.find(f"{qn('w:trPr')}/{qn('w:trHeight')}")
+            row_heights.append(
+                (_twips(height.get(qn("w:val"))) or 0.0, height.get(qn("w:hRule")) or "atLeast")
+                if height is not None else (0.0, "atLeast")
+            )
+        columns = max((len(row) for row in rows), default=1)
+        if len(grid) >= columns and sum(grid) > 0:
+            column_widths = grid[:columns]
+        else:
+            column_widths = [geometry.content_width_pt / columns] * columns
+        return LayoutTable(rows, column_widths, geometry, row_heights)
+
+    def cell_blocks(self, tc, geometry: PageGeometry) -> list:
+        blocks = []
+        for child in tc:
+            if child.tag == qn("w:p"):
+                blocks.append(self.paragraph(child, geometry, None))
+            elif child.tag == qn("w:tbl"):
+                blocks.append(self.table(child, geometry))
+        return blocks
+
+    def blocks(self, resume: Optional[LayoutCheckpoint] = None,
+               checkpoint_every: int = 0) -> tuple[list, int, dict[int, tuple[int, int, int]]]:
+        """
+        Layout blocks of the body (from `resume`'s element on), the body paragraph count, and
+        the block positions to checkpoint at: the first block of every `checkpoint_every`-th element.
+        """
+        sections = list(self.doc.sections)
+        geometries = [_section_geometry(section) for section in sections] or [PageGeometry(468.0, 648.0)]
+        starts = [_section_start(section) for section in sections]
+        blocks: list = []
+        boundaries: dict[int, tuple[int, int, int]] = {}
+        section_index = resume.section if resume is not None else 0
+        paragraph_index = resume.paragraph_index if resume is not None else 0
+        first_child = resume.child if resume is not None else 0
+        if resume is not None:
+            self.estimated_objects = resume.estimated_objects
+
+        def add_paragraph(p, index: Optional[int]) -> None:
+            nonlocal section_index
+            block = self.paragraph(p, geometries[min(section_index, len(geometries) - 1)], index)
+            pPr = p.pPr
+            if pPr is not None and pPr.find(qn("w:sectPr")) is not None:
+                section_index += 1
+                block.section_break = starts[section_index] if section_index < len(starts) else "nextPage"
+            blocks.append(block)
+
+        for child_index, child in enumerate(self.doc.element.body):
+            if child_index < first_child:
+                continue
+            start, state = len(blocks), (child_index, paragraph_index, self.estimated_objects)
+            geometry = geometries[min(section_index, len(geometries) - 1)]
+            if child.tag == qn("w:p"):
+                add_paragraph(child, paragraph_index)
+                paragraph_index += 1
+            elif child.tag == qn("w:tbl"):
+                blocks.append(self.table(child, geometry))
+            elif child.tag == qn("w:sdt"):
+                # Content controls (tables of contents) take space but are not in doc.paragraphs
+                for p in child.iter(qn("w:p")):
+                    add_paragraph(p, None)
+            if checkpoint_every and child_index > first_child and child_index % checkpoint_every == 0 \
+                    and len(blocks) > start:
+                boundaries[start] = state
+        return blocks, paragraph_index, boundaries
+
+
+def estimate_docx_layout(doc, font_of: Callable[[Run, Paragraph], Optional[str]],
+                         registry: Optional[FontRegistry] = None, resume: Optional[LayoutCheckpoint] = None,
+                         checkpoint_every: int = 0) -> PageLayout:
+    """
+    Page of every paragraph in `doc.paragraphs`, from font metrics. `resume` skips the body
+    elements before a checkpoint taken on a document with the same beginning; with
+    `checkpoint_every`, `layout.checkpoints` holds states to resume later estimates from.
+    """
+    builder = DocxLayoutBuilder(doc, font_of)
+    blocks, paragraph_count, boundaries = builder.blocks(resume, checkpoint_every)
+    layout = LayoutEngine(registry).run(blocks, paragraph_count, resume, boundaries)
+    layout.estimated_objects += builder.estimated_objects
+    return layout
+
+
+def has_rendered_page_breaks(doc) -> bool:
+    return doc.element.body.find(f".//{qn('w:lastRenderedPageBreak')}") is not None
+
+
+def rendered_docx_layout(doc) -> PageLayout:
+    """
+    Page map from the w:lastRenderedPageBreak markers Word/Docs leave behind: exact for an
+    unmodified export, stale once the document has been edited.
+    """
+    paragraphs = doc.paragraphs
+    layout = PageLayout([1] * len(paragraphs), {1: 0} if paragraphs else {}, {0: 1}, 1)
+    sections = doc.sections
+    page, section = 1, 0
+    for index, paragraph in enumerate(paragraphs):
+        p = paragraph._p
+        if paragraph.paragraph_format.page_break_before or p.find(f".//{qn('w:lastRenderedPageBreak')}") is not None:
+            page += 1
+            layout.page_first_paragraph.setdefault(page, index)
+        layout.paragraph_pages[index] = page
+        if any(br.get(qn("w:type")) == "page" for br in p.iter(qn("w:br"))):
+            page += 1
+        if p.pPr is not None and p.pPr.find(qn("w:sectPr")) is not None:
+            section += 1
+            if section < len(sections) and _section_start(sections[section]) != "continuous":
+                page += 1
+            layout.section_start_pages[section] = page
+    layout.page_count = page
+    return layout
+
+
+def docx_page_layout(doc, font_of: Callable[[Run, Paragraph], Optional[str]],
+                     use_rendered_breaks: bool = True) -> PageLayout:
+    """Rendered page breaks when the document carries them (and is unmodified), otherwise an estimate"""
+    if use_rendered_breaks and has_rendered_page_breaks(doc):
+        return rendered_docx_layout(doc)
+    return estimate_docx_layout(doc, font_of)
+
+
+# --- Google Docs adapter ---
+
+def _magnitude(value: Optional[dict], default: float = 0.0) -> float:
+    return (value or {}).get("magnitude", default)
+
+
+def estimate_google_layout(document: dict, registry: Optional[FontRegistry] = None) -> PageLayout:
+    """Page of every paragraph in a documents.get response (body paragraphs, in order)"""
+    doc_style = document.get("documentStyle", {})
+    page_size = doc_style.get("pageSize", {})
+    geometry = PageGeometry(
+        _magnitude(page_size.get("width"), 612) - _magnitude(doc_style.get("marginLeft"), 72)
+        - _magnitude(doc_style.get("marginRight"), 72),
+        _magnitude(page_size.get("height"), 792) - _magnitude(doc_style.get("marginTop"), 72)
+        - _magnitude(doc_style.get("marginBottom"), 72),
+    )
+    named = {}
+    for style in document.get("namedStyles", {}).get("styles", []):
+        text_style = style.get("textStyle", {})
+        named[style.get("namedStyleType")] = (
+            text_style.get("weightedFontFamily", {}).get("fontFamily"),
+            _magnitude(text_style.get("fontSize")) or None,
+            text_style.get("bold", False),
+            style.get("paragraphStyle", {}),
+        )
+    normal_family, normal_size, _, normal_paragraph = named.get("NORMAL_TEXT", (None, None, False, {}))
+    inline_objects = document.get("inlineObjects", {})
+    estimated_objects = 0
+
+    def paragraph_block(paragraph: dict, block_geometry: PageGeometry, index: Optional[int]) -> LayoutParagraph:
+        nonlocal estimated_objects
+        style = paragraph.get("paragraphStyle", {})
+        style_type = style.get("namedStyleType", "NORMAL_TEXT")
+        family, size, bold, named_paragraph = named.get(style_type, (normal_family, normal_size, False, normal_paragraph))
+        # Google Docs' own defaults: Arial 11pt
+        family, size = family or normal_family or "Arial", size or normal_size or 11.0
+
+        runs = []
+        for elem in paragraph.get("elements", []):
+            if "textRun" in elem:
+                text_style = elem["textRun"].get("textStyle", {})
+                runs.append(LayoutRun(
+                    elem["textRun"].get("content", "").rstrip("\n").replace("\u000b", "\n"),
+                    text_style.get("weightedFontFamily", {}).get("fontFamily") or family,
+                    _magnitude(text_style.get("fontSize")) or size,
+                    text_style.get("bold", bold),
+                ))
+            elif "pageBreak" in elem:
+                runs.append(LayoutRun("\f", family, size, bold))
+            elif "inlineObjectElement" in elem:
+                object_id = elem["inlineObjectElement"].get("inlineObjectId")
+                embedded = inline_objects.get(object_id, {}).get("inlineObjectProperties", {}).get("embeddedObject", {})
+                object_size = embedded.get("size")
+                if object_size:
+                    margins = _magnitude(embedded.get("marginTop")) + _magnitude(embedded.get("marginBottom"))
+                    runs.append(LayoutRun(object_size=(_magnitude(object_size.get("width")),
+                                                       _magnitude(object_size.get("height")) + margins)))
+                else:
+                    estimated_objects += 1
+                    runs.append(LayoutRun(object_size=(0.0, DEFAULT_OBJECT_HEIGHT_PT)))
+
+        def paragraph_value(name: str, default: float) -> float:
+            value = style.get(name) or named_paragraph.get(name)
+            return _magnitude(value, default) if isinstance(value, dict) else (value if value is not None else default)
+
+        return LayoutParagraph(
+            runs=runs,
+            geometry=block_geometry,
+            paragraph_index=index,
+            line_spacing=paragraph_value("lineSpacing", 115) / 100,
+            space_before_pt=paragraph_value("spaceAbove", 0.0),
+            space_after_pt=paragraph_value("spaceBelow", 0.0),
+            mark=LayoutRun("", family, size, bold),
+        )
+
+    def table_block(table: dict) -> LayoutTable:
+        nonlocal estimated_objects
+        rows, row_heights = [], []
+        for table_row in table.get("tableRows", []):
+            cells = []
+            for cell in table_row.get("tableCells", []):
+                blocks_in_cell = []
+                for child in cell.get("content", []):
+                    if "paragraph" in child:
+                        blocks_in_cell.append(paragraph_block(child["paragraph"], geometry, None))
+                    elif "table" in child:
+                        # Nested tables are beyond the fields mask
+                        estimated_objects += 1
+                cells.append(blocks_in_cell)
+            rows.append(cells)
+            row_heights.append((_magnitude(table_row.get("tableRowStyle", {}).get("minRowHeight")), "atLeast"))
+        columns = max(table.get("columns", 0), max((len(row) for row in rows), default=1), 1)
+        properties = table.get("tableStyle", {}).get("tableColumnProperties", [])
+        fixed = sum(_magnitude(p.get("width")) for p in properties if p.get("widthType") == "FIXED_WIDTH")
+        evenly = sum(1 for p in properties if p.get("widthType") != "FIXED_WIDTH") + max(0, columns - len(properties))
+        even_width = max(0.0, geometry.content_width_pt - fixed) / evenly if evenly else 0.0
+        column_widths = [
+            _magnitude(properties[column].get("width"))
+            if column < len(properties) and properties[column].get("widthType") == "FIXED_WIDTH" else even_width
+            for column in range(columns)
+        ]
+        return LayoutTable(rows, column_widths, geometry, row_heights)
+
+    blocks: list = []
+    paragraph_index = 0
+    previous_end = None
+    content = document.get("body", {}).get("content", [])
+    for element in content:
+        if "sectionBreak" in element:
+            section_type = element["sectionBreak"].get("sectionStyle", {}).get("sectionType")
+            if blocks:
+                blocks[-1].section_break = "continuous" if section_type == "CONTINUOUS" else "nextPage"
+            previous_end = None  # the break takes an index of its own
+            continue
+        if "table" in element:
+            blocks.append(table_block(element["table"]))
+            previous_end = element.get("endIndex")
+            continue
+        if "paragraph" not in element:
+            continue
+        paragraph = element["paragraph"]
+        elements = paragraph.get("elements", [])
+        # Tables of contents are not in the fields mask; they show up as a gap in the indices
+        if elements and previous_end is not None and elements[0].get("startIndex", previous_end) > previous_end:
+            estimated_objects += 1
+        if elements:
+            previous_end = elements[-1].get("endIndex", previous_end)
+
+        blocks.append(paragraph_block(paragraph, geometry, paragraph_index))
+        paragraph_index += 1
+
+    layout = LayoutEngine(registry).run(blocks, paragraph_index)
+    layout.estimated_objects += estimated_objects
+    return layout
@@ -3,29 +3,34 @@ Local Document Service - Handles operations on uploaded .docx files.
 """
 from typing import Annotated, Optional
 from dataclasses import dataclass, field
-from io import BytesIO
 from lxml import etree
+import logging
 import time
 import zipfile
 
 from docx import Document
-from docx.shared import Pt
+from docx.shared import Pt, Twips
+from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
 from docx.oxml.simpletypes import ST_TwipsMeasure, ST_SignedTwipsMeasure
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_LINE_SPACING
 from fastapi import Depends
 
-class SimpleLogger:
-    def info(self, msg): print("INFO:", msg, flush=True)
-    def error(self, msg): print("ERROR:", msg, flush=True)
-    def warning(self, msg): print("WARNING:", msg, flush=True)
-
-logger = SimpleLogger()
+logger = logging.getLogger(__name__)
 
 from core.format_checker import FormatIssue, CheckResult
-from core.document_formatter import FormatChange, FormatResult as FormatterResult
+from core.document_analysis import DocumentAnalysis
+from core.docx_package import DocxStream, open_docx, write_docx
+from core.extraction_cache import paragraph_cache
+from core.layout_estimator import use_pdf_twin
+from core.metrics import StageClock, cache_hit, cache_miss, tracked_job
+from core.document_formatter import CHANGE_EXAMPLE_CHARS, ChangeLedger, FormatChange, FormatResult as FormatterResult
 from schemas.template import TemplateParams
 
+# Pages either side of the estimated numbering start rendered by the PDF twin
+PDF_TWIN_PAGE_WINDOW = 3
+
 
 # Patch for parsing DOCX margins with float values
 # 1. Save the original margin conversion methods
@@ -97,6 +102,17 @@ class ParagraphAlignment:
     is_italic: bool
     is_on_first_page: bool
 
+@dataclass(frozen=True)
+class ExtractedParagraph:
+    """Position-independent facts of one paragraph, memoized by its fingerprint."""
+    is_heading: bool
+    line_spacing: float
+    has_image: bool
+    alignment: str
+    text: str
+    is_italic: bool
+    segments: tuple[tuple[str, Optional[float], str], ...]  # (text, size pt, font family) of non-blank runs
+
 @dataclass
 class LocalDocumentProperties:
     """Properties extracted from a local document."""
@@ -225,13 +241,17 @@ class LocalDocumentService:
                 defaults_map['default_font'] = default_char_font
 
         except Exception as e:
-            print(f"Error parsing doc defaults: {e}")
+            logger.warning("Error parsing doc defaults: %s", e)
             
         return defaults_map
 
-    def _resolve_font_family(self, run, paragraph, theme_map, doc_defaults, expected_font_family: Optional[str] = None) -> str:
+    def _resolve_font_family(
+        self, run, paragraph, theme_map, doc_defaults, expected_font_family: Optional[str] = None,
+        styles: Optional[DocumentAnalysis] = None,
+    ) -> str:
         """
         Resolves font family following strict inheritance hierarchy.
+        `styles` supplies cached style lookups when the document has been analysed.
         """
         # 1. Direct Run Formatting
         try:
@@ -242,8 +262,9 @@ class LocalDocumentService:
             pass
 
         # 2. Run (Character) Style Hierarchy
-        if run.style:
-            style = run.style
+        run_style = styles.run_style(run) if styles is not None else run.style
+        if run_style:
+            style = run_style
             while style:
                 try:
                     if hasattr(style, '_element') and style._element is not None:
@@ -265,8 +286,9 @@ class LocalDocumentService:
             pass
 
         # 4. Paragraph Style Hierarchy
-        if paragraph.style:
-            style = paragraph.style
+        paragraph_style = styles.paragraph_style(paragraph) if styles is not None else paragraph.style
+        if paragraph_style:
+            style = paragraph_style
             while style:
                 try:
                     if hasattr(style, '_element') and style._element is not None:
@@ -300,14 +322,14 @@ class LocalDocumentService:
             
         return theme_map.get('minorHAnsi', 'Arial')
     
-    def _resolve_line_spacing(self, paragraph) -> float:
+    def _resolve_line_spacing(self, paragraph, styles: Optional[DocumentAnalysis] = None) -> float:
         """Resolves line spacing, checking paragraph and style hierarchy."""
         if paragraph.paragraph_format.line_spacing is not None:
             spacing = paragraph.paragraph_format.line_spacing
             return float(spacing) if isinstance(spacing, (int, float)) else 1.0
         
         # Check style hierarchy
-        style = paragraph.style
+        style = styles.paragraph_style(paragraph) if styles is not None else paragraph.style
         while style:
             if style.paragraph_format.line_spacing is not None:
                 spacing = style.paragraph_format.line_spacing
@@ -338,7 +360,7 @@ class LocalDocumentService:
             if section.footer and self._header_footer_contains_page_number(section.footer):
                 return True
         except Exception as e:
-            print(f"Error checking page numbers: {e}")
+            logger.warning("Error checking page numbers: %s", e)
         return False
 
     def _find_page_number_location(self, doc) -> str:
@@ -353,6 +375,254 @@ class LocalDocumentService:
             pass
         return 'footer'  # Default if not found
 
+    def _find_page_start_paragraph_via_pdf(self, analysis: DocumentAnalysis, page: int) -> tuple[int, str]:
+        """
+        Render the analysed document, edits included, through the PDF twin and find the
+        paragraph whose text opens `page`. Returns (paragraph index or -1, normalized page-start text).
+        """
+        import re
+        from core import pdf_utils
+
+        # Convert the current formatted state to bytes
+        target_text = pdf_utils.get_page_start_text_via_pdf(
+            write_docx(analysis.doc, analysis.content).getvalue(), page - 1
+        )
+        if not target_text:
+            return -1, ""
+
+        logger.debug("PDF twin target_text for expected start page %s: '%s'", page, target_text)
+        normalized_target = re.sub(r'\s+', ' ', target_text).strip()
+        # Alphanumeric matching is robust against split paragraphs, bullets (●), punctuation, page numbers, etc.
+        # We strip leading numbers/punctuation and extract a distinct 6-word snippet from the PDF page start.
+        cleaned_target = re.sub(r'^[\s\d\.\,\-\_●•○■□*+]+', '', normalized_target).strip()
+        target_words = cleaned_target.split()
+        search_snippet = " ".join(target_words[:6]) if len(target_words) > 6 else cleaned_target
+        alphanumeric_snippet = "".join(re.findall(r'\w', search_snippet)).lower()
+
+        logger.debug("PDF twin searching doc.paragraphs for start of: '%s...'", normalized_target[:100])
+        paragraph_pages = analysis.layout.paragraph_pages
+        for i, p in enumerate(analysis.paragraphs):
+            if not p.text.strip():
+                continue
+
+            # Prevent false positives on earlier pages; the estimate guesses floating objects, so allow 3 pages of error
+            if paragraph_pages[i] < page - 3:
+                continue
+
+            # Skip Table of Contents (TOC) entries to avoid matching headings in TOC
+            style_name = p.style.name.lower() if p.style else ""
+            if any(x in style_name for x in ["toc", "table of contents", "зміст", "список"]):
+                continue
+
+            if p.text.count('.') > 5 or p.text.count('_') > 5 or p.text.count('·') > 5 or p.text.count('…') > 3:
+                continue
+
+            normalized_p = re.sub(r'\s+', ' ', p.text).strip()
+            alphanumeric_p = "".join(re.findall(r'\w', normalized_p)).lower()
+
+            if len(alphanumeric_snippet) > 10 and len(alphanumeric_p) > 10:
+                # Match split paragraphs (snippet inside paragraph) or short paragraphs (paragraph inside snippet)
+                if alphanumeric_snippet in alphanumeric_p or alphanumeric_p in alphanumeric_snippet:
+                    # Ensure it's not a TOC entry by checking if it has a trailing page number pattern
+                    if not re.search(r'\d+$', normalized_p) or re.search(r'\d+$', normalized_target):
+                        return i, normalized_target
+        return -1, normalized_target
+
+    def _set_explicit_font(self, rPr, font_family: str) -> None:
+        """Force `font_family` on all rFonts slots and drop the theme references Word would prefer"""
+        rFonts = rPr.get_or_add_rFonts()
+        for attrib in ['w:ascii', 'w:hAnsi', 'w:eastAsia', 'w:cs']:
+            rFonts.set(qn(attrib), font_family)
+        for attrib in ['w:asciiTheme', 'w:hAnsiTheme', 'w:eastAsiaTheme', 'w:cstheme']:
+            if qn(attrib) in rFonts.attrib:
+                del rFonts.attrib[qn(attrib)]
+
+    def _resolve_font_size(self, run, paragraph, default_size: float) -> float:
+        """Resolves font size: direct run formatting, character style, paragraph style, docDefaults"""
+        if run.font.size:
+            return run.font.size.pt
+        styles = [paragraph.style]
+        if run._element.rPr is not None and run._element.rPr.rStyle is not None:
+            styles.insert(0, run.style)
+        for style in styles:
+            while style is not None:
+                if style.font.size:
+                    return style.font.size.pt
+                style = style.base_style
+        return default_size
+
+    def _normalize_via_styles(
+        self,
+        doc: Document,
+        params: TemplateParams,
+        expected_font_family: Optional[str],
+        paragraphs: list,
+        pinned_paragraphs: list,
+        theme_map: dict[str, str],
+        doc_defaults: dict[str, str],
+        changes: ChangeLedger,
+    ) -> None:
+        """
+        "styles" mode of format_document: font, size and line spacing go on docDefaults, Normal
+        and the styles `paragraphs` use; only direct run/paragraph overrides that conflict with
+        them are removed. `pinned_paragraphs` (the skipped first page) keep their current look.
+        """
+        styles_element = doc.styles.element
+        doc_defaults_elem = styles_element.find(qn('w:docDefaults'))
+        if doc_defaults_elem is None:
+            doc_defaults_elem = OxmlElement('w:docDefaults')
+            styles_element.insert(0, doc_defaults_elem)
+        rPr_default = doc_defaults_elem.find(qn('w:rPrDefault'))
+        if rPr_default is None:
+            rPr_default = OxmlElement('w:rPrDefault')
+            doc_defaults_elem.insert(0, rPr_default)
+        pPr_default = doc_defaults_elem.find(qn('w:pPrDefault'))
+        if pPr_default is None:
+            pPr_default = OxmlElement('w:pPrDefault')
+            rPr_default.addnext(pPr_default)
+        default_rPr = rPr_default.find(qn('w:rPr'))
+        if default_rPr is None:
+            default_rPr = OxmlElement('w:rPr')
+            rPr_default.append(default_rPr)
+        default_pPr = pPr_default.find(qn('w:pPr'))
+        if default_pPr is None:
+            default_pPr = OxmlElement('w:pPr')
+            pPr_default.append(default_pPr)
+        # Word's built-in default when docDefaults has no size
+        default_size = default_rPr.sz_val.pt if default_rPr.sz_val is not None else 10.0
+
+        # 1. Pin the skipped first page to what it resolves to now, before the styles change under it
+        for paragraph in pinned_paragraphs:
+            if paragraph.paragraph_format.line_spacing is None:
+                current_spacing = self._resolve_line_spacing(paragraph)
+                if abs(current_spacing - params.line_spacing) > 0.01:
+                    paragraph.paragraph_format.line_spacing = current_spacing
+            for run in paragraph.runs:
+                if not run.text.strip():
+                    continue
+                if run.font.size is None:
+                    current_size = self._resolve_font_size(run, paragraph, default_size)
+                    if abs(current_size - params.font_size) > self.FONT_SIZE_TOLERANCE:
+                        run.font.size = Pt(current_size)
+                if expected_font_family and self._extract_font_from_rPr(run._element.rPr, theme_map) is None:
+                    current_font = self._resolve_font_family(run, paragraph, theme_map, doc_defaults, expected_font_family)
+                    if current_font.lower() != expected_font_family.lower():
+                        self._set_explicit_font(run._element.get_or_add_rPr(), current_font)
+
+        # 2. docDefaults and Normal always carry the target; other styles in use only where they override it
+        default_rPr.sz_val = Pt(params.font_size)
+        default_pPr.spacing_line = Twips(round(240 * params.line_spacing))
+        default_pPr.spacing_lineRule = WD_LINE_SPACING.MULTIPLE
+        if expected_font_family:
+            self._set_explicit_font(default_rPr, expected_font_family)
+
+        normal_style = doc.styles.default(WD_STYLE_TYPE.PARAGRAPH)
+        used_styles = {normal_style.style_id: normal_style} if normal_style is not None else {}
+        for paragraph in paragraphs:
+            style = paragraph.style
+            while style is not None and style.style_id not in used_styles:
+                used_styles[style.style_id] = style
+                style = style.base_style
+            for run in paragraph.runs:
+                rPr = run._element.rPr
+                if rPr is not None and rPr.rStyle is not None and rPr.rStyle.val not in used_styles:
+                    used_styles[rPr.rStyle.val] = run.style
+
+        for style in used_styles.values():
+            is_normal = style is normal_style
+            style_rPr = style.element.rPr
+            style_label = f"Updated style '{style.name}'"
+
+            declared_font = self._extract_font_from_rPr(style_rPr, theme_map)
+            if expected_font_family and (is_normal or declared_font is not None) and \
+                    (declared_font or "").lower() != expected_font_family.lower():
+                self._set_explicit_font(style.element.get_or_add_rPr(), expected_font_family)
+                changes.append(FormatChange(
+                    type="font_family", description=style_label,
+                    before=declared_font or "unset", after=expected_font_family,
+                ))
+            # Paragraph-mark run properties of the style (where Google Docs exports put the font)
+            style_pPr = style.element.pPr
+            mark_rPr = style_pPr.find(qn('w:rPr')) if style_pPr is not None else None
+            mark_font = self._extract_font_from_rPr(mark_rPr, theme_map)
+            if expected_font_family and mark_font is not None and mark_font.lower() != expected_font_family.lower():
+                self._set_explicit_font(mark_rPr, expected_font_family)
+
+            old_size = style.font.size.pt if style.font.size else None
+            if (is_normal or old_size is not None) and \
+                    (old_size is None or abs(old_size - params.font_size) > self.FONT_SIZE_TOLERANCE):
+                style.font.size = Pt(params.font_size)
+                changes.append(FormatChange(
+                    type="font_size", description=style_label,
+                    before=f"{old_size:.1f}pt" if old_size else "unset", after=f"{params.font_size}pt",
+                ))
+
+            if style.type == WD_STYLE_TYPE.PARAGRAPH:
+                old_spacing = style.paragraph_format.line_spacing
+                if (is_normal or old_spacing is not None) and old_spacing != params.line_spacing:
+                    style.paragraph_format.line_spacing = params.line_spacing
+                    changes.append(FormatChange(
+                        type="line_spacing", description=style_label,
+                        before=f"{old_spacing:.2f}" if isinstance(old_spacing, float) else "unset",
+                        after=f"{params.line_spacing:.2f}",
+                    ))
+                # Ensure headings are explicitly bold
+                if style.name.startswith('Heading') and not style.font.bold:
+                    style.font.bold = True
+
+        # 3. Drop direct overrides that contradict the styles; matching ones stay untouched
+        for paragraph in paragraphs:
+            old_spacing = paragraph.paragraph_format.line_spacing
+            if old_spacing is not None and old_spacing != params.line_spacing:
+                spacing = paragraph._element.pPr.spacing
+                for attrib in ['w:line', 'w:lineRule']:
+                    if qn(attrib) in spacing.attrib:
+                        del spacing.attrib[qn(attrib)]
+                changes.add(
+                    "line_spacing",
+                    "Removed direct line spacing",
+                    before=f"{old_spacing:.2f}" if isinstance(old_spacing, float) else str(old_spacing),
+                    after=f"{params.line_spacing:.2f}",
+                    example=paragraph.text.strip()[:CHANGE_EXAMPLE_CHARS],
+                )
+
+            is_heading = paragraph.style.name.startswith('Heading')
+            for run in paragraph.runs:
+                rPr = run._element.rPr
+                if rPr is None:
+                    continue
+                run_text = run.text.strip()
+                if not run_text:
+                    continue
+                if is_heading and run.font.bold is False:
+                    run.font.bold = None
+
+                if expected_font_family:
+                    old_font = self._extract_font_from_rPr(rPr, theme_map)
+                    if old_font is not None and old_font.lower() != expected_font_family.lower():
+                        rPr._remove_rFonts()
+                        changes.add(
+                            "font_family",
+                            "Removed direct font family",
+                            before=old_font,
+                            after=expected_font_family,
+                            example=run_text[:CHANGE_EXAMPLE_CHARS],
+                        )
+
+                if rPr.sz_val is not None and abs(rPr.sz_val.pt - params.font_size) > self.FONT_SIZE_TOLERANCE:
+                    old_size = rPr.sz_val.pt
+                    rPr._remove_sz()
+                    sz_cs = rPr.find(qn('w:szCs'))
+                    if sz_cs is not None:
+                        rPr.remove(sz_cs)
+                    changes.add(
+                        "font_size",
+                        "Removed direct font size",
+                        before=f"{old_size:.1f}pt",
+                        after=f"{params.font_size}pt",
+                        example=run_text[:CHANGE_EXAMPLE_CHARS],
+                    )
+
     def _get_document_theme_fonts(self, doc: Document) -> dict[str, str]:
         """
         Parses the document's theme1.xml to find the actual font names,
@@ -393,26 +663,111 @@ class LocalDocumentService:
                             theme_map[key] = latin_font.get('typeface')
                             
         except Exception as e:
-            print(f"Warning: Could not parse document theme: {e}")
+            logger.warning("Could not parse document theme: %s", e)
             
         return theme_map
 
-    def extract_document_properties(self, file_content: bytes, expected_font_family: Optional[str] = None) -> LocalDocumentProperties:
+    def analyze(self, file_content: bytes) -> DocumentAnalysis:
+        """Parse a .docx once for any number of check/format stages"""
+        return DocumentAnalysis(self, file_content)
+
+    def _extract_paragraph(
+        self, paragraph, analysis: DocumentAnalysis, expected_font_family: Optional[str]
+    ) -> ExtractedParagraph:
+        """Everything extraction reads from one paragraph; depends only on its XML and the styles"""
+        paragraph_style = analysis.paragraph_style(paragraph)
+        # Check if paragraph is a heading
+        is_heading = paragraph_style.name.startswith('Heading')
+        spacing = self._resolve_line_spacing(paragraph, analysis)
+
+        # --- NEW: Image Detection ---
+        has_image = False
+        # Check for drawings in paragraph XML
+        if paragraph._element.find(qn('w:drawing')) is not None or \
+           paragraph._element.find(qn('w:pict')) is not None:
+            has_image = True
+        
+        # Also check runs for drawings (more reliable for inline images)
+        if not has_image:
+            for run in paragraph.runs:
+                if run._element.find(qn('w:drawing')) is not None or \
+                   run._element.find(qn('w:pict')) is not None:
+                    has_image = True
+                    break
+        
+        # Resolve paragraph alignment
+        alignment = "unknown"
+        if paragraph.alignment is not None:
+            from docx.enum.text import WD_ALIGN_PARAGRAPH
+            if paragraph.alignment == WD_ALIGN_PARAGRAPH.CENTER: alignment = "center"
+            elif paragraph.alignment == WD_ALIGN_PARAGRAPH.JUSTIFY: alignment = "justify"
+            elif paragraph.alignment == WD_ALIGN_PARAGRAPH.LEFT: alignment = "left"
+            elif paragraph.alignment == WD_ALIGN_PARAGRAPH.RIGHT: alignment = "right"
+        elif paragraph_style and hasattr(paragraph_style, 'paragraph_format'):
+            # Check style alignment
+            style_align = paragraph_style.paragraph_format.alignment
+            from docx.enum.text import WD_ALIGN_PARAGRAPH
+            if style_align == WD_ALIGN_PARAGRAPH.CENTER: alignment = "center"
+            elif style_align == WD_ALIGN_PARAGRAPH.JUSTIFY: alignment = "justify"
+            elif style_align == WD_ALIGN_PARAGRAPH.LEFT: alignment = "left"
+            elif style_align == WD_ALIGN_PARAGRAPH.RIGHT: alignment = "right"
+
+        is_italic = any(run.font.italic for run in paragraph.runs if run.text.strip())
+
+        # Extract runs (text segments with consistent formatting)
+        segments = []
+        for run in paragraph.runs:
+            if not run.text.strip():
+                continue
+
+            # Get font size
+            font_size = None
+            if run.font.size:
+                font_size = run.font.size.pt
+
+            font_family = self._resolve_font_family(
+                run, paragraph, analysis.theme_fonts, analysis.doc_defaults, expected_font_family, styles=analysis
+            )
+            segments.append((run.text, font_size, font_family))
+
+        return ExtractedParagraph(
+            is_heading=is_heading,
+            line_spacing=spacing,
+            has_image=has_image,
+            alignment=alignment,
+            text=paragraph.text.strip(),
+            is_italic=is_italic,
+            segments=tuple(segments),
+        )
+
+    def extract_document_properties(
+        self,
+        file_content: bytes,
+        expected_font_family: Optional[str] = None,
+        analysis: Optional[DocumentAnalysis] = None,
+    ) -> LocalDocumentProperties:
         """
         Extract formatting properties from a .docx file.
 
         Args:
             file_content: Raw bytes of the .docx file
+            expected_font_family: Font family reported for runs whose font cannot be resolved
+            analysis: Already parsed document (e.g. right after formatting); file_content
+                is ignored when given
 
         Returns:
             LocalDocumentProperties with extracted formatting information
         """
 
-        doc = Document(BytesIO(file_content))
+        clock = StageClock("local")
+        if analysis is None:
+            analysis = DocumentAnalysis(self, file_content)
+        doc = analysis.doc
+        clock.lap("parse")
 
-        theme_fonts_map = self._get_document_theme_fonts(doc)
-
-        doc_defaults = self._get_doc_defaults(doc, theme_fonts_map)
+        # Paragraph memo entries are only valid for the same styles, theme and expected font
+        style_key = (analysis.style_fingerprint, expected_font_family)
+        clock.lap("styles")
 
         # Get document title (from core properties or filename)
         title = doc.core_properties.title or "Untitled Document"
@@ -422,227 +777,66 @@ class LocalDocumentService:
         images = []
         alignments = []
 
-        # Get page dimensions for first page detection
-        section = doc.sections[0] if doc.sections else None
-        page_height_inches = section.page_height.inches if section and section.page_height else 11.0
-        top_margin_inches = section.top_margin.inches if section and section.top_margin else 1.0
-        bottom_margin_inches = section.bottom_margin.inches if section and section.bottom_margin else 1.0
-        left_margin_inches = section.left_margin.inches if section and section.left_margin else 1.0
-        right_margin_inches = section.right_margin.inches if section and section.right_margin else 1.0
-        page_width_inches = section.page_width.inches if section and section.page_width else 8.5
-
-        # Calculate usable dimensions for content on first page
-        usable_page_height_inches = (page_height_inches - top_margin_inches - bottom_margin_inches) * 0.95
-        usable_page_width_inches = page_width_inches - left_margin_inches - right_margin_inches
-
-        # Estimate characters per line based on usable width
-        # ~10-11 chars per inch for standard 12pt-14pt fonts with spacing
-        chars_per_line = max(40, int(usable_page_width_inches * 10.5))
-
-        # --- NEW: Track explicit page boundaries and section starts ---
-        # Check if the document has any w:lastRenderedPageBreak elements
-        has_rendered_page_breaks = False
-        try:
-            has_rendered_page_breaks = len(doc.element.xpath('//*[local-name()="lastRenderedPageBreak"]')) > 0
-        except Exception:
-            pass
-
-        cumulative_height_inches = 0.0
-        has_passed_first_page = False
-        section_start_pages = {0: 1}
-        current_section_idx = 0
-        current_page = 1
-        page_cumulative_height = 0.0
-
-        # Extract text and formatting from paragraphs
-        for para_idx, paragraph in enumerate(doc.paragraphs):
-            # Check if paragraph is a heading
-            is_heading = paragraph.style.name.startswith('Heading')
-
-            # Estimate paragraph height (very rough approximation)
-            # Average font size of runs in paragraph, or default to 12pt
-            para_font_sizes = [run.font.size.pt for run in paragraph.runs if run.font.size]
-            avg_font_size = sum(para_font_sizes) / len(para_font_sizes) if para_font_sizes else 12.0
-
-            # Line height is approximately font size * line spacing (default 1.15)
-            line_spacing_multiple = 1.15
-            if paragraph.paragraph_format.line_spacing is not None:
-                spacing = paragraph.paragraph_format.line_spacing
-                if isinstance(spacing, (int, float)):
-                    line_spacing_multiple = float(spacing)
-
-            # Calculate line height in inches (1 pt = 1/72 inch)
-            line_height_inches = (avg_font_size / 72.0) * line_spacing_multiple
-
-            # Count approximate lines in paragraph based on actual page width
-            para_text_length = len(paragraph.text)
-            estimated_lines = max(1, para_text_length // chars_per_line) if para_text_length > 0 else 1
-
-            # Add paragraph height
-            para_height_inches = line_height_inches * estimated_lines
-
-            # Add space before/after if specified
-            if paragraph.paragraph_format.space_before:
-                para_height_inches += paragraph.paragraph_format.space_before.inches
-            if paragraph.paragraph_format.space_after:
-                para_height_inches += paragraph.paragraph_format.space_after.inches
-
-            # Track physical page index
-            has_hard_break = False
-            if paragraph.paragraph_format.page_break_before:
-                has_hard_break = True
+        # Page of every paragraph: Word's rendered page breaks if present, else a font-metric estimate
+        layout = analysis.layout
+        clock.lap("layout")
+
+        # Extract text and formatting from paragraphs; those seen before (same XML, same
+        # styles) are taken from the memo, so a re-upload only processes what was edited
+        reused = 0
+        for para_idx, (paragraph, paragraph_key) in enumerate(
+            zip(analysis.paragraphs, analysis.paragraph_fingerprints)
+        ):
+            extracted = paragraph_cache.get((paragraph_key, style_key))
+            if extracted is None:
+                extracted = self._extract_paragraph(paragraph, analysis, expected_font_family)
+                paragraph_cache.put((paragraph_key, style_key), extracted)
             else:
-                for run in paragraph.runs:
-                    if run._element.find(qn('w:lastRenderedPageBreak')) is not None:
-                        has_hard_break = True
-                        break
-                    for br in run._element.findall(qn('w:br')):
-                        if br.get(qn('w:type')) == 'page':
-                            has_hard_break = True
-                            break
-            
-            if has_hard_break:
-                current_page += 1
-                page_cumulative_height = 0.0
-
-            if not has_rendered_page_breaks:
-                page_cumulative_height += para_height_inches
-                if page_cumulative_height > usable_page_height_inches:
-                    current_page += 1
-                    page_cumulative_height = para_height_inches
-
-            # Check if this paragraph ends a section
-            pPr = paragraph._element.pPr
-            if pPr is not None:
-                sectPr = pPr.find(qn('w:sectPr'))
-                if sectPr is not None:
-                    next_section_idx = current_section_idx + 1
-                    
-                    # Check type of section break (continuous vs page break nextPage)
-                    break_type_elem = sectPr.find(qn('w:type'))
-                    is_continuous = break_type_elem is not None and break_type_elem.get(qn('w:val')) == 'continuous'
-                    next_section_start = current_page if is_continuous else (current_page + 1)
-                    
-                    section_start_pages[next_section_idx] = next_section_start
-                    current_section_idx = next_section_idx
-                    
-                    # If it's a page-break section break, increment current_page for subsequent paragraphs
-                    if not is_continuous:
-                        current_page = next_section_start
-                        page_cumulative_height = 0.0
-
-            # --- NEW FIRST PAGE DETECTION LOGIC ---
-            # 1. Check for explicit page boundaries before this paragraph
-            if not has_passed_first_page:
-                if paragraph.paragraph_format.page_break_before:
-                    has_passed_first_page = True
-                else:
-                    for run in paragraph.runs:
-                        # Catch pagination boundaries established by Word/Docs
-                        if run._element.find(qn('w:lastRenderedPageBreak')) is not None:
-                            has_passed_first_page = True
-                            break
-
-            # 2. Fallback to height heuristic if no hard break is found
-            if not has_passed_first_page and not has_rendered_page_breaks:
-                if cumulative_height_inches > usable_page_height_inches:
-                    has_passed_first_page = True
-
-            is_on_first_page = not has_passed_first_page
-            cumulative_height_inches += para_height_inches
-
-            # 3. Check for manual page breaks INSIDE this paragraph (affects the NEXT paragraph)
-            if is_on_first_page:
-                for run in paragraph.runs:
-                    for br in run._element.findall(qn('w:br')):
-                        if br.get(qn('w:type')) == 'page':
-                            has_passed_first_page = True
-                            break
-            # ----------------------------------------
+                reused += 1
+            is_on_first_page = layout.paragraph_pages[para_idx] == 1
 
             # Track line spacing for paragraph (after is_on_first_page is determined)
-            spacing = self._resolve_line_spacing(paragraph)
             paragraph_line_spacings.append(ParagraphLineSpacing(
-                line_spacing=spacing,
+                line_spacing=extracted.line_spacing,
                 paragraph_index=para_idx,
                 is_on_first_page=is_on_first_page,
             ))
 
-            # --- NEW: Image Detection ---
-            has_image = False
-            # Check for drawings in paragraph XML
-            if paragraph._element.find(qn('w:drawing')) is not None or \
-               paragraph._element.find(qn('w:pict')) is not None:
-                has_image = True
-            
-            # Also check runs for drawings (more reliable for inline images)
-            if not has_image:
-                for run in paragraph.runs:
-                    if run._element.find(qn('w:drawing')) is not None or \
-                       run._element.find(qn('w:pict')) is not None:
-                        has_image = True
-                        break
-            
-            # Resolve paragraph alignment
-            alignment = "unknown"
-            if paragraph.alignment is not None:
-                from docx.enum.text import WD_ALIGN_PARAGRAPH
-                if paragraph.alignment == WD_ALIGN_PARAGRAPH.CENTER: alignment = "center"
-                elif paragraph.alignment == WD_ALIGN_PARAGRAPH.JUSTIFY: alignment = "justify"
-                elif paragraph.alignment == WD_ALIGN_PARAGRAPH.LEFT: alignment = "left"
-                elif paragraph.alignment == WD_ALIGN_PARAGRAPH.RIGHT: alignment = "right"
-            elif paragraph.style and hasattr(paragraph.style, 'paragraph_format'):
-                # Check style alignment
-                style_align = paragraph.style.paragraph_format.alignment
-                from docx.enum.text import WD_ALIGN_PARAGRAPH
-                if style_align == WD_ALIGN_PARAGRAPH.CENTER: alignment = "center"
-                elif style_align == WD_ALIGN_PARAGRAPH.JUSTIFY: alignment = "justify"
-                elif style_align == WD_ALIGN_PARAGRAPH.LEFT: alignment = "left"
-                elif style_align == WD_ALIGN_PARAGRAPH.RIGHT: alignment = "right"
-
-            if has_image:
+            if extracted.has_image:
                 images.append(LocalImageInfo(
                     paragraph_index=para_idx,
-                    alignment=alignment,
+                    alignment=extracted.alignment,
                     is_on_first_page=is_on_first_page
                 ))
             
             # Store alignment info for all paragraphs to check captions/sources
-            is_italic = any(run.font.italic for run in paragraph.runs if run.text.strip())
             alignments.append(ParagraphAlignment(
                 paragraph_index=para_idx,
-                alignment=alignment,
-                text=paragraph.text.strip(),
-                is_italic=is_italic,
+                alignment=extracted.alignment,
+                text=extracted.text,
+                is_italic=extracted.is_italic,
                 is_on_first_page=is_on_first_page
             ))
 
-            # Extract runs (text segments with consistent formatting)
-            for run in paragraph.runs:
-                if not run.text.strip():
-                    continue
-
-                # Get font size
-                font_size = None
-                if run.font.size:
-                    font_size = run.font.size.pt
-
-                font_family = self._resolve_font_family(run, paragraph, theme_fonts_map, doc_defaults, expected_font_family)
-
-                segment = LocalTextSegment(
-                    content=run.text,
+            for content, font_size, font_family in extracted.segments:
+                text_segments.append(LocalTextSegment(
+                    content=content,
                     font_size_pt=font_size,
                     font_family=font_family,
-                    char_count=len(run.text),
+                    char_count=len(content),
                     paragraph_index=para_idx,
-                    is_heading=is_heading,
+                    is_heading=extracted.is_heading,
                     is_on_first_page=is_on_first_page,
-                )
-                text_segments.append(segment)
+                ))
+        cache_hit("paragraphs", reused)
+        cache_miss("paragraphs", len(analysis.paragraphs) - reused)
+
+        clock.lap("extract")  # paragraph scan
 
         # Extract margins (in inches, convert from twips)
         margins = {}
-        section = doc.sections[0] if doc.sections else None
+        sections = analysis.sections
+        section = sections[0] if sections else None
         if section:
             margins = {
                 "top": section.top_margin.inches if section.top_margin else 1.0,
@@ -666,15 +860,15 @@ class LocalDocumentService:
         numbering_start_page = 0
         
         first_numbered_section_idx = -1
-        for idx, sec in enumerate(doc.sections):
+        for idx, sec in enumerate(sections):
             if self._contains_page_number(sec):
                 has_page_numbers = True
                 first_numbered_section_idx = idx
                 break
         
         # Check if first page is different (typically on the first section)
-        if doc.sections:
-            first_sec = doc.sections[0]
+        if sections:
+            first_sec = sections[0]
             try:
                 sectPr = first_sec._sectPr
                 titlePg = sectPr.find(qn('w:titlePg'))
@@ -683,7 +877,7 @@ class LocalDocumentService:
                 pass
 
         if has_page_numbers and first_numbered_section_idx != -1:
-            numbered_sec = doc.sections[first_numbered_section_idx]
+            numbered_sec = sections[first_numbered_section_idx]
             
             # Try to get page number start (pgNumType) for this section
             try:
@@ -711,37 +905,46 @@ class LocalDocumentService:
                 else:
                     numbering_start_page = 1
             else:
-                # Use PDF twin to get exact page number of the section start
+                # Use PDF twin to get exact page number of the section start, unless the estimate is reliable
+                estimated_page = layout.section_start_pages.get(first_numbered_section_idx, 1)
                 pdf_page = None
-                try:
-                    from core import pdf_utils
-                    first_paras = []
-                    word_count = 0
-                    current_sec_idx = 0
-                    for p in doc.paragraphs:
-                        if current_sec_idx == first_numbered_section_idx and p.text.strip():
-                            first_paras.append(p.text.strip())
-                            word_count += len(p.text.split())
-                            if word_count >= 40:
+                if use_pdf_twin(layout):
+                    try:
+                        from core import pdf_utils
+                        first_paras = []
+                        word_count = 0
+                        for p, sec_idx in zip(analysis.paragraphs, analysis.paragraph_sections):
+                            if sec_idx == first_numbered_section_idx and p.text.strip():
+                                first_paras.append(p.text.strip())
+                                word_count += len(p.text.split())
+                                if word_count >= 40:
+                                    break
+                            elif sec_idx > first_numbered_section_idx:
                                 break
-                                
-                        pPr = p._element.pPr
-                        if pPr is not None and pPr.find(qn('w:sectPr')) is not None:
-                            current_sec_idx += 1
-                            
-                    first_para_text = " ".join(first_paras) if first_paras else None
+
+                        first_para_text = " ".join(first_paras) if first_paras else None
                             
-                    if first_para_text:
-                        logger.info(f"PDF twin finding page for first_para_text: '{first_para_text}'")
-                        pdf_page = pdf_utils.find_text_in_pdf_pages(file_content, first_para_text)
-                        logger.info(f"PDF twin returned page: {pdf_page}")
-                except Exception as e:
-                    logger.error(f"PDF twin failed for properties: {e}")
+                        if first_para_text:
+                            logger.debug("PDF twin finding page for first_para_text: '%s'", first_para_text)
+                            # Render only the pages around the estimate, not the whole document
+                            page_range = (
+                                max(1, estimated_page - PDF_TWIN_PAGE_WINDOW), estimated_page + PDF_TWIN_PAGE_WINDOW
+                            )
+                            pdf_page = pdf_utils.find_text_in_pdf_pages(analysis.content, first_para_text, page_range)
+                            if pdf_page is None and pdf_utils.supports_page_range():
+                                # The estimate was judged unreliable and may be off by more than the window
+                                logger.debug("PDF twin missed pages %s-%s, searching the whole render", *page_range)
+                                pdf_page = pdf_utils.find_text_in_pdf_pages(analysis.content, first_para_text)
+                            logger.debug("PDF twin returned page: %s", pdf_page)
+                    except Exception as e:
+                        logger.error("PDF twin failed for properties: %s", e)
                 
                 if pdf_page is not None:
                     numbering_start_page = pdf_page
                 else:
-                    numbering_start_page = section_start_pages.get(first_numbered_section_idx, 1)
+                    numbering_start_page = estimated_page
+
+        clock.lap("page_numbering")  # includes LibreOffice/PyMuPDF (also recorded as pdf.*)
 
         return LocalDocumentProperties(
             title=title,
@@ -758,24 +961,24 @@ class LocalDocumentService:
         )
 
     def debug_google_docs_xml(self, file_content: bytes):
-        doc = Document(BytesIO(file_content))
+        doc = open_docx(file_content)
         styles_element = doc.styles.element
         
-        # Helper to safely print the raw XML
+        # Helper to safely log the raw XML
         def print_xml(elem):
             if elem is not None:
-                print(etree.tostring(elem, pretty_print=True, encoding='unicode'))
+                logger.debug("%s", etree.tostring(elem, pretty_print=True, encoding='unicode'))
             else:
-                print("Element is None")
+                logger.debug("Element is None")
 
-        print("=== 1. DOC DEFAULTS ===")
+        logger.debug("=== 1. DOC DEFAULTS ===")
         doc_defaults = styles_element.find(qn('w:docDefaults'))
         if doc_defaults is not None:
             print_xml(doc_defaults)
         else:
-            print("No w:docDefaults found.")
+            logger.debug("No w:docDefaults found.")
             
-        print("\n=== 2. RELEVANT STYLES ===")
+        logger.debug("=== 2. RELEVANT STYLES ===")
         for style in styles_element.findall(qn('w:style')):
             style_id = style.get(qn('w:styleId'))
             name_node = style.find(qn('w:name'))
@@ -784,21 +987,23 @@ class LocalDocumentService:
             
             # Grab anything marked default, or named Normal
             if is_default in ['1', 'true'] or style_id == 'Normal' or name == 'Normal':
-                print(f"\n--- Style: ID='{style_id}', Name='{name}', Default='{is_default}' ---")
+                logger.debug("--- Style: ID='%s', Name='%s', Default='%s' ---", style_id, name, is_default)
                 print_xml(style)
 
-        print("\n=== 3. FIRST PARAGRAPH XML ===")
+        logger.debug("=== 3. FIRST PARAGRAPH XML ===")
         # Find the first paragraph that actually contains text to see its properties
         for p in doc.paragraphs:
             if p.text.strip():
                 print_xml(p._element)
                 break
 
+    @tracked_job("local.check")
     def check_document(
         self,
         file_content: bytes,
         params: TemplateParams,
         expected_font_family: Optional[str] = None,
+        analysis: Optional[DocumentAnalysis] = None,
     ) -> CheckResult:
         """
         Check a local document's formatting against parameters.
@@ -807,6 +1012,7 @@ class LocalDocumentService:
             file_content: Raw bytes of the .docx file
             params: Expected formatting parameters
             expected_font_family: Expected font family name
+            analysis: Already parsed document, e.g. the one format_document() just edited
 
         Returns:
             CheckResult with formatting issues found
@@ -816,7 +1022,8 @@ class LocalDocumentService:
 
         #self.debug_google_docs_xml(file_content)
 
-        doc_props = self.extract_document_properties(file_content, expected_font_family)
+        doc_props = self.extract_document_properties(file_content, expected_font_family, analysis)
+        clock = StageClock("local.check")
 
         # Font Size & Family Checks
         font_size_issues: list[LocalTextSegment] = []
@@ -825,7 +1032,6 @@ class LocalDocumentService:
         for segment in doc_props.text_segments:
             # Skip first page content if requested
             if params.skip_first_page and segment.is_on_first_page:
-                print(segment.content)
                 continue
 
             if segment.font_size_pt is not None:
@@ -1160,6 +1366,7 @@ class LocalDocumentService:
 
         processing_time = int((time.time() - start_time) * 1000)
 
+        clock.lap("rules")
         return CheckResult(
             passed=len(issues) == 0,
             overall_score=overall_score,
@@ -1167,12 +1374,16 @@ class LocalDocumentService:
             processing_time_ms=processing_time,
             document_title=doc_props.title,
         )
+    @tracked_job("local.format")
     def format_document(
         self,
         file_content: bytes,
         params: TemplateParams,
         expected_font_family: Optional[str] = None,
-    ) -> tuple[bytes, FormatterResult]:
+        mode: str = "runs",
+        detailed_changes: bool = False,
+        analysis: Optional[DocumentAnalysis] = None,
+    ) -> tuple[DocxStream, FormatterResult]:
         """
         Apply formatting to a local document and return the modified file.
         
@@ -1180,170 +1391,136 @@ class LocalDocumentService:
             file_content: Raw bytes of the .docx file
             params: Formatting parameters to apply
             expected_font_family: Font family to apply
+            mode: "runs" sets font, size and spacing on every run and paragraph;
+                "styles" sets them on docDefaults and the styles in use, and removes
+                only the direct overrides that conflict
+            detailed_changes: Report every change separately instead of aggregated counts
+            analysis: Parsed document to format in place (file_content is then ignored);
+                afterwards it describes the formatted document and can be passed to
+                check_document() without parsing the output again
             
         Returns:
-            Tuple of (modified_file_bytes, FormatterResult)
+            Tuple of (modified file as DocxStream chunks, FormatterResult)
         """
         start_time = time.time()
-        changes: list[FormatChange] = []
+        changes = ChangeLedger(detailed_changes)
         
-        doc = Document(BytesIO(file_content))
+        clock = StageClock("local.format")
+        if analysis is None:
+            analysis = DocumentAnalysis(self, file_content)
+        doc = analysis.doc
+        clock.lap("parse")
         doc_title = doc.core_properties.title or "Untitled Document"
 
-        theme_fonts_map = self._get_document_theme_fonts(doc)
-        doc_defaults = self._get_doc_defaults(doc, theme_fonts_map)
-        
-        # Get page dimensions for first page detection (if skip_first_page is enabled)
-        section = doc.sections[0] if doc.sections else None
-        page_height_inches = section.page_height.inches if section and section.page_height else 11.0
-        top_margin_inches = section.top_margin.inches if section and section.top_margin else 1.0
-        bottom_margin_inches = section.bottom_margin.inches if section and section.bottom_margin else 1.0
-        left_margin_inches = section.left_margin.inches if section and section.left_margin else 1.0
-        right_margin_inches = section.right_margin.inches if section and section.right_margin else 1.0
-        page_width_inches = section.page_width.inches if section and section.page_width else 8.5
-        
-        # Calculate usable dimensions for first page detection
-        usable_page_height_inches = (page_height_inches - top_margin_inches - bottom_margin_inches) * 0.92
-        usable_page_width_inches = page_width_inches - left_margin_inches - right_margin_inches
-        chars_per_line = max(40, int(usable_page_width_inches * 8.5))
-        
-        # --- NEW: Track explicit page boundaries ---
-        cumulative_height_inches = 0.0
-        has_passed_first_page = False
+        theme_fonts_map = analysis.theme_fonts
+        doc_defaults = analysis.doc_defaults
+        clock.lap("styles")
         
+        # Page of every paragraph, for first page detection (if skip_first_page is enabled)
+        first_page_layout = analysis.layout
+        clock.lap("layout")
+
+        styled_paragraphs: list = []
+        pinned_paragraphs: list = []
+
         # Apply formatting to all paragraphs
-        for para_idx, paragraph in enumerate(doc.paragraphs):
+        for para_idx, paragraph in enumerate(analysis.paragraphs):
             # Check if paragraph is a heading
-            is_heading = paragraph.style.name.startswith('Heading')
-            
-            # Estimate paragraph height for first page detection
-            para_font_sizes = [run.font.size.pt for run in paragraph.runs if run.font.size]
-            avg_font_size = sum(para_font_sizes) / len(para_font_sizes) if para_font_sizes else 12.0
-            
-            line_spacing_multiple = 1.15
-            if paragraph.paragraph_format.line_spacing is not None:
-                spacing = paragraph.paragraph_format.line_spacing
-                if isinstance(spacing, (int, float)):
-                    line_spacing_multiple = float(spacing)
-            
-            line_height_inches = (avg_font_size / 72.0) * line_spacing_multiple
-            para_text_length = len(paragraph.text)
-            estimated_lines = max(1, para_text_length // chars_per_line) if para_text_length > 0 else 1
-            para_height_inches = line_height_inches * estimated_lines
-            
-            if paragraph.paragraph_format.space_before:
-                para_height_inches += paragraph.paragraph_format.space_before.inches
-            if paragraph.paragraph_format.space_after:
-                para_height_inches += paragraph.paragraph_format.space_after.inches
-            
-            # --- NEW FIRST PAGE DETECTION LOGIC ---
-            # 1. Check for explicit page boundaries before this paragraph
-            if not has_passed_first_page:
-                if paragraph.paragraph_format.page_break_before:
-                    has_passed_first_page = True
-                else:
-                    for run in paragraph.runs:
-                        # Catch pagination boundaries established by Word/Docs
-                        if run._element.find(qn('w:lastRenderedPageBreak')) is not None:
-                            has_passed_first_page = True
-                            break
-
-            # 2. Fallback to height heuristic if no hard break is found
-            if not has_passed_first_page:
-                if cumulative_height_inches > usable_page_height_inches:
-                    has_passed_first_page = True
-
-            is_on_first_page = not has_passed_first_page
-            cumulative_height_inches += para_height_inches
-
-            # 3. Check for manual page breaks INSIDE this paragraph (affects the NEXT paragraph)
-            if is_on_first_page:
-                for run in paragraph.runs:
-                    for br in run._element.findall(qn('w:br')):
-                        if br.get(qn('w:type')) == 'page':
-                            has_passed_first_page = True
-                            break
-            # ----------------------------------------
-            
+            is_heading = analysis.paragraph_style(paragraph).name.startswith('Heading')
+            is_on_first_page = first_page_layout.paragraph_pages[para_idx] == 1
+
             # Skip first page content if requested
             if params.skip_first_page and is_on_first_page:
+                pinned_paragraphs.append(paragraph)
                 continue
             
-            # Apply line spacing
-            if paragraph.paragraph_format.line_spacing != params.line_spacing:
-                old_spacing = paragraph.paragraph_format.line_spacing
-                paragraph.paragraph_format.line_spacing = params.line_spacing
-                changes.append(FormatChange(
-                    type="line_spacing",
-                    description=f"Updated line spacing for paragraph",
-                    before=f"{old_spacing:.2f}" if old_spacing else "unset",
-                    after=f"{params.line_spacing:.2f}",
-                ))
+            if mode == "styles":
+                # Fonts, sizes and spacing are normalized through styles.xml after the loop
+                styled_paragraphs.append(paragraph)
+            else:
+                # Apply line spacing
+                if paragraph.paragraph_format.line_spacing != params.line_spacing:
+                    old_spacing = paragraph.paragraph_format.line_spacing
+                    paragraph.paragraph_format.line_spacing = params.line_spacing
+                    changes.add(
+                        "line_spacing",
+                        "Updated line spacing for paragraph",
+                        before=f"{old_spacing:.2f}" if old_spacing else "unset",
+                        after=f"{params.line_spacing:.2f}",
+                        example=paragraph.text.strip()[:CHANGE_EXAMPLE_CHARS],
+                    )
             
-            # Apply formatting to runs
-            for run in paragraph.runs:
-                if not run.text.strip():
-                    continue
+                # Apply formatting to runs
+                for run in paragraph.runs:
+                    run_text = run.text.strip()
+                    if not run_text:
+                        continue
                 
-                # Ensure headings are explicitly bold
-                if is_heading and not run.font.bold:
-                    run.font.bold = True
+                    # Ensure headings are explicitly bold
+                    if is_heading and not run.font.bold:
+                        run.font.bold = True
                 
-                # Apply font size
-                if run.font.size:
-                    old_size = run.font.size.pt
-                    if abs(old_size - params.font_size) > self.FONT_SIZE_TOLERANCE:
+                    # Apply font size
+                    if run.font.size:
+                        old_size = run.font.size.pt
+                        if abs(old_size - params.font_size) > self.FONT_SIZE_TOLERANCE:
+                            run.font.size = Pt(params.font_size)
+                            changes.add(
+                                "font_size",
+                                "Changed font size",
+                                before=f"{old_size:.1f}pt",
+                                after=f"{params.font_size}pt",
+                                example=run_text[:CHANGE_EXAMPLE_CHARS],
+                            )
+                    else:
                         run.font.size = Pt(params.font_size)
-                        changes.append(FormatChange(
-                            type="font_size",
-                            description=f"Changed font size",
-                            before=f"{old_size:.1f}pt",
+                        changes.add(
+                            "font_size",
+                            "Set font size",
+                            before="unset",
                             after=f"{params.font_size}pt",
-                        ))
-                else:
-                    run.font.size = Pt(params.font_size)
-                    changes.append(FormatChange(
-                        type="font_size",
-                        description=f"Set font size",
-                        before="unset",
-                        after=f"{params.font_size}pt",
-                    ))
+                            example=run_text[:CHANGE_EXAMPLE_CHARS],
+                        )
                 
-                # Apply font family
-                if expected_font_family:
-                    # 1. Use the robust resolver to check the REAL current font
-                    old_font = self._resolve_font_family(run, paragraph, theme_fonts_map, doc_defaults, expected_font_family)
+                    # Apply font family
+                    if expected_font_family:
+                        # 1. Use the robust resolver to check the REAL current font
+                        old_font = self._resolve_font_family(
+                            run, paragraph, theme_fonts_map, doc_defaults, expected_font_family, styles=analysis
+                        )
                     
-                    if old_font.lower() != expected_font_family.lower():
-                        # 2. Set the python-docx property (Updates w:ascii mostly)
-                        run.font.name = expected_font_family
+                        if old_font.lower() != expected_font_family.lower():
+                            # 2. Set the python-docx property (Updates w:ascii mostly)
+                            run.font.name = expected_font_family
                         
-                        # 3. CRITICAL: Manipulate XML to remove Theme References
-                        # Access the raw XML element for the run's properties
-                        r = run._element
-                        rPr = r.get_or_add_rPr()
-                        rFonts = rPr.get_or_add_rFonts()
+                            # 3. CRITICAL: Manipulate XML to remove Theme References
+                            # Access the raw XML element for the run's properties
+                            r = run._element
+                            rPr = r.get_or_add_rPr()
+                            rFonts = rPr.get_or_add_rFonts()
                         
-                        # A. Force the font on ALL slots (East Asia often overrides)
-                        rFonts.set(qn('w:ascii'), expected_font_family)
-                        rFonts.set(qn('w:hAnsi'), expected_font_family)
-                        rFonts.set(qn('w:eastAsia'), expected_font_family)
-                        rFonts.set(qn('w:cs'), expected_font_family)
+                            # A. Force the font on ALL slots (East Asia often overrides)
+                            rFonts.set(qn('w:ascii'), expected_font_family)
+                            rFonts.set(qn('w:hAnsi'), expected_font_family)
+                            rFonts.set(qn('w:eastAsia'), expected_font_family)
+                            rFonts.set(qn('w:cs'), expected_font_family)
                         
-                        # B. DELETE THEME REFERENCES
-                        # This breaks the link to "Calibri (Headings)" or "Major Theme"
-                        # If these exist, Word ignores the attributes we set above.
-                        for attrib in ['w:asciiTheme', 'w:hAnsiTheme', 'w:eastAsiaTheme', 'w:cstheme']:
-                            if qn(attrib) in rFonts.attrib:
-                                del rFonts.attrib[qn(attrib)]
+                            # B. DELETE THEME REFERENCES
+                            # This breaks the link to "Calibri (Headings)" or "Major Theme"
+                            # If these exist, Word ignores the attributes we set above.
+                            for attrib in ['w:asciiTheme', 'w:hAnsiTheme', 'w:eastAsiaTheme', 'w:cstheme']:
+                                if qn(attrib) in rFonts.attrib:
+                                    del rFonts.attrib[qn(attrib)]
                                 
-                        changes.append(FormatChange(
-                            type="font_family",
-                            description=f"Changed font family",
-                            before=old_font,
-                            after=expected_font_family,
-                        ))
+                            changes.add(
+                                "font_family",
+                                "Changed font family",
+                                before=old_font,
+                                after=expected_font_family,
+                                example=run_text[:CHANGE_EXAMPLE_CHARS],
+                            )
             
+
             # --- NEW: Image, Caption and Source Formatting ---
             from docx.enum.text import WD_ALIGN_PARAGRAPH
             
@@ -1364,12 +1541,13 @@ class LocalDocumentService:
                 if paragraph.alignment != WD_ALIGN_PARAGRAPH.CENTER:
                     old_align = str(paragraph.alignment)
                     paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    changes.append(FormatChange(
-                        type="image_alignment",
-                        description="Відцентровано зображення",
+                    changes.add(
+                        "image_alignment",
+                        "Відцентровано зображення",
                         before=old_align,
-                        after="center"
-                    ))
+                        after="center",
+                        example=paragraph.text.strip()[:CHANGE_EXAMPLE_CHARS],
+                    )
             
             # 2. Format Caption Paragraph (Рис. X.X.)
             import re
@@ -1396,24 +1574,26 @@ class LocalDocumentService:
 
                 if paragraph.alignment != WD_ALIGN_PARAGRAPH.CENTER:
                     paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    changes.append(FormatChange(
-                        type="caption_alignment",
-                        description=f"Відцентровано підпис",
+                    changes.add(
+                        "caption_alignment",
+                        "Відцентровано підпис",
                         before="unset",
-                        after="center"
-                    ))
+                        after="center",
+                        example=paragraph.text.strip()[:CHANGE_EXAMPLE_CHARS],
+                    )
             
             # 3. Format Source Paragraph (Джерело:)
             if paragraph.text.strip().lower().startswith("джерело:"):
                 # Align center
                 if paragraph.alignment != WD_ALIGN_PARAGRAPH.CENTER:
                     paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                    changes.append(FormatChange(
-                        type="source_alignment",
-                        description="Відцентровано рядок джерела",
+                    changes.add(
+                        "source_alignment",
+                        "Відцентровано рядок джерела",
                         before="unset",
-                        after="center"
-                    ))
+                        after="center",
+                        example=paragraph.text.strip()[:CHANGE_EXAMPLE_CHARS],
+                    )
                 # Set Italic
                 for run in paragraph.runs:
                     if run.text.strip() and not run.font.italic:
@@ -1426,9 +1606,18 @@ class LocalDocumentService:
                         ))
                         break # Only need to log once per paragraph
         
+        if mode == "styles":
+            self._normalize_via_styles(
+                doc, params, expected_font_family, styled_paragraphs, pinned_paragraphs,
+                theme_fonts_map, doc_defaults, changes,
+            )
+        # Fonts and spacing changed: the page map (and in styles mode the defaults) must be recomputed
+        analysis.invalidate(styles=mode == "styles")
+        clock.lap("apply_text")
+
         # Apply margins
-        if doc.sections:
-            section = doc.sections[0]
+        if analysis.sections:
+            section = analysis.sections[0]
             from docx.shared import Inches
             
             # Convert mm to inches (margins in params are in mm)
@@ -1487,105 +1676,22 @@ class LocalDocumentService:
                         after=f"{new_right:.2f}\"",
                     ))
         
+        clock.lap("margins")
+
         # Apply page numbering
-        if params.check_numbering and doc.sections:
+        if params.check_numbering and analysis.sections:
             target_section_idx = 0
-            first_sec = doc.sections[0]
-            
-            # Fetch A4 or Letter page geometry from first section
-            page_height_inches = first_sec.page_height.inches if first_sec.page_height else 11.69
-            top_margin_inches = first_sec.top_margin.inches if first_sec.top_margin else 0.787
-            bottom_margin_inches = first_sec.bottom_margin.inches if first_sec.bottom_margin else 0.787
-            page_width_inches = first_sec.page_width.inches if first_sec.page_width else 8.27
-            left_margin_inches = first_sec.left_margin.inches if first_sec.left_margin else 1.18
-            right_margin_inches = first_sec.right_margin.inches if first_sec.right_margin else 0.39
-            
-            # Simplified section start page tracking
-            section_start_pages = {0: 1}
-            current_section_idx = 0
-            current_page = 1
-            page_cumulative_height = 0.0
-            
-            has_rendered_page_breaks = False
-            try:
-                has_rendered_page_breaks = len(doc.element.xpath('//*[local-name()="lastRenderedPageBreak"]')) > 0
-            except Exception:
-                pass
-                
-            usable_page_height_inches = (page_height_inches - top_margin_inches - bottom_margin_inches) * 0.95
-            usable_page_width_inches = page_width_inches - left_margin_inches - right_margin_inches
-            chars_per_line = max(40, int(usable_page_width_inches * 10.5))
-            
-            para_estimated_pages = []
-            for paragraph in doc.paragraphs:
-                para_estimated_pages.append(current_page)
-                para_font_sizes = [run.font.size.pt for run in paragraph.runs if run.font.size]
-                avg_font_size = sum(para_font_sizes) / len(para_font_sizes) if para_font_sizes else 12.0
-                
-                line_spacing_multiple = 1.15
-                if paragraph.paragraph_format.line_spacing is not None:
-                    spacing = paragraph.paragraph_format.line_spacing
-                    if isinstance(spacing, (int, float)):
-                        line_spacing_multiple = float(spacing)
-                
-                line_height_inches = (avg_font_size / 72.0) * line_spacing_multiple
-                para_text_length = len(paragraph.text)
-                estimated_lines = max(1, para_text_length // chars_per_line) if para_text_length > 0 else 1
-                para_height_inches = line_height_inches * estimated_lines
-                
-                if paragraph.paragraph_format.space_before:
-                    para_height_inches += paragraph.paragraph_format.space_before.inches
-                if paragraph.paragraph_format.space_after:
-                    para_height_inches += paragraph.paragraph_format.space_after.inches
-                
-                has_hard_break = False
-                if paragraph.paragraph_format.page_break_before:
-                    has_hard_break = True
-                else:
-                    for run in paragraph.runs:
-                        if run._element.find(qn('w:lastRenderedPageBreak')) is not None:
-                            has_hard_break = True
-                            break
-                        for br in run._element.findall(qn('w:br')):
-                            if br.get(qn('w:type')) == 'page':
-                                has_hard_break = True
-                                break
-                
-                if has_hard_break:
-                    current_page += 1
-                    page_cumulative_height = 0.0
-                
-                if not has_rendered_page_breaks:
-                    page_cumulative_height += para_height_inches
-                    if page_cumulative_height > usable_page_height_inches:
-                        current_page += 1
-                        page_cumulative_height = para_height_inches
-                
-                # Check for section break
-                pPr = paragraph._element.pPr
-                if pPr is not None:
-                    sectPr = pPr.find(qn('w:sectPr'))
-                    if sectPr is not None:
-                        next_section_idx = current_section_idx + 1
-                        
-                        break_type_elem = sectPr.find(qn('w:type'))
-                        is_continuous = break_type_elem is not None and break_type_elem.get(qn('w:val')) == 'continuous'
-                        next_section_start = current_page if is_continuous else (current_page + 1)
-                        
-                        section_start_pages[next_section_idx] = next_section_start
-                        current_section_idx = next_section_idx
-                        
-                        if not is_continuous:
-                            current_page = next_section_start
-                            page_cumulative_height = 0.0
-            
+            # Page map of the formatted document: rendered page breaks are stale after reformatting
+            layout = analysis.layout
+            section_start_pages = layout.section_start_pages
+
             # Find closest section based on numbering_start_page parameter or existing page numbers
             expected_start_page = params.numbering_start_page
             if params.skip_first_page and expected_start_page == 1:
                 expected_start_page = 2
                 
             found_existing_numbered_sec = False
-            for idx, sec in enumerate(doc.sections):
+            for idx, sec in enumerate(analysis.sections):
                 if self._contains_page_number(sec):
                     target_section_idx = idx
                     found_existing_numbered_sec = True
@@ -1593,115 +1699,65 @@ class LocalDocumentService:
             
             if expected_start_page > 2:
                 # User wants to start numbering on a later page (e.g., page 8)
-                # Use PDF twin to find the text at the start of that page, and create a section break there.
+                # Find the paragraph opening that page, and create a section break there.
                 try:
-                    from core import pdf_utils
                     from copy import deepcopy
-                    
-                    # Convert the current formatted state to bytes
-                    temp_io = BytesIO()
-                    doc.save(temp_io)
-                    formatted_bytes = temp_io.getvalue()
-                    
-                    target_text = pdf_utils.get_page_start_text_via_pdf(formatted_bytes, expected_start_page - 1)
-                    if target_text:
-                        logger.info(f"PDF twin target_text for expected start page {expected_start_page}: '{target_text}'")
-                        target_para_idx = -1
-                        import re
-                        normalized_target = re.sub(r'\s+', ' ', target_text).strip()
+
+                    if use_pdf_twin(layout):
+                        target_para_idx, normalized_target = self._find_page_start_paragraph_via_pdf(
+                            analysis, expected_start_page
+                        )
+                    else:
+                        target_para_idx = layout.paragraph_at_page_start(expected_start_page)
+                        if target_para_idx is None:
+                            target_para_idx = -1
+                            normalized_target = ""
+                        else:
+                            normalized_target = " ".join(analysis.paragraphs[target_para_idx].text.split())
+                        logger.debug("Layout estimate: page %s starts at paragraph %s", expected_start_page, target_para_idx)
+
+                    if target_para_idx > 0:
+                        prev_p = analysis.paragraphs[target_para_idx - 1]
+                        pPr = prev_p._element.get_or_add_pPr()
                         
-                        logger.info(f"PDF twin searching doc.paragraphs for start of: '{normalized_target[:100]}...'")
-                        for i, p in enumerate(doc.paragraphs):
-                            if not p.text.strip():
-                                continue
-                                
-                            # Prevent false positives on earlier pages, but allow a HUGE margin of error (6 pages)
-                            # because the naive estimator doesn't account for large images or tables which push text down.
-                            if para_estimated_pages[i] < max(0, expected_start_page - 6):
-                                continue
-                            
-                            # Skip Table of Contents (TOC) entries to avoid matching headings in TOC
-                            style_name = p.style.name.lower() if p.style else ""
-                            if any(x in style_name for x in ["toc", "table of contents", "зміст", "список"]):
-                                continue
-                                
-                            if p.text.count('.') > 5 or p.text.count('_') > 5 or p.text.count('·') > 5 or p.text.count('…') > 3:
-                                continue
-                            
-                            normalized_p = re.sub(r'\s+', ' ', p.text).strip()
-                            
-                            # Alphanumeric matching is 100% robust against split paragraphs, bullets (●), punctuation, page numbers, etc.
-                            # We strip leading numbers/punctuation and extract a distinct 6-word snippet from the PDF page start.
-                            cleaned_target = re.sub(r'^[\s\d\.\,\-\_●•○■□*+]+', '', normalized_target).strip()
-                            target_words = cleaned_target.split()
-                            search_snippet = " ".join(target_words[:6]) if len(target_words) > 6 else cleaned_target
-                            
-                            alphanumeric_snippet = "".join(re.findall(r'\w', search_snippet)).lower()
-                            alphanumeric_p = "".join(re.findall(r'\w', normalized_p)).lower()
-                            
-                            if len(alphanumeric_snippet) > 10 and len(alphanumeric_p) > 10:
-                                # Match split paragraphs (snippet inside paragraph) or short paragraphs (paragraph inside snippet)
-                                if (alphanumeric_snippet in alphanumeric_p or 
-                                    alphanumeric_p in alphanumeric_snippet):
-                                    # Ensure it's not a TOC entry by checking if it has a trailing page number pattern
-                                    if not re.search(r'\d+$', normalized_p) or re.search(r'\d+$', normalized_target):
-                                        target_para_idx = i
-                                        break
-                                
-                        if target_para_idx > 0:
-                            prev_p = doc.paragraphs[target_para_idx - 1]
-                            pPr = prev_p._element.get_or_add_pPr()
+                        # Only add section break if there isn't one already
+                        if pPr.find(qn('w:sectPr')) is None:
+                            new_sectPr = deepcopy(analysis.sections[-1]._sectPr)
                             
-                            # Only add section break if there isn't one already
-                            if pPr.find(qn('w:sectPr')) is None:
-                                new_sectPr = deepcopy(doc.sections[-1]._sectPr)
-                                
-                                # Remove copied header/footer references to force python-docx
-                                # to create new, independent parts when unlinked.
-                                for ref in list(new_sectPr.findall(qn('w:headerReference'))) + list(new_sectPr.findall(qn('w:footerReference'))):
-                                    new_sectPr.remove(ref)
-                                    
-                                type_elem = new_sectPr.find(qn('w:type'))
-                                if type_elem is not None:
-                                    type_elem.set(qn('w:val'), 'nextPage')
-                                else:
-                                    type_elem = etree.SubElement(new_sectPr, qn('w:type'))
-                                    type_elem.set(qn('w:val'), 'nextPage')
-                                    
-                                pPr.append(new_sectPr)
+                            # Remove copied header/footer references to force python-docx
+                            # to create new, independent parts when unlinked.
+                            for ref in list(new_sectPr.findall(qn('w:headerReference'))) + list(new_sectPr.findall(qn('w:footerReference'))):
+                                new_sectPr.remove(ref)
                                 
-                                changes.append(FormatChange(
-                                    type="page_numbering",
-                                    description=f"Created section break for page {expected_start_page}",
-                                    before="No section break",
-                                    after=f"Inserted section break before: '{normalized_target[:50]}...'",
-                                ))
-                                
-                                # Reload document to parse the new section break correctly
-                                temp_io = BytesIO()
-                                doc.save(temp_io)
-                                temp_io.seek(0)
-                                doc = Document(temp_io)
+                            type_elem = new_sectPr.find(qn('w:type'))
+                            if type_elem is not None:
+                                type_elem.set(qn('w:val'), 'nextPage')
                             else:
-                                logger.info("Found existing section break at target paragraph.")
+                                type_elem = etree.SubElement(new_sectPr, qn('w:type'))
+                                type_elem.set(qn('w:val'), 'nextPage')
                                 
-                            # Find the target section index
-                            current_sec_idx = 0
-                            target_section_idx = -1
-                            for i, p in enumerate(doc.paragraphs):
-                                if i == target_para_idx:
-                                    target_section_idx = current_sec_idx
-                                    break
-                                if p._element.pPr is not None and p._element.pPr.find(qn('w:sectPr')) is not None:
-                                    current_sec_idx += 1
-                                    
-                            if target_section_idx == -1:
-                                target_section_idx = current_sec_idx
+                            pPr.append(new_sectPr)
                             
-                            found_existing_numbered_sec = True
-                            logger.info(f"PDF twin found target section idx: {target_section_idx}")
+                            changes.append(FormatChange(
+                                type="page_numbering",
+                                description=f"Created section break for page {expected_start_page}",
+                                before="No section break",
+                                after=f"Inserted section break before: '{normalized_target[:50]}...'",
+                            ))
+                            
+                            # Reload document to parse the new section break correctly
+                            analysis.reload(write_docx(doc, analysis.content))
+                            doc = analysis.doc
+                        else:
+                            logger.debug("Found existing section break at target paragraph.")
+                            
+                        # Find the target section index
+                        target_section_idx = analysis.paragraph_sections[target_para_idx]
+                        
+                        found_existing_numbered_sec = True
+                        logger.debug("Numbering target section idx: %s", target_section_idx)
                 except Exception as e:
-                    logger.error(f"Failed to create section break via PDF twin: {e}")
+                    logger.error("Failed to create section break for page %s: %s", expected_start_page, e)
             
             if not found_existing_numbered_sec:
                 for idx in sorted(section_start_pages.keys(), reverse=True):
@@ -1709,7 +1765,7 @@ class LocalDocumentService:
                         target_section_idx = idx
                         break
             
-            section = doc.sections[target_section_idx]
+            section = analysis.sections[target_section_idx]
             pn_location = self._find_page_number_location(doc)
             
             # Unlink header/footers from previous sections to prevent page numbers propagating backwards
@@ -1720,12 +1776,12 @@ class LocalDocumentService:
                         try:
                             f.is_linked_to_previous = False
                         except Exception as e:
-                            logger.error(f"Failed to unlink {f_type} for section {target_section_idx}: {e}")
+                            logger.error("Failed to unlink %s for section %s: %s", f_type, target_section_idx, e)
                             
             # Clear headers/footers in all preceding sections so no page numbers are displayed there
             if target_section_idx > 0:
                 for idx in range(target_section_idx):
-                    prev_section = doc.sections[idx]
+                    prev_section = analysis.sections[idx]
                     for f_type in [pn_location, f'first_page_{pn_location}', f'even_page_{pn_location}']:
                         f = getattr(prev_section, f_type, None)
                         if f is not None:
@@ -1734,7 +1790,7 @@ class LocalDocumentService:
                                     f._element.remove(child)
                                 f.add_paragraph()
                             except Exception as e:
-                                logger.error(f"Failed to clear {f_type} in section {idx}: {e}")
+                                logger.error("Failed to clear %s in section %s: %s", f_type, idx, e)
             
             # Set up "Different first page" based on skip_first_page parameter
             try:
@@ -1769,7 +1825,7 @@ class LocalDocumentService:
                             after="Same header/footer on all pages",
                         ))
             except Exception as e:
-                print(f"Error setting first page different: {e}")
+                logger.warning("Error setting first page different: %s", e)
             
             # Set page number start value
             try:
@@ -1793,7 +1849,7 @@ class LocalDocumentService:
                         after=f"Start: {start_val}",
                     ))
             except Exception as e:
-                print(f"Error setting page number start: {e}")
+                logger.warning("Error setting page number start: %s", e)
             
             # Add page number field to header/footer if not present or make sure it is right-aligned
             try:
@@ -1865,26 +1921,47 @@ class LocalDocumentService:
                                     after="Right-aligned",
                                 ))
             except Exception as e:
-                print(f"Error adding page numbers: {e}")
+                logger.warning("Error adding page numbers: %s", e)
         
-        # Save modified document to bytes
-        output = BytesIO()
-        doc.save(output)
-        output.seek(0)
-        modified_content = output.getvalue()
+        clock.lap("page_numbering")
+
+        # Serialize the modified parts; media and other untouched parts are copied as they are
+        modified_content = write_docx(doc, analysis.content)
+        # Header/footer and numbering edits leave the body page map computed above valid
+        analysis.written(modified_content)
+        clock.lap("save")
         
         processing_time = int((time.time() - start_time) * 1000)
         
         result = FormatterResult(
             success=True,
             changes_applied=len(changes),
-            changes=changes,
+            changes=changes.entries(),
             processing_time_ms=processing_time,
             document_title=doc_title,
         )
         
         return modified_content, result
 
+    def format_and_check_document(
+        self,
+        file_content: bytes,
+        params: TemplateParams,
+        expected_font_family: Optional[str] = None,
+        mode: str = "runs",
+        detailed_changes: bool = False,
+    ) -> tuple[DocxStream, FormatterResult, CheckResult]:
+        """
+        format_document() followed by check_document() on the formatted tree in memory,
+        so the output is neither parsed nor extracted a second time.
+        """
+        analysis = self.analyze(file_content)
+        formatted_content, format_result = self.format_document(
+            file_content, params, expected_font_family, mode, detailed_changes, analysis=analysis
+        )
+        check_result = self.check_document(file_content, params, expected_font_family, analysis=analysis)
+        return formatted_content, format_result, check_result
+
 
 # Dependency for FastAPI
 LocalDocumentServiceDependency = Annotated[LocalDocumentService, Depends(LocalDocumentService)]
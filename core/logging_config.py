@@ -0,0 +1,158 @@
+"""
+Process-wide logging setup.
+
+Log calls only enqueue the record (QueueHandler); a single QueueListener thread formats it
+as one JSON line and writes it to stdout, so the document pipeline never waits on I/O.
+
+Every record carries the id of the HTTP request it was logged under (the `X-Request-Id`
+header, or a generated one that is echoed back). contextvars follow run_in_threadpool, so
+worker-thread logs are correlated too. With LOG_DEBUG_SAMPLE_RATE > 0 the app's DEBUG
+records are kept for that share of requests; the decision is made once per request, so a
+sampled request is logged in full.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Loggers whose DEBUG records take part in sampling; third-party libraries stay at LOG_LEVEL
+APP_LOGGERS = ("main", "core", "controllers", "crud", "common")
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_debug_sampled: ContextVar[bool] = ContextVar("debug_sampled", default=False)
+_listener: Optional[QueueListener] = None
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Runs in the logging thread (on the QueueHandler): stamps the request id and, when
+    sampling, drops DEBUG records of requests that were not sampled.
+    """
+
+    def __init__(self, sample_debug: bool):
+        super().__init__()
+        self.sample_debug = sample_debug
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sample_debug and record.levelno < logging.INFO and not _debug_sampled.get():
+            return False
+        record.request_id = _request_id.get()
+        return True
+
+
+class _ContextQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the message and render the traceback here (frames must not outlive the call),
+        # but leave the rest of the formatting to the listener thread
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", debug_sample_rate: float = 0.0) -> None:
+    """Route all logging (uvicorn's included) through one queue; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+
+    level_no = logging.getLevelName(level.upper())
+    if not isinstance(level_no, int):
+        level_no = logging.INFO
+    sample_debug = debug_sample_rate > 0 and level_no > logging.DEBUG
+
+    output = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT, defaults={"request_id": "-"}))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _ContextQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter(sample_debug))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level_no)
+    if sample_debug:
+        for name in APP_LOGGERS:
+            logging.getLogger(name).setLevel(logging.DEBUG)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class RequestContextMiddleware:
+    """ASGI middleware assigning each HTTP request its correlation id and debug-sampling decision."""
+
+    def __init__(self, app, debug_sample_rate: float = 0.0):
+        self.app = app
+        self.debug_sample_rate = debug_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        # Accept the caller's id only if it is a sane token, so it cannot inject into log lines
+        if not request_id or len(request_id) > 128 or not request_id.isprintable():
+            request_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        id_token = _request_id.set(request_id)
+        sampled_token = _debug_sampled.set(
+            self.debug_sample_rate > 0 and random.random() < self.debug_sample_rate
+        )
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(id_token)
+            _debug_sampled.reset(sampled_token)
@@ -0,0 +1,367 @@
+"""
+In-process metrics rendered in the Prometheus text format on `/metrics`.
+
+Every worker process keeps its own registry, so scrape each worker (or run a single
+worker per container). Collection is a dict update under a lock; nothing is exported
+unless `/metrics` is scraped.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterable, Iterator, Optional
+
+from core.profiling import current_profiler
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        yield from self._render_samples()
+
+    def _render_samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class _Value(_Metric):
+    """
+    Counter/gauge storage. Values are either updated in place or computed at scrape time
+    by `callback`, which returns {label values tuple: value} (for state owned elsewhere).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        callback: Optional[Callable[[], dict[tuple[str, ...], float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self) -> Iterator[str]:
+        if self.callback is not None:
+            values = list(self.callback().items())
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_Value):
+    type_name = "counter"
+
+
+class Gauge(_Value):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items()]
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), callback=None) -> Counter:
+        return self._register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), callback=None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            try:
+                lines.extend(list(metric.render()))
+            except Exception:
+                # A failing scrape-time callback must not take the whole endpoint down
+                continue
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "diploma_stage_duration_seconds", "Time spent in one processing stage", ("stage",)
+)
+JOB_SECONDS = registry.histogram(
+    "diploma_job_duration_seconds", "Total time of a check/format job", ("job",)
+)
+JOBS_TOTAL = registry.counter("diploma_jobs_total", "Finished check/format jobs", ("job", "outcome"))
+JOBS_IN_FLIGHT = registry.gauge("diploma_jobs_in_flight", "Check/format jobs currently running", ("job",))
+CACHE_REQUESTS = registry.counter(
+    "diploma_cache_requests_total", "In-process cache lookups", ("cache", "result")
+)
+
+
+def cache_hit(cache: str, count: int = 1) -> None:
+    CACHE_REQUESTS.inc(count, cache=cache, result="hit")
+
+
+def cache_miss(cache: str, count: int = 1) -> None:
+    CACHE_REQUESTS.inc(count, cache=cache, result="miss")
+
+
+class StageClock:
+    """
+    Splits one long function into stages without restructuring it:
+    `clock.lap("parse")` records the time since the previous lap as stage "<prefix>.parse".
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        _observe_stage(f"{self.prefix}.{stage}", now - self._last)
+        self._last = now
+
+    def skip(self) -> None:
+        """Restart the clock without recording (e.g. after a part timed elsewhere)"""
+        self._last = time.perf_counter()
+
+
+def _observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    profiler = current_profiler()
+    if profiler is not None:
+        profiler.record_stage(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe_stage(stage, time.perf_counter() - started)
+
+
+def tracked_job(job: str):
+    """Decorator: count, time and track in-flight runs of a (blocking) job function."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            JOBS_IN_FLIGHT.inc(job=job)
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                JOBS_IN_FLIGHT.dec(job=job)
+                JOB_SECONDS.observe(time.perf_counter() - started, job=job)
+                JOBS_TOTAL.inc(job=job, outcome=outcome)
+        return wrapper
+    return decorator
+
+
+# --- HTTP ---
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "diploma_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = registry.gauge("diploma_http_requests_in_flight", "HTTP requests being served")
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by route template (not raw path, to bound cardinality)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, method=scope["method"], route=route, status=str(status_code)
+            )
+
+
+# --- Database ---
+
+DB_QUERY_SECONDS = registry.histogram(
+    "diploma_db_query_duration_seconds", "SQL statement latency", ("operation",)
+)
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement and expose connection pool usage for an (async) SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["_query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, operation=operation)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(context):
+        if context.connection is not None:
+            stack = context.connection.info.get("_query_started")
+            if stack:
+                stack.pop()
+
+    pool = sync_engine.pool
+
+    def pool_stats() -> dict[tuple[str, ...], float]:
+        stats = {}
+        for name in ("size", "checkedout", "overflow", "checkedin"):
+            getter = getattr(pool, name, None)
+            if callable(getter):
+                stats[(name,)] = getter()
+        return stats
+
+    registry.gauge("diploma_db_pool_connections", "Connection pool usage", ("state",), callback=pool_stats)
+
+
+# --- Worker threadpool (sync Google / docx / LibreOffice work runs here) ---
+
+def _threadpool_stats() -> dict[tuple[str, ...], float]:
+    import anyio.to_thread
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    return {
+        ("size",): limiter.total_tokens,
+        ("busy",): statistics.borrowed_tokens,
+        ("waiting",): statistics.tasks_waiting,
+    }
+
+
+registry.gauge(
+    "diploma_threadpool_threads", "Worker threadpool usage; 'waiting' is the queue depth", ("state",),
+    callback=_threadpool_stats,
+)
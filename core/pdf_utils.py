@@ -1,18 +1,20 @@
+import functools
+import json
+import logging
 import os
+import re
 import tempfile
 import subprocess
+from typing import Optional
+
+from core.metrics import StageClock
 
 try:
     import fitz  # PyMuPDF
 except ImportError:
     fitz = None
 
-class SimpleLogger:
-    def info(self, msg): print("INFO:", msg, flush=True)
-    def error(self, msg): print("ERROR:", msg, flush=True)
-    def warning(self, msg): print("WARNING:", msg, flush=True)
-
-logger = SimpleLogger()
+logger = logging.getLogger(__name__)
 
 def _find_soffice_path_on_windows() -> str | None:
     """Helper to locate soffice.exe on Windows using registry or common paths."""
@@ -40,163 +42,181 @@ def _find_soffice_path_on_windows() -> str | None:
             
     return None
 
+def _page_range_filter(first_page: int, last_page: int) -> str:
+    """LibreOffice --convert-to target exporting only pages first_page..last_page (1-based)"""
+    options = {"PageRange": {"type": "string", "value": f"{first_page}-{last_page}"}}
+    return "pdf:writer_pdf_Export:" + json.dumps(options, separators=(",", ":"))
+
+
+def _run_soffice(args: list[str]) -> subprocess.CompletedProcess:
+    """Run LibreOffice with `args`, trying `libreoffice`, `soffice` and the Windows install in turn"""
+    command = ["libreoffice", *args]
+    try:
+        return subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        # Fallback for Windows if 'libreoffice' is not in PATH but 'soffice' is
+        command[0] = "soffice"
+        try:
+            return subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            win_path = _find_soffice_path_on_windows() if os.name == 'nt' else None
+            if not win_path:
+                raise
+            command[0] = win_path
+            return subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+# JSON filter options (and with them PageRange on --convert-to) arrived in LibreOffice 7.4
+_PAGE_RANGE_MIN_VERSION = (7, 4)
+
+
+@functools.lru_cache(maxsize=1)
+def supports_page_range() -> bool:
+    """
+    Whether the installed LibreOffice honours PageRange in `convert_docx_to_pdf()`, from
+    `--version` (checked once per process). Older versions silently export every page.
+    """
+    try:
+        output = _run_soffice(["--version"]).stdout.decode("utf-8", errors="ignore")
+    except Exception as e:
+        logger.warning("Could not determine the LibreOffice version, rendering whole documents: %s", e)
+        return False
+    match = re.search(r"(\d+)\.(\d+)", output)
+    if match is None:
+        logger.warning("Unrecognised LibreOffice version %r, rendering whole documents", output.strip())
+        return False
+    return (int(match.group(1)), int(match.group(2))) >= _PAGE_RANGE_MIN_VERSION
+
+
+def convert_docx_to_pdf(docx_path: str, out_dir: str, page_range: Optional[tuple[int, int]] = None) -> Optional[str]:
+    """
+    Convert `docx_path` with LibreOffice and return the PDF path (None on failure).
+    With `page_range` (1-based, inclusive) only those pages are exported; LibreOffice still
+    lays out the document up to them, but the rest is never written to the PDF or parsed.
+    Only pass a range when `supports_page_range()`.
+    """
+    target = _page_range_filter(*page_range) if page_range else "pdf"
+    try:
+        _run_soffice(["--headless", "--convert-to", target, docx_path, "--outdir", out_dir])
+        logger.debug("LibreOffice conversion successful")
+    except subprocess.CalledProcessError as e:
+        logger.error("LibreOffice conversion failed: %s", e.stderr.decode('utf-8', errors='ignore'))
+        return None
+    except Exception as e:
+        logger.error("Failed to run LibreOffice: %s", e)
+        return None
+
+    pdf_path = os.path.splitext(os.path.join(out_dir, os.path.basename(docx_path)))[0] + ".pdf"
+    if not os.path.exists(pdf_path):
+        logger.error("PDF was not created by LibreOffice.")
+        return None
+    return pdf_path
+
+
 def get_page_start_text_via_pdf(docx_bytes: bytes, target_page_index: int, max_words: int = 40) -> str | None:
     """
-    Converts a docx document to PDF using LibreOffice and returns the first few words 
-    of the specified physical page (0-indexed).
+    Renders only the specified physical page (0-indexed) of a docx document to PDF with
+    LibreOffice and returns its first few words.
     This helps in mapping physical pages back to the original docx paragraphs.
     """
     if fitz is None:
         logger.error("PyMuPDF (fitz) is not installed.")
         return None
+    if target_page_index < 0:
+        return None
 
     with tempfile.TemporaryDirectory() as temp_dir:
         docx_path = os.path.join(temp_dir, "temp.docx")
         with open(docx_path, "wb") as f:
             f.write(docx_bytes)
-            
-        # Run LibreOffice to convert
-        try:
-            # Note: on Windows it might be 'soffice', on Linux 'libreoffice'
-            command = [
-                "libreoffice", "--headless", "--convert-to", "pdf", 
-                docx_path, "--outdir", temp_dir
-            ]
-            
-            logger.info(f"Running LibreOffice to convert docx to PDF for page {target_page_index} extraction")
-            try:
-                subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                logger.info("LibreOffice conversion (libreoffice) successful")
-            except FileNotFoundError:
-                # Fallback for Windows if 'libreoffice' is not in PATH but 'soffice' is
-                command[0] = "soffice"
-                try:
-                    subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                except FileNotFoundError:
-                    if os.name == 'nt':
-                        win_path = _find_soffice_path_on_windows()
-                        if win_path:
-                            command[0] = win_path
-                            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                        else:
-                            raise
-                    else:
-                        raise
-                
-        except subprocess.CalledProcessError as e:
-            logger.error(f"LibreOffice conversion failed: {e.stderr.decode('utf-8', errors='ignore')}")
-            return None
-        except Exception as e:
-            logger.error(f"Failed to run LibreOffice: {e}")
-            return None
-            
-        pdf_path = os.path.join(temp_dir, "temp.pdf")
-        if not os.path.exists(pdf_path):
-            logger.error("PDF was not created by LibreOffice.")
+        clock = StageClock("pdf")
+
+        page_range = (target_page_index + 1, target_page_index + 1) if supports_page_range() else None
+        logger.debug("Running LibreOffice to render page %s for start text extraction", target_page_index)
+        pdf_path = convert_docx_to_pdf(docx_path, temp_dir, page_range)
+        clock.lap("libreoffice")
+        if pdf_path is None:
             return None
-            
+
         try:
-            doc = fitz.open(pdf_path)
-            if target_page_index < 0 or target_page_index >= len(doc):
-                logger.warning(f"Target page index {target_page_index} is out of bounds (total pages: {len(doc)}).")
-                doc.close()
-                return None
-                
-            page = doc[target_page_index]
-            text = page.get_text("text").strip()
-            doc.close()
-            
+            with fitz.open(pdf_path) as doc:
+                page_index = 0 if page_range else target_page_index
+                if page_index >= len(doc):
+                    logger.warning("Target page index %s is out of bounds (rendered pages: %s).", target_page_index, len(doc))
+                    return None
+                text = doc.load_page(page_index).get_text("text").strip()
+            clock.lap("pymupdf")
+
             if not text:
                 return ""
-                
+
             # Take the first few words
             words = text.split()
             first_words = " ".join(words[:max_words])
-            logger.info(f"Successfully extracted {len(words)} words from page {target_page_index}. Start text: '{first_words}'")
+            logger.debug("Successfully extracted %s words from page %s. Start text: '%s'", len(words), target_page_index, first_words)
             return first_words
-            
+
         except Exception as e:
-            logger.error(f"Failed to read PDF with PyMuPDF: {e}")
+            logger.error("Failed to read PDF with PyMuPDF: %s", e)
             return None
 
-def find_text_in_pdf_pages(docx_bytes: bytes, target_text: str) -> int | None:
+
+def find_text_in_pdf_pages(
+    docx_bytes: bytes, target_text: str, page_range: Optional[tuple[int, int]] = None
+) -> int | None:
     """
-    Converts a docx document to PDF and finds the 1-indexed page number where 
+    Converts a docx document to PDF and finds the 1-indexed page number where
     the target_text appears.
+    With `page_range` (1-based, inclusive) only those pages are rendered and searched
+    (the whole document when the installed LibreOffice cannot export a page range).
+    Pages are extracted one at a time and the search stops at the first match.
     """
     if fitz is None:
         logger.error("PyMuPDF (fitz) is not installed.")
         return None
-        
+
     if not target_text.strip():
         return None
 
+    if page_range and not supports_page_range():
+        page_range = None
+
     with tempfile.TemporaryDirectory() as temp_dir:
         docx_path = os.path.join(temp_dir, "temp.docx")
         with open(docx_path, "wb") as f:
             f.write(docx_bytes)
-            
-        try:
-            command = [
-                "libreoffice", "--headless", "--convert-to", "pdf", 
-                docx_path, "--outdir", temp_dir
-            ]
-            logger.info(f"Running LibreOffice to convert docx to PDF to find text: '{target_text[:30]}...'")
-            try:
-                subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                logger.info("LibreOffice conversion (libreoffice) successful")
-            except FileNotFoundError:
-                command[0] = "soffice"
-                try:
-                    subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                except FileNotFoundError:
-                    if os.name == 'nt':
-                        win_path = _find_soffice_path_on_windows()
-                        if win_path:
-                            command[0] = win_path
-                            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                        else:
-                            raise
-                    else:
-                        raise
-        except Exception as e:
-            logger.error(f"Failed to run LibreOffice: {e}")
-            return None
-            
-        pdf_path = os.path.join(temp_dir, "temp.pdf")
-        if not os.path.exists(pdf_path):
+        clock = StageClock("pdf")
+
+        logger.debug("Running LibreOffice to convert docx to PDF (pages %s) to find text: '%s...'", page_range or "all", target_text[:30])
+        pdf_path = convert_docx_to_pdf(docx_path, temp_dir, page_range)
+        clock.lap("libreoffice")
+        if pdf_path is None:
             return None
-            
+
         try:
-            doc = fitz.open(pdf_path)
-            num_pages = len(doc)
             target_words = target_text.split()
             # Try to match up to 40 words to be robust against slight formatting changes
             # while ensuring the string is long enough to bypass Table of Contents entries
-            search_string = " ".join(target_words[:40]) if len(target_words) > 40 else target_text
-            
-            # Normalize search string spaces
-            import re
-            search_string = re.sub(r'\s+', ' ', search_string).strip()
-            
+            search_string = " ".join(target_words[:40])
+
             found_page = None
-            for page_num in range(num_pages):
-                page = doc[page_num]
-                text = page.get_text("text")
-                # Normalize text spaces and newlines
-                text = re.sub(r'\s+', ' ', text)
-                if search_string in text:
-                    found_page = page_num + 1
-                    break
-                    
-            doc.close()
+            with fitz.open(pdf_path) as doc:
+                first_page = page_range[0] if page_range else 1
+                num_pages = len(doc)
+                for page_num in range(num_pages):
+                    # Normalize text spaces and newlines
+                    text = " ".join(doc.load_page(page_num).get_text("text").split())
+                    if search_string in text:
+                        found_page = first_page + page_num
+                        break
+
+            clock.lap("pymupdf")
             if found_page:
-                logger.info(f"Successfully found text on page {found_page}")
+                logger.debug("Successfully found text on page %s", found_page)
             else:
-                logger.warning(f"Could not find text in any of the {num_pages} pages: '{search_string}'")
+                logger.warning("Could not find text in any of the %s rendered pages: '%s'", num_pages, search_string)
             return found_page
-            
+
         except Exception as e:
-            logger.error(f"Failed to read PDF with PyMuPDF: {e}")
+            logger.error("Failed to read PDF with PyMuPDF: %s", e)
             return None
-
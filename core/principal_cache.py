@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from uuid import UUID
+
+from crud.cache_version import CacheVersionRepository
+from core.cache_version import CacheVersionWatcher
+from core.metrics import cache_hit, cache_miss
+from models.user import User, UserRole
+from common.app_settings import settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    """What request authorization needs to know about the caller."""
+    id: UUID
+    role: UserRole
+    is_banned: bool
+
+    @staticmethod
+    def from_user(user: User) -> 'Principal':
+        return Principal(id=user.id, role=user.role, is_banned=bool(user.is_banned))
+
+
+class PrincipalCache:
+    """
+    Bounded LRU + TTL cache: JWT `sub` -> Principal.
+
+    Saves the users-table lookup on nearly every authenticated request. UserService
+    evicts an entry as soon as the user is banned, unbanned or deleted, and bumps the
+    "principals" version row so other workers flush their copies on their next poll;
+    the TTL bounds staleness for changes made outside the service (e.g. a manual role change).
+    """
+
+    VERSION_NAME = "principals"
+
+    def __init__(self, ttl_seconds: float, max_size: int, poll_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        # Bumped by every evict/flush, so a principal read from the database before one is not stored
+        self._generation = 0
+        self._watcher = CacheVersionWatcher(self.VERSION_NAME, poll_seconds)
+
+    async def sync(self, cache_version_repository: CacheVersionRepository) -> None:
+        """Flush everything if another node published an invalidation."""
+        if await self._watcher.poll(cache_version_repository):
+            self._entries.clear()
+            self._generation += 1
+
+    @property
+    def generation(self) -> int:
+        """Read before loading a principal and pass it to `put()`"""
+        return self._generation
+
+    def get(self, sub: str) -> Optional[Principal]:
+        entry = self._entries.get(sub)
+        if entry is None:
+            cache_miss("principals")
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(sub, None)
+            cache_miss("principals")
+            return None
+        self._entries.move_to_end(sub)
+        cache_hit("principals")
+        return principal
+
+    def put(self, sub: str, principal: Principal, generation: int) -> None:
+        """Store `principal` unless an evict or flush happened since `generation` was read"""
+        if generation != self._generation:
+            return
+        self._entries[sub] = (time.monotonic() + self.ttl_seconds, principal)
+        self._entries.move_to_end(sub)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def evict(self, user_id: UUID, cache_version_repository: CacheVersionRepository) -> None:
+        """Drop the user's entry here and on every other node."""
+        self._entries.pop(str(user_id), None)
+        self._generation += 1
+        await self._watcher.bump(cache_version_repository)
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    poll_seconds=settings.CACHE_VERSION_POLL_SECONDS,
+)
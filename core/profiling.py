@@ -0,0 +1,134 @@
+"""
+On-demand profiling of a single check/format request.
+
+Admins add `X-Profile: 1` (or `?profile=1`) to a check/format call; the blocking job then
+runs under pyinstrument (when installed) or cProfile with tracemalloc on, and every
+StageClock lap records the allocation peak of its stage. Without the switch the job is
+called directly - nothing here runs.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from functools import wraps
+from typing import Optional
+
+from fastapi import Request
+
+from models.user import UserRole
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+_TRUE_VALUES = ("1", "true", "yes", "on")
+_REPORT_LINES = 60
+
+_local = threading.local()
+# tracemalloc is process-wide, so profiled jobs run one at a time (they queue in their worker thread)
+_exclusive = threading.Lock()
+
+
+def profile_requested(request: Request, user) -> bool:
+    """True if the caller is an admin and asked for a profile (header or query flag)"""
+    if user is None or user.role != UserRole.ADMIN:
+        return False
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get("profile")
+    return flag is not None and flag.lower() in _TRUE_VALUES
+
+
+def current_profiler() -> Optional["RequestProfiler"]:
+    """The profiler of the job running in this thread, if any"""
+    return getattr(_local, "profiler", None)
+
+
+@dataclass
+class StageSample:
+    stage: str
+    seconds: float
+    peak_memory_bytes: int
+
+    def to_dict(self) -> dict:
+        return {"stage": self.stage, "seconds": round(self.seconds, 4), "peak_memory_bytes": self.peak_memory_bytes}
+
+
+@dataclass
+class ProfileReport:
+    profiler: str  # "pyinstrument" | "cprofile"
+    duration_ms: int
+    peak_memory_bytes: int
+    stages: list[StageSample]
+    report: str  # call tree (pyinstrument) or top functions by cumulative time (cProfile)
+    artifact: bytes  # pyinstrument HTML flame view, or a pstats dump (open with snakeviz)
+    artifact_type: str  # "html" | "pstats"
+
+
+class RequestProfiler:
+    """Profiles one blocking job; create one per request and call `wrap()` on the job."""
+
+    def __init__(self):
+        self.stages: list[StageSample] = []
+        self.report: Optional[ProfileReport] = None
+        self._peak = 0
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        """Called by StageClock/timed_stage: attribute the allocation peak since the last stage"""
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        self._peak = max(self._peak, peak)
+        self.stages.append(StageSample(stage, seconds, peak))
+
+    def wrap(self, func):
+        @wraps(func)
+        def profiled(*args, **kwargs):
+            with _exclusive:
+                return self._run(func, args, kwargs)
+        return profiled
+
+    def _run(self, func, args, kwargs):
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        use_cprofile = PyinstrumentProfiler is None
+        profiler = cProfile.Profile() if use_cprofile else PyinstrumentProfiler(async_mode="disabled")
+        _local.profiler = self
+        started = time.perf_counter()
+        if use_cprofile:
+            profiler.enable()
+        else:
+            profiler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if use_cprofile:
+                profiler.disable()
+            else:
+                profiler.stop()
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            _local.profiler = None
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            if not was_tracing:
+                tracemalloc.stop()
+            self.report = self._build_report(profiler, duration_ms)
+
+    def _build_report(self, profiler, duration_ms: int) -> ProfileReport:
+        if isinstance(profiler, cProfile.Profile):
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(_REPORT_LINES)
+            profiler.create_stats()
+            return ProfileReport(
+                "cprofile", duration_ms, self._peak, self.stages,
+                stream.getvalue(), marshal.dumps(profiler.stats), "pstats",
+            )
+        return ProfileReport(
+            "pyinstrument", duration_ms, self._peak, self.stages,
+            profiler.output_text(unicode=True, color=False), profiler.output_html().encode("utf-8"), "html",
+        )
@@ -38,7 +38,7 @@ class RateLimitService:
         ua_hash = hashlib.md5(ua.encode()).hexdigest()[:8]
         return f"{ip}|{ua_hash}"
 
-    def check_and_increment_anonymous_limit(self, request: Request) -> dict:
+    async def check_and_increment_anonymous_limit(self, request: Request) -> dict:
         """
         Check if anonymous user has exceeded daily limit and increment count.
         
@@ -49,7 +49,7 @@ class RateLimitService:
             HTTPException if limit exceeded
         """
         identifier = self._get_identifier(request)
-        current_count = self.anonymous_check_repository.get_check_count_today(identifier)
+        current_count = await self.anonymous_check_repository.get_check_count_today(identifier)
         
         if current_count >= ANONYMOUS_DAILY_CHECK_LIMIT:
             raise HTTPException(
@@ -58,15 +58,15 @@ class RateLimitService:
             )
         
         # Increment the count
-        self.anonymous_check_repository.increment_check_count(identifier)
+        await self.anonymous_check_repository.increment_check_count(identifier)
         
         remaining = ANONYMOUS_DAILY_CHECK_LIMIT - current_count - 1
         return {"remaining_checks": remaining}
     
-    def get_remaining_checks(self, request: Request) -> int:
+    async def get_remaining_checks(self, request: Request) -> int:
         """Get the number of remaining checks for an anonymous user today."""
         identifier = self._get_identifier(request)
-        current_count = self.anonymous_check_repository.get_check_count_today(identifier)
+        current_count = await self.anonymous_check_repository.get_check_count_today(identifier)
         return max(0, ANONYMOUS_DAILY_CHECK_LIMIT - current_count)
 
 
@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import Annotated, Optional
+from uuid import UUID
+
+from fastapi import Depends, HTTPException, status
+
+from crud import RequestProfileRepositoryDependency
+from core.profiling import RequestProfiler
+from models import RequestProfile
+from schemas.request_profile import RequestProfileDto, RequestProfileSummaryDto
+
+
+class RequestProfileService:
+    def __init__(self, request_profile_repository: RequestProfileRepositoryDependency):
+        self.request_profile_repository = request_profile_repository
+
+    async def save_profile(
+        self,
+        profiler: RequestProfiler,
+        user_id: UUID,
+        endpoint: str,
+        details: Optional[dict] = None,
+    ) -> Optional[RequestProfile]:
+        """Store the profiler's report; None if the profiled job never ran."""
+        report = profiler.report
+        if report is None:
+            return None
+        return await self.request_profile_repository.create_profile(RequestProfile(
+            user_id=user_id,
+            endpoint=endpoint,
+            profiler=report.profiler,
+            duration_ms=report.duration_ms,
+            peak_memory_bytes=report.peak_memory_bytes,
+            stages=[stage.to_dict() for stage in report.stages],
+            details=details,
+            report=report.report,
+            artifact=report.artifact,
+            artifact_type=report.artifact_type,
+            created_at=datetime.utcnow(),
+        ))
+
+    async def get_profiles(self, limit: int = 50, offset: int = 0) -> list[RequestProfileSummaryDto]:
+        profiles = await self.request_profile_repository.get_profiles(limit=limit, offset=offset)
+        return [RequestProfileSummaryDto.from_profile(profile) for profile in profiles]
+
+    async def get_profile(self, profile_id: UUID) -> RequestProfileDto:
+        profile = await self.request_profile_repository.get_profile(profile_id)
+        if not profile:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+        return RequestProfileDto.from_profile(profile)
+
+    async def get_artifact(self, profile_id: UUID) -> tuple[bytes, str]:
+        """(artifact bytes, artifact type)"""
+        profile = await self.request_profile_repository.get_profile(profile_id, with_artifact=True)
+        if not profile:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+        return profile.artifact, profile.artifact_type
+
+
+RequestProfileServiceDependency = Annotated[RequestProfileService, Depends(RequestProfileService)]
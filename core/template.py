@@ -2,31 +2,33 @@ from typing import Annotated, Optional
 
 from fastapi import Depends, HTTPException, status
 
-from crud import TemplateRepositoryDependency
+from crud import TemplateRepositoryDependency, CacheVersionRepositoryDependency
+from core.template_cache import template_cache
 from models import Template
 from schemas.template import TemplateCreate, TemplateDto
 
 
 class TemplateService:
-    def __init__(self, template_repository: TemplateRepositoryDependency):
+    def __init__(
+        self,
+        template_repository: TemplateRepositoryDependency,
+        cache_version_repository: CacheVersionRepositoryDependency,
+    ):
         self.template_repository = template_repository
+        self.cache_version_repository = cache_version_repository
 
-    def get_template(self, template_id: int) -> Optional[TemplateDto]:
-        """Get template by ID."""
-        template = self.template_repository.get_template_by_id(template_id)
-        if not template:
-            return None
-        return TemplateDto.from_template(template)
+    async def get_template(self, template_id: int) -> Optional[TemplateDto]:
+        """Get template by ID (served from the template cache)."""
+        return await template_cache.get(template_id, self.template_repository, self.cache_version_repository)
 
-    def get_all_templates(self, include_inactive: bool = False) -> list[TemplateDto]:
-        """Get all templates, optionally including inactive ones."""
-        templates = self.template_repository.get_all_templates(active_only=not include_inactive)
-        return [TemplateDto.from_template(t) for t in templates]
+    async def get_all_templates(self, include_inactive: bool = False) -> list[TemplateDto]:
+        """Get all templates, optionally including inactive ones (served from the template cache)."""
+        return await template_cache.get_all(include_inactive, self.template_repository, self.cache_version_repository)
 
-    def create_template(self, data: TemplateCreate) -> TemplateDto:
+    async def create_template(self, data: TemplateCreate) -> TemplateDto:
         """Create a new template (admin only)."""
         # Check if template with same name exists
-        existing = self.template_repository.get_template_by_name(data.name)
+        existing = await self.template_repository.get_template_by_name(data.name)
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -39,10 +41,11 @@ class TemplateService:
             font_id=data.font_id,
             params=data.params.model_dump(),
         )
-        created_template = self.template_repository.create_template(template)
+        created_template = await self.template_repository.create_template(template)
+        await template_cache.invalidate(self.cache_version_repository)
         return TemplateDto.from_template(created_template)
 
-    def update_template(
+    async def update_template(
         self,
         template_id: int,
         name: Optional[str] = None,
@@ -52,7 +55,7 @@ class TemplateService:
         is_active: Optional[bool] = None,
     ) -> TemplateDto:
         """Update template fields."""
-        template = self.template_repository.get_template_by_id(template_id)
+        template = await self.template_repository.get_template_by_id(template_id)
         if not template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -61,7 +64,7 @@ class TemplateService:
 
         if name is not None:
             # Check for duplicate name
-            existing = self.template_repository.get_template_by_name(name)
+            existing = await self.template_repository.get_template_by_name(name)
             if existing and existing.id != template_id:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -78,19 +81,21 @@ class TemplateService:
         if is_active is not None:
             template.is_active = is_active
 
-        updated_template = self.template_repository.update_template(template)
+        updated_template = await self.template_repository.update_template(template)
+        await template_cache.invalidate(self.cache_version_repository)
         return TemplateDto.from_template(updated_template)
 
-    def delete_template(self, template_id: int) -> TemplateDto:
+    async def delete_template(self, template_id: int) -> TemplateDto:
         """Delete a template (admin only)."""
-        template = self.template_repository.get_template_by_id(template_id)
+        template = await self.template_repository.get_template_by_id(template_id)
         if not template:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Template not found",
             )
 
-        deleted_template = self.template_repository.delete_template(template)
+        deleted_template = await self.template_repository.delete_template(template)
+        await template_cache.invalidate(self.cache_version_repository)
         return TemplateDto.from_template(deleted_template)
 
 
@@ -0,0 +1,80 @@
+import logging
+from typing import Dict, List, Optional
+
+from crud.cache_version import CacheVersionRepository
+from crud.template import TemplateRepository
+from core.cache_version import CacheVersionWatcher
+from core.metrics import cache_hit, cache_miss
+from schemas.template import TemplateDto
+from common.app_settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateCache:
+    """
+    Read-through, in-process copy of all templates (active and inactive) as DTOs.
+
+    Templates are read on every check/format request and almost never change, so the
+    whole table is loaded at once (fonts joined eagerly) and served from memory.
+    TemplateService drops it on create/update/delete and bumps the "templates" version
+    row so the other workers reload on their next poll.
+    """
+
+    VERSION_NAME = "templates"
+
+    def __init__(self, poll_seconds: float):
+        self._templates: Optional[Dict[int, TemplateDto]] = None
+        # Bumped whenever the copy is dropped, so a load that raced a drop is not stored
+        self._generation = 0
+        self._watcher = CacheVersionWatcher(self.VERSION_NAME, poll_seconds)
+
+    async def _ensure_fresh(
+        self,
+        template_repository: TemplateRepository,
+        cache_version_repository: CacheVersionRepository,
+    ) -> Dict[int, TemplateDto]:
+        if await self._watcher.poll(cache_version_repository):
+            self._drop()
+        templates = self._templates
+        if templates is not None:
+            cache_hit("templates")
+        else:
+            cache_miss("templates")
+            generation = self._generation
+            rows = await template_repository.get_all_templates(active_only=False)
+            templates = {t.id: TemplateDto.from_template(t) for t in rows}
+            if generation == self._generation:
+                self._templates = templates
+                logger.info(f"Template cache loaded ({len(templates)} templates)")
+        return templates
+
+    def _drop(self) -> None:
+        self._templates = None
+        self._generation += 1
+
+    async def get(
+        self,
+        template_id: int,
+        template_repository: TemplateRepository,
+        cache_version_repository: CacheVersionRepository,
+    ) -> Optional[TemplateDto]:
+        templates = await self._ensure_fresh(template_repository, cache_version_repository)
+        return templates.get(template_id)
+
+    async def get_all(
+        self,
+        include_inactive: bool,
+        template_repository: TemplateRepository,
+        cache_version_repository: CacheVersionRepository,
+    ) -> List[TemplateDto]:
+        templates = await self._ensure_fresh(template_repository, cache_version_repository)
+        return [t for t in templates.values() if include_inactive or t.is_active]
+
+    async def invalidate(self, cache_version_repository: CacheVersionRepository) -> None:
+        """Drop the local copy and tell the other nodes to do the same."""
+        self._drop()
+        await self._watcher.bump(cache_version_repository)
+
+
+template_cache = TemplateCache(poll_seconds=settings.CACHE_VERSION_POLL_SECONDS)
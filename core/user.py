@@ -3,38 +3,44 @@ from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
 
-from crud import UserRepositoryDependency
+from crud import UserRepositoryDependency, CacheVersionRepositoryDependency
+from core.principal_cache import principal_cache
 from models import User
 from schemas.user import UserCreate, UserDto
 
 
 class UserService:
-    def __init__(self, user_repository: UserRepositoryDependency):
+    def __init__(
+        self,
+        user_repository: UserRepositoryDependency,
+        cache_version_repository: CacheVersionRepositoryDependency,
+    ):
         self.user_repository = user_repository
+        self.cache_version_repository = cache_version_repository
 
-    def get_user(self, user_id: UUID) -> Optional[UserDto]:
+    async def get_user(self, user_id: UUID) -> Optional[UserDto]:
         """Get user by ID."""
-        user = self.user_repository.get_user_by_id(user_id)
+        user = await self.user_repository.get_user_by_id(user_id)
         if not user:
             return None
         return UserDto.from_user(user)
 
-    def get_user_by_email(self, email: str) -> Optional[UserDto]:
+    async def get_user_by_email(self, email: str) -> Optional[UserDto]:
         """Get user by email."""
-        user = self.user_repository.get_user_by_email(email)
+        user = await self.user_repository.get_user_by_email(email)
         if not user:
             return None
         return UserDto.from_user(user)
 
-    def get_all_users(self) -> list[UserDto]:
+    async def get_all_users(self) -> list[UserDto]:
         """Get all users."""
-        users = self.user_repository.get_all_users()
+        users = await self.user_repository.get_all_users()
         return [UserDto.from_user(user) for user in users]
 
-    def create_user(self, data: UserCreate) -> UserDto:
+    async def create_user(self, data: UserCreate) -> UserDto:
         """Create a new user."""
         # Check if user already exists
-        existing = self.user_repository.get_user_by_email(data.email)
+        existing = await self.user_repository.get_user_by_email(data.email)
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -42,20 +48,20 @@ class UserService:
             )
 
         user = User(email=data.email)
-        created_user = self.user_repository.create_user(user)
+        created_user = await self.user_repository.create_user(user)
         return UserDto.from_user(created_user)
 
-    def get_or_create_user(self, email: str) -> UserDto:
+    async def get_or_create_user(self, email: str) -> UserDto:
         """Get existing user or create new one (for OAuth flow)."""
-        user = self.user_repository.get_user_by_email(email)
+        user = await self.user_repository.get_user_by_email(email)
         if not user:
             user = User(email=email)
-            user = self.user_repository.create_user(user)
+            user = await self.user_repository.create_user(user)
         return UserDto.from_user(user)
 
-    def delete_user(self, user_id: UUID, admin_id: UUID) -> UserDto:
+    async def delete_user(self, user_id: UUID, admin_id: UUID) -> UserDto:
         """Delete a user by ID."""
-        user = self.user_repository.get_user_by_id(user_id)
+        user = await self.user_repository.get_user_by_id(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -78,12 +84,13 @@ class UserService:
                 detail="You cannot delete another admin",
             )
         
-        deleted_user = self.user_repository.delete_user(user)
+        deleted_user = await self.user_repository.delete_user(user)
+        await principal_cache.evict(user_id, self.cache_version_repository)
         return UserDto.from_user(deleted_user)
 
-    def ban_user(self, user_id: UUID, admin_id: UUID) -> UserDto:
+    async def ban_user(self, user_id: UUID, admin_id: UUID) -> UserDto:
         """Ban a user (admin only)."""
-        user = self.user_repository.get_user_by_id(user_id)
+        user = await self.user_repository.get_user_by_id(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -107,27 +114,29 @@ class UserService:
             )
         
         user.is_banned = True
-        updated = self.user_repository.update_user(user)
+        updated = await self.user_repository.update_user(user)
+        await principal_cache.evict(user_id, self.cache_version_repository)
         return UserDto.from_user(updated)
 
-    def unban_user(self, user_id: UUID) -> UserDto:
+    async def unban_user(self, user_id: UUID) -> UserDto:
         """Unban a user (admin only)."""
-        user = self.user_repository.get_user_by_id(user_id)
+        user = await self.user_repository.get_user_by_id(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found",
             )
         user.is_banned = False
-        updated = self.user_repository.update_user(user)
+        updated = await self.user_repository.update_user(user)
+        await principal_cache.evict(user_id, self.cache_version_repository)
         return UserDto.from_user(updated)
 
-    def update_google_token(self, user_id: UUID, new_token: str) -> None:
+    async def update_google_token(self, user_id: UUID, new_token: str) -> None:
         """Update user's Google access token (called when token is refreshed)."""
-        user = self.user_repository.get_user_by_id(user_id)
+        user = await self.user_repository.get_user_by_id(user_id)
         if user:
             user.google_token = new_token
-            self.user_repository.update_user(user)
+            await self.user_repository.update_user(user)
 
 
 UserServiceDependency = Annotated[UserService, Depends(UserService)]
@@ -1,63 +1,114 @@
-from typing import Annotated, Optional, List
+from typing import Annotated, Optional, List, Tuple
 from datetime import datetime
 from uuid import UUID
+import threading
+import time
 from fastapi import Depends
 
 from crud import UserActionLogRepositoryDependency
+from core.metrics import cache_hit, cache_miss
 from models import UserActionLog
 
+# Totals for the admin log browser are informational, so they are cached per filter set
+LOG_COUNT_CACHE_TTL_SECONDS = 60
+# Above this many rows an unfiltered total comes from the planner estimate instead of COUNT(*)
+LOG_COUNT_ESTIMATE_THRESHOLD = 100_000
+
+_count_cache: dict[tuple, tuple[float, int, bool]] = {}
+_count_cache_lock = threading.Lock()
+
 
 class UserActionLogService:
     def __init__(self, log_repository: UserActionLogRepositoryDependency):
         self.log_repository = log_repository
 
-    def log_action(
+    async def log_action(
         self,
         user_id: UUID,
         action_type: str,
         details: Optional[dict] = None
     ) -> UserActionLog:
         """Log a user action."""
-        return self.log_repository.create_log(
+        return await self.log_repository.create_log(
             user_id=user_id,
             action_type=action_type,
             details=details
         )
 
-    def get_user_logs(
+    async def get_user_logs(
         self,
         user_id: UUID,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[Tuple[datetime, int]] = None
     ) -> List[UserActionLog]:
         """Get logs for a specific user."""
-        return self.log_repository.get_logs_by_user(user_id, limit, offset)
+        return await self.log_repository.get_logs_by_user(user_id, limit, offset, cursor)
 
-    def get_all_logs(
+    async def get_all_logs(
         self,
         limit: int = 100,
         offset: int = 0,
         action_type: Optional[str] = None,
         user_id: Optional[UUID] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> tuple[List[UserActionLog], int]:
+        end_date: Optional[datetime] = None,
+        cursor: Optional[Tuple[datetime, int]] = None
+    ) -> tuple[List[UserActionLog], int, bool]:
         """
         Get all logs with filters (admin only).
-        Returns (logs, total_count).
+        Returns (logs, total_count, total_is_estimate).
         """
-        return self.log_repository.get_all_logs(
+        logs = await self.log_repository.get_all_logs(
             limit=limit,
             offset=offset,
             action_type=action_type,
             user_id=user_id,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            cursor=cursor
         )
+        total, is_estimate = await self._get_total(action_type, user_id, start_date, end_date)
+        return logs, total, is_estimate
+
+    async def _get_total(
+        self,
+        action_type: Optional[str],
+        user_id: Optional[UUID],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime]
+    ) -> tuple[int, bool]:
+        """
+        Total number of matching logs, cached for LOG_COUNT_CACHE_TTL_SECONDS.
+        Large unfiltered totals use the pg_class estimate so paging never waits on COUNT(*).
+        """
+        key = (action_type, user_id, start_date, end_date)
+        now = time.monotonic()
+        with _count_cache_lock:
+            cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            cache_hit("log_counts")
+            return cached[1], cached[2]
+        cache_miss("log_counts")
+
+        is_estimate = False
+        total = -1
+        if not any(key):
+            total = await self.log_repository.estimate_total_logs()
+            is_estimate = total >= LOG_COUNT_ESTIMATE_THRESHOLD
+        if not is_estimate:
+            total = await self.log_repository.count_logs(action_type, user_id, start_date, end_date)
+
+        with _count_cache_lock:
+            # Drop expired entries so arbitrary date filters can't grow the cache unbounded
+            for stale_key in [k for k, v in _count_cache.items() if v[0] <= now]:
+                del _count_cache[stale_key]
+            _count_cache[key] = (now + LOG_COUNT_CACHE_TTL_SECONDS, total, is_estimate)
+        return total, is_estimate
 
-    def get_log(self, log_id: int) -> Optional[UserActionLog]:
+    async def get_log(self, log_id: int) -> Optional[UserActionLog]:
         """Get a specific log entry."""
-        return self.log_repository.get_log_by_id(log_id)
+        return await self.log_repository.get_log_by_id(log_id)
 
 
 UserActionLogServiceDependency = Annotated[UserActionLogService, Depends(UserActionLogService)]
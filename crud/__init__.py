@@ -3,6 +3,8 @@ from crud.document import DocumentRepository, DocumentRepositoryDependency
 from crud.template import TemplateRepository, TemplateRepositoryDependency
 from crud.check_result import CheckResultRepository, CheckResultRepositoryDependency
 from crud.user_action_log import UserActionLogRepository, UserActionLogRepositoryDependency
+from crud.cache_version import CacheVersionRepository, CacheVersionRepositoryDependency
+from crud.request_profile import RequestProfileRepository, RequestProfileRepositoryDependency
 
 __all__ = [
     "UserRepository",
@@ -15,4 +17,8 @@ __all__ = [
     "CheckResultRepositoryDependency",
     "UserActionLogRepository",
     "UserActionLogRepositoryDependency",
+    "CacheVersionRepository",
+    "CacheVersionRepositoryDependency",
+    "RequestProfileRepository",
+    "RequestProfileRepositoryDependency",
 ]
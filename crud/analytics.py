@@ -3,7 +3,6 @@ from datetime import datetime, timedelta
 
 from fastapi import Depends
 from sqlalchemy import select, func, and_, or_, case
-from sqlalchemy.orm import Session
 
 from db import SessionDep
 from models.document import Document
@@ -15,7 +14,7 @@ class AnalyticsRepository:
     def __init__(self, session: SessionDep):
         self.session = session
 
-    def get_document_processing_last_week(self):
+    async def get_document_processing_last_week(self):
         """Get document processing statistics for the last 7 days"""
         seven_days_ago = datetime.utcnow() - timedelta(days=7)
         
@@ -43,9 +42,9 @@ class AnalyticsRepository:
             .order_by(func.date(UserActionLog.created_at))
         )
         
-        return self.session.execute(query).all()
+        return (await self.session.execute(query)).all()
 
-    def get_user_registrations_last_week(self):
+    async def get_user_registrations_last_week(self):
         """Get user registration statistics for the last 7 days"""
         seven_days_ago = datetime.utcnow() - timedelta(days=7)
         
@@ -59,9 +58,9 @@ class AnalyticsRepository:
             .order_by(func.date(User.created_at))
         )
         
-        return self.session.execute(query).all()
+        return (await self.session.execute(query)).all()
 
-    def get_recent_users(self, limit: int = 10):
+    async def get_recent_users(self, limit: int = 10):
         """Get most recently registered users"""
         query = (
             select(User)
@@ -69,9 +68,9 @@ class AnalyticsRepository:
             .limit(limit)
         )
         
-        return self.session.scalars(query).all()
+        return (await self.session.scalars(query)).all()
 
-    def get_recent_bans_unbans(self, limit: int = 4):
+    async def get_recent_bans_unbans(self, limit: int = 4):
         """Get recent ban and unban actions"""
         query = (
             select(UserActionLog)
@@ -85,7 +84,7 @@ class AnalyticsRepository:
             .limit(limit)
         )
         
-        return self.session.scalars(query).all()
+        return (await self.session.scalars(query)).all()
 
 
 AnalyticsRepositoryDependency = Annotated[AnalyticsRepository, Depends(AnalyticsRepository)]
@@ -3,7 +3,6 @@ from datetime import datetime, date
 
 from fastapi import Depends
 from sqlalchemy import select, func, and_
-from sqlalchemy.orm import Session
 
 from db import SessionDep
 from models.anonymous_check import AnonymousCheck
@@ -15,13 +14,13 @@ class AnonymousCheckRepository:
     def __init__(self, session: SessionDep):
         self.session = session
     
-    def get_check_count_today(self, ip_address: str) -> int:
+    async def get_check_count_today(self, ip_address: str) -> int:
         """Get the number of checks performed by this IP today."""
         today = date.today()
         today_start = datetime.combine(today, datetime.min.time())
         today_end = datetime.combine(today, datetime.max.time())
         
-        result = self.session.execute(
+        result = (await self.session.execute(
             select(func.coalesce(func.sum(AnonymousCheck.check_count), 0))
             .where(
                 and_(
@@ -30,11 +29,11 @@ class AnonymousCheckRepository:
                     AnonymousCheck.check_date <= today_end
                 )
             )
-        ).scalar()
+        )).scalar()
         
         return int(result) if result else 0
     
-    def increment_check_count(self, ip_address: str) -> None:
+    async def increment_check_count(self, ip_address: str) -> None:
         """Increment the check count for this IP address today."""
         today = date.today()
         today_datetime = datetime.combine(today, datetime.min.time())
@@ -46,7 +45,7 @@ class AnonymousCheckRepository:
                 AnonymousCheck.check_date == today_datetime
             )
         )
-        existing = self.session.execute(stmt).scalar_one_or_none()
+        existing = (await self.session.execute(stmt)).scalar_one_or_none()
         
         if existing:
             # Increment existing count
@@ -62,7 +61,7 @@ class AnonymousCheckRepository:
             )
             self.session.add(new_check)
         
-        self.session.commit()
+        await self.session.commit()
 
 
 AnonymousCheckRepositoryDependency = Annotated[AnonymousCheckRepository, Depends(AnonymousCheckRepository)]
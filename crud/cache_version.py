@@ -0,0 +1,38 @@
+from typing import Annotated
+from datetime import datetime
+
+from fastapi import Depends
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from db import SessionDep
+from models import CacheVersion
+
+
+class CacheVersionRepository:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def get_version(self, name: str) -> int:
+        """Current version of a cache; 0 if it was never bumped."""
+        result = await self.session.execute(select(CacheVersion.version).where(CacheVersion.name == name))
+        return result.scalar_one_or_none() or 0
+
+    async def bump_version(self, name: str) -> int:
+        """Atomically increment (or create) the version row and return the new value."""
+        now = datetime.utcnow()
+        stmt = (
+            insert(CacheVersion)
+            .values(name=name, version=1, updated_at=now)
+            .on_conflict_do_update(
+                index_elements=[CacheVersion.name],
+                set_={"version": CacheVersion.version + 1, "updated_at": now},
+            )
+            .returning(CacheVersion.version)
+        )
+        version = (await self.session.execute(stmt)).scalar_one()
+        await self.session.commit()
+        return version
+
+
+CacheVersionRepositoryDependency = Annotated[CacheVersionRepository, Depends(CacheVersionRepository)]
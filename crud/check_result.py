@@ -1,33 +1,80 @@
-from typing import Annotated, Optional
+from datetime import datetime
+from typing import Annotated, Optional, Tuple
 from uuid import UUID
 
 from fastapi import Depends
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, or_, tuple_
+from sqlalchemy.orm import load_only
 
 from db import SessionDep
 from models import CheckResult
 
+# What a history chart needs; the issue columns stay in the database
+_summary_columns = load_only(
+    CheckResult.id, CheckResult.created_at, CheckResult.passed, CheckResult.overall_score, CheckResult.issues_count,
+)
+
 
 class CheckResultRepository:
     def __init__(self, session: SessionDep):
         self.session = session
 
-    def get_check_result_by_id(self, check_result_id: UUID) -> Optional[CheckResult]:
-        return self.session.get(CheckResult, check_result_id)
+    async def get_check_result_by_id(self, check_result_id: UUID) -> Optional[CheckResult]:
+        return await self.session.get(CheckResult, check_result_id)
 
-    def get_check_results_by_document_id(self, document_id: UUID) -> list[CheckResult]:
+    async def get_check_results_by_document_id(self, document_id: UUID) -> list[CheckResult]:
         query = select(CheckResult).where(CheckResult.document_id == document_id).order_by(desc(CheckResult.created_at))
-        return list(self.session.scalars(query).all())
+        return list((await self.session.scalars(query)).all())
+
+    async def get_check_result_summaries(
+        self,
+        document_id: UUID,
+        limit: int = 50,
+        cursor: Optional[Tuple[datetime, UUID]] = None,
+    ) -> list[CheckResult]:
+        """
+        A page of the document's check results, newest first, with only the summary columns loaded.
+        Pass `cursor` (created_at, id) of the last seen row for keyset pagination.
+        """
+        query = select(CheckResult).options(_summary_columns).where(CheckResult.document_id == document_id)
+        if cursor is not None:
+            created_at, check_result_id = cursor
+            query = query.where(tuple_(CheckResult.created_at, CheckResult.id) < tuple_(created_at, check_result_id))
+        query = query.order_by(desc(CheckResult.created_at), desc(CheckResult.id)).limit(limit)
+        return list((await self.session.scalars(query)).all())
+
+    async def get_latest_check_results(self, document_id: UUID, limit: int = 1) -> list[CheckResult]:
+        """The document's most recent check results, newest first"""
+        query = (
+            select(CheckResult)
+            .where(CheckResult.document_id == document_id)
+            .order_by(desc(CheckResult.created_at))
+            .limit(limit)
+        )
+        return list((await self.session.scalars(query)).all())
+
+    async def get_delta_chain(self, check_result: CheckResult) -> list[CheckResult]:
+        """The snapshot `check_result` builds on and the results after it up to `check_result`, oldest first"""
+        snapshot_id = check_result.snapshot_id or check_result.id
+        query = (
+            select(CheckResult)
+            .where(
+                or_(CheckResult.id == snapshot_id, CheckResult.snapshot_id == snapshot_id),
+                CheckResult.created_at <= check_result.created_at,
+            )
+            .order_by(CheckResult.created_at)
+        )
+        return list((await self.session.scalars(query)).all())
 
-    def create_check_result(self, check_result: CheckResult) -> CheckResult:
+    async def create_check_result(self, check_result: CheckResult) -> CheckResult:
         self.session.add(check_result)
-        self.session.commit()
-        self.session.refresh(check_result)
+        await self.session.commit()
+        await self.session.refresh(check_result)
         return check_result
 
-    def delete_check_result(self, check_result: CheckResult) -> CheckResult:
-        self.session.delete(check_result)
-        self.session.commit()
+    async def delete_check_result(self, check_result: CheckResult) -> CheckResult:
+        await self.session.delete(check_result)
+        await self.session.commit()
         return check_result
 
 
@@ -1,42 +1,79 @@
-from typing import Annotated, Optional
+from datetime import datetime
+from typing import Annotated, Any, Optional, Tuple
 from uuid import UUID
 
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import select, desc, true, tuple_
+from sqlalchemy.orm import noload, selectinload
 
 from db import SessionDep
-from models import Document
+from models import CheckResult, Document
+
+# DocumentDto needs the check timestamps; load them up front (lazy loads are not
+# available on an AsyncSession) and skip the heavy issues payload.
+_check_results_timestamps = selectinload(Document.check_results).load_only(CheckResult.created_at)
 
 
 class DocumentRepository:
     def __init__(self, session: SessionDep):
         self.session = session
 
-    def get_document_by_id(self, document_id: UUID) -> Optional[Document]:
-        return self.session.get(Document, document_id)
+    async def get_document_by_id(self, document_id: UUID) -> Optional[Document]:
+        return await self.session.get(Document, document_id, options=[_check_results_timestamps])
 
-    def get_documents_by_user_id(self, user_id: UUID) -> list[Document]:
-        query = select(Document).where(Document.user_id == user_id)
-        return list(self.session.scalars(query).all())
+    async def get_documents_page_by_user_id(
+        self,
+        user_id: UUID,
+        limit: int = 100,
+        cursor: Optional[Tuple[datetime, UUID]] = None,
+    ) -> list[Tuple[Document, Optional[dict[str, Any]]]]:
+        """
+        A page of the user's documents, newest first, each paired with the summary row of its
+        latest check (None if never checked). One query: the latest check comes from a LATERAL
+        subquery served by ix_check_results_document_id_created_at.
+        Pass `cursor` (created_at, id) of the last seen document for keyset pagination.
+        """
+        latest_check = (
+            select(
+                CheckResult.id, CheckResult.created_at, CheckResult.passed,
+                CheckResult.overall_score, CheckResult.issues_count,
+            )
+            .where(CheckResult.document_id == Document.id)
+            .order_by(desc(CheckResult.created_at))
+            .limit(1)
+            .lateral("latest_check")
+        )
+        query = (
+            select(Document, latest_check)
+            .outerjoin(latest_check, true())
+            .where(Document.user_id == user_id)
+            .options(noload(Document.check_results))
+        )
+        if cursor is not None:
+            created_at, document_id = cursor
+            query = query.where(tuple_(Document.created_at, Document.id) < tuple_(created_at, document_id))
+        query = query.order_by(desc(Document.created_at), desc(Document.id)).limit(limit)
+        rows = (await self.session.execute(query)).all()
+        columns = latest_check.c.keys()
+        return [(row[0], dict(zip(columns, row[1:])) if row[1] is not None else None) for row in rows]
 
-    def get_document_by_google_doc_id(self, google_doc_id: str) -> Optional[Document]:
-        query = select(Document).where(Document.google_doc_id == google_doc_id)
-        return self.session.scalars(query).first()
+    async def get_document_by_google_doc_id(self, google_doc_id: str) -> Optional[Document]:
+        query = select(Document).where(Document.google_doc_id == google_doc_id).options(_check_results_timestamps)
+        return (await self.session.scalars(query)).first()
 
-    def create_document(self, document: Document) -> Document:
+    async def create_document(self, document: Document) -> Document:
         self.session.add(document)
-        self.session.commit()
-        self.session.refresh(document)
+        await self.session.commit()
+        await self.session.refresh(document, attribute_names=["check_results"])
         return document
 
-    def update_document(self, document: Document) -> Document:
-        self.session.commit()
-        self.session.refresh(document)
+    async def update_document(self, document: Document) -> Document:
+        await self.session.commit()
         return document
 
-    def delete_document(self, document: Document) -> Document:
-        self.session.delete(document)
-        self.session.commit()
+    async def delete_document(self, document: Document) -> Document:
+        await self.session.delete(document)
+        await self.session.commit()
         return document
 
 
@@ -1,8 +1,7 @@
 from typing import Annotated, List, Optional
 
 from fastapi import Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, delete, func
 
 from db import SessionDep
 from models.font import Font
@@ -12,7 +11,7 @@ class FontRepository:
     def __init__(self, session: SessionDep):
         self.session = session
 
-    def create_font(self, family: str, category: Optional[str] = None,
+    async def create_font(self, family: str, category: Optional[str] = None,
                     variants: Optional[str] = None, subsets: Optional[str] = None,
                     version: Optional[str] = None, last_modified: Optional[str] = None) -> Font:
         """Create a new font"""
@@ -25,12 +24,12 @@ class FontRepository:
             last_modified=last_modified
         )
         self.session.add(font)
-        self.session.commit()
-        self.session.refresh(font)
+        await self.session.commit()
+        await self.session.refresh(font)
         return font
 
-    def get_all_fonts(self, skip: int = 0, limit: int = 1000, search: Optional[str] = None) -> List[Font]:
-        """Get all fonts with pagination and search"""
+    async def get_all_fonts(self, skip: int = 0, limit: Optional[int] = 1000, search: Optional[str] = None) -> List[Font]:
+        """Get all fonts with pagination and search (limit=None returns every row)"""
         query = select(Font)
         
         # Add search filter if provided
@@ -38,52 +37,48 @@ class FontRepository:
             query = query.where(Font.family.ilike(f"%{search}%"))
         
         query = query.order_by(Font.family).offset(skip).limit(limit)
-        result = self.session.execute(query)
+        result = await self.session.execute(query)
         return list(result.scalars().all())
 
-    def get_font_by_id(self, font_id: int) -> Optional[Font]:
+    async def get_font_by_id(self, font_id: int) -> Optional[Font]:
         """Get font by ID"""
-        result = self.session.execute(select(Font).where(Font.id == font_id))
+        result = await self.session.execute(select(Font).where(Font.id == font_id))
         return result.scalar_one_or_none()
 
-    def get_font_by_family(self, family: str) -> Optional[Font]:
+    async def get_font_by_family(self, family: str) -> Optional[Font]:
         """Get font by family name"""
-        result = self.session.execute(select(Font).where(Font.family == family))
+        result = await self.session.execute(select(Font).where(Font.family == family))
         return result.scalar_one_or_none()
 
-    def delete_font(self, font_id: int) -> bool:
+    async def delete_font(self, font_id: int) -> bool:
         """Delete a font by ID"""
-        font = self.get_font_by_id(font_id)
+        font = await self.get_font_by_id(font_id)
         if font:
-            self.session.delete(font)
-            self.session.commit()
+            await self.session.delete(font)
+            await self.session.commit()
             return True
         return False
 
-    def count_fonts(self, search: Optional[str] = None) -> int:
+    async def count_fonts(self, search: Optional[str] = None) -> int:
         """Count total number of fonts with optional search filter"""
-        query = select(Font)
+        query = select(func.count()).select_from(Font)
         
-        # Add search filter if provided
+        # Add search filter if provided (served by the pg_trgm index on family)
         if search:
             query = query.where(Font.family.ilike(f"%{search}%"))
         
-        result = self.session.execute(query)
-        return len(list(result.scalars().all()))
+        return (await self.session.execute(query)).scalar_one()
 
-    def delete_all_fonts(self) -> None:
+    async def delete_all_fonts(self) -> None:
         """Delete all fonts (for re-seeding)"""
-        result = self.session.execute(select(Font))
-        fonts = result.scalars().all()
-        for font in fonts:
-            self.session.delete(font)
-        self.session.commit()
+        await self.session.execute(delete(Font))
+        await self.session.commit()
 
-    def bulk_create_fonts(self, fonts_data: List[dict]) -> int:
+    async def bulk_create_fonts(self, fonts_data: List[dict]) -> int:
         """Bulk create fonts from list of dicts"""
         fonts = [Font(**font_data) for font_data in fonts_data]
         self.session.add_all(fonts)
-        self.session.commit()
+        await self.session.commit()
         return len(fonts)
 
 
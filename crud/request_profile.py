@@ -0,0 +1,34 @@
+from typing import Annotated, Optional
+from uuid import UUID
+
+from fastapi import Depends
+from sqlalchemy import desc, select
+from sqlalchemy.orm import undefer
+
+from db import SessionDep
+from models import RequestProfile
+
+
+class RequestProfileRepository:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def create_profile(self, profile: RequestProfile) -> RequestProfile:
+        self.session.add(profile)
+        await self.session.commit()
+        await self.session.refresh(profile)
+        return profile
+
+    async def get_profile(self, profile_id: UUID, with_artifact: bool = False) -> Optional[RequestProfile]:
+        query = select(RequestProfile).where(RequestProfile.id == profile_id)
+        if with_artifact:
+            query = query.options(undefer(RequestProfile.artifact))
+        return (await self.session.scalars(query)).one_or_none()
+
+    async def get_profiles(self, limit: int = 50, offset: int = 0) -> list[RequestProfile]:
+        """Newest first, without the (large) artifacts."""
+        query = select(RequestProfile).order_by(desc(RequestProfile.created_at)).offset(offset).limit(limit)
+        return list((await self.session.scalars(query)).all())
+
+
+RequestProfileRepositoryDependency = Annotated[RequestProfileRepository, Depends(RequestProfileRepository)]
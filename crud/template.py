@@ -2,6 +2,7 @@ from typing import Annotated, Optional
 
 from fastapi import Depends
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
 from db import SessionDep
 from models import Template
@@ -11,33 +12,34 @@ class TemplateRepository:
     def __init__(self, session: SessionDep):
         self.session = session
 
-    def get_template_by_id(self, template_id: int) -> Optional[Template]:
-        return self.session.get(Template, template_id)
+    async def get_template_by_id(self, template_id: int) -> Optional[Template]:
+        return await self.session.get(Template, template_id, options=[joinedload(Template.font)])
 
-    def get_all_templates(self, active_only: bool = True) -> list[Template]:
-        query = select(Template)
+    async def get_all_templates(self, active_only: bool = True) -> list[Template]:
+        query = select(Template).options(joinedload(Template.font)).order_by(Template.id)
         if active_only:
             query = query.where(Template.is_active == True)
-        return list(self.session.scalars(query).all())
+        return list((await self.session.scalars(query)).all())
 
-    def get_template_by_name(self, name: str) -> Optional[Template]:
+    async def get_template_by_name(self, name: str) -> Optional[Template]:
         query = select(Template).where(Template.name == name)
-        return self.session.scalars(query).first()
+        return (await self.session.scalars(query)).first()
 
-    def create_template(self, template: Template) -> Template:
+    async def create_template(self, template: Template) -> Template:
         self.session.add(template)
-        self.session.commit()
-        self.session.refresh(template)
+        await self.session.commit()
+        await self.session.refresh(template)
         return template
 
-    def update_template(self, template: Template) -> Template:
-        self.session.commit()
-        self.session.refresh(template)
+    async def update_template(self, template: Template) -> Template:
+        await self.session.commit()
+        # Reloads the joined `font` relationship too, in case font_id changed
+        await self.session.refresh(template)
         return template
 
-    def delete_template(self, template: Template) -> Template:
-        self.session.delete(template)
-        self.session.commit()
+    async def delete_template(self, template: Template) -> Template:
+        await self.session.delete(template)
+        await self.session.commit()
         return template
 
 
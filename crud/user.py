@@ -3,7 +3,6 @@ from uuid import UUID
 
 from fastapi import Depends
 from sqlalchemy import select
-from sqlalchemy.orm import Session
 
 from db import SessionDep
 from models import User
@@ -13,31 +12,31 @@ class UserRepository:
     def __init__(self, session: SessionDep):
         self.session = session
 
-    def get_user_by_id(self, user_id: UUID) -> Optional[User]:
-        return self.session.get(User, user_id)
+    async def get_user_by_id(self, user_id: UUID) -> Optional[User]:
+        return await self.session.get(User, user_id)
 
-    def get_user_by_email(self, email: str) -> Optional[User]:
+    async def get_user_by_email(self, email: str) -> Optional[User]:
         query = select(User).where(User.email == email)
-        return self.session.scalars(query).first()
+        return (await self.session.scalars(query)).first()
 
-    def get_all_users(self) -> list[User]:
+    async def get_all_users(self) -> list[User]:
         query = select(User)
-        return list(self.session.scalars(query).all())
+        return list((await self.session.scalars(query)).all())
 
-    def create_user(self, user: User) -> User:
+    async def create_user(self, user: User) -> User:
         self.session.add(user)
-        self.session.commit()
-        self.session.refresh(user)
+        await self.session.commit()
+        await self.session.refresh(user)
         return user
 
-    def update_user(self, user: User) -> User:
-        self.session.commit()
-        self.session.refresh(user)
+    async def update_user(self, user: User) -> User:
+        await self.session.commit()
+        await self.session.refresh(user)
         return user
 
-    def delete_user(self, user: User) -> User:
-        self.session.delete(user)
-        self.session.commit()
+    async def delete_user(self, user: User) -> User:
+        await self.session.delete(user)
+        await self.session.commit()
         return user
 
 
@@ -1,9 +1,9 @@
-from typing import Annotated, Optional, List
+from typing import Annotated, Optional, List, Tuple
 from datetime import datetime, timedelta
 from uuid import UUID
 from fastapi import Depends
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc
+from sqlalchemy.orm import joinedload
+from sqlalchemy import delete, desc, func, select, text, tuple_
 
 from db import SessionDep
 from models import UserActionLog
@@ -13,7 +13,7 @@ class UserActionLogRepository:
     def __init__(self, db: SessionDep):
         self.db = db
 
-    def create_log(
+    async def create_log(
         self,
         user_id: UUID,
         action_type: str,
@@ -27,84 +27,119 @@ class UserActionLogRepository:
             created_at=datetime.utcnow()
         )
         self.db.add(log_entry)
-        self.db.commit()
-        self.db.refresh(log_entry)
+        await self.db.commit()
+        await self.db.refresh(log_entry)
         return log_entry
 
-    def get_logs_by_user(
+    async def get_logs_by_user(
         self,
         user_id: UUID,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[Tuple[datetime, int]] = None
     ) -> List[UserActionLog]:
-        """Get action logs for a specific user."""
-        return (
-            self.db.query(UserActionLog)
-            .filter(UserActionLog.user_id == user_id)
-            .order_by(desc(UserActionLog.created_at))
-            .offset(offset)
-            .limit(limit)
-            .all()
+        """
+        Get action logs for a specific user, newest first.
+        Pass `cursor` (created_at, id) of the last seen row for keyset pagination;
+        served by the (user_id, created_at) index.
+        """
+        query = (
+            select(UserActionLog)
+            .options(joinedload(UserActionLog.user))
+            .where(UserActionLog.user_id == user_id)
         )
+        query = self._apply_keyset(query, cursor)
+        if offset and cursor is None:
+            query = query.offset(offset)
+        return list((await self.db.scalars(query.limit(limit))).all())
 
-    def get_all_logs(
+    async def get_all_logs(
         self,
         limit: int = 100,
         offset: int = 0,
         action_type: Optional[str] = None,
         user_id: Optional[UUID] = None,
         start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        cursor: Optional[Tuple[datetime, int]] = None
+    ) -> List[UserActionLog]:
+        """
+        Get all action logs with optional filters, newest first.
+        Pass `cursor` (created_at, id) of the last seen row for keyset pagination;
+        `offset` is kept for old clients and ignored when a cursor is given.
+        """
+        query = self._filtered(
+            select(UserActionLog).options(joinedload(UserActionLog.user)),
+            action_type, user_id, start_date, end_date
+        )
+        query = self._apply_keyset(query, cursor)
+        if offset and cursor is None:
+            query = query.offset(offset)
+        return list((await self.db.scalars(query.limit(limit))).all())
+
+    async def count_logs(
+        self,
+        action_type: Optional[str] = None,
+        user_id: Optional[UUID] = None,
+        start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
-    ) -> tuple[List[UserActionLog], int]:
+    ) -> int:
+        """Exact number of logs matching the filters (no join, index-only where possible)."""
+        query = self._filtered(
+            select(func.count()).select_from(UserActionLog),
+            action_type, user_id, start_date, end_date
+        )
+        return (await self.db.execute(query)).scalar_one()
+
+    async def estimate_total_logs(self) -> int:
         """
-        Get all action logs with optional filters.
-        Returns (logs, total_count).
+        Planner estimate of the table size from pg_class (updated by autovacuum/ANALYZE).
+        Returns -1 if the table has never been analyzed.
         """
-        query = self.db.query(UserActionLog).options(joinedload(UserActionLog.user))
+        estimate = (await self.db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'user_action_logs'::regclass")
+        )).scalar_one_or_none()
+        return int(estimate) if estimate is not None else -1
 
-        # Apply filters
+    @staticmethod
+    def _filtered(query, action_type, user_id, start_date, end_date):
         if action_type:
-            query = query.filter(UserActionLog.action_type == action_type)
+            query = query.where(UserActionLog.action_type == action_type)
         if user_id:
-            query = query.filter(UserActionLog.user_id == user_id)
+            query = query.where(UserActionLog.user_id == user_id)
         if start_date:
-            query = query.filter(UserActionLog.created_at >= start_date)
+            query = query.where(UserActionLog.created_at >= start_date)
         if end_date:
-            query = query.filter(UserActionLog.created_at <= end_date)
-
-        # Get total count
-        total_count = query.count()
-
-        # Apply pagination and ordering
-        logs = (
-            query
-            .order_by(desc(UserActionLog.created_at))
-            .offset(offset)
-            .limit(limit)
-            .all()
-        )
+            query = query.where(UserActionLog.created_at <= end_date)
+        return query
 
-        return logs, total_count
+    @staticmethod
+    def _apply_keyset(query, cursor: Optional[Tuple[datetime, int]]):
+        """Order newest first with `id` as tie-breaker and seek past the cursor row."""
+        if cursor is not None:
+            created_at, log_id = cursor
+            query = query.where(
+                tuple_(UserActionLog.created_at, UserActionLog.id) < tuple_(created_at, log_id)
+            )
+        return query.order_by(desc(UserActionLog.created_at), desc(UserActionLog.id))
 
-    def get_log_by_id(self, log_id: int) -> Optional[UserActionLog]:
+    async def get_log_by_id(self, log_id: int) -> Optional[UserActionLog]:
         """Get a specific log entry by ID."""
-        return (
-            self.db.query(UserActionLog)
+        query = (
+            select(UserActionLog)
             .options(joinedload(UserActionLog.user))
-            .filter(UserActionLog.id == log_id)
-            .first()
+            .where(UserActionLog.id == log_id)
         )
+        return (await self.db.scalars(query)).first()
 
-    def delete_old_logs(self, days: int = 90) -> int:
+    async def delete_old_logs(self, days: int = 90) -> int:
         """Delete logs older than specified days. Returns number of deleted records."""
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        deleted = (
-            self.db.query(UserActionLog)
-            .filter(UserActionLog.created_at < cutoff_date)
-            .delete()
+        result = await self.db.execute(
+            delete(UserActionLog).where(UserActionLog.created_at < cutoff_date)
         )
-        self.db.commit()
-        return deleted
+        await self.db.commit()
+        return result.rowcount
 
 
 UserActionLogRepositoryDependency = Annotated[UserActionLogRepository, Depends(UserActionLogRepository)]
@@ -1,26 +1,43 @@
-from typing import Annotated, Generator
-from sqlalchemy.orm import Session
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from typing import Annotated
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from fastapi import Depends
 
 from common.app_settings import settings
 
-engine = create_engine(
-    settings.DB_CONNECTION_STRING.replace("asyncpg", "psycopg2"),
+
+def _async_database_url() -> str:
+    """Normalize the configured connection string to the asyncpg driver."""
+    url = make_url(settings.DB_CONNECTION_STRING).set(drivername="postgresql+asyncpg")
+    # SQLAlchemy keeps its own prepared-statement cache on top of asyncpg's;
+    # both must be 0 behind a transaction-mode pgbouncer.
+    return url.update_query_dict(
+        {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+    ).render_as_string(hide_password=False)
+
+
+engine = create_async_engine(
+    _async_database_url(),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
     pool_pre_ping=True,
-    pool_recycle=300
+    connect_args={
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "command_timeout": settings.DB_COMMAND_TIMEOUT,
+        "timeout": settings.DB_CONNECT_TIMEOUT,
+    },
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: DTOs are built from instances after commit, and an
+# expired attribute can't be lazily reloaded outside the async session context.
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 # FastAPI-style dependency (no contextmanager needed)
 async def get_db():
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # Typed annotation
-SessionDep = Annotated[Session, Depends(get_db)]
+SessionDep = Annotated[AsyncSession, Depends(get_db)]
@@ -0,0 +1,194 @@
+"""
+Load driver for the Google-backed endpoints (POST /documents/{id}/check and /format).
+
+Run the API against loadtest/fake_google.py (see its docstring), then:
+
+    python -m loadtest.driver --api http://localhost:8000/v1 --users 20 --concurrency 40 --duration 60
+
+Setup logs the users in through the normal OAuth callback (the fake token endpoint accepts any
+code) and registers --docs-per-user synthetic documents each. The run keeps --concurrency
+requests in flight for --duration seconds and reports throughput and latency percentiles per
+operation; --json writes the same report to a file for comparing runs.
+Note the API's own per-account Google quota (GOOGLE_API_USER_RATE / _BURST) applies: with few
+users it answers 429 long before anything else saturates.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+
+@dataclass
+class LoadUser:
+    token: str
+    document_ids: list[str] = field(default_factory=list)
+
+
+@dataclass
+class OperationStats:
+    latencies: list[float] = field(default_factory=list)  # seconds, successful requests only
+    statuses: Counter = field(default_factory=Counter)
+
+    def report(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 1)
+
+        total = sum(self.statuses.values())
+        # Keys are HTTP status codes or exception names (timeouts, refused connections)
+        statuses = sorted((str(code), count) for code, count in self.statuses.items())
+        return {
+            "requests": total,
+            "ok": len(ordered),
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(1 - len(ordered) / total, 4) if total else 0.0,
+            "statuses": dict(statuses),
+            "latency_ms": {
+                "mean": round(statistics.fmean(ordered) * 1000, 1) if ordered else None,
+                "p50": percentile(50),
+                "p90": percentile(90),
+                "p95": percentile(95),
+                "p99": percentile(99),
+                "max": round(ordered[-1] * 1000, 1) if ordered else None,
+            },
+        }
+
+
+async def login(client: httpx.AsyncClient, code: str) -> str:
+    """Go through /auth/callback with a fake OAuth code and return the API access token"""
+    response = await client.get("/auth/callback", params={"code": code}, follow_redirects=False)
+    location = response.headers.get("location", "")
+    query = parse_qs(urlparse(location).query)
+    if "token" not in query:
+        raise RuntimeError(f"Login failed for {code}: {response.status_code} {query.get('error', location)}")
+    return query["token"][0]
+
+
+async def first_template_id(client: httpx.AsyncClient) -> int:
+    response = await client.get("/templates", params={"limit": 1})
+    response.raise_for_status()
+    templates = response.json()["templates"]
+    if not templates:
+        raise RuntimeError("No active templates; create one or pass --template-id")
+    return templates[0]["id"]
+
+
+async def setup_users(client: httpx.AsyncClient, args, template_id: int) -> list[LoadUser]:
+    users = []
+    for user_index in range(args.users):
+        token = await login(client, f"{args.user_prefix}-{user_index}")
+        user = LoadUser(token)
+        for doc_index in range(args.docs_per_user):
+            response = await client.post(
+                "/documents",
+                json={
+                    "google_doc_id": f"synthetic-{args.pages}-u{user_index}-d{doc_index}",
+                    "template_id": template_id,
+                    "title": f"Load test {user_index}/{doc_index}",
+                },
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            response.raise_for_status()
+            user.document_ids.append(response.json()["id"])
+        users.append(user)
+    return users
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("check", "format"):
+            raise argparse.ArgumentTypeError(f"unknown operation: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def worker(client, users, mix, template_id, deadline, stats: dict[str, OperationStats]) -> None:
+    operations, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        operation = random.choices(operations, weights)[0]
+        user = random.choice(users)
+        document_id = random.choice(user.document_ids)
+        started = time.perf_counter()
+        try:
+            response = await client.post(
+                f"/documents/{document_id}/{operation}",
+                json={"template_id": template_id},
+                headers={"Authorization": f"Bearer {user.token}"},
+            )
+            status_code = response.status_code
+        except httpx.HTTPError as e:
+            status_code = type(e).__name__
+        elapsed = time.perf_counter() - started
+        stats[operation].statuses[status_code] += 1
+        if status_code == 200:
+            stats[operation].latencies.append(elapsed)
+
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.api, timeout=args.timeout, limits=limits) as client:
+        template_id = args.template_id or await first_template_id(client)
+        users = await setup_users(client, args, template_id)
+        print(f"Set up {len(users)} users x {args.docs_per_user} documents ({args.pages} pages), template {template_id}")
+
+        stats: dict[str, OperationStats] = defaultdict(OperationStats)
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            worker(client, users, args.mix, template_id, deadline, stats) for _ in range(args.concurrency)
+        ))
+        elapsed = time.monotonic() - started
+
+    report = {
+        "config": {
+            "api": args.api, "users": args.users, "docs_per_user": args.docs_per_user, "pages": args.pages,
+            "concurrency": args.concurrency, "duration": args.duration, "mix": args.mix,
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "operations": {name: operation.report(elapsed) for name, operation in sorted(stats.items())},
+    }
+    if args.fake_google:
+        async with httpx.AsyncClient(base_url=args.fake_google) as fake:
+            report["fake_google_calls"] = (await fake.get("/__fake/stats")).json()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the Google-backed check/format endpoints")
+    parser.add_argument("--api", default="http://localhost:8000/v1", help="API base URL, including the /v1 prefix")
+    parser.add_argument("--fake-google", help="fake_google base URL, to include its call counters in the report")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--user-prefix", default="loadtest", help="OAuth code prefix; users are <prefix>-N@loadtest.example")
+    parser.add_argument("--docs-per-user", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=20, help="pages per synthetic document")
+    parser.add_argument("--template-id", type=int, help="default: the first active template")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests kept in flight")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("check=3,format=1"), help="e.g. check=3,format=1")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout, seconds")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
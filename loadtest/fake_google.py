@@ -0,0 +1,421 @@
+"""
+Local stand-in for the Google APIs the service calls, for load tests that must not touch real quotas.
+
+Serves OAuth (authorize/token/userinfo), Docs `documents.get` / `documents.batchUpdate` and
+Drive `files.export` (PDF) with configurable latency, a slow tail and injected 429/503 errors.
+Point the API at it with GOOGLE_API_BASE_URL:
+
+    python -m loadtest.fake_google --port 8090 --latency-ms 120 --throttle-rate 0.01
+    GOOGLE_API_BASE_URL=http://localhost:8090 OAUTHLIB_INSECURE_TRANSPORT=1 uvicorn main:app
+
+Documents: `<id>.json` (a recorded `documents.get` response, optionally with `<id>.pdf`) from
+--documents, otherwise generated deterministically from the id; "synthetic-<pages>-..." ids
+get that many pages and "missing..." ids are 404. batchUpdate is acknowledged but not applied.
+Runtime knobs: GET/PUT /__fake/config, call counters: GET /__fake/stats.
+"""
+import argparse
+import asyncio
+import json
+import random
+import zlib
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import FastAPI, Form, Request
+from fastapi.responses import JSONResponse, RedirectResponse, Response
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# ASCII on purpose: the PDF export uses a base-14 font, and the PDF-twin page mapping
+# only works if the PDF text matches the document text
+_WORDS = (
+    "analiz", "systema", "model", "dokument", "formatuvannia", "doslidzhennia", "rezultat",
+    "metod", "protses", "struktura", "dani", "parametr", "otsinka", "rozrobka", "alhorytm",
+    "perevirka", "shryft", "interval", "storinka", "rozdil", "tablytsia", "rysunok", "znachennia",
+    "vymoha", "standart", "robota", "proiekt", "servis", "zastosunok", "korystuvach",
+    "ta", "shcho", "dlia", "z", "u", "na", "yakyi", "bulo", "ye", "tse", "takozh", "pry",
+)
+PARAGRAPHS_PER_PAGE = 5
+_FONTS = ("Times New Roman", "Times New Roman", "Times New Roman", "Arial")
+
+
+@dataclass
+class FakeGoogleConfig:
+    latency_ms: float = 80.0  # per call
+    jitter_ms: float = 40.0  # uniform +/- around latency_ms
+    export_latency_ms: float = 400.0  # Drive PDF exports are much slower than Docs reads
+    slow_rate: float = 0.0  # fraction of calls that take slow_ms instead (tail latency)
+    slow_ms: float = 3000.0
+    throttle_rate: float = 0.0  # fraction of calls answered with 429 rateLimitExceeded
+    error_rate: float = 0.0  # fraction of calls answered with 503
+    default_pages: int = 20
+
+
+def _google_error(code: int, status: str, message: str, reason: str, headers: Optional[dict] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=code,
+        content={"error": {"code": code, "message": message, "status": status, "errors": [{"reason": reason}]}},
+        headers=headers,
+    )
+
+
+def _style(rng: random.Random, font: str, size: float) -> dict:
+    style = {
+        "weightedFontFamily": {"fontFamily": font, "weight": 400},
+        "fontSize": {"magnitude": size, "unit": "PT"},
+    }
+    if rng.random() < 0.05:
+        style["bold"] = True
+    if rng.random() < 0.05:
+        style["italic"] = True
+    return style
+
+
+class _DocumentBuilder:
+    """Builds a documents.get-shaped body with consistent indices"""
+
+    def __init__(self, doc_id: str, pages: int):
+        self.doc_id = doc_id
+        self.pages = pages
+        self.rng = random.Random(zlib.crc32(doc_id.encode("utf-8")))
+        self.content: list[dict] = [{"endIndex": 1, "sectionBreak": {"sectionStyle": {"sectionType": "CONTINUOUS"}}}]
+        self.index = 1
+        self.page_texts: list[list[str]] = []
+
+    def words(self, count: int) -> str:
+        return " ".join(self.rng.choice(_WORDS) for _ in range(count))
+
+    def paragraph(self, runs: list[tuple[str, dict]], named_style: str = "NORMAL_TEXT", **paragraph_style) -> None:
+        elements = []
+        start = self.index
+        for position, (text, style) in enumerate(runs):
+            if position == len(runs) - 1:
+                text += "\n"
+            elements.append({
+                "startIndex": self.index,
+                "endIndex": self.index + len(text),
+                "textRun": {"content": text, "textStyle": style},
+            })
+            self.index += len(text)
+        self.content.append({
+            "startIndex": start,
+            "endIndex": self.index,
+            "paragraph": {
+                "elements": elements,
+                "paragraphStyle": {"namedStyleType": named_style, **paragraph_style},
+            },
+        })
+        self.page_texts[-1].append("".join(text for text, _ in runs))
+
+    def body_paragraph(self) -> None:
+        runs = []
+        for _ in range(self.rng.randint(1, 5)):
+            font = self.rng.choice(_FONTS)
+            size = self.rng.choice((14, 14, 14, 12))
+            runs.append((self.words(self.rng.randint(8, 25)) + " ", _style(self.rng, font, size)))
+        spacing = 115 if self.rng.random() < 0.1 else 150
+        self.paragraph(runs, lineSpacing=spacing, alignment="JUSTIFIED")
+
+    def build(self) -> dict:
+        for page in range(self.pages):
+            self.page_texts.append([])
+            if page == 0:
+                self.paragraph([("KVALIFIKATSIINA ROBOTA", {})], "TITLE", alignment="CENTER")
+            elif page % 4 == 1:
+                self.paragraph([(f"Rozdil {page // 4 + 1}. {self.words(4)}", {})], "HEADING_1")
+            for _ in range(PARAGRAPHS_PER_PAGE):
+                self.body_paragraph()
+            if page % 5 == 4:
+                self.paragraph([(f"Рис. {page // 4 + 1}.{page % 4 + 1}. {self.words(5)}", {})], alignment="CENTER")
+
+        return {
+            "documentId": self.doc_id,
+            "title": f"Load test {self.doc_id}",
+            "revisionId": "fake-rev-1",
+            "documentStyle": {
+                "pageSize": {"width": {"magnitude": 595.3, "unit": "PT"}, "height": {"magnitude": 841.9, "unit": "PT"}},
+                "marginTop": {"magnitude": 56.7, "unit": "PT"},
+                "marginBottom": {"magnitude": 56.7, "unit": "PT"},
+                "marginLeft": {"magnitude": 85.05, "unit": "PT"},
+                "marginRight": {"magnitude": 28.35, "unit": "PT"},
+                "useFirstPageHeaderFooter": True,
+                "defaultFooterId": "kix.footer-default",
+                "firstPageFooterId": "kix.footer-first",
+            },
+            "namedStyles": {"styles": [
+                {
+                    "namedStyleType": "NORMAL_TEXT",
+                    "textStyle": {
+                        "weightedFontFamily": {"fontFamily": "Times New Roman", "weight": 400},
+                        "fontSize": {"magnitude": 14, "unit": "PT"},
+                    },
+                    "paragraphStyle": {"namedStyleType": "NORMAL_TEXT", "lineSpacing": 150, "alignment": "START"},
+                },
+                {
+                    "namedStyleType": "HEADING_1",
+                    "textStyle": {"bold": True, "fontSize": {"magnitude": 16, "unit": "PT"}},
+                    "paragraphStyle": {"namedStyleType": "HEADING_1"},
+                },
+                {"namedStyleType": "TITLE", "textStyle": {"fontSize": {"magnitude": 26, "unit": "PT"}}},
+            ]},
+            "body": {"content": self.content},
+            "headers": {},
+            "footers": {
+                "kix.footer-default": {
+                    "footerId": "kix.footer-default",
+                    "content": [{"paragraph": {"elements": [
+                        {"autoText": {"type": "PAGE_NUMBER"}},
+                        {"textRun": {"content": "\n"}},
+                    ]}}],
+                },
+                "kix.footer-first": {
+                    "footerId": "kix.footer-first",
+                    "content": [{"paragraph": {"elements": [{"textRun": {"content": "\n"}}]}}],
+                },
+            },
+        }
+
+
+def _paragraph_texts(document: dict) -> list[str]:
+    texts = []
+    for element in document.get("body", {}).get("content", []):
+        paragraph = element.get("paragraph")
+        if paragraph:
+            text = "".join(e.get("textRun", {}).get("content", "") for e in paragraph.get("elements", []))
+            if text.strip():
+                texts.append(text.strip())
+    return texts
+
+
+def _render_pdf(pages: list[list[str]]) -> bytes:
+    """One PDF page per list of paragraph texts (only the start of each page matters to the mapping)"""
+    if fitz is None:
+        raise RuntimeError("PyMuPDF is required to serve PDF exports")
+    pdf = fitz.open()
+    for texts in pages:
+        page = pdf.new_page(width=595, height=842)
+        # Paragraph openings only, so the text always fits the box (insert_textbox drops overflowing text)
+        lines = [" ".join(text.split()[:12]) for text in texts]
+        page.insert_textbox(fitz.Rect(72, 72, 523, 770), "\n".join(lines) or " ", fontsize=11)
+    data = pdf.tobytes()
+    pdf.close()
+    return data
+
+
+class FakeGoogle:
+    def __init__(self, config: FakeGoogleConfig, documents_dir: Optional[Path] = None, cache_size: int = 256):
+        self.config = config
+        self.documents_dir = documents_dir
+        self.cache_size = cache_size
+        self.stats: Counter = Counter()
+        self._documents: "OrderedDict[str, tuple[dict, list[list[str]]]]" = OrderedDict()
+        self._pdfs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._rng = random.Random()
+
+    def _remember(self, cache: OrderedDict, key: str, value):
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def document(self, doc_id: str) -> Optional[tuple[dict, list[list[str]]]]:
+        if doc_id in self._documents:
+            self._documents.move_to_end(doc_id)
+            return self._documents[doc_id]
+
+        if self.documents_dir is not None:
+            path = self.documents_dir / f"{doc_id}.json"
+            if path.exists():
+                document = json.loads(path.read_text(encoding="utf-8"))
+                texts = _paragraph_texts(document)
+                pages = [texts[i:i + PARAGRAPHS_PER_PAGE] for i in range(0, len(texts), PARAGRAPHS_PER_PAGE)]
+                return self._remember(self._documents, doc_id, (document, pages or [[]]))
+        if doc_id.startswith("missing"):
+            return None
+
+        pages = self.config.default_pages
+        parts = doc_id.split("-")
+        if len(parts) > 1 and parts[0] == "synthetic" and parts[1].isdigit():
+            pages = max(1, min(500, int(parts[1])))
+        builder = _DocumentBuilder(doc_id, pages)
+        document = builder.build()
+        return self._remember(self._documents, doc_id, (document, builder.page_texts))
+
+    def pdf(self, doc_id: str) -> Optional[bytes]:
+        if doc_id in self._pdfs:
+            return self._pdfs[doc_id]
+        if self.documents_dir is not None and (self.documents_dir / f"{doc_id}.pdf").exists():
+            return self._remember(self._pdfs, doc_id, (self.documents_dir / f"{doc_id}.pdf").read_bytes())
+        entry = self.document(doc_id)
+        if entry is None:
+            return None
+        return self._remember(self._pdfs, doc_id, _render_pdf(entry[1]))
+
+    async def simulate(self, operation: str, latency_ms: Optional[float] = None) -> Optional[JSONResponse]:
+        """Sleep like Google would and maybe fail; returns the error response to send, if any"""
+        config = self.config
+        self.stats[operation] += 1
+        if self._rng.random() < config.slow_rate:
+            delay = config.slow_ms
+        else:
+            base = config.latency_ms if latency_ms is None else latency_ms
+            delay = max(0.0, base + self._rng.uniform(-config.jitter_ms, config.jitter_ms))
+        await asyncio.sleep(delay / 1000)
+
+        roll = self._rng.random()
+        if roll < config.throttle_rate:
+            self.stats[f"{operation}:429"] += 1
+            return _google_error(
+                429, "RESOURCE_EXHAUSTED", "Quota exceeded for quota metric 'Read requests'",
+                "rateLimitExceeded", headers={"Retry-After": "1"},
+            )
+        if roll < config.throttle_rate + config.error_rate:
+            self.stats[f"{operation}:503"] += 1
+            return _google_error(503, "UNAVAILABLE", "The service is currently unavailable.", "backendError")
+        return None
+
+
+def _bearer(request: Request) -> Optional[str]:
+    header = request.headers.get("authorization", "")
+    return header[7:] if header.lower().startswith("bearer ") else None
+
+
+def _unauthorized() -> JSONResponse:
+    return _google_error(401, "UNAUTHENTICATED", "Request is missing a valid access token.", "authError")
+
+
+def create_app(config: Optional[FakeGoogleConfig] = None, documents_dir: Optional[Path] = None) -> FastAPI:
+    fake = FakeGoogle(config or FakeGoogleConfig(), documents_dir)
+    app = FastAPI(title="Fake Google APIs")
+    app.state.fake = fake
+
+    # --- OAuth ---
+
+    @app.get("/o/oauth2/auth")
+    async def authorize(redirect_uri: str, state: str = ""):
+        """Consent screen stand-in: approve immediately with a random user"""
+        code = f"user-{random.randrange(1_000_000)}"
+        return RedirectResponse(f"{redirect_uri}?{urlencode({'code': code, 'state': state})}")
+
+    @app.post("/token")
+    async def token(grant_type: str = Form(...), code: str = Form(None), refresh_token: str = Form(None)):
+        if grant_type == "authorization_code" and code:
+            subject = code
+        elif grant_type == "refresh_token" and refresh_token and refresh_token.startswith("fake-refresh-"):
+            subject = refresh_token[len("fake-refresh-"):]
+        else:
+            return JSONResponse(status_code=400, content={"error": "invalid_grant"})
+        if error := await fake.simulate("oauth2.token"):
+            return error
+        return {
+            "access_token": f"fake-access-{subject}",
+            "refresh_token": f"fake-refresh-{subject}",
+            "expires_in": 3600,
+            "token_type": "Bearer",
+        }
+
+    @app.get("/oauth2/v2/userinfo")
+    async def userinfo(request: Request):
+        token = _bearer(request)
+        if not token or not token.startswith("fake-access-"):
+            return _unauthorized()
+        if error := await fake.simulate("oauth2.userinfo.get"):
+            return error
+        subject = token[len("fake-access-"):]
+        return {"id": str(zlib.crc32(subject.encode())), "email": f"{subject}@loadtest.example", "verified_email": True}
+
+    # --- Docs / Drive ---
+
+    @app.get("/v1/documents/{doc_id}")
+    async def get_document(doc_id: str, request: Request):
+        if not _bearer(request):
+            return _unauthorized()
+        if error := await fake.simulate("docs.documents.get"):
+            return error
+        entry = fake.document(doc_id)
+        if entry is None:
+            return _google_error(404, "NOT_FOUND", "Requested entity was not found.", "notFound")
+        return entry[0]
+
+    @app.post("/v1/documents/{doc_id}:batchUpdate")
+    async def batch_update(doc_id: str, request: Request):
+        if not _bearer(request):
+            return _unauthorized()
+        body = await request.json()
+        if error := await fake.simulate("docs.documents.batchUpdate"):
+            return error
+        if fake.document(doc_id) is None:
+            return _google_error(404, "NOT_FOUND", "Requested entity was not found.", "notFound")
+        requests = body.get("requests", [])
+        fake.stats["docs.documents.batchUpdate:requests"] += len(requests)
+        return {
+            "documentId": doc_id,
+            "replies": [{} for _ in requests],
+            "writeControl": {"requiredRevisionId": f"fake-rev-{fake.stats['docs.documents.batchUpdate']}"},
+        }
+
+    @app.get("/drive/v3/files/{file_id}/export")
+    async def export_file(file_id: str, request: Request, mimeType: str):
+        if not _bearer(request):
+            return _unauthorized()
+        if mimeType != "application/pdf":
+            return _google_error(400, "INVALID_ARGUMENT", f"Export to {mimeType} is not supported.", "badRequest")
+        if error := await fake.simulate("drive.files.export", fake.config.export_latency_ms):
+            return error
+        data = fake.pdf(file_id)
+        if data is None:
+            return _google_error(404, "NOT_FOUND", f"File not found: {file_id}.", "notFound")
+        return Response(content=data, media_type="application/pdf")
+
+    # --- Control ---
+
+    @app.get("/__fake/config")
+    async def get_config():
+        return asdict(fake.config)
+
+    @app.put("/__fake/config")
+    async def update_config(request: Request):
+        changes = await request.json()
+        unknown = set(changes) - set(asdict(fake.config))
+        if unknown:
+            return JSONResponse(status_code=400, content={"error": f"unknown settings: {sorted(unknown)}"})
+        for name, value in changes.items():
+            setattr(fake.config, name, type(getattr(fake.config, name))(value))
+        return asdict(fake.config)
+
+    @app.get("/__fake/stats")
+    async def get_stats():
+        return dict(fake.stats)
+
+    @app.delete("/__fake/stats")
+    async def reset_stats():
+        fake.stats.clear()
+        return {}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    defaults = FakeGoogleConfig()
+    parser = argparse.ArgumentParser(description="Fake Google OAuth/Docs/Drive server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--documents", type=Path, help="directory with recorded <id>.json (and <id>.pdf) documents")
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    config = FakeGoogleConfig(**{name: getattr(args, name) for name in asdict(defaults)})
+    uvicorn.run(create_app(config, args.documents), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from core.cleanup import cleanup_old_logs
+from core.cleanup import cleanup_old_logs, cleanup_old_profiles
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
 from controllers import (
@@ -18,11 +18,17 @@ from controllers import (
     user_action_log_router,
     font_router,
     analytics_router,
+    request_profile_router,
 )
-from db import SessionLocal
+from db import SessionLocal, engine
+from common.app_settings import settings
+from core.metrics import MetricsMiddleware, instrument_engine, registry
+from core.logging_config import RequestContextMiddleware, configure_logging
 from core.font import ensure_fonts_seeded
+from core.font_catalog import font_catalog
 from crud.font import FontRepository
 
+configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_DEBUG_SAMPLE_RATE)
 logger = logging.getLogger(__name__)
 
 
@@ -32,20 +38,23 @@ async def lifespan(app: FastAPI):
     # Startup: ensure fonts are seeded
     logger.info("Starting application...")
     try:
-        db = SessionLocal()
-        try:
+        async with SessionLocal() as db:
             font_repository = FontRepository(db)
-            ensure_fonts_seeded(font_repository)
-        finally:
-            db.close()
+            await ensure_fonts_seeded(font_repository)
+            await font_catalog.load(font_repository)
     except Exception as e:
         logger.error(f"Error during startup font seeding: {e}")
     
     try:
-        scheduler = BackgroundScheduler()
+        scheduler = AsyncIOScheduler()
         scheduler.add_job(cleanup_old_logs, args=[30])
         trigger = CronTrigger(day_of_week='mon', hour=3, minute=0)
         scheduler.add_job(cleanup_old_logs, trigger=trigger, args=[30])
+        scheduler.add_job(
+            cleanup_old_profiles,
+            trigger=CronTrigger(hour=3, minute=30),
+            args=[settings.REQUEST_PROFILE_RETENTION_DAYS],
+        )
         scheduler.start()
         logger.info("Log cleanup scheduler started (Mondays at 3:00 AM + run on start)")
         app.state.scheduler = scheduler
@@ -59,6 +68,7 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, 'scheduler'):
         app.state.scheduler.shutdown()
         logger.info("Scheduler shut down.")
+    await engine.dispose()
 
 
 app = FastAPI(
@@ -70,6 +80,9 @@ app = FastAPI(
 )
 
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware, debug_sample_rate=settings.LOG_DEBUG_SAMPLE_RATE)
+instrument_engine(engine)
 
 # Custom exception handler for validation errors to prevent binary data decoding issues
 @app.exception_handler(RequestValidationError)
@@ -124,6 +137,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Profile-Id", "X-Request-Id"],
 )
 
 # Include all routers with /v1 prefix
@@ -135,6 +149,7 @@ app.include_router(check_result_router, prefix="/v1")
 app.include_router(user_action_log_router, prefix="/v1")
 app.include_router(font_router, prefix="/v1")
 app.include_router(analytics_router, prefix="/v1")
+app.include_router(request_profile_router, prefix="/v1")
 
 
 @app.get("/")
@@ -148,6 +163,17 @@ def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """
+    Prometheus metrics of this worker process.
+    If METRICS_TOKEN is set, the scraper must send it as a bearer token.
+    """
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        return PlainTextResponse("Forbidden", status_code=403)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     # You can change the port here if 8000 is taken
@@ -6,5 +6,7 @@ from models.user import User
 from models.user_action_log import UserActionLog
 from models.font import Font
 from models.anonymous_check import AnonymousCheck
+from models.cache_version import CacheVersion
+from models.request_profile import RequestProfile
 
-__all__ = ["Base", "User", "Document", "Template", "CheckResult", "UserActionLog", "Font", "AnonymousCheck"]
\ No newline at end of file
+__all__ = ["Base", "User", "Document", "Template", "CheckResult", "UserActionLog", "Font", "AnonymousCheck", "CacheVersion", "RequestProfile"]
\ No newline at end of file
@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, DateTime, BigInteger
+
+from models.base import Base
+
+
+class CacheVersion(Base):
+    """
+    Monotonic version counter per in-process cache ("templates", ...).
+    Writers bump the counter; every worker polls it to know when to drop its copy.
+    """
+    __tablename__ = 'cache_versions'
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow,
+                                                 onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CacheVersion(name={self.name}, version={self.version})>"
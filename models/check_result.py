@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import List, Optional
 import uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, DateTime, Boolean, JSON, Float
+from sqlalchemy import ForeignKey, DateTime, Boolean, JSON, Float, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 
 from models.base import Base
@@ -10,6 +10,10 @@ from models.base import Base
 
 class CheckResult(Base):
     __tablename__ = 'check_results'
+    __table_args__ = (
+        # Latest check per document (document listing) and newest-first history pages
+        Index('ix_check_results_document_id_created_at', 'document_id', text('created_at DESC')),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     document_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey('documents.id', ondelete='CASCADE'), nullable=False, index=True)
@@ -22,8 +26,13 @@ class CheckResult(Base):
     passed: Mapped[bool] = mapped_column(nullable=False)
     overall_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # 0.0-1.0
     issues_count: Mapped[int] = mapped_column(default=0)
-    issues: Mapped[List[dict]] = mapped_column(JSON, nullable=False,
-                                               default=list)  # [{"type": "font_mismatch", "severity": "high", "details": "..."}]
+    # Full issue list, stored on snapshots only: [{"type": "font_mismatch", "severity": "high", "details": "..."}]
+    issues: Mapped[Optional[List[dict]]] = mapped_column(JSON, nullable=True)
+    # Changes against the previous check of the document (None for the first one), see core/issue_delta.py:
+    # {"previous_id": "...", "previous_passed": ..., "previous_overall_score": ..., "added": [[index, issue]], "resolved": [[index, issue]]}
+    issues_delta: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # Snapshot the delta chain starts from; None when this result is a snapshot itself
+    snapshot_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey('check_results.id', ondelete='CASCADE'), nullable=True, index=True)
     processing_time_ms: Mapped[int] = mapped_column(nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
 
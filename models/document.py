@@ -3,7 +3,7 @@ from enum import Enum
 from typing import Optional
 import uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import String, DateTime, Text, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 
 from models.base import Base
@@ -18,6 +18,10 @@ class DocumentStatus(str, Enum):
 
 class Document(Base):
     __tablename__ = 'documents'
+    __table_args__ = (
+        # Keyset pagination index: newest-first pages of a user's documents, id as tie-breaker
+        Index('ix_documents_user_id_created_at', 'user_id', 'created_at', 'id'),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
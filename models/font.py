@@ -1,12 +1,21 @@
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, DateTime, Text
+from sqlalchemy import String, DateTime, Text, Index
 
 from models.base import Base
 
 
 class Font(Base):
     __tablename__ = 'fonts'
+    __table_args__ = (
+        # Trigram index so `ILIKE '%term%'` searches don't fall back to a seq scan
+        Index(
+            'ix_fonts_family_trgm',
+            'family',
+            postgresql_using='gin',
+            postgresql_ops={'family': 'gin_trgm_ops'},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True, autoincrement=True)
     family: Mapped[str] = mapped_column(String(255), nullable=False, unique=True, index=True)
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+import uuid
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, DateTime, ForeignKey, Integer, BigInteger, Text, LargeBinary
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from models.base import Base
+
+
+class RequestProfile(Base):
+    """Profiler output of one admin-requested check/format run (see core/profiling.py)."""
+    __tablename__ = 'request_profiles'
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # Admin who made the profiled request
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True
+    )
+    # e.g. "documents.upload.check"
+    endpoint: Mapped[str] = mapped_column(String(100), nullable=False)
+    profiler: Mapped[str] = mapped_column(String(20), nullable=False)
+    duration_ms: Mapped[int] = mapped_column(Integer, nullable=False)
+    peak_memory_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # [{"stage": ..., "seconds": ..., "peak_memory_bytes": ...}] in execution order
+    stages: Mapped[list] = mapped_column(JSONB, nullable=False, default=list)
+    # Request context (file size, document id, template...) to reproduce the case
+    details: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    report: Mapped[str] = mapped_column(Text, nullable=False)
+    # pyinstrument HTML or a pstats dump; deferred, only loaded on download
+    artifact: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, deferred=True)
+    artifact_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RequestProfile(id={self.id}, endpoint={self.endpoint}, duration_ms={self.duration_ms})>"
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Optional
 import uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime, ForeignKey, Integer
+from sqlalchemy import String, DateTime, ForeignKey, Integer, Index
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 
 from models.base import Base
@@ -10,6 +10,11 @@ from models.base import Base
 
 class UserActionLog(Base):
     __tablename__ = 'user_action_logs'
+    __table_args__ = (
+        # Keyset pagination indexes: newest-first pages per user / per action type, id as tie-breaker
+        Index('ix_user_action_logs_user_id_created_at', 'user_id', 'created_at', 'id'),
+        Index('ix_user_action_logs_action_type_created_at', 'action_type', 'created_at', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(
         Integer,
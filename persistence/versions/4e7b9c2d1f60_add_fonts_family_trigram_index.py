@@ -0,0 +1,34 @@
+"""add_fonts_family_trigram_index
+
+Revision ID: 4e7b9c2d1f60
+Revises: cc4946fa759f
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e7b9c2d1f60'
+down_revision: Union[str, None] = 'cc4946fa759f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_fonts_family_trgm',
+        'fonts',
+        ['family'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'family': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    # The extension is left installed: other objects may depend on it
+    op.drop_index('ix_fonts_family_trgm', table_name='fonts', postgresql_using='gin')
@@ -0,0 +1,27 @@
+"""add_user_action_logs_keyset_indexes
+
+Revision ID: 7a3f51c08d2e
+Revises: 4e7b9c2d1f60
+Create Date: 2026-10-19 11:04:27.902136
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3f51c08d2e'
+down_revision: Union[str, None] = '4e7b9c2d1f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_user_action_logs_user_id_created_at', 'user_action_logs', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_user_action_logs_action_type_created_at', 'user_action_logs', ['action_type', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_action_logs_action_type_created_at', table_name='user_action_logs')
+    op.drop_index('ix_user_action_logs_user_id_created_at', table_name='user_action_logs')
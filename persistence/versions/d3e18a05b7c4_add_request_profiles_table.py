@@ -0,0 +1,45 @@
+"""add_request_profiles_table
+
+Revision ID: d3e18a05b7c4
+Revises: b82d6e4c9a17
+Create Date: 2026-10-19 15:02:41.118305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3e18a05b7c4'
+down_revision: Union[str, None] = 'b82d6e4c9a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('request_profiles',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('endpoint', sa.String(length=100), nullable=False),
+    sa.Column('profiler', sa.String(length=20), nullable=False),
+    sa.Column('duration_ms', sa.Integer(), nullable=False),
+    sa.Column('peak_memory_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('stages', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('details', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('report', sa.Text(), nullable=False),
+    sa.Column('artifact', sa.LargeBinary(), nullable=False),
+    sa.Column('artifact_type', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_request_profiles_created_at'), 'request_profiles', ['created_at'], unique=False)
+    op.create_index(op.f('ix_request_profiles_user_id'), 'request_profiles', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_request_profiles_user_id'), table_name='request_profiles')
+    op.drop_index(op.f('ix_request_profiles_created_at'), table_name='request_profiles')
+    op.drop_table('request_profiles')
@@ -0,0 +1,42 @@
+"""add_check_result_deltas
+
+Revision ID: e5c9a1f7b3d2
+Revises: d3e18a05b7c4
+Create Date: 2026-10-19 17:24:08.531964
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c9a1f7b3d2'
+down_revision: Union[str, None] = 'd3e18a05b7c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing results keep their full issue list and become snapshots
+    op.add_column('check_results', sa.Column('issues_delta', sa.JSON(), nullable=True))
+    op.add_column('check_results', sa.Column('snapshot_id', sa.UUID(), nullable=True))
+    op.create_index(op.f('ix_check_results_snapshot_id'), 'check_results', ['snapshot_id'], unique=False)
+    op.create_foreign_key(op.f('check_results_snapshot_id_fkey'), 'check_results', 'check_results',
+                          ['snapshot_id'], ['id'], ondelete='CASCADE')
+    op.alter_column('check_results', 'issues',
+               existing_type=sa.JSON(),
+               nullable=True)
+
+
+def downgrade() -> None:
+    # Deltas cannot be represented without the new columns
+    op.execute("DELETE FROM check_results WHERE issues IS NULL")
+    op.alter_column('check_results', 'issues',
+               existing_type=sa.JSON(),
+               nullable=False)
+    op.drop_constraint(op.f('check_results_snapshot_id_fkey'), 'check_results', type_='foreignkey')
+    op.drop_index(op.f('ix_check_results_snapshot_id'), table_name='check_results')
+    op.drop_column('check_results', 'snapshot_id')
+    op.drop_column('check_results', 'issues_delta')
@@ -0,0 +1,28 @@
+"""add_document_listing_indexes
+
+Revision ID: f2b8d4a61c93
+Revises: e5c9a1f7b3d2
+Create Date: 2026-10-19 18:41:53.207614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4a61c93'
+down_revision: Union[str, None] = 'e5c9a1f7b3d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_check_results_document_id_created_at', 'check_results', ['document_id', sa.text('created_at DESC')], unique=False)
+    op.create_index('ix_documents_user_id_created_at', 'documents', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_user_id_created_at', table_name='documents')
+    op.drop_index('ix_check_results_document_id_created_at', table_name='check_results')
@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List
 from uuid import UUID
 
 
@@ -36,3 +36,14 @@ class AnalyticsDashboardResponse(BaseModel):
     user_registrations: List[UserRegistrationStats]
     recent_users: List[RecentUserDto]
     recent_bans_unbans: List[UserActionDto]
+
+
+class GoogleApiUsageResponse(BaseModel):
+    calls: Dict[str, int]
+    errors: Dict[str, int]
+    retries: int
+    google_throttled: int
+    local_waits: int
+    local_wait_seconds: float
+    rejected: int
+    in_flight: int
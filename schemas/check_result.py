@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 from pydantic_settings import SettingsConfigDict
 from typing import List, Optional
 from datetime import datetime
@@ -52,7 +52,8 @@ class CheckResultDto(BaseModel):
     created_at: datetime
 
     @staticmethod
-    def from_check_result(result: CheckResult) -> 'CheckResultDto':
+    def from_check_result(result: CheckResult, issues: Optional[list[dict]] = None) -> 'CheckResultDto':
+        """`issues` is the rebuilt issue list when `result` is stored as a delta"""
         return CheckResultDto(
             id=result.id,
             document_id=result.document_id,
@@ -62,7 +63,7 @@ class CheckResultDto(BaseModel):
             passed=result.passed,
             overall_score=result.overall_score,
             issues_count=result.issues_count,
-            issues=result.issues,
+            issues=[Issue.model_validate(issue) for issue in (issues if issues is not None else result.issues) or []],
             processing_time_ms=result.processing_time_ms,
             created_at=result.created_at
         )
@@ -70,6 +71,32 @@ class CheckResultDto(BaseModel):
     model_config = SettingsConfigDict(from_attributes=True)
 
 
+class CheckResultSummaryDto(BaseModel):
+    """One point of a document's check history; the issues are at GET /check-results/{id}"""
+    id: UUID
+    created_at: datetime
+    passed: bool
+    overall_score: Optional[float] = Field(None, ge=0.0, le=1.0)
+    issues_count: int = Field(..., ge=0)
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CheckResultDiffDto(BaseModel):
+    """What changed in a document's latest check since the check before it"""
+    check_result_id: UUID
+    previous_check_result_id: Optional[UUID] = None  # None for the first check of the document
+    created_at: datetime
+    passed: bool
+    previous_passed: Optional[bool] = None
+    overall_score: Optional[float] = Field(None, ge=0.0, le=1.0)
+    previous_overall_score: Optional[float] = Field(None, ge=0.0, le=1.0)
+    issues_count: int = Field(..., ge=0)
+    new_issues: List[Issue] = Field(default_factory=list)
+    resolved_issues: List[Issue] = Field(default_factory=list)
+    unchanged_count: int = Field(..., ge=0)
+
+
 class UploadCheckResultDto(BaseModel):
     """
     Response model for uploaded file checks.
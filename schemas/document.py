@@ -5,6 +5,7 @@ from datetime import datetime
 from uuid import UUID
 
 from models.document import Document, DocumentStatus  # Import actual enum
+from schemas.check_result import CheckResultSummaryDto
 from schemas.template import TemplateParams
 
 
@@ -21,9 +22,22 @@ class DocumentDto(BaseModel):
     status: DocumentStatus  # Use actual SQLAlchemy enum
     created_at: datetime
     last_checked_at: Optional[datetime] = None
+    latest_check: Optional[CheckResultSummaryDto] = None  # only set by the document listing
 
     @staticmethod
-    def from_document(doc: Document) -> 'DocumentDto':
+    def from_document(doc: Document, latest_check: Optional[dict] = None) -> 'DocumentDto':
+        """`latest_check` is the summary of the document's latest check when it was queried with it"""
+        if latest_check is not None:
+            return DocumentDto(
+                id=doc.id,
+                google_doc_id=doc.google_doc_id,
+                title=doc.title,
+                status=doc.status,
+                created_at=doc.created_at,
+                last_checked_at=latest_check["created_at"],
+                latest_check=CheckResultSummaryDto.model_validate(latest_check),
+            )
+
         # Get the most recent check result timestamp
         last_checked = None
         if doc.check_results:
@@ -49,6 +63,7 @@ class FormatDocumentRequest(BaseModel):
     template_id: Optional[int] = Field(None, description="Template ID for formatting rules")
     custom_params: Optional[TemplateParams] = Field(None, description="Custom formatting parameters")
     font_family: Optional[str] = Field(None, description="Font family to apply")
+    detailed_changes: bool = Field(False, description="List every change separately instead of aggregated counts")
 
 
 class FormatChange(BaseModel):
@@ -57,6 +72,8 @@ class FormatChange(BaseModel):
     description: str
     before: Optional[str] = None
     after: Optional[str] = None
+    count: int = 1  # identical changes folded into this entry
+    examples: list[str] = Field(default_factory=list)  # a few excerpts of the affected text
 
 
 class FormatResultDto(BaseModel):
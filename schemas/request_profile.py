@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+from models import RequestProfile
+
+
+class ProfileStageDto(BaseModel):
+    stage: str
+    seconds: float
+    peak_memory_bytes: int
+
+
+class RequestProfileSummaryDto(BaseModel):
+    """Profile metadata, as listed on /admin/profiles."""
+    id: UUID
+    user_id: UUID
+    endpoint: str
+    profiler: str
+    duration_ms: int
+    peak_memory_bytes: int
+    artifact_type: str
+    created_at: datetime
+
+    @classmethod
+    def from_profile(cls, profile: "RequestProfile") -> "RequestProfileSummaryDto":
+        return cls(
+            id=profile.id,
+            user_id=profile.user_id,
+            endpoint=profile.endpoint,
+            profiler=profile.profiler,
+            duration_ms=profile.duration_ms,
+            peak_memory_bytes=profile.peak_memory_bytes,
+            artifact_type=profile.artifact_type,
+            created_at=profile.created_at,
+        )
+
+
+class RequestProfileDto(RequestProfileSummaryDto):
+    """Full profile: per-stage timings and memory peaks plus the profiler's text report."""
+    stages: list[ProfileStageDto]
+    details: Optional[dict] = None
+    report: str
+
+    @classmethod
+    def from_profile(cls, profile: "RequestProfile") -> "RequestProfileDto":
+        return cls(
+            **RequestProfileSummaryDto.from_profile(profile).model_dump(),
+            stages=[ProfileStageDto(**stage) for stage in profile.stages],
+            details=profile.details,
+            report=profile.report,
+        )
@@ -43,5 +43,7 @@ class UserActionLogListResponse(BaseModel):
     """Schema for paginated list of logs."""
     logs: list[UserActionLogDto]
     total: int
+    total_is_estimate: bool = False
     limit: int
-    offset: int
+    skip: int
+    next_cursor: Optional[str] = None